@@ -0,0 +1,279 @@
+"""
+Annotation Store
+
+Persistent per-entry journal annotations, kept in SQLite.
+
+Without it every journal entry is analyzed again on every call: each
+insights request rescans the full journal history for keywords, and the
+backend scores the same entries again through /api/detect-emotion. The
+store keeps, per entry:
+- 'keywords': the TextAnalyzer keyword IDs found in its text, which the
+  journal emotion, theme and productivity analyses read
+- 'emotion': the EmotionDetector result (emotion, probability and
+  distribution)
+
+Entries are keyed by their 'id' plus a hash of their text. An edited entry
+no longer matches its hash, so it is analyzed again and replaced. Entries
+without an id are keyed by the hash alone. Each annotation also records a
+fingerprint of what produced it: the analyzer's keyword vocabulary, or the
+detector's keywords, inference mode, settings and model file. After a
+change, old annotations simply stop matching and are replaced as entries
+come up again.
+
+Annotations are filled lazily (misses are analyzed in one batch and
+written back) or ahead of time with backfill(), e.g. from a bulk export:
+    python annotation_store.py backfill export.jsonl
+
+Hits and misses of each kind are counted per process (stats(), reported by
+/health). Empty texts are never stored or counted.
+
+The database lives at ANNOTATION_STORE_PATH. When it is not set, the store
+is disabled and every lookup is a pass-through to the analyzer or detector.
+Like the insight state store it is opened lazily in each process and used
+in WAL mode, so gunicorn workers share one file.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from text_analysis import TextAnalyzer, TokenizedEntries
+
+KINDS = ('keywords', 'emotion')
+
+# Keys looked up per query (below SQLite's default variable limit)
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    entry_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (entry_key, kind)
+);
+"""
+
+
+def content_hash(text: str) -> str:
+    """Hash of an entry's text"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _entry_key(entry_id: Any, text_hash: str) -> str:
+    """Store key: the entry's id, or its text hash when it has none"""
+    return f'id:{entry_id}' if entry_id is not None else f'hash:{text_hash}'
+
+
+class AnnotationStore:
+    """
+    SQLite-backed per-entry keyword and emotion annotations
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: SQLite file (default: ANNOTATION_STORE_PATH env var; empty
+                disables the store, ':memory:' for a private store)
+        """
+        self.path = path if path is not None else os.getenv('ANNOTATION_STORE_PATH', '')
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._hits = dict.fromkeys(KINDS, 0)
+        self._misses = dict.fromkeys(KINDS, 0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use in this process (after any fork)"""
+        if self._connection is None or self._pid != os.getpid():
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ':memory:':
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _annotate(self, kind: str, fingerprint: str, texts: Sequence[Optional[str]], ids: Sequence[Any],
+                  analyze: Callable[[List[str]], List[bytes]]) -> List[Optional[bytes]]:
+        """
+        Stored annotation of each non-empty text; misses are analyzed together and stored
+
+        Args:
+            kind: One of KINDS
+            fingerprint: Identifies the analyzer or detector that would produce them now
+            texts: Entry texts (empty or missing texts get None)
+            ids: Entry ids (None where an entry has none)
+            analyze: Encoded annotation of each of a list of texts
+
+        Returns:
+            list: Encoded annotation per text (None for empty texts)
+        """
+        values: List[Optional[bytes]] = [None] * len(texts)
+        wanted = {}
+        for index, (text, entry_id) in enumerate(zip(texts, ids)):
+            if text and isinstance(text, str):
+                text_hash = content_hash(text)
+                wanted.setdefault((_entry_key(entry_id, text_hash), text_hash), []).append(index)
+
+        with self._lock:
+            connection = self._connect()
+            stored = {}
+            keys = list({key for key, _ in wanted})
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                stored.update(((key, text_hash), value) for key, text_hash, value in connection.execute(
+                    f'SELECT entry_key, content_hash, value FROM annotations WHERE kind = ? AND fingerprint = ? '
+                    f'AND entry_key IN ({",".join("?" * len(chunk))})', [kind, fingerprint] + chunk))
+
+        missing = [(key, indexes) for key, indexes in wanted.items() if key not in stored]
+        if missing:
+            analyzed = analyze([texts[indexes[0]] for _, indexes in missing])
+            stored.update((key, value) for (key, _), value in zip(missing, analyzed))
+            with self._lock:
+                connection = self._connect()
+                connection.execute('BEGIN IMMEDIATE')
+                try:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO annotations (entry_key, kind, content_hash, fingerprint, value) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        [(key, kind, text_hash, fingerprint, stored[key, text_hash]) for (key, text_hash), _ in missing])
+                    connection.execute('COMMIT')
+                except BaseException:
+                    connection.execute('ROLLBACK')
+                    raise
+
+        misses = sum(len(indexes) for _, indexes in missing)
+        with self._lock:
+            self._misses[kind] += misses
+            self._hits[kind] += sum(len(indexes) for indexes in wanted.values()) - misses
+        for key, indexes in wanted.items():
+            for index in indexes:
+                values[index] = stored[key]
+        return values
+
+    def tokenize_entries(self, analyzer: TextAnalyzer, entries: List[Dict],
+                         field: str = 'content') -> TokenizedEntries:
+        """
+        TextAnalyzer.tokenize_entries, reading stored keyword IDs and
+        tokenizing only new or edited entries
+        """
+        texts = [entry.get(field) for entry in entries]
+        if not self.enabled:
+            return TokenizedEntries(analyzer, [analyzer.tokenize(text) for text in texts])
+        values = self._annotate('keywords', analyzer.fingerprint, texts, [entry.get('id') for entry in entries],
+                                lambda misses: [analyzer.tokenize(text).astype(np.uint32).tobytes()
+                                                for text in misses])
+        return TokenizedEntries(analyzer, [
+            analyzer.tokenize(text) if value is None else np.frombuffer(value, dtype=np.uint32)
+            for text, value in zip(texts, values)
+        ])
+
+    def detect(self, texts: Sequence[Optional[str]], ids: Optional[Sequence[Any]],
+               predict_batch: Callable[[List[str]], List[Dict]],
+               fingerprint: Union[str, Callable[[], str]]) -> List[Dict]:
+        """
+        Emotion results for a batch of texts, scoring only new or edited entries
+
+        Args:
+            texts: Entry texts
+            ids: Entry ids, or None when the texts have none
+            predict_batch: Scores a list of texts (EmotionDetector.predict_batch
+                or the detection pool)
+            fingerprint: EmotionDetector.fingerprint() of the detector behind
+                predict_batch, or a callable returning it (called only when
+                the store is enabled)
+
+        Returns:
+            list: One result per text, like predict_batch (empty texts are
+            passed to predict_batch as they are)
+        """
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        if not self.enabled:
+            return predict_batch(list(texts))
+        if callable(fingerprint):
+            fingerprint = fingerprint()
+        values = self._annotate('emotion', fingerprint, texts, ids,
+                                lambda misses: [json.dumps(result).encode('utf-8')
+                                                for result in predict_batch(misses)])
+        empty = [index for index, value in enumerate(values) if value is None]
+        results = dict(zip(empty, predict_batch([texts[index] for index in empty]) if empty else []))
+        return [results[index] if value is None else json.loads(value) for index, value in enumerate(values)]
+
+    def backfill(self, entries: Iterable[Dict], analyzer: TextAnalyzer, detector,
+                 chunk_size: int = 500) -> Dict[str, int]:
+        """
+        Annotate journal entries ahead of time, a chunk at a time
+
+        Args:
+            entries: Journal entries ('id' and 'content')
+            analyzer: TextAnalyzer of the insights generator
+            detector: EmotionDetector used for /api/detect-emotion
+            chunk_size: Entries annotated per batch
+
+        Returns:
+            dict: Entries seen and annotations added per kind
+        """
+        before = self.stats()
+        seen = 0
+        entries = iter(entries)
+        fingerprint = detector.fingerprint()
+        while True:
+            chunk = list(islice(entries, chunk_size))
+            if not chunk:
+                break
+            seen += len(chunk)
+            self.tokenize_entries(analyzer, chunk)
+            self.detect([entry.get('content') for entry in chunk], [entry.get('id') for entry in chunk],
+                        detector.predict_batch, fingerprint)
+        after = self.stats()
+        return {'entries': seen, **{f'{kind}_added': after[kind]['misses'] - before[kind]['misses']
+                                    for kind in KINDS}}
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit ratio per kind in this process"""
+        with self._lock:
+            result = {'enabled': self.enabled}
+            for kind in KINDS:
+                lookups = self._hits[kind] + self._misses[kind]
+                result[kind] = {'hits': self._hits[kind], 'misses': self._misses[kind],
+                                'hit_rate': round(self._hits[kind] / lookups, 4) if lookups else 0.0}
+            return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Annotate the journal entries of a JSONL export of users')
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('input', help='JSONL export, one user per line (see bulk_insights.py)')
+    parser.add_argument('--path', help='Store file (default: ANNOTATION_STORE_PATH)')
+    args = parser.parse_args()
+
+    from emotion_detector import EmotionDetector
+    from personalized_insights import PersonalizedInsights
+
+    store = AnnotationStore(args.path)
+    if not store.enabled:
+        parser.error('Set ANNOTATION_STORE_PATH or --path')
+
+    def journal_entries():
+        with open(args.input, 'rb') as export:
+            for line in export:
+                if line.strip():
+                    yield from json.loads(line).get('journal_entries') or []
+
+    print(json.dumps(store.backfill(journal_entries(), PersonalizedInsights().text_analyzer, EmotionDetector())))
@@ -8,19 +8,32 @@ Provides REST API endpoints for:
 - Personalized insights generation
 - Mood pattern analysis
 - Productivity insights
+- Weekly summaries
 - Habit recommendations
 
 This service is optional but enhances the main application with AI-powered features.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+import functools
+import json
 import os
+import threading
+import time
 import numpy as np
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from annotation_store import AnnotationStore
+from daily_rollup import parse_day
+from detection_pool import DetectionPool
 from emotion_detector import EmotionDetector
+from insight_frames import resolve_timezone
+from insight_state import RECORD_TABLES, InsightStateStore, InvalidDelta
+from micro_batcher import MicroBatcher
+from mood_trends import trend_options
 from personalized_insights import PersonalizedInsights
+from response_cache import ResponseCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -32,23 +45,244 @@ app = Flask(__name__)
 # Origins are loaded from environment variable (see .env.example)
 CORS(app, origins=os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5002').split(','))
 
-# Initialize ML components
-detector = EmotionDetector()  # Handles emotion detection from text
-insights_generator = PersonalizedInsights()  # Generates personalized insights
+# ML components are created on first use (or by the background warm-up)
+# so importing the app stays fast and /health answers right away
+_detector = None  # Handles emotion detection from text
+_insights_generator = None  # Generates personalized insights
+_detection_pool = None  # Spreads large batches over several processes
+_micro_batcher = None  # Groups concurrent single-text detections (opt-in)
+_insight_state = None  # Per-user insight aggregates fed by delta ingestion
+_components_lock = threading.Lock()
+
+# Serialized insight responses, keyed by endpoint and canonical request body
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 300))
+)
+
+# Per-entry keyword and emotion annotations kept across requests
+# (disabled unless ANNOTATION_STORE_PATH is set)
+annotation_store = AnnotationStore()
+
+# Readiness: set once warm-up has built the components, compiled the
+# keyword matchers and loaded the model (if any)
+service_state = {
+    'ready': False,
+    'started_at': time.time(),
+    'warm_up_seconds': None,
+    'warm_up_error': None
+}
+
+def get_detector():
+    """Return the shared EmotionDetector, creating it on first use"""
+    global _detector
+    if _detector is None:
+        with _components_lock:
+            if _detector is None:
+                _detector = EmotionDetector()
+    return _detector
+
+def get_insights_generator():
+    """Return the shared PersonalizedInsights, creating it on first use"""
+    global _insights_generator
+    if _insights_generator is None:
+        with _components_lock:
+            if _insights_generator is None:
+                _insights_generator = PersonalizedInsights(annotations=annotation_store)
+    return _insights_generator
+
+def get_detection_pool():
+    """Return the shared DetectionPool (its processes start on first large batch)"""
+    global _detection_pool
+    if _detection_pool is None:
+        detector = get_detector()
+        with _components_lock:
+            if _detection_pool is None:
+                _detection_pool = DetectionPool(detector)
+    return _detection_pool
+
+def get_micro_batcher():
+    """Return the shared MicroBatcher (passes straight through when disabled)"""
+    global _micro_batcher
+    if _micro_batcher is None:
+        detector = get_detector()
+        with _components_lock:
+            if _micro_batcher is None:
+                _micro_batcher = MicroBatcher(detector)
+    return _micro_batcher
+
+def get_insight_state():
+    """Return the shared InsightStateStore (the database opens on first use)"""
+    global _insight_state
+    if _insight_state is None:
+        generator = get_insights_generator()
+        with _components_lock:
+            if _insight_state is None:
+                _insight_state = InsightStateStore(generator)
+    return _insight_state
+
+def _wants_stored_state(data, record_lists):
+    """A request naming a user_id and posting none of the record lists is answered from stored state"""
+    return data.get('user_id') is not None and not any(name in data for name in record_lists)
+
+def _period(data):
+    """(start, end) epoch days from optional "start"/"end" ISO dates; ValueError if invalid"""
+    return parse_day(data.get('start')), parse_day(data.get('end'))
+
+def _valid_timezone(timezone):
+    """An omitted timezone or a known IANA name"""
+    try:
+        resolve_timezone(timezone)
+        return True
+    except ValueError:
+        return False
+
+def _tagged_response(response, etag):
+    """Set the ETag, answering 304 Not Modified when the client already holds it"""
+    if request.if_none_match.contains(etag):
+        response_cache.record_not_modified(request.path)
+        response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def serve_cached_responses(view):
+    """
+    Answer a byte-identical repeat of a recently cached request before the
+    view parses its body; everything else goes to the view
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if response_cache.enabled:
+            raw_key = ResponseCache.make_raw_key(request.path, request.query_string, request.get_data())
+            key = response_cache.known_key(raw_key)
+            if key is None:
+                g.response_cache_raw_key = raw_key
+            else:
+                cached = response_cache.get(request.path, key)
+                if cached is not None:
+                    body, etag = cached
+                    return _tagged_response(app.response_class(body, mimetype=app.json.mimetype), etag)
+                # Already counted as a miss; cached_json_response stores the fresh body
+                g.response_cache_key = key
+        return view(*args, **kwargs)
+    return wrapper
+
+def cached_json_response(data, compute):
+    """
+    JSON response for the current request, served from the response cache
+    when an identical request was answered recently
+    
+    Every response carries an ETag; a request whose If-None-Match already
+    holds it gets 304 Not Modified without a body.
+    
+    Args:
+        data: Parsed request body (part of the cache key)
+        compute: Zero-argument callable returning the payload on a miss
+    
+    Returns:
+        Response with an ETag header
+    """
+    key = g.pop('response_cache_key', None)
+    raw_key = g.pop('response_cache_raw_key', None)
+    cached = None
+    if key is None and raw_key is not None:
+        key = response_cache.key_for(raw_key, request.path, request.query_string, data)
+        cached = response_cache.get(request.path, key)
+    
+    if cached is None:
+        response = jsonify(compute())
+        etag = ResponseCache.make_etag(response.get_data())
+        if key is not None:
+            response_cache.put(key, response.get_data(), etag)
+    else:
+        body, etag = cached
+        response = app.response_class(body, mimetype=app.json.mimetype)
+    
+    return _tagged_response(response, etag)
+
+def warm_up():
+    """
+    Build and exercise the ML components, then mark the service ready
+    
+    Runs in a background thread at startup. Requests that arrive earlier
+    still work; they just build the components themselves.
+    """
+    start = time.perf_counter()
+    try:
+        get_detector().warm_up()
+        get_insights_generator()
+        service_state['ready'] = True
+    except Exception as e:
+        service_state['warm_up_error'] = str(e)
+        app.logger.error(f'Warm-up failed: {str(e)}')
+    finally:
+        service_state['warm_up_seconds'] = round(time.perf_counter() - start, 3)
+
+def start_warm_up():
+    """Start warm-up in a daemon thread so it never blocks startup"""
+    thread = threading.Thread(target=warm_up, name='ml-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def health_status():
+    """
+    Liveness payload shared by /health here and in the async entry point
+    
+    Returns:
+        tuple: (payload dict, HTTP status)
+    """
+    detector = _detector
+    return {
+        'status': 'OK',
+        'message': 'ML Service is running',
+        'ready': service_state['ready'],
+        'uptime_seconds': round(time.time() - service_state['started_at'], 1),
+        'warm_up_seconds': service_state['warm_up_seconds'],
+        'warm_up_error': service_state['warm_up_error'],
+        'model_loaded': detector.is_loaded() if detector else False,
+        'inference_mode': detector.active_inference_mode() if detector else None,
+        'prediction_cache': detector.cache.stats() if detector else None,
+        'detection_pool': _detection_pool.stats() if _detection_pool else None,
+        'micro_batcher': _micro_batcher.stats() if _micro_batcher else None,
+        'response_cache': response_cache.stats(),
+        'annotation_store': annotation_store.stats()
+    }, 200
+
+def readiness_status():
+    """
+    Readiness payload shared by /health/ready here and in the async entry point
+    
+    Returns:
+        tuple: (payload dict, HTTP status) - 503 until warm-up has finished
+    """
+    if not service_state['ready']:
+        return {'ready': False}, 503
+    return {'ready': True}, 200
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint
     
-    Returns service status and model availability
+    Liveness: always answers 200 while the process is running.
+    Readiness is reported separately in the 'ready' field (and by
+    /health/ready) and only becomes true after warm-up.
     Used by monitoring systems and deployment platforms
     """
-    return jsonify({
-        'status': 'OK',
-        'message': 'ML Service is running',
-        'model_loaded': detector.is_loaded()
-    })
+    payload, status = health_status()
+    return jsonify(payload), status
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness check endpoint
+    
+    Returns 503 until warm-up has finished so load balancers only route
+    traffic to workers that can answer quickly.
+    """
+    payload, status = readiness_status()
+    return jsonify(payload), status
 
 @app.route('/api/detect-emotion', methods=['POST'])
 def detect_emotion():
@@ -57,9 +291,13 @@ def detect_emotion():
     
     Request body:
         {
-            "text": "I feel amazing today!"
+            "text": "I feel amazing today!",
+            "id": 7  (optional journal entry id, see below)
         }
     
+    With the annotation store enabled, a text already scored (under its
+    id, or its content when there is none) is answered from the store.
+    
     Response:
         {
             "emotion": "joy",
@@ -78,8 +316,11 @@ def detect_emotion():
         if not text or len(text.strip()) == 0:
             return jsonify({'error': 'Text cannot be empty'}), 400
         
-        # Detect emotion
-        result = detector.predict(text)
+        # Detect emotion (batched with concurrent requests when enabled),
+        # unless the entry was already scored
+        result = annotation_store.detect([text], [data.get('id')],
+                                         lambda texts: [get_micro_batcher().predict(text) for text in texts],
+                                         lambda: get_detector().fingerprint())[0]
         
         return jsonify(result)
     
@@ -90,6 +331,23 @@ def detect_emotion():
             'details': str(e)
         }), 500
 
+def detect_batch(texts, ids=None):
+    """
+    Score a list of texts for the batch endpoints
+    
+    The whole batch is scored at once (duplicates only once), across the
+    process pool when it is large enough. With the annotation store
+    enabled, only texts it has not seen (under their id, or their content
+    when ids is None or an id is None) are scored. Empty texts get a
+    neutral result with an empty distribution.
+    """
+    results = annotation_store.detect(texts, ids, get_detection_pool().predict_batch,
+                                      lambda: get_detector().fingerprint())
+    for text, result in zip(texts, results):
+        if not text or len(text.strip()) == 0:
+            result['all_emotions'] = {}
+    return results
+
 @app.route('/api/batch-detect', methods=['POST'])
 def batch_detect_emotion():
     """
@@ -99,7 +357,8 @@ def batch_detect_emotion():
     
     Request body:
         {
-            "texts": ["Text 1", "Text 2", "Text 3"]
+            "texts": ["Text 1", "Text 2", "Text 3"],
+            "ids": [7, 8, 9]  (optional journal entry ids, one per text)
         }
     
     Response:
@@ -122,18 +381,11 @@ def batch_detect_emotion():
         if not isinstance(texts, list):
             return jsonify({'error': 'Texts must be a list'}), 400
         
-        results = []
-        for text in texts:
-            if text and len(text.strip()) > 0:
-                results.append(detector.predict(text))
-            else:
-                results.append({
-                    'emotion': 'neutral',
-                    'probability': 0.5,
-                    'all_emotions': {}
-                })
+        ids = data.get('ids')
+        if ids is not None and (not isinstance(ids, list) or len(ids) != len(texts)):
+            return jsonify({'error': 'ids must be a list with one id per text'}), 400
         
-        return jsonify({'results': results})
+        return jsonify({'results': detect_batch(texts, ids)})
     
     except Exception as e:
         app.logger.error(f'Error in batch detection: {str(e)}')
@@ -142,7 +394,84 @@ def batch_detect_emotion():
             'details': str(e)
         }), 500
 
+def _parse_ndjson_line(line):
+    """
+    Extract the text and optional entry id from one NDJSON input line
+    (a JSON string or {"text": ..., "id": ...})
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    item = json.loads(line)
+    entry_id = None
+    if isinstance(item, dict):
+        item, entry_id = item.get('text', ''), item.get('id')
+    if item is not None and not isinstance(item, str):
+        raise ValueError('Each line must be a JSON string or an object with a "text" field')
+    return item, entry_id
+
+def _stream_batch_results(lines, max_batch_size):
+    """
+    Generator pipeline: NDJSON lines in, NDJSON result lines out
+    
+    Lines are scored in small batches that start at 1 and double up to
+    max_batch_size, so the first result goes out immediately while later
+    ones still benefit from batched scoring. Only the current batch is
+    held in memory, whatever the size of the request.
+    """
+    batch = []  # (line number, text or error message, is_error, entry id)
+    batch_size = 1
+    
+    def flush():
+        texts = [text if not is_error else None for _, text, is_error, _ in batch]
+        results = detect_batch(texts, [entry_id for _, _, _, entry_id in batch])
+        for (line_number, text, is_error, _), result in zip(batch, results):
+            if is_error:
+                result = {'error': text, 'line': line_number}
+            yield json.dumps(result) + '\n'
+    
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            text, entry_id = _parse_ndjson_line(line)
+            batch.append((line_number, text, False, entry_id))
+        except ValueError as e:
+            batch.append((line_number, f'Invalid line: {str(e)}', True, None))
+        
+        if len(batch) >= batch_size:
+            yield from flush()
+            batch = []
+            batch_size = min(batch_size * 2, max_batch_size)
+    
+    if batch:
+        yield from flush()
+
+@app.route('/api/batch-detect/stream', methods=['POST'])
+def batch_detect_emotion_stream():
+    """
+    Streaming batch emotion detection (NDJSON in, NDJSON out)
+    
+    Built for large backfills: the request body is read line by line and
+    each result is written as soon as it is computed, so memory stays flat
+    and the first result arrives right away.
+    
+    Request body (Content-Type: application/x-ndjson), one entry per line:
+        "Text 1"
+        {"text": "Text 2"}
+        {"text": "Text 3", "id": 9}  (optional journal entry id, see /api/detect-emotion)
+    
+    Response (chunked, application/x-ndjson), one result per input line:
+        {"emotion": "happy", "probability": 0.8, "all_emotions": {...}}
+        {"error": "Invalid line: ...", "line": 3}
+    """
+    max_batch_size = int(os.getenv('STREAM_BATCH_SIZE', 256))
+    return Response(
+        stream_with_context(_stream_batch_results(request.stream, max_batch_size)),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/api/personalized-insights', methods=['POST'])
+@serve_cached_responses
 def generate_personalized_insights():
     """
     Generate personalized insights based on user data
@@ -155,8 +484,16 @@ def generate_personalized_insights():
             "journal_entries": [...],
             "mood_history": [...],
             "task_history": [...],
-            "habit_data": [...]
+            "habit_data": [...],
+            "timezone": "Europe/Berlin"  (optional, for best productivity times)
         }
+    
+    Or, to answer from the state kept by /api/insight-state/ingest:
+        {"user_id": 42}
+    
+    Query parameters:
+        profile: "true" adds analysis_profile (time per section and the
+            intermediates each section used)
     """
     try:
         data = request.get_json()
@@ -164,21 +501,38 @@ def generate_personalized_insights():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        if _wants_stored_state(data, RECORD_TABLES):
+            state = get_insight_state()
+            if not state.has_user(data['user_id']):
+                return jsonify({'error': 'No stored insight state for this user'}), 404
+            return jsonify(state.insights(data['user_id']))
+        
         # Extract user data
         journal_entries = data.get('journal_entries', [])
         mood_history = data.get('mood_history', [])
         task_history = data.get('task_history', [])
         habit_data = data.get('habit_data', [])
+        timezone = data.get('timezone')
+        profile = request.args.get('profile', '').lower() in ('1', 'true')
+        
+        if not _valid_timezone(timezone):
+            return jsonify({'error': f'Unknown timezone: {timezone}'}), 400
         
         # Generate insights
-        insights = insights_generator.generate_insights(
-            journal_entries=journal_entries,
-            mood_history=mood_history,
-            task_history=task_history,
-            habit_data=habit_data
-        )
+        def compute():
+            return get_insights_generator().generate_insights(
+                journal_entries=journal_entries,
+                mood_history=mood_history,
+                task_history=task_history,
+                habit_data=habit_data,
+                profile=profile,
+                timezone=timezone
+            )
         
-        return jsonify(insights)
+        # Profiles time this request's analysis, so they are never cached
+        if profile:
+            return jsonify(compute())
+        return cached_json_response(data, compute)
     
     except Exception as e:
         app.logger.error(f'Error generating insights: {str(e)}')
@@ -187,21 +541,84 @@ def generate_personalized_insights():
             'details': str(e)
         }), 500
 
+@app.route('/api/insight-state/ingest', methods=['POST'])
+def ingest_insight_state():
+    """
+    Apply new, changed and deleted records to a user's stored insight state
+    
+    Request body:
+        {
+            "user_id": 42,
+            "journal_entries": [{"id": 7, ...}],
+            "mood_history": [...],
+            "task_history": [...],
+            "habit_data": [{"id": 3, "name": "...", "marked_days": [...]}],
+            "deleted": {"task_history": [12, 13]},
+            "replace": false
+        }
+    
+    Every record needs an id; a known id replaces the stored record.
+    "replace": true drops the user's state first (full resync).
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or data.get('user_id') is None:
+            return jsonify({'error': 'No user_id provided'}), 400
+        
+        result = get_insight_state().ingest(data['user_id'], data)
+        return jsonify(result)
+    
+    except InvalidDelta as e:
+        return jsonify({'error': str(e)}), 400
+    
+    except Exception as e:
+        app.logger.error(f'Error ingesting insight state: {str(e)}')
+        return jsonify({
+            'error': 'Failed to ingest insight state',
+            'details': str(e)
+        }), 500
+
 @app.route('/api/mood-patterns', methods=['POST'])
+@serve_cached_responses
 def analyze_mood_patterns():
-    """Analyze mood patterns and trends"""
+    """
+    Analyze mood patterns and trends
+    
+    Request body: {"mood_history": [...]}, or {"user_id": 42} to answer
+    from the state kept by /api/insight-state/ingest. With the user_id,
+    "start" and/or "end" dates ("2026-01-31") limit the analysis to that
+    period, answered from the user's daily rollup.
+    
+    Query parameters (trend_analytics):
+        windows: Rolling window lengths in days (default "7,30,90")
+        halflife: EWMA half-life in days (default 7)
+        points: Most points in the downsampled series (default 90)
+    """
     try:
         data = request.get_json()
         
+        try:
+            options = trend_options(request.args.get('windows'), request.args.get('halflife'),
+                                    request.args.get('points'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if data and _wants_stored_state(data, ['mood_history']):
+            try:
+                start, end = _period(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(get_insight_state().mood_patterns(data['user_id'], options, start, end))
+        
         if not data or 'mood_history' not in data:
             return jsonify({'error': 'No mood history provided'}), 400
         
         mood_history = data['mood_history']
         
         # Analyze patterns
-        patterns = insights_generator.analyze_mood_patterns(mood_history)
-        
-        return jsonify(patterns)
+        return cached_json_response(data, lambda: get_insights_generator().analyze_mood_patterns(mood_history,
+                                                                                                 options))
     
     except Exception as e:
         app.logger.error(f'Error analyzing mood patterns: {str(e)}')
@@ -211,26 +628,45 @@ def analyze_mood_patterns():
         }), 500
 
 @app.route('/api/productivity-insights', methods=['POST'])
+@serve_cached_responses
 def analyze_productivity():
-    """Analyze productivity patterns"""
+    """
+    Analyze productivity patterns
+    
+    Request body: {"task_history": [...], "mood_history": [...],
+    "journal_entries": [...], "timezone": ...}, or {"user_id": 42} to answer
+    from the state kept by /api/insight-state/ingest. With the user_id,
+    "start" and/or "end" dates limit the analysis to that period, answered
+    from the user's daily rollup (completion and mood correlation only).
+    """
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        if _wants_stored_state(data, ['task_history', 'mood_history', 'journal_entries']):
+            try:
+                start, end = _period(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(get_insight_state().productivity(data['user_id'], start, end))
+        
         task_history = data.get('task_history', [])
         mood_history = data.get('mood_history', [])
         journal_entries = data.get('journal_entries', [])
+        timezone = data.get('timezone')
+        
+        if not _valid_timezone(timezone):
+            return jsonify({'error': f'Unknown timezone: {timezone}'}), 400
         
         # Analyze productivity
-        insights = insights_generator.analyze_productivity(
+        return cached_json_response(data, lambda: get_insights_generator().analyze_productivity(
             task_history=task_history,
             mood_history=mood_history,
-            journal_entries=journal_entries
-        )
-        
-        return jsonify(insights)
+            journal_entries=journal_entries,
+            timezone=timezone
+        ))
     
     except Exception as e:
         app.logger.error(f'Error analyzing productivity: {str(e)}')
@@ -239,7 +675,42 @@ def analyze_productivity():
             'details': str(e)
         }), 500
 
+@app.route('/api/weekly-summary', methods=['POST'])
+def weekly_summary():
+    """
+    Summarize a week of a user's stored state from the daily rollup
+    
+    Request body:
+        {
+            "user_id": 42,
+            "end": "2026-01-31"  (optional, last day of the week; default today)
+        }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or data.get('user_id') is None:
+            return jsonify({'error': 'No user_id provided'}), 400
+        
+        try:
+            end = parse_day(data.get('end'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        state = get_insight_state()
+        if not state.has_user(data['user_id']):
+            return jsonify({'error': 'No stored insight state for this user'}), 404
+        return jsonify(state.weekly_summary(data['user_id'], end))
+    
+    except Exception as e:
+        app.logger.error(f'Error generating weekly summary: {str(e)}')
+        return jsonify({
+            'error': 'Failed to generate weekly summary',
+            'details': str(e)
+        }), 500
+
 @app.route('/api/habit-recommendations', methods=['POST'])
+@serve_cached_responses
 def generate_habit_recommendations():
     """Generate personalized habit recommendations"""
     try:
@@ -253,13 +724,11 @@ def generate_habit_recommendations():
         journal_entries = data.get('journal_entries', [])
         
         # Generate recommendations
-        recommendations = insights_generator.generate_habit_recommendations(
+        return cached_json_response(data, lambda: get_insights_generator().generate_habit_recommendations(
             current_habits=current_habits,
             mood_history=mood_history,
             journal_entries=journal_entries
-        )
-        
-        return jsonify(recommendations)
+        ))
     
     except Exception as e:
         app.logger.error(f'Error generating habit recommendations: {str(e)}')
@@ -278,6 +747,14 @@ def internal_error(error):
     """Handle 500 errors - internal server error"""
     return jsonify({'error': 'Internal server error'}), 500
 
+# Warm up as soon as the app is imported. In the background by default;
+# ML_WARM_UP=sync blocks instead, which gunicorn.conf.py uses with
+# preload_app so the master finishes warm-up before forking workers.
+if os.getenv('ML_WARM_UP', 'background') == 'sync':
+    warm_up()
+else:
+    start_warm_up()
+
 # Application entry point
 if __name__ == '__main__':
     # Get configuration from environment variables
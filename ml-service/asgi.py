@@ -0,0 +1,71 @@
+"""
+Echo: Intune - ML Service ASGI Entry Point
+
+Async serving mode for the ML service. It exposes exactly the same endpoints
+and payloads as app.py: the Flask app is wrapped in an ASGI adapter, so every
+route still has a single implementation.
+
+How requests are served:
+- An event loop (uvicorn) accepts connections and reads request bodies, so
+  idle or slow clients only cost a socket each instead of a whole worker
+- Route handlers run in a bounded thread pool (ASGI_THREADS). CPU-bound
+  analysis such as personalized insights never blocks the event loop, and a
+  long request only holds one thread while short ones keep being answered
+- /health and /health/ready are answered on the event loop itself, so
+  probes stay fast even when every handler thread is busy
+
+Large detection batches still go to the process pool (detection_pool.py)
+from inside their handler thread.
+
+Usage:
+    ML_SERVER_MODE=async gunicorn --config gunicorn.conf.py
+    uvicorn asgi:app --port 5001  (single process, for development)
+"""
+
+import json
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app, health_status, readiness_status
+
+# Handler threads per worker process. Analysis is CPU-bound, so more threads
+# than this mostly add context switching; further requests wait in a queue
+# on the event loop instead of in the kernel's accept backlog.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+
+_flask_asgi = WSGIMiddleware(flask_app, workers=ASGI_THREADS)
+
+# Answered without a handler thread (cheap, no request body)
+_LOOP_ROUTES = {
+    '/health': health_status,
+    '/health/ready': readiness_status
+}
+
+
+async def _send_json(send, payload, status):
+    """Send a JSON response formatted like Flask's jsonify"""
+    body = (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii'))
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def app(scope, receive, send):
+    """
+    ASGI application
+
+    Health probes are answered on the event loop; every other request is
+    handed to the Flask app in the handler thread pool.
+    """
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] in _LOOP_ROUTES:
+        payload, status = _LOOP_ROUTES[scope['path']]()
+        await _send_json(send, payload, status)
+        return
+    await _flask_asgi(scope, receive, send)
@@ -0,0 +1,126 @@
+"""
+Annotation Store Benchmark
+
+Replays a user's dashboard over several days. Each day the user writes one
+new journal entry and edits one old entry. The backend then:
+1. scores every entry with EmotionDetector.predict_batch, as it does for
+   /api/batch-detect (the prediction cache is disabled: it is per process
+   and would not survive a restart or reach another worker)
+2. asks for the journal insights (tokenizing every entry)
+
+Both run with the annotation store off (everything is analyzed again) and
+on (annotation_store.AnnotationStore in a temporary SQLite file, filled by
+a backfill first).
+
+The script first checks that results with the store equal results
+without it, including after edits. It then times a day for journals of
+365, 3 650 and 10 000 entries (about 600 characters each) and prints the
+store's hit ratios.
+
+Usage:
+    python benchmarks/annotation_store_reuse.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from annotation_store import AnnotationStore
+from emotion_detector import EmotionDetector
+from journal_themes_streaming import journal_entries
+from personalized_insights import PersonalizedInsights
+
+DAYS = 5
+
+
+def day_of_use(insights, detector, store, entries):
+    """Score every entry, then analyze the journal; returns both results"""
+    texts = [entry['content'] for entry in entries]
+    if store.enabled:
+        emotions = store.detect(texts, [entry.get('id') for entry in entries], detector.predict_batch,
+                                detector.fingerprint())
+    else:
+        emotions = detector.predict_batch(texts)
+    return emotions, insights._analyze_journal_patterns(entries)
+
+
+def journal(count, seed):
+    entries = list(journal_entries(count, seed))
+    for index, entry in enumerate(entries):
+        entry['id'] = index
+    return entries
+
+
+def next_day(entries, rng):
+    """One new entry and one edited entry"""
+    new = next(journal_entries(1, rng.random()))
+    new['id'] = len(entries)
+    edited = rng.randrange(len(entries))
+    entries[edited] = dict(entries[edited], content=entries[edited]['content'] + ' later i felt anxious')
+    return entries + [new]
+
+
+def check_equivalence(directory):
+    detector = EmotionDetector(cache_max_entries=0)
+    plain = PersonalizedInsights()
+    store = AnnotationStore(os.path.join(directory, 'check.db'))
+    stored = PersonalizedInsights(annotations=store)
+    rng = random.Random(42)
+    entries = journal(300, seed=1)
+    entries[5]['content'] = ''
+    del entries[7]['id']
+    mismatches = 0
+    for _ in range(DAYS):
+        expected = day_of_use(plain, detector, AnnotationStore(''), entries)
+        actual = day_of_use(stored, detector, store, entries)
+        mismatches += json.dumps(expected, sort_keys=True) != json.dumps(actual, sort_keys=True)
+        entries = next_day(entries, rng)
+    print(f"Days: {DAYS}, {mismatches} mismatches; store {json.dumps(store.stats())}")
+    return mismatches == 0
+
+
+def run_benchmark(directory):
+    detector = EmotionDetector(cache_max_entries=0)
+    print(f"\n{'entries':>8} {'off (ms)':>9} {'on (ms)':>8} {'speedup':>8} {'keyword hits':>13} {'emotion hits':>13} "
+          f"{'backfill (s)':>13}")
+    for count in [365, 3650, 10000]:
+        store = AnnotationStore(os.path.join(directory, f'{count}.db'))
+        plain, stored = PersonalizedInsights(), PersonalizedInsights(annotations=store)
+        entries = journal(count, seed=count)
+        started = time.perf_counter()
+        store.backfill(entries, stored.text_analyzer, detector)
+        backfill = time.perf_counter() - started
+        before = store.stats()
+
+        rng = random.Random(count)
+        off = on = 0.0
+        for _ in range(DAYS):
+            entries = next_day(entries, rng)
+            started = time.perf_counter()
+            day_of_use(plain, detector, AnnotationStore(''), entries)
+            off += time.perf_counter() - started
+            started = time.perf_counter()
+            day_of_use(stored, detector, store, entries)
+            on += time.perf_counter() - started
+
+        after = store.stats()
+        rates = []
+        for kind in ['keywords', 'emotion']:
+            hits = after[kind]['hits'] - before[kind]['hits']
+            misses = after[kind]['misses'] - before[kind]['misses']
+            rates.append(hits / (hits + misses))
+        print(f"{count:>8} {off / DAYS * 1e3:>9.1f} {on / DAYS * 1e3:>8.1f} {off / on:>7.1f}x {rates[0]:>13.4f} "
+              f"{rates[1]:>13.4f} {backfill:>13.2f}")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        if not check_equivalence(directory):
+            sys.exit(1)
+        run_benchmark(directory)
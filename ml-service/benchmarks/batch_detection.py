@@ -0,0 +1,65 @@
+"""
+Batch Detection Benchmark
+
+Compares EmotionDetector.predict_batch with calling predict() once per text,
+as /api/batch-detect used to do.
+
+1. Verifies both return identical per-item results in the same order
+2. Times both for journal backfills of growing size
+
+Usage:
+    python benchmarks/batch_detection.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from emotion_detector import EmotionDetector
+from keyword_matching import FILLER_WORDS, build_golden_corpus
+
+
+def build_backfill(detector, size, duplicate_rate, seed=3):
+    """Journal history where `duplicate_rate` of entries repeat an earlier one"""
+    rng = random.Random(seed)
+    keywords = [k for keywords in detector.emotion_keywords.values() for k in keywords]
+    texts = []
+    for _ in range(size):
+        if texts and rng.random() < duplicate_rate:
+            texts.append(rng.choice(texts))
+            continue
+        words = [rng.choice(keywords) if rng.random() < 0.05 else rng.choice(FILLER_WORDS)
+                 for _ in range(rng.randint(20, 300))]
+        texts.append(' '.join(words) + rng.choice(['.', '!', '?']))
+    return texts
+
+
+def check_identical(detector):
+    corpus = build_golden_corpus(detector) + ['', '   ', 'I feel amazing today!', 'I feel amazing today!']
+    expected = [detector.predict(text) for text in corpus]
+    actual = detector.predict_batch(corpus)
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"Golden corpus: {len(corpus)} entries, {mismatches} mismatches")
+    return mismatches == 0 and len(expected) == len(actual)
+
+
+def run_benchmark(detector):
+    print(f"\n{'texts':>7} {'duplicates':>11} {'per-text (ms)':>14} {'batch (ms)':>11} {'speedup':>8}")
+    for size in [10, 100, 1000, 10000]:
+        for duplicate_rate in [0.0, 0.3]:
+            texts = build_backfill(detector, size, duplicate_rate)
+            number = max(1, 1000 // size)
+            loop = min(timeit.repeat(lambda: [detector.predict(t) for t in texts], number=number, repeat=3)) / number
+            batch = min(timeit.repeat(lambda: detector.predict_batch(texts), number=number, repeat=3)) / number
+            print(f"{size:>7} {duplicate_rate:>11.0%} {loop * 1e3:>14.2f} {batch * 1e3:>11.2f} {loop / batch:>7.1f}x")
+
+
+if __name__ == '__main__':
+    # Measure scoring itself, not prediction cache hits across repeats
+    detector = EmotionDetector(cache_max_entries=0)
+    if not check_identical(detector):
+        sys.exit(1)
+    run_benchmark(detector)
@@ -0,0 +1,97 @@
+"""
+Bulk Insights Benchmark
+
+Compares ways of precomputing /api/personalized-insights for every user of
+an export:
+- http: one POST per user to the Flask app (test client, no network), one
+  after the other, as the nightly job does today
+- bulk: bulk_insights.BulkInsightsJob reading the JSONL export, with the
+  pool disabled (processes=0) and with 1, 2 and 4 processes
+
+The export has 400 users with 0 to 3 years of history (daily mood logs,
+about 4 tasks a day, 6 habits). Results are written as JSONL. The script
+first checks that every bulk result equals the HTTP response for the same
+user.
+
+Usage:
+    python benchmarks/bulk_insights_throughput.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('ML_WARM_UP', 'sync')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import app, response_cache
+from bulk_insights import BulkInsightsJob
+from insight_frames_scaling import build_history
+
+USERS = 400
+
+
+def write_export(path, rng):
+    with open(path, 'w') as export:
+        for user_id in range(USERS):
+            journal, moods, tasks, habits = build_history(rng.choice([0, 30, 365, 3 * 365]), rng)
+            export.write(json.dumps({'user_id': user_id, 'journal_entries': journal, 'mood_history': moods,
+                                     'task_history': tasks, 'habit_data': habits}) + '\n')
+
+
+def run_http(path):
+    """Every user's response body, one POST at a time"""
+    client = app.test_client()
+    results = {}
+    with open(path, 'rb') as export:
+        for line in export:
+            user_id = json.loads(line)['user_id']
+            results[user_id] = client.post('/api/personalized-insights', data=line,
+                                           content_type='application/json').get_json()
+    return results
+
+
+def run_bulk(path, output, processes):
+    return BulkInsightsJob(output, processes=processes, progress=None).run(path, resume=False)
+
+
+def check_equivalence(http_results, output):
+    with open(output) as results:
+        bulk_results = {row['user_id']: row['insights'] for row in map(json.loads, results)}
+    mismatches = sum(json.dumps(bulk_results.get(user_id), sort_keys=True) != json.dumps(result, sort_keys=True)
+                     for user_id, result in http_results.items())
+    print(f"Users: {len(http_results)}, {mismatches} mismatches between bulk and HTTP results")
+    return mismatches == 0
+
+
+def run_benchmark(directory):
+    path = os.path.join(directory, 'export.jsonl')
+    write_export(path, random.Random(3))
+    print(f"Export: {USERS} users, {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)\n")
+
+    max_entries, response_cache.max_entries = response_cache.max_entries, 0
+    started = time.perf_counter()
+    http_results = run_http(path)
+    http_seconds = time.perf_counter() - started
+    response_cache.max_entries = max_entries
+
+    output = os.path.join(directory, 'insights.jsonl')
+    run_bulk(path, output, 0)
+    if not check_equivalence(http_results, output):
+        sys.exit(1)
+
+    print(f"\n{'mode':>14} {'seconds':>8} {'users/s':>8} {'parse':>6} {'analyze':>8} {'serialize':>10} {'write':>6}")
+    print(f"{'http':>14} {http_seconds:>8.1f} {USERS / http_seconds:>8.1f}")
+    for processes in [0, 1, 2, 4]:
+        summary = run_bulk(path, output, processes)
+        stages = summary['stages']
+        print(f"{f'bulk ({processes} proc)':>14} {summary['seconds']:>8.1f} {summary['users_per_second']:>8.1f} "
+              f"{stages['parse']:>6.1f} {stages['analyze']:>8.1f} {stages['serialize']:>10.1f} {stages['write']:>6.1f}")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        run_benchmark(directory)
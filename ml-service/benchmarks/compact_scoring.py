@@ -0,0 +1,90 @@
+"""
+Compact Model Benchmark
+
+Trains the TF-IDF + Naive Bayes model on the synthetic labelled corpus,
+exports it with compact_model.py in every dtype and compares each export
+with the scikit-learn pipeline:
+1. Largest probability difference and predicted-label agreement on a
+   held-out set (must stay within compact_model.TOLERANCES)
+2. Size on disk
+3. Cold start in a fresh interpreter: importing the detector and loading
+   the model (MODEL_PATH pointing at the pickle or the .npz)
+4. Scoring time for single texts and for a batch
+
+Usage:
+    python benchmarks/compact_scoring.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_model import TOLERANCES, export_compact_model, load_compact_model, max_probability_error
+from emotion_detector import EmotionDetector
+from inference_modes import build_labelled_corpus
+
+COLD_START = (
+    "import time; start = time.perf_counter(); "
+    "from emotion_detector import EmotionDetector; "
+    "detector = EmotionDetector(); assert detector.is_loaded(); "
+    "detector.predict('warm up'); print(time.perf_counter() - start)"
+)
+
+
+def cold_start_seconds(model_path, runs=5):
+    env = dict(os.environ, MODEL_PATH=model_path, EMOTION_INFERENCE_MODE='model', MODEL_MMAP_MODE='r')
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', COLD_START], cwd=SERVICE_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def scoring_times(model, texts):
+    single_texts = texts[:200]
+    single = min(timeit.repeat(lambda: [model.predict_proba([t]) for t in single_texts], number=1, repeat=5))
+    batch = min(timeit.repeat(lambda: model.predict_proba(texts), number=1, repeat=5))
+    return single / len(single_texts), batch / len(texts)
+
+
+def run_benchmark():
+    trainer = EmotionDetector(cache_max_entries=0)
+    train_texts, train_labels = build_labelled_corpus(trainer, 20000, seed=1)
+    test_texts, _ = build_labelled_corpus(trainer, 2000, seed=2)
+    test_texts = [trainer._preprocess_text(text) for text in test_texts]
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        pickle_path = os.path.join(model_dir, 'emotion_model.pkl')
+        trainer.train_model(train_texts, train_labels, pickle_path)
+        pipeline = trainer.model
+        expected = np.asarray(pipeline.predict_proba(test_texts)).argmax(axis=1)
+
+        rows = [('sklearn pipeline', pickle_path, pipeline, 0.0, 1.0,
+                 os.path.getsize(pickle_path) + os.path.getsize(pickle_path + '.arrays'))]
+        for dtype in TOLERANCES:
+            path = os.path.join(model_dir, f'emotion_model_{dtype}.npz')
+            export_compact_model(pipeline, path, dtype)
+            scorer = load_compact_model(path)
+            error = max_probability_error(pipeline, scorer, test_texts)
+            agreement = float((scorer.predict_proba(test_texts).argmax(axis=1) == expected).mean())
+            rows.append((f'compact {dtype}', path, scorer, error, agreement, os.path.getsize(path)))
+
+        print(f"\n{'model':<18} {'max diff':>9} {'labels':>7} {'size (KB)':>10} {'cold start (ms)':>16} "
+              f"{'single (us)':>12} {'batch (us/text)':>16}")
+        for name, path, model, error, agreement, size in rows:
+            single, batch = scoring_times(model, test_texts)
+            print(f"{name:<18} {error:>9.1e} {agreement:>7.1%} {size / 1024:>10.0f} "
+                  f"{cold_start_seconds(path) * 1e3:>16.0f} {single * 1e6:>12.0f} {batch * 1e6:>16.1f}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
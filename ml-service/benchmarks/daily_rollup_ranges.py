@@ -0,0 +1,150 @@
+"""
+Daily Rollup Benchmark
+
+Compares ways of answering mood patterns, productivity and the weekly
+summary for a period of a user's history (the last 7 days, 90 days, a
+year, everything):
+- records: the backend selects the period's records (not timed) and posts
+  them, and PersonalizedInsights recomputes the day-level aggregates from
+  scratch (analyze_mood_patterns, analyze_productivity and the
+  weekly-summary section of generate_insights)
+- rollup: InsightStateStore answers from the user's daily rollup
+  (daily_rollup.py): a binary search on the memory-mapped day column, then
+  sums over the period's rows
+
+The script first checks both give the same results on the same periods.
+It then times each for 1, 3 and 10 years of history. It also times
+ingesting one day of new records with and without the rollup (which
+rewrites the rows from the first day an ingest touched) and reports the
+rollup's size on disk.
+
+Usage:
+    python benchmarks/daily_rollup_ranges.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from habit_bitmaps import epoch_day
+from insight_frames import parse_timestamps
+from insight_frames_scaling import build_history
+from insight_state import InsightStateStore
+from insight_state_scaling import one_day_delta, with_ids
+from personalized_insights import PersonalizedInsights
+
+PERIODS = {'7 days': 7, '90 days': 90, '1 year': 365, 'all': None}
+
+# Fields the rollup answers with the same meaning as the records path
+MOOD_FIELDS = ['average_mood_score', 'emotion_distribution', 'day_patterns', 'total_entries', 'trend_analytics']
+WEEK_FIELDS = ['journal_entries_this_week', 'mood_entries_this_week', 'tasks_this_week',
+               'completed_tasks_this_week', 'average_mood_this_week']
+
+
+def in_period(records, field, start, end):
+    """Records dated from epoch day start to end (inclusive)"""
+    timestamps, _ = parse_timestamps(record.get(field) for record in records)
+    days = timestamps.astype('datetime64[D]').astype('int64')
+    return [record for record, day, valid in zip(records, days.tolist(), (timestamps == timestamps).tolist())
+            if valid and start <= day <= end]
+
+
+def select(history, start, end):
+    """The period's journal entries, moods and tasks, as the backend would query them"""
+    journal, moods, tasks, _ = history
+    return (in_period(journal, 'created_at', start, end), in_period(moods, 'date', start, end),
+            in_period(tasks, 'created_at', start, end))
+
+
+def records_answers(insights, journal, moods, tasks):
+    frames = insights.build_frames(journal, moods, tasks)
+    return (insights.analyze_mood_patterns(moods), insights.analyze_productivity(tasks, moods, []),
+            insights._generate_weekly_summary(frames))
+
+
+def rollup_answers(store, user_id, start, end):
+    return (store.mood_patterns(user_id, None, start, end), store.productivity(user_id, start, end),
+            store.weekly_summary(user_id, end))
+
+
+def same(expected, actual, fields):
+    def pick(result):
+        picked = {field: result[field] for field in fields}
+        if 'emotion_distribution' in picked:
+            picked['emotion_distribution'] = dict(sorted(picked['emotion_distribution'].items()))
+        return json.dumps(picked, sort_keys=True, default=float)
+    return pick(expected) == pick(actual)
+
+
+def check_equivalence(insights, directory):
+    """Records and rollup answers agree on periods ending today, with the history ingested in two deltas"""
+    store = InsightStateStore(insights, os.path.join(directory, 'check.db'))
+    rng = random.Random(5)
+    history = with_ids(build_history(500, rng), rng)
+    journal, moods, tasks, habits = history
+    store.ingest('check', {'journal_entries': journal[:300], 'mood_history': moods[:300],
+                           'task_history': tasks[:300], 'habit_data': habits})
+    store.ingest('check', {'journal_entries': journal[300:], 'mood_history': moods[300:],
+                           'task_history': tasks[300:]})
+    today = epoch_day(datetime.now())
+    mismatches = 0
+    for start in [today - 6, today - 89, today - 364, -10 ** 6]:
+        mood, productivity, week = records_answers(insights, *select(history, start, today))
+        stored_mood, stored_productivity, stored_week = rollup_answers(store, 'check', start, today)
+        if start == today - 6:
+            # Only the records of these 7 dates were posted, so their last 7 x 24 hours are the same week
+            mismatches += not same(week, stored_week, WEEK_FIELDS)
+        mismatches += not same(mood, stored_mood, MOOD_FIELDS)
+        mismatches += not same(productivity, stored_productivity, list(stored_productivity))
+    print(f"Periods: 4, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights, directory):
+    rng = random.Random(11)
+    today = epoch_day(datetime.now())
+    print(f"\n{'years':>6} {'records':>8} {'period':>8} {'records (ms)':>13} {'rollup (ms)':>12} {'speedup':>8}")
+    ingests = []
+    for years in [1, 3, 10]:
+        history = with_ids(build_history(365 * years, rng), rng)
+        journal, moods, tasks, habits = history
+        user_id = f'user-{years}y'
+        store = InsightStateStore(insights, os.path.join(directory, f'{years}y.db'))
+        store.ingest(user_id, {'journal_entries': journal, 'mood_history': moods, 'task_history': tasks,
+                               'habit_data': habits, 'replace': True})
+        count = len(journal) + len(moods) + len(tasks)
+        for label, days in PERIODS.items():
+            start = today - days + 1 if days else -10 ** 6
+            records = select(history, start, today)
+            scratch = min(timeit.repeat(lambda: records_answers(insights, *records), number=3, repeat=3)) / 3
+            rollup = min(timeit.repeat(lambda: rollup_answers(store, user_id, start, today),
+                                       number=10, repeat=3)) / 10
+            print(f"{years:>6} {count:>8} {label:>8} {scratch * 1e3:>13.1f} {rollup * 1e3:>12.2f} "
+                  f"{scratch / rollup:>7.1f}x")
+
+        delta = one_day_delta(history, rng)
+        with_rollup = min(timeit.repeat(lambda: store.ingest(user_id, delta), number=10, repeat=3)) / 10
+        rollups, store.rollups = store.rollups, None
+        without = min(timeit.repeat(lambda: store.ingest(user_id, delta), number=10, repeat=3)) / 10
+        user_directory = rollups._directory(user_id)
+        size = sum(os.path.getsize(os.path.join(user_directory, name)) for name in os.listdir(user_directory))
+        ingests.append((years, without, with_rollup, size))
+
+    print(f"\n{'years':>6} {'ingest day (ms)':>16} {'with rollup (ms)':>17} {'rollup KB':>10}")
+    for years, without, with_rollup, size in ingests:
+        print(f"{years:>6} {without * 1e3:>16.2f} {with_rollup * 1e3:>17.2f} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    with tempfile.TemporaryDirectory() as directory:
+        if not check_equivalence(insights, directory):
+            sys.exit(1)
+        run_benchmark(insights, directory)
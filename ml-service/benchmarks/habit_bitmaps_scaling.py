@@ -0,0 +1,168 @@
+"""
+Habit Bitmaps Benchmark
+
+Compares per-habit completion windows, streaks and weekday breakdowns
+computed two ways:
+- loop: per habit, parse every marked day into a set of dates, then walk
+  the days of each window, of the streaks and of every weekday since the
+  habit started (datetime.now() per habit, as the old completion rate did
+  per day)
+- bitmaps: habit_bitmaps.HabitBitmaps, built from the request's habit
+  frame (timestamps parsed once per distinct string) or from the packed
+  rows the insight state store keeps
+
+1. Verifies both give the same summaries on seeded habit sets (habits
+   created before, after and without their first mark, marks in the
+   future, offset-aware marks, malformed far-away dates)
+2. Times 10, 100 and 500 habits with 1, 3 and 10 years of history, each
+   marked on about 70% of the days, with the default 7/30/90-day windows
+
+Usage:
+    python benchmarks/habit_bitmaps_scaling.py
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from habit_bitmaps import (DAY_NAMES, MAX_DAYS_AHEAD, MAX_HISTORY_DAYS, NO_START, HabitBitmaps, epoch_day, epoch_days,
+                           plausible_days)
+from insight_frames import _parse_timestamp, parse_timestamps
+from personalized_insights import PersonalizedInsights
+
+WINDOWS = PersonalizedInsights.HABIT_WINDOWS
+
+
+def loop_summary(habit, windows=WINDOWS):
+    today = datetime.now().date()
+    marked = set()
+    for value in habit.get('marked_days', []) or []:
+        moment = _parse_timestamp(value) if isinstance(value, str) else None
+        if moment is not None and -MAX_DAYS_AHEAD <= (today - moment.date()).days < MAX_HISTORY_DAYS:
+            marked.add(moment.date())
+    created = _parse_timestamp(habit['created_at']) if isinstance(habit.get('created_at'), str) else None
+    candidates = ([created.date()] if created else []) + ([min(marked)] if marked else [])
+    started = min(candidates) if candidates else None
+
+    rates = {}
+    for window in windows:
+        first = today - timedelta(days=window - 1)
+        if started is not None:
+            first = max(first, min(started, today + timedelta(days=1)))
+        days = [first + timedelta(days=offset) for offset in range((today - first).days + 1)]
+        rates[f'{window}d'] = round(sum(day in marked for day in days) / len(days), 4) if days else 0.0
+
+    current, day = 0, today
+    while day in marked:
+        current += 1
+        day -= timedelta(days=1)
+    longest, run, previous = 0, 0, None
+    for day in sorted(marked):
+        run = run + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = day
+
+    hits, occurrences = [0] * 7, [0] * 7
+    day = started
+    while day is not None and day <= today:
+        occurrences[day.weekday()] += 1
+        hits[day.weekday()] += day in marked
+        day += timedelta(days=1)
+    return {
+        'started': started.isoformat() if started else None,
+        'total_marked': len(marked),
+        'completion_rates': rates,
+        'current_streak': current,
+        'longest_streak': longest,
+        'weekday_rates': {name: round(hits[i] / occurrences[i], 4) if occurrences[i] else 0.0
+                          for i, name in enumerate(DAY_NAMES)}
+    }
+
+
+def frame_summaries(insights, habits):
+    frames = insights.build_frames(habit_data=habits)
+    return insights._habit_bitmaps(frames).summaries(epoch_day(frames.now), WINDOWS)
+
+
+def stored_rows(habits):
+    """(origin, packed bytes) rows and creation days, as insight_state.py stores them"""
+    rows = []
+    for habit in habits:
+        marked, _ = parse_timestamps(habit.get('marked_days', []) or [])
+        marked = epoch_days(marked[~np.isnat(marked)])
+        rows.append(HabitBitmaps.to_row(marked[plausible_days(marked, epoch_day(datetime.now()))]))
+    created, _ = parse_timestamps(habit.get('created_at') for habit in habits)
+    return rows, np.where(np.isnat(created), NO_START, epoch_days(created))
+
+
+def build_habits(count, days, rng, messy=False):
+    today = date.today()
+    habits = []
+    for index in range(count):
+        length = rng.randint(1, days) if messy else days
+        first = today - timedelta(days=length - 1)
+        marks = [first + timedelta(days=offset) for offset in range(length + (3 if messy else 0))
+                 if rng.random() < 0.7]
+        marked_days = [day.isoformat() if not messy or rng.random() < 0.7
+                       else f'{day.isoformat()}T{rng.randint(0, 23):02d}:15:00{rng.choice(["Z", "+05:30", ""])}'
+                       for day in marks]
+        if messy and rng.random() < 0.2:
+            # Malformed dates far outside the kept range
+            marked_days += ['0001-01-01', '9999-12-31']
+        habit = {'name': f'Habit {index}', 'marked_days': marked_days}
+        shape = rng.random() if messy else 0.0
+        if shape < 0.4:
+            habit['created_at'] = (first - timedelta(days=rng.randint(0, 20) if messy else 0)).isoformat()
+        elif shape < 0.7:
+            habit['created_at'] = (first + timedelta(days=rng.randint(0, 10))).isoformat() + 'T09:00:00Z'
+        habits.append(habit)
+    return habits
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(60):
+        habits = build_habits(rng.randint(1, 8), rng.choice([1, 3, 20, 120, 800]), rng, messy=True)
+        expected = json.dumps([loop_summary(habit) for habit in habits], sort_keys=True)
+        actual = json.dumps(frame_summaries(insights, habits), sort_keys=True)
+        rows, created = stored_rows(habits)
+        stored = json.dumps(HabitBitmaps.from_rows(rows, created, epoch_day(datetime.now())).summaries(
+            epoch_day(datetime.now()), WINDOWS), sort_keys=True)
+        mismatches += expected != actual or expected != stored
+    print(f"Seeded habit sets: 60, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights):
+    rng = random.Random(7)
+    today = epoch_day(datetime.now())
+    print(f"\n{'habits':>7} {'years':>6} {'marks':>8} {'loop (ms)':>10} {'frames (ms)':>12} {'stored (ms)':>12} "
+          f"{'speedup':>8} {'bytes':>8}")
+    for count in [10, 100, 500]:
+        for years in [1, 3, 10]:
+            habits = build_habits(count, 365 * years, rng)
+            marks = sum(len(habit['marked_days']) for habit in habits)
+            rows, created = stored_rows(habits)
+            repeat = 1 if count * years > 300 else 3
+            loop = min(timeit.repeat(lambda: [loop_summary(habit) for habit in habits], number=1, repeat=repeat))
+            frames = min(timeit.repeat(lambda: frame_summaries(insights, habits), number=1, repeat=3))
+            stored = min(timeit.repeat(lambda: HabitBitmaps.from_rows(rows, created, today).summaries(today, WINDOWS),
+                                       number=1, repeat=3))
+            size = sum(len(packed) for _, packed in rows)
+            print(f"{count:>7} {years:>6} {marks:>8} {loop * 1e3:>10.1f} {frames * 1e3:>12.1f} {stored * 1e3:>12.2f} "
+                  f"{loop / frames:>7.1f}x {size:>8}")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
@@ -0,0 +1,62 @@
+"""
+Inference Mode Benchmark
+
+Trains the TF-IDF + Naive Bayes model on a synthetic labelled corpus, then
+compares the rule, model and hybrid inference modes:
+1. Accuracy on a held-out synthetic set
+2. Throughput of single predict() calls and of predict_batch()
+
+Usage:
+    python benchmarks/inference_modes.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from emotion_detector import EmotionDetector
+from keyword_matching import FILLER_WORDS
+
+
+def build_labelled_corpus(detector, size, seed):
+    """Entries of filler text with one to three keywords of the labelled emotion"""
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(size):
+        emotion = rng.choice(list(detector.emotion_keywords))
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(10, 80))]
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(detector.emotion_keywords[emotion]))
+        texts.append(' '.join(words) + rng.choice(['.', '!', '?']))
+        labels.append(emotion)
+    return texts, labels
+
+
+def run_benchmark():
+    trainer = EmotionDetector(cache_max_entries=0)
+    train_texts, train_labels = build_labelled_corpus(trainer, 20000, seed=1)
+    test_texts, test_labels = build_labelled_corpus(trainer, 2000, seed=2)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        trainer.train_model(train_texts, train_labels, os.path.join(model_dir, 'emotion_model.pkl'))
+
+    print(f"\n{'mode':>7} {'accuracy':>9} {'single (texts/s)':>17} {'batch (texts/s)':>16}")
+    for mode in ['rule', 'model', 'hybrid']:
+        detector = EmotionDetector(cache_max_entries=0, inference_mode=mode)
+        detector.model = trainer.model
+
+        results = detector.predict_batch(test_texts)
+        accuracy = sum(r['emotion'] == label for r, label in zip(results, test_labels)) / len(test_labels)
+
+        single_texts = test_texts[:200]
+        single = min(timeit.repeat(lambda: [detector.predict(t) for t in single_texts], number=1, repeat=3))
+        batch = min(timeit.repeat(lambda: detector.predict_batch(test_texts), number=1, repeat=3))
+        print(f"{mode:>7} {accuracy:>9.1%} {len(single_texts) / single:>17,.0f} {len(test_texts) / batch:>16,.0f}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
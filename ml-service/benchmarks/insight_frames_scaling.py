@@ -0,0 +1,257 @@
+"""
+Insight Frames Benchmark
+
+Compares the mood, productivity, habit, recommendation and weekly summary
+analyses of PersonalizedInsights before and after columnar frames
+(insight_frames.py):
+- legacy: every analysis walks the raw lists with entry.get(...) and
+  re-parses each timestamp (habit days also call datetime.now() per day)
+- frames: the payload is converted once per request, timestamps parsed once
+  per distinct string, and the analyses run as NumPy column operations
+
+1. Verifies both produce identical results on seeded histories (the
+   mood-productivity correlation and best productivity times, placeholders
+   in the legacy code, are left out; see mood_correlation_scaling.py and
+   productivity_windows_scaling.py, and so are the per-habit details, see
+   habit_bitmaps_scaling.py). Habits are created 30 days before the
+   history starts, where the legacy rate's fixed 30-day denominator holds.
+   The legacy weekly summary counts UTC times by their wall clock, as the
+   weekly summary now does without a timezone (the original left them out).
+2. Times a full request for 1, 3 and 10 year histories
+   (daily mood logs, 4 tasks a day, 6 habits marked most days)
+
+Usage:
+    python benchmarks/insight_frames_scaling.py
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from personalized_insights import PersonalizedInsights
+
+EMOTIONS = ['joy', 'sad', 'anxious', 'calm', 'angry', 'neutral']
+TASK_TITLES = ['Finish project report', 'Gym session', 'Read a chapter', 'Call mom', 'Team meeting',
+               'Study statistics', 'Buy groceries', 'Morning run', 'Plan the week', 'Learn guitar']
+HABITS = ['Meditate', 'Exercise', 'Read', 'Journal', 'Sleep early', 'Drink water']
+
+
+def legacy_parse(date_str):
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except Exception:
+        return None
+
+
+def legacy_since(date_str, start):
+    """Original _is_within_week/_is_recent: offset-aware times never compare"""
+    date_obj = legacy_parse(date_str)
+    try:
+        return date_obj is not None and date_obj >= start
+    except TypeError:
+        return False
+
+
+def legacy_week_since(date_str, start):
+    """legacy_since, with offset-aware times compared by their wall clock"""
+    date_obj = legacy_parse(date_str)
+    return date_obj is not None and date_obj.replace(tzinfo=None) >= start
+
+
+def legacy_habit_rate(habit):
+    marked_days = habit.get('marked_days', [])
+    if not marked_days:
+        return 0.0
+    recent_days = [day for day in marked_days if legacy_since(day, datetime.now() - timedelta(days=30))]
+    return len(recent_days) / 30.0 if recent_days else 0.0
+
+
+def legacy_mood_patterns(mood_history):
+    """
+    Original mood patterns, with the tie-break and rounding both paths now
+    share: ties for the most common emotion go to the alphabetically first
+    (not the first seen), and means are rounded to 9 decimals before 2, so
+    summation order cannot flip the second decimal
+    """
+    if not mood_history:
+        return {'error': 'No mood data available'}
+    emotions = [entry.get('emotion', 'neutral') for entry in mood_history]
+    scores = [entry.get('score', 5) for entry in mood_history]
+    emotion_counts = Counter(emotions)
+    if len(scores) >= 7:
+        recent_avg = np.mean(scores[-7:])
+        older_avg = np.mean(scores[:-7]) if len(scores) > 7 else recent_avg
+        trend = 'improving' if recent_avg > older_avg else 'declining' if recent_avg < older_avg else 'stable'
+    else:
+        trend = 'insufficient_data'
+    day_scores = {day: [] for day in PersonalizedInsights.DAY_NAMES}
+    for entry in mood_history:
+        date_obj = legacy_parse(entry.get('date'))
+        if date_obj is not None:
+            day_scores[date_obj.strftime('%A')].append(entry.get('score', 5))
+    return {
+        'most_common_emotion': min(emotion_counts, key=lambda emotion: (-emotion_counts[emotion], emotion)),
+        'average_mood_score': round(round(np.mean(scores), 9), 2),
+        'mood_trend': trend,
+        'emotion_distribution': dict(emotion_counts),
+        'day_patterns': {day: round(round(np.mean(s), 9), 2) for day, s in day_scores.items() if s},
+        'total_entries': len(mood_history)
+    }
+
+
+def legacy_productivity(insights, task_history, mood_history):
+    if not task_history:
+        return {'error': 'No task data available'}
+    completed_tasks = len([task for task in task_history if task.get('completed', False)])
+    task_types = {}
+    for task in task_history:
+        category = insights.TASK_CATEGORIES[insights._task_category(task.get('title', '').lower())]
+        counts = task_types.setdefault(category, {'total': 0, 'completed': 0})
+        counts['total'] += 1
+        if task.get('completed', False):
+            counts['completed'] += 1
+    for counts in task_types.values():
+        counts['completion_rate'] = counts['completed'] / counts['total'] * 100
+    return {
+        'completion_rate': round(completed_tasks / len(task_history) * 100, 1),
+        'total_tasks': len(task_history),
+        'completed_tasks': completed_tasks,
+        'task_insights': task_types
+    }
+
+
+def legacy_habits(habit_data):
+    if not habit_data:
+        return {'error': 'No habit data available'}
+    performance = {habit.get('name', 'Unknown'): legacy_habit_rate(habit) for habit in habit_data}
+    return {
+        'habit_performance': performance,
+        'best_habits': sorted(performance.items(), key=lambda x: x[1], reverse=True)[:3],
+        'total_habits': len(habit_data),
+        'average_completion_rate': np.mean(list(performance.values()))
+    }
+
+
+def legacy_recommendations(mood_history, task_history, habit_data):
+    types = []
+    if mood_history and np.mean([entry.get('score', 5) for entry in mood_history[-7:]]) < 4:
+        types.append('mood_support')
+    if task_history and len([t for t in task_history if t.get('completed', False)]) / len(task_history) < 0.7:
+        types.append('productivity')
+    if habit_data and np.mean([legacy_habit_rate(h) for h in habit_data]) < 0.6:
+        types.append('habits')
+    return types
+
+
+def legacy_weekly_summary(journal_entries, mood_history, task_history):
+    week_ago = datetime.now() - timedelta(days=7)
+    recent_moods = [m for m in mood_history if legacy_week_since(m.get('date'), week_ago)]
+    recent_tasks = [t for t in task_history if legacy_week_since(t.get('created_at'), week_ago)]
+    return {
+        'journal_entries_this_week': len([j for j in journal_entries
+                                          if legacy_week_since(j.get('created_at'), week_ago)]),
+        'mood_entries_this_week': len(recent_moods),
+        'tasks_this_week': len(recent_tasks),
+        'completed_tasks_this_week': len([t for t in recent_tasks if t.get('completed', False)]),
+        'average_mood_this_week': np.mean([m.get('score', 5) for m in recent_moods]) if recent_moods else None
+    }
+
+
+def legacy_analysis(insights, journal, moods, tasks, habits):
+    return {
+        'mood_patterns': legacy_mood_patterns(moods),
+        'productivity_insights': legacy_productivity(insights, tasks, moods),
+        'habit_insights': legacy_habits(habits),
+        'recommendations': legacy_recommendations(moods, tasks, habits),
+        'weekly_summary': legacy_weekly_summary(journal, moods, tasks)
+    }
+
+
+def frames_analysis(insights, journal, moods, tasks, habits):
+    frames = insights.build_frames(journal, moods, tasks, habits)
+    productivity = insights._analyze_productivity_patterns(frames)
+    productivity.pop('mood_productivity_correlation', None)
+    productivity.pop('mood_productivity_analysis', None)
+    productivity.pop('best_productivity_times', None)
+    productivity.pop('productivity_windows', None)
+    habit_insights = insights._analyze_habit_patterns(frames)
+    habit_insights.pop('habit_details', None)
+    return {
+        'mood_patterns': insights._analyze_mood_patterns(frames),
+        'productivity_insights': productivity,
+        'habit_insights': habit_insights,
+        'recommendations': [r['type'] for r in insights._generate_recommendations(frames)],
+        'weekly_summary': insights._generate_weekly_summary(frames)
+    }
+
+
+def timestamp(moment, rng):
+    """ISO strings in the shapes clients send: local, UTC ('Z') and date-only"""
+    shape = rng.random()
+    if shape < 0.2:
+        return moment.isoformat() + 'Z'
+    if shape < 0.3:
+        return moment.date().isoformat()
+    return moment.isoformat(timespec='seconds')
+
+
+def build_history(days, rng, tasks_per_day=4):
+    now = datetime.now()
+    start = now - timedelta(days=days)
+    day_starts = [start + timedelta(days=day) for day in range(days)]
+    journal = [{'content': '', 'created_at': timestamp(day + timedelta(hours=rng.uniform(19, 23)), rng)}
+               for day in day_starts if rng.random() < 0.6]
+    moods = [{'emotion': rng.choice(EMOTIONS), 'score': rng.choice([rng.randint(1, 10), round(rng.uniform(1, 10), 1)]),
+              'date': timestamp(day + timedelta(hours=rng.uniform(7, 22)), rng)}
+             for day in day_starts]
+    tasks = [{'title': rng.choice(TASK_TITLES), 'completed': rng.random() < 0.7,
+              'created_at': timestamp(day + timedelta(hours=rng.uniform(8, 20)), rng)}
+             for day in day_starts for _ in range(rng.randint(0, 2 * tasks_per_day))]
+    habits = [{'name': name, 'created_at': (start - timedelta(days=30)).date().isoformat(),
+               'marked_days': [day.date().isoformat() for day in day_starts if rng.random() < 0.7]}
+              for name in HABITS]
+    return journal, moods, tasks, habits
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(100):
+        history = build_history(rng.choice([1, 5, 10, 40, 400]), rng)
+        legacy = json.dumps(legacy_analysis(insights, *history), sort_keys=True, default=float)
+        frames = json.dumps(frames_analysis(insights, *history), sort_keys=True, default=float)
+        mismatches += legacy != frames
+    print(f"Seeded histories: 100, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights):
+    rng = random.Random(7)
+    print(f"\n{'years':>6} {'moods':>6} {'tasks':>7} {'habit days':>11} {'legacy (ms)':>12} "
+          f"{'frames (ms)':>12} {'speedup':>8}")
+    for years in [1, 3, 10]:
+        history = build_history(365 * years, rng)
+        journal, moods, tasks, habits = history
+        habit_days = sum(len(habit['marked_days']) for habit in habits)
+        number = max(1, 10 // years)
+        legacy = min(timeit.repeat(lambda: legacy_analysis(insights, *history), number=number, repeat=3)) / number
+        frames = min(timeit.repeat(lambda: frames_analysis(insights, *history), number=number, repeat=3)) / number
+        print(f"{years:>6} {len(moods):>6} {len(tasks):>7} {habit_days:>11} {legacy * 1e3:>12.1f} "
+              f"{frames * 1e3:>12.1f} {legacy / frames:>7.1f}x")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
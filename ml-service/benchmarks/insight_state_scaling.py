@@ -0,0 +1,84 @@
+"""
+Insight State Benchmark
+
+Compares two ways of answering /api/personalized-insights for one user:
+- full history: the backend posts every record and generate_insights
+  recomputes all sections from scratch
+- stored state: the history was ingested once into InsightStateStore
+  (insight_state.py); the backend posts one day of new records and the
+  answer is built from the stored aggregates
+
+Times, for 1, 3 and 10 year histories, the from-scratch request, ingesting
+one day's delta, the first state-backed answer after it (which recomputes
+the mood-productivity correlation from the daily totals of its lookback)
+and repeated answers. The stored state lives in a temporary SQLite file,
+like the service's own.
+
+Usage:
+    python benchmarks/insight_state_scaling.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from insight_frames_scaling import build_history
+from insight_state import InsightStateStore
+from personalized_insights import PersonalizedInsights
+
+WORDS = ['work', 'project', 'deadline', 'happy', 'friend', 'family', 'tired', 'study', 'travel', 'calm']
+
+
+def with_ids(history, rng):
+    """Give every record an id and the journal entries some content"""
+    for records in history:
+        for record_id, record in enumerate(records):
+            record['id'] = record_id
+    for entry in history[0]:
+        entry['content'] = ' '.join(rng.choices(WORDS, k=40))
+    return history
+
+
+def one_day_delta(history, rng):
+    """New records for today, numbered after the existing ones"""
+    journal, moods, tasks, _ = history
+    now = datetime.now().isoformat(timespec='seconds')
+    return {
+        'journal_entries': [{'id': len(journal), 'content': ' '.join(rng.choices(WORDS, k=40)), 'created_at': now}],
+        'mood_history': [{'id': len(moods), 'emotion': 'calm', 'score': 7, 'date': now}],
+        'task_history': [{'id': len(tasks) + offset, 'title': 'Gym session', 'completed': True, 'created_at': now}
+                         for offset in range(4)]
+    }
+
+
+def run_benchmark(insights, path):
+    store = InsightStateStore(insights, path)
+    rng = random.Random(11)
+    print(f"{'years':>6} {'records':>8} {'full history (ms)':>18} {'ingest day (ms)':>16} "
+          f"{'first answer (ms)':>18} {'repeat (ms)':>12}")
+    for years in [1, 3, 10]:
+        history = with_ids(build_history(365 * years, rng), rng)
+        journal, moods, tasks, habits = history
+        user_id = f'user-{years}y'
+        store.ingest(user_id, {'journal_entries': journal, 'mood_history': moods,
+                               'task_history': tasks, 'habit_data': habits, 'replace': True})
+        delta = one_day_delta(history, rng)
+        number = max(1, 10 // years)
+        full = min(timeit.repeat(lambda: insights.generate_insights(*history), number=number, repeat=3)) / number
+        ingest = min(timeit.repeat(lambda: store.ingest(user_id, delta), number=10, repeat=3)) / 10
+        first = min(timeit.repeat(lambda: (store.ingest(user_id, delta), store.insights(user_id)),
+                                  number=10, repeat=3)) / 10 - ingest
+        repeat = min(timeit.repeat(lambda: store.insights(user_id), number=10, repeat=3)) / 10
+        records = len(journal) + len(moods) + len(tasks)
+        print(f"{years:>6} {records:>8} {full * 1e3:>18.1f} {ingest * 1e3:>16.1f} "
+              f"{first * 1e3:>18.1f} {repeat * 1e3:>12.1f}")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        run_benchmark(PersonalizedInsights(), os.path.join(directory, 'insight_state.db'))
@@ -0,0 +1,70 @@
+"""
+Insights Response Cache Benchmark
+
+Measures a dashboard refresh - the same payload posted again - to
+/api/personalized-insights through the Flask app:
+- no cache: the analysis runs and the response is serialized every time
+- cache miss: as above, plus hashing the canonical body and storing the entry
+- cache hit: the serialized body is served from ResponseCache
+- 304: the client sends the ETag back in If-None-Match and gets no body
+
+Request bodies are serialized once up front, so client-side JSON encoding
+is not part of the timings. Histories: 1, 3 and 10 years of daily mood
+logs, about 4 tasks a day and 6 habits.
+
+Usage:
+    python benchmarks/insights_response_caching.py
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+
+os.environ.setdefault('ML_WARM_UP', 'sync')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import app, response_cache
+from insight_frames_scaling import build_history
+
+
+def post(client, body, headers=None):
+    return client.post('/api/personalized-insights', data=body, content_type='application/json',
+                       headers=headers or {})
+
+
+def run_benchmark():
+    client = app.test_client()
+    rng = random.Random(5)
+    print(f"{'years':>6} {'body (KB)':>10} {'no cache (ms)':>14} {'miss (ms)':>10} {'hit (ms)':>9} "
+          f"{'304 (ms)':>9} {'speedup':>8}")
+    for years in [1, 3, 10]:
+        journal, moods, tasks, habits = build_history(365 * years, rng)
+        body = json.dumps({'journal_entries': journal, 'mood_history': moods,
+                           'task_history': tasks, 'habit_data': habits}).encode('utf-8')
+        number = max(1, 10 // years)
+
+        def missed():
+            response_cache.clear()
+            post(client, body)
+
+        max_entries, response_cache.max_entries = response_cache.max_entries, 0
+        disabled = min(timeit.repeat(lambda: post(client, body), number=number, repeat=3)) / number
+        response_cache.max_entries = max_entries
+
+        etag = post(client, body).headers['ETag']
+        assert post(client, body, {'If-None-Match': etag}).status_code == 304
+        miss = min(timeit.repeat(missed, number=number, repeat=3)) / number
+        hit = min(timeit.repeat(lambda: post(client, body), number=10, repeat=3)) / 10
+        not_modified = min(timeit.repeat(lambda: post(client, body, {'If-None-Match': etag}),
+                                         number=10, repeat=3)) / 10
+        print(f"{years:>6} {len(body) / 1024:>10.0f} {disabled * 1e3:>14.1f} {miss * 1e3:>10.1f} "
+              f"{hit * 1e3:>9.1f} {not_modified * 1e3:>9.1f} {disabled / hit:>7.1f}x")
+    stats = response_cache.stats()
+    print(f"\nhits {stats['hits']}, misses {stats['misses']}, 304s {stats['not_modified']}, "
+          f"hit rate {stats['hit_rate']}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
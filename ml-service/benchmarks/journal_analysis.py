@@ -0,0 +1,120 @@
+"""
+Journal Text Analysis Benchmark
+
+Compares the keyword analyzers of PersonalizedInsights before and after
+sharing one tokenization pass (TextAnalyzer):
+- legacy: themes, journal emotions and productivity mentions each lowercase
+  and substring-scan every entry again
+- shared: each entry is scanned once into keyword IDs, and every analyzer
+  reads its counts from those
+
+1. Verifies both produce identical results on seeded journals
+2. Times all three analyses for journals of growing size
+
+Usage:
+    python benchmarks/journal_analysis.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_matching import FILLER_WORDS
+from personalized_insights import PersonalizedInsights
+
+
+def legacy_themes(insights, journal_entries):
+    """Original implementation: substring scans over all content joined together"""
+    content_lower = ' '.join([entry.get('content', '') for entry in journal_entries]).lower()
+    return [
+        theme for theme, keywords in insights.theme_keywords.items()
+        if any(word in content_lower for word in keywords)
+    ]
+
+
+def legacy_journal_emotions(insights, journal_entries):
+    """Original implementation: one substring scan per emotion keyword per entry"""
+    emotion_counts = {emotion: 0 for emotion in insights.emotion_keywords.keys()}
+    for entry in journal_entries:
+        content = entry.get('content', '').lower()
+        for emotion, keywords in insights.emotion_keywords.items():
+            for keyword in keywords:
+                if keyword in content:
+                    emotion_counts[emotion] += 1
+    return emotion_counts
+
+
+def legacy_productivity_mentions(insights, journal_entries):
+    """Original implementation: one substring scan per productivity keyword per entry"""
+    count = 0
+    for entry in journal_entries:
+        content = entry.get('content', '').lower()
+        for keyword in insights.productivity_keywords:
+            if keyword in content:
+                count += 1
+    return count
+
+
+def legacy_analysis(insights, journal_entries):
+    return (legacy_themes(insights, journal_entries),
+            legacy_journal_emotions(insights, journal_entries),
+            legacy_productivity_mentions(insights, journal_entries))
+
+
+def shared_analysis(insights, journal_entries):
+    tokens = insights.text_analyzer.tokenize_entries(journal_entries)
+    themes = insights._analyze_journal_patterns(journal_entries, tokens)['content_themes']
+    return (themes,
+            insights._analyze_journal_emotions(journal_entries, tokens),
+            insights._count_productivity_mentions(journal_entries, tokens))
+
+
+def build_journal(insights, entries, words, keyword_rate, rng):
+    """Entries of `words` words where roughly `keyword_rate` are analyzer keywords"""
+    keywords = [k for k in insights.text_analyzer.vocabulary]
+    punctuation = ['', '', '', '!', '?', '.', ',']
+    return [
+        {'content': ' '.join(
+            (rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)).capitalize()
+            if rng.random() < 0.05 else
+            (rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)) + rng.choice(punctuation)
+            for _ in range(rng.randint(1, words))
+        )}
+        for _ in range(entries)
+    ]
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(300):
+        journal = build_journal(insights, rng.randint(1, 20), 80, rng.choice([0.0, 0.05, 0.3]), rng)
+        if legacy_analysis(insights, journal) != shared_analysis(insights, journal):
+            mismatches += 1
+    print(f"Seeded journals: 300, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights):
+    rng = random.Random(7)
+    print(f"\n{'entries':>8} {'keywords':>9} {'legacy (ms)':>12} {'shared (ms)':>12} {'speedup':>8}")
+    for entries in [10, 365, 2000]:
+        for keyword_rate in [0.03, 0.3]:
+            journal = build_journal(insights, entries, 300, keyword_rate, rng)
+            # Warm the word cache once, as it is in a long-running service
+            shared_analysis(insights, journal)
+            number = max(3, 2000 // entries)
+            legacy = min(timeit.repeat(lambda: legacy_analysis(insights, journal), number=number, repeat=3)) / number
+            shared = min(timeit.repeat(lambda: shared_analysis(insights, journal), number=number, repeat=3)) / number
+            print(f"{entries:>8} {keyword_rate:>9.0%} {legacy * 1e3:>12.2f} {shared * 1e3:>12.2f} {legacy / shared:>7.1f}x")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
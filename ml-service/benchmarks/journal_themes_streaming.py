@@ -0,0 +1,114 @@
+"""
+Journal Theme Timeline Benchmark
+
+Compares ways of finding the themes of a long journal history:
+- join: the original theme extraction, one lowercase string of every
+  entry's content joined together, then a substring scan per keyword. It
+  only says whether a theme ever appeared.
+- request: the /api/personalized-insights path. Every entry is tokenized
+  once, and the theme timeline (journal_themes.ThemeTimeline) is added from
+  the token counts and the journal frame.
+- stream: journal_themes.stream_theme_timeline over an iterator of the
+  entries, 500 at a time
+
+1. Verifies the request and stream timelines are identical and name the
+   same themes as the join, on seeded journals with undated entries
+2. Times each for 1k to 50k entries of about 600 characters (up to ~30 MB
+   of text) and records the peak memory each allocates on top of the
+   entries themselves (tracemalloc)
+
+Usage:
+    python benchmarks/journal_themes_streaming.py
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from journal_themes import stream_theme_timeline
+from personalized_insights import PersonalizedInsights
+
+WORDS = ('today i went to the office and my friend said the project was fine then we talked about travel plans '
+         'a course i want to study my health and the doctor visit family dinner was calm and i felt tired '
+         'later the weather turned and i read a book about history while the kids played outside').split()
+
+
+def journal_entries(count, seed, undated=0.0):
+    """Entries of about 600 characters, spread over ten years"""
+    rng = random.Random(seed)
+    start = datetime(2016, 1, 1)
+    for index in range(count):
+        moment = start + timedelta(hours=index * 24 * 3650 / max(count, 1) + rng.uniform(0, 12))
+        yield {'content': ' '.join(rng.choices(WORDS, k=rng.randint(80, 140))),
+               'created_at': None if rng.random() < undated else moment.isoformat()}
+
+
+def join_themes(insights, entries):
+    content_lower = ' '.join([entry.get('content', '') for entry in entries]).lower()
+    return [theme for theme, keywords in insights.theme_keywords.items()
+            if any(word in content_lower for word in keywords)]
+
+
+def request_timeline(insights, entries):
+    return insights._analyze_journal_patterns(entries)['theme_timeline']
+
+
+def stream_timeline(insights, entries):
+    return stream_theme_timeline(iter(entries), insights.text_analyzer, insights.theme_keywords).summaries()
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for seed in range(30):
+        count = rng.choice([1, 7, 300, 1200])
+        entries = list(journal_entries(count, seed, undated=0.2))
+        if rng.random() < 0.3:
+            for entry in entries:
+                entry['content'] = entry['content'].replace('travel', 'stay')
+        request = request_timeline(insights, entries)
+        streamed = stream_theme_timeline(iter(entries), insights.text_analyzer, insights.theme_keywords,
+                                         chunk_size=rng.choice([1, 64, 500])).summaries()
+        mismatches += (json.dumps(request) != json.dumps(streamed)
+                       or list(request) != join_themes(insights, entries))
+    print(f"Seeded journals: 30, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def measure(run):
+    """(seconds, peak MB allocated while running)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def run_benchmark(insights):
+    print(f"\n{'entries':>8} {'text MB':>8} {'join (s)':>9} {'join MB':>8} {'request (s)':>12} {'request MB':>11} "
+          f"{'stream (s)':>11} {'stream MB':>10}")
+    for count in [1000, 10000, 50000]:
+        entries = list(journal_entries(count, seed=count))
+        text = sum(len(entry['content']) for entry in entries) / 1e6
+        join = measure(lambda: join_themes(insights, entries))
+        request = measure(lambda: request_timeline(insights, entries))
+        stream = measure(lambda: stream_timeline(insights, entries))
+        print(f"{count:>8} {text:>8.1f} {join[0]:>9.2f} {join[1]:>8.1f} {request[0]:>12.2f} {request[1]:>11.1f} "
+              f"{stream[0]:>11.2f} {stream[1]:>10.1f}")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
@@ -0,0 +1,143 @@
+"""
+Keyword Matching Benchmark
+
+Compares the compiled single-pass keyword matcher used by
+EmotionDetector._rule_based_detection against the original
+one-substring-scan-per-keyword implementation.
+
+1. Verifies both produce identical results on a golden corpus
+2. Times both as journal entries grow longer
+
+Usage:
+    python benchmarks/keyword_matching.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from emotion_detector import EmotionDetector
+
+# Hand-written entries covering the tricky cases: keywords inside longer
+# words, overlapping keywords, negation, questions and empty matches
+GOLDEN_SENTENCES = [
+    "I feel amazing today!",
+    "I am not happy with how things went.",
+    "Why does everything make me so anxious?",
+    "Had a calm, peaceful evening with the family.",
+    "I know I should download the report, but I'm down.",
+    "My career is something I care about deeply.",
+    "Joyful, joyous, overjoyed - just pure joy!!!",
+    "Nothing special happened. It was an ordinary day.",
+    "I'm afraid and terrified of the exam tomorrow",
+    "Sitting still in the quiet library, feeling content.",
+    "What a wonderful, fantastic, awesome trip!",
+    "I'm frustrated and annoyed, honestly upset.",
+    "Nobody showed up. I feel blue and heartbroken.",
+    "Thrilled and pumped for the weekend!",
+    "How are you? I'm fine, thanks.",
+    "Visit https://example.com for more info",
+    "",
+    "...",
+    "I adore my dog and cherish every moment",
+    "Work was okay. Normal meeting, usual emails.",
+]
+
+FILLER_WORDS = (
+    "i went to work today and felt a bit tired but the meeting ran long and "
+    "my friend called me later we talked about the trip next month then i "
+    "cooked dinner read a chapter of my book and went to bed early"
+).split()
+
+
+def legacy_rule_based_detection(detector, text):
+    """Original implementation: one substring scan per keyword"""
+    text_lower = text.lower()
+    emotion_scores = {emotion: 0 for emotion in detector.emotions}
+
+    for emotion, keywords in detector.emotion_keywords.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                emotion_scores[emotion] += 1
+
+    if '!' in text:
+        emotion_scores['excited'] += 0.5
+        emotion_scores['happy'] += 0.3
+
+    if '?' in text and any(word in text_lower for word in ['why', 'what', 'how']):
+        emotion_scores['anxious'] += 0.3
+
+    negation_words = ['not', 'no', 'never', 'neither', 'nobody', 'nothing']
+    if any(word in text_lower for word in negation_words):
+        emotion_scores['happy'] *= 0.5
+        emotion_scores['joy'] *= 0.5
+        emotion_scores['excited'] *= 0.5
+        emotion_scores['sad'] *= 1.5
+        emotion_scores['anxious'] *= 1.5
+
+    max_score = max(emotion_scores.values())
+    if max_score == 0:
+        return 'neutral', 0.5
+
+    dominant_emotion = max(emotion_scores, key=emotion_scores.get)
+    total_score = sum(emotion_scores.values())
+    confidence = emotion_scores[dominant_emotion] / total_score if total_score > 0 else 0.5
+    return dominant_emotion, max(0.5, min(1.0, confidence))
+
+
+def build_golden_corpus(detector, size=5000, seed=42):
+    """Hand-written sentences plus seeded random mixes of keywords and filler"""
+    rng = random.Random(seed)
+    vocabulary = FILLER_WORDS + [k for keywords in detector.emotion_keywords.values() for k in keywords]
+    vocabulary += ['not', 'no', 'why', 'how', 'know', 'downtown', 'careful', 'stillness']
+    punctuation = ['', '', '', '!', '?', '.', ',']
+
+    corpus = list(GOLDEN_SENTENCES)
+    for _ in range(size):
+        words = [rng.choice(vocabulary) + rng.choice(punctuation) for _ in range(rng.randint(1, 60))]
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def build_entry(length, keyword_rate, rng, detector):
+    """Build an entry of `length` words where roughly `keyword_rate` are emotion keywords"""
+    keywords = [k for keywords in detector.emotion_keywords.values() for k in keywords]
+    return ' '.join(
+        rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)
+        for _ in range(length)
+    )
+
+
+def check_golden_corpus(detector):
+    corpus = build_golden_corpus(detector)
+    mismatches = 0
+    for text in corpus:
+        processed = detector._preprocess_text(text)
+        if detector._rule_based_detection(processed) != legacy_rule_based_detection(detector, processed):
+            mismatches += 1
+    print(f"Golden corpus: {len(corpus)} entries, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(detector):
+    rng = random.Random(7)
+    print(f"\n{'words':>8} {'keywords':>9} {'legacy (us)':>12} {'matcher (us)':>13} {'speedup':>8}")
+    for length in [20, 200, 2000, 20000]:
+        for keyword_rate in [0.0, 0.05]:
+            text = detector._preprocess_text(build_entry(length, keyword_rate, rng, detector))
+            number = max(5, 20000 // length)
+            legacy = min(timeit.repeat(lambda: legacy_rule_based_detection(detector, text), number=number, repeat=3)) / number
+            # Warm the word cache once, as it is in a long-running service
+            detector._rule_based_detection(text)
+            compiled = min(timeit.repeat(lambda: detector._rule_based_detection(text), number=number, repeat=3)) / number
+            print(f"{length:>8} {keyword_rate:>9.0%} {legacy * 1e6:>12.1f} {compiled * 1e6:>13.1f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == '__main__':
+    detector = EmotionDetector()
+    if not check_golden_corpus(detector):
+        sys.exit(1)
+    run_benchmark(detector)
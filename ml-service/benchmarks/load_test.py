@@ -0,0 +1,146 @@
+"""
+Serving Mode Load Test
+
+Starts gunicorn in the sync mode (app:app, sync workers) and the async mode
+(asgi:app, uvicorn workers, see asgi.py), each with its default number of
+workers from gunicorn.conf.py unless --workers is given, then drives both with the same mixed workload from many concurrent
+connections:
+- 95% /api/detect-emotion (fast, single text)
+- 5% /api/personalized-insights for ten years of journal and mood data (slow)
+
+Reports p50/p99 latency per endpoint, throughput and errors. The client is
+a small asyncio HTTP/1.1 client, so it stays cheap next to the server.
+
+Usage:
+    python benchmarks/load_test.py [connections ...] [--seconds N] [--workers N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_matching import GOLDEN_SENTENCES
+from worker_memory import worker_pids
+
+PORT = 5092
+SLOW_SHARE = 0.05
+
+
+def build_insights_payload(days=3650, seed=3):
+    """Daily journal entries and mood logs for one user"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    sentences = [s for s in GOLDEN_SENTENCES if s]
+    journal, moods = [], []
+    for day in range(days):
+        date = (start + timedelta(days=day)).isoformat()
+        journal.append({'content': ' '.join(rng.choice(sentences) for _ in range(8)), 'date': date})
+        moods.append({'mood': rng.choice(['happy', 'sad', 'calm', 'anxious']), 'intensity': rng.randint(1, 10), 'date': date})
+    return json.dumps({'journal_entries': journal, 'mood_history': moods, 'task_history': [], 'habit_data': []})
+
+
+def build_request(path, body):
+    body = body.encode('utf-8')
+    head = (f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n')
+    return head.encode('ascii') + body
+
+
+async def send_request(raw_request):
+    """Send one request on a new connection and return its HTTP status"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    try:
+        writer.write(raw_request)
+        await writer.drain()
+        response = await reader.read()
+        return int(response.split(b' ', 2)[1])
+    finally:
+        writer.close()
+
+
+async def client(deadline, rng, requests, samples):
+    fast, slow = requests
+    while time.perf_counter() < deadline:
+        kind = 'insights' if rng.random() < SLOW_SHARE else 'detect'
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(send_request(slow if kind == 'insights' else fast), timeout=60)
+        except (OSError, asyncio.TimeoutError):
+            status = None
+        samples.append((kind, time.perf_counter() - start, status))
+
+
+async def run_load(connections, seconds, requests):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(
+        client(deadline, random.Random(index), requests, samples) for index in range(connections)
+    ))
+    return samples
+
+
+def start_server(mode, workers):
+    env = dict(os.environ, ML_SERVER_MODE=mode, PORT=str(PORT))
+    if workers:
+        env['GUNICORN_WORKERS'] = str(workers)
+    server = subprocess.Popen(['gunicorn', '--config', 'gunicorn.conf.py'], cwd=SERVICE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{PORT}/health/ready', timeout=1)
+            return server
+        except Exception:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'{mode} server did not become ready')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))] if values else float('nan')
+
+
+def report(mode, workers, connections, seconds, samples):
+    errors = sum(1 for _, _, status in samples if status != 200)
+    line = f"{mode:<6} {workers:>7} {connections:>5} {len(samples) / seconds:>8.1f} {errors:>7}"
+    for kind in ('detect', 'insights'):
+        latencies = [latency * 1e3 for sample_kind, latency, status in samples if sample_kind == kind and status == 200]
+        line += f" {percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.99):>9.1f}"
+    print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare sync and async serving under concurrent load')
+    parser.add_argument('connections', nargs='*', type=int, default=[8, 64, 256])
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=None, help='Workers for both modes (default: per mode)')
+    args = parser.parse_args()
+
+    requests = (build_request('/api/detect-emotion', json.dumps({'text': 'I feel amazing today, so happy!'})),
+                build_request('/api/personalized-insights', build_insights_payload()))
+
+    print(f"\nCPU cores available: {len(os.sched_getaffinity(0))}, {args.seconds:.0f}s per run, "
+          f"{SLOW_SHARE:.0%} insights requests")
+    print(f"{'':<28} {'':>8} {'detect (ms)':>19} {'insights (ms)':>19}")
+    print(f"{'mode':<6} {'workers':>7} {'conns':>5} {'req/s':>8} {'errors':>7} {'p50':>9} {'p99':>9} {'p50':>9} {'p99':>9}")
+    for mode in ('sync', 'async'):
+        server = start_server(mode, args.workers)
+        try:
+            workers = len(worker_pids(server.pid))
+            for connections in args.connections:
+                samples = asyncio.run(run_load(connections, args.seconds, requests))
+                report(mode, workers, connections, args.seconds, samples)
+        finally:
+            server.terminate()
+            server.wait()
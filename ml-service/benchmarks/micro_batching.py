@@ -0,0 +1,81 @@
+"""
+Micro-Batching Benchmark
+
+Simulates a burst of concurrent single-text /api/detect-emotion calls:
+`clients` threads each send requests back to back (every text distinct,
+prediction cache disabled). Compares scoring each call on its own with the
+MicroBatcher at several windows, in the model and hybrid inference modes
+(in rule mode the batcher passes requests straight through).
+
+Reports throughput, per-request latency (p50/p99) and the batch sizes and
+queue waits from MicroBatcher.stats().
+
+Usage:
+    python benchmarks/micro_batching.py [clients]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from emotion_detector import EmotionDetector
+from inference_modes import build_labelled_corpus
+from micro_batcher import MicroBatcher
+
+REQUESTS_PER_CLIENT = 100
+
+
+def run_clients(batcher, texts, clients):
+    """Each client thread sends its share of texts one request at a time"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        own = []
+        for text in texts[index::clients]:
+            start = time.perf_counter()
+            batcher.predict(text)
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def run_benchmark(clients):
+    trainer = EmotionDetector(cache_max_entries=0)
+    train_texts, train_labels = build_labelled_corpus(trainer, 20000, seed=1)
+    texts, _ = build_labelled_corpus(trainer, clients * REQUESTS_PER_CLIENT, seed=2)
+    with tempfile.TemporaryDirectory() as model_dir:
+        trainer.train_model(train_texts, train_labels, os.path.join(model_dir, 'emotion_model.pkl'))
+
+    print(f"\n{clients} concurrent clients, {len(texts)} requests, every text distinct")
+    print(f"{'mode':>6} {'window':>8} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch':>6} {'wait p99 (ms)':>14}")
+    for mode in ['model', 'hybrid']:
+        detector = EmotionDetector(cache_max_entries=0, inference_mode=mode)
+        detector.model = trainer.model
+        for window_ms in [0, 1, 2, 5]:
+            batcher = MicroBatcher(detector, window_ms=window_ms, max_batch_size=clients)
+            elapsed, latencies = run_clients(batcher, texts, clients)
+            stats = batcher.stats()
+            label = f'{window_ms} ms' if window_ms else 'off'
+            batch = f"{stats['mean_batch_size']:.1f}" if stats['batches'] else '1.0'
+            wait = f"{stats['queue_wait_ms']['p99']:.2f}" if stats['queue_wait_ms'] else '-'
+            print(f"{mode:>6} {label:>8} {len(texts) / elapsed:>8.0f} "
+                  f"{latencies[len(latencies) // 2] * 1e3:>9.2f} {latencies[int(len(latencies) * 0.99)] * 1e3:>9.2f} "
+                  f"{batch:>6} {wait:>14}")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
@@ -0,0 +1,157 @@
+"""
+Mood-Productivity Correlation Benchmark
+
+Compares two implementations of the mood-productivity correlation
+(Pearson, Spearman and lag +-1, with p-values):
+- loop: group moods and tasks into per-day dicts in Python, pair the days
+  one by one and call scipy.stats.pearsonr / spearmanr per coefficient
+- vectorized: mood_correlation.correlate on the request's frames (np.unique,
+  np.bincount and np.intersect1d; no Python loop over days)
+
+1. Verifies both give the same coefficients and p-values on seeded
+   histories, at day and hour resolution
+2. Times 1, 3 and 10 year histories (daily mood logs, about 4 tasks a day,
+   mood loosely tied to the day's completion rate). Building the frames
+   (parsing timestamps) is timed separately: a request builds them once
+   for all its sections.
+
+Usage:
+    python benchmarks/mood_correlation_scaling.py
+"""
+
+import os
+import random
+import sys
+import timeit
+from collections import defaultdict
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from insight_frames import _parse_timestamp
+from insight_frames_scaling import build_history
+from mood_correlation import correlate, time_bins
+from personalized_insights import PersonalizedInsights
+
+LAGS = (1, -1)
+BIN_HOURS = {'day': 24, 'hour': 1}
+
+
+def loop_bin(date_str, resolution):
+    moment = _parse_timestamp(date_str) if isinstance(date_str, str) else None
+    if moment is None:
+        return None
+    hours = (moment.replace(tzinfo=None).toordinal() - 719163) * 24 + moment.hour
+    return hours // BIN_HOURS[resolution]
+
+
+def loop_coefficient(x, y, function):
+    if len(x) < 3 or len(set(x)) < 2 or len(set(y)) < 2:
+        return None, None
+    r, p_value = function(x, y)
+    return round(float(r), 4), round(float(p_value), 4)
+
+
+def loop_correlation(moods, tasks, resolution):
+    mood_days = defaultdict(list)
+    for entry in moods:
+        day = loop_bin(entry.get('date'), resolution)
+        if day is not None:
+            mood_days[day].append(entry.get('score', 5))
+    task_days = defaultdict(list)
+    for task in tasks:
+        day = loop_bin(task.get('created_at'), resolution)
+        if day is not None:
+            task_days[day].append(bool(task.get('completed', False)))
+    mood = {day: round(sum(scores) / len(scores), 9) for day, scores in mood_days.items()}
+    productivity = {day: round(sum(done) / len(done), 9) for day, done in task_days.items()}
+
+    result = {}
+    for lag in (0,) + LAGS:
+        days = sorted(day for day in mood if day + lag in productivity)
+        x = [mood[day] for day in days]
+        y = [productivity[day + lag] for day in days]
+        result[lag] = (loop_coefficient(x, y, stats.pearsonr), loop_coefficient(x, y, stats.spearmanr))
+    return result
+
+
+def build_frames(insights, moods, tasks):
+    frames = insights.build_frames(mood_history=moods, task_history=tasks)
+    return frames.mood, frames.tasks
+
+
+def frame_correlation(mood, task, resolution):
+    mood_dated = ~np.isnat(mood['timestamp'])
+    task_dated = ~np.isnat(task['timestamp'])
+    return correlate(time_bins(mood['timestamp'][mood_dated], resolution), mood['score'][mood_dated],
+                     np.ones(np.count_nonzero(mood_dated)),
+                     time_bins(task['timestamp'][task_dated], resolution), task['completed'][task_dated],
+                     np.ones(np.count_nonzero(task_dated)), lags=LAGS, resolution=resolution)
+
+
+def as_loop_result(analysis):
+    def pair(coefficients):
+        return tuple((c['r'], c['p_value']) if c['r'] is not None else (None, None)
+                     for c in (coefficients['pearson'], coefficients['spearman']))
+    result = {0: pair(analysis)}
+    result.update({lagged['lag']: pair(lagged) for lagged in analysis['lagged']})
+    return result
+
+
+def correlated_history(days, rng):
+    """build_history with each day's mood nudged towards its completion rate"""
+    journal, moods, tasks, habits = build_history(days, rng)
+    rates = defaultdict(list)
+    for task in tasks:
+        rates[task['created_at'][:10]].append(task['completed'])
+    for entry in moods:
+        done = rates.get(entry['date'][:10])
+        if done:
+            entry['score'] = min(10, max(1, round(entry['score'] * 0.5 + 10 * sum(done) / len(done) * 0.5, 1)))
+    return moods, tasks
+
+
+def close(a, b):
+    return all(x == y or (x is not None and y is not None and abs(x - y) <= 2e-4)
+               for lag in a for pa, pb in zip(a[lag], b[lag]) for x, y in zip(pa, pb))
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(60):
+        moods, tasks = correlated_history(rng.choice([2, 5, 30, 400]), rng)
+        for resolution in ['day', 'hour']:
+            expected = loop_correlation(moods, tasks, resolution)
+            actual = as_loop_result(frame_correlation(*build_frames(insights, moods, tasks), resolution))
+            mismatches += not close(expected, actual)
+    print(f"Seeded histories: 60 x 2 resolutions, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights):
+    rng = random.Random(7)
+    print(f"\n{'years':>6} {'moods':>6} {'tasks':>7} {'grid':>5} {'loop (ms)':>10} {'frames (ms)':>12} "
+          f"{'correlate (ms)':>15} {'r':>7} {'p':>7}")
+    for years in [1, 3, 10]:
+        moods, tasks = correlated_history(365 * years, rng)
+        number = max(1, 10 // years)
+        frames = min(timeit.repeat(lambda: build_frames(insights, moods, tasks), number=number, repeat=3)) / number
+        mood, task = build_frames(insights, moods, tasks)
+        for resolution in ['day', 'hour']:
+            loop = min(timeit.repeat(lambda: loop_correlation(moods, tasks, resolution),
+                                     number=number, repeat=3)) / number
+            vectorized = min(timeit.repeat(lambda: frame_correlation(mood, task, resolution),
+                                           number=10, repeat=3)) / 10
+            pearson = frame_correlation(mood, task, resolution)['pearson']
+            print(f"{years:>6} {len(moods):>6} {len(tasks):>7} {resolution:>5} {loop * 1e3:>10.1f} "
+                  f"{frames * 1e3:>12.1f} {vectorized * 1e3:>15.2f} {pearson['r']:>7} {pearson['p_value']:>7}")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
@@ -0,0 +1,166 @@
+"""
+Mood Trend Analytics Benchmark
+
+Compares the rolling-window, EWMA and downsampled mood trends of
+mood_trends.py with a straightforward version:
+- loop: group scores per day in a dict, then for every day walk back over
+  each window, step the EWMA day by day and fit each window's slope with
+  np.polyfit on the individual entries
+- vectorized: mood_trends.mood_trends on the request's mood frame
+  (cumulative sums over a dense day grid; no Python loop over days)
+
+1. Verifies both give the same windows, EWMA and series on seeded
+   histories (with gaps of several weeks)
+2. Times 1, 3 and 10 year histories of daily mood logs with the default
+   7/30/90-day windows. Building the frames (parsing timestamps) is timed
+   separately: a request builds them once for all its sections.
+
+Usage:
+    python benchmarks/mood_trends_scaling.py
+"""
+
+import math
+import os
+import random
+import sys
+import timeit
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from insight_frames import _parse_timestamp
+from insight_frames_scaling import build_history
+from mood_trends import EWMA_HALFLIFE_DAYS, SERIES_POINTS, WINDOWS, lookback_days, mood_trends
+from personalized_insights import PersonalizedInsights
+
+
+def rounded(value):
+    return None if value is None else round(round(value, 9), 2)
+
+
+def loop_trends(moods, windows=WINDOWS, halflife=EWMA_HALFLIFE_DAYS, points=SERIES_POINTS):
+    scores = defaultdict(list)
+    for entry in moods:
+        moment = _parse_timestamp(entry['date']) if isinstance(entry.get('date'), str) else None
+        if moment is not None:
+            scores[moment.replace(tzinfo=None).date()].append(entry.get('score', 5))
+    # Only the days within the lookback count, as in mood_trends
+    last = max(scores)
+    scores = {day: values for day, values in scores.items()
+              if (last - day).days < lookback_days(windows, halflife)}
+    first = min(scores)
+    span = (last - first).days + 1
+    days = [first + timedelta(days=offset) for offset in range(span)]
+
+    def window_mean(end, length):
+        values = [score for offset in range(length) for score in scores.get(end - timedelta(days=offset), [])]
+        return sum(values) / len(values) if values else None
+
+    rolling = {window: [window_mean(day, window) for day in days] for window in windows}
+    ewma, numerator, denominator = [], 0.0, 0.0
+    decay = 0.5 ** (1 / halflife)
+    for day in days:
+        numerator = numerator * decay + sum(scores.get(day, []))
+        denominator = denominator * decay + len(scores.get(day, []))
+        ewma.append(numerator / denominator if denominator else None)
+
+    window_results = []
+    for window in windows:
+        entries = [(offset, score) for offset in range(window)
+                   for score in scores.get(last - timedelta(days=offset), [])]
+        slope = None
+        if len(entries) >= 2 and len({offset for offset, _ in entries}) > 1:
+            slope = -np.polyfit([offset for offset, _ in entries], [score for _, score in entries], 1)[0]
+        window_results.append({
+            'days': window,
+            'entries': len(entries),
+            'mean': rounded(rolling[window][-1]),
+            'previous_mean': rounded(window_mean(last - timedelta(days=window), window)) if span > window else None,
+            'slope_per_week': None if slope is None else round(slope * 7, 3)
+        })
+
+    width = math.ceil(span / points)
+    series = []
+    for end in range((span - 1) % width, span, width):
+        values = [score for offset in range(max(end - width + 1, 0), end + 1)
+                  for score in scores.get(days[offset], [])]
+        series.append({
+            'date': days[end].isoformat(),
+            'entries': len(values),
+            'mean': rounded(sum(values) / len(values)) if values else None,
+            'ewma': rounded(ewma[end]),
+            'rolling_means': {f'{window}d': rounded(rolling[window][end]) for window in windows}
+        })
+    return {
+        'as_of': last.isoformat(),
+        'windows': window_results,
+        'ewma': {'halflife_days': halflife, 'value': rounded(ewma[-1])},
+        'series': {'bucket_days': width, 'points': series}
+    }
+
+
+def frame_trends(mood, **options):
+    dated = ~np.isnat(mood['timestamp'])
+    days = mood['timestamp'][dated].astype('datetime64[D]').astype(np.int64)
+    return mood_trends(days, mood['score'][dated], np.ones(np.count_nonzero(dated)), **options)
+
+
+def with_gaps(moods, rng):
+    """Drop a few multi-week stretches of a long enough log"""
+    for _ in range(3 if len(moods) > 100 else 0):
+        start = rng.randrange(len(moods))
+        del moods[start:start + rng.randint(10, 40)]
+    return moods
+
+
+def same(a, b):
+    """Equal, allowing for the last rounding digit (summation order differs)"""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= 0.0011
+    return a == b
+
+
+def check_equivalence(insights):
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(40):
+        _, moods, _, _ = build_history(rng.choice([3, 40, 200, 700]), rng)
+        moods = with_gaps(moods, rng)
+        options = {'windows': rng.choice([(7, 30, 90), (1, 14), (365,)]), 'halflife': rng.choice([1.0, 7.0, 30.0]),
+                   'points': rng.choice([1, 12, 90])}
+        expected = loop_trends(moods, **options)
+        actual = frame_trends(insights.build_frames(mood_history=moods).mood, **options)
+        mismatches += not same(expected, actual)
+    print(f"Seeded histories: 40, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def run_benchmark(insights):
+    rng = random.Random(7)
+    print(f"\n{'years':>6} {'moods':>6} {'loop (ms)':>10} {'frames (ms)':>12} {'trends (ms)':>12} "
+          f"{'speedup':>8} {'series':>7}")
+    for years in [1, 3, 10]:
+        _, moods, _, _ = build_history(365 * years, rng)
+        number = max(1, 10 // years)
+        loop = min(timeit.repeat(lambda: loop_trends(moods), number=1, repeat=3))
+        frames = min(timeit.repeat(lambda: insights.build_frames(mood_history=moods).mood,
+                                   number=number, repeat=3)) / number
+        mood = insights.build_frames(mood_history=moods).mood
+        vectorized = min(timeit.repeat(lambda: frame_trends(mood), number=10, repeat=3)) / 10
+        points = len(frame_trends(mood)['series']['points'])
+        print(f"{years:>6} {len(moods):>6} {loop * 1e3:>10.1f} {frames * 1e3:>12.1f} {vectorized * 1e3:>12.2f} "
+              f"{loop / vectorized:>7.0f}x {points:>7}")
+
+
+if __name__ == '__main__':
+    insights = PersonalizedInsights()
+    if not check_equivalence(insights):
+        sys.exit(1)
+    run_benchmark(insights)
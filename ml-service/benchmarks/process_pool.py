@@ -0,0 +1,54 @@
+"""
+Process Pool Benchmark
+
+Times DetectionPool.predict_batch for growing batch sizes, inline and with
+1, 2, 4 and 8 pool processes, to pick DETECTION_POOL_MIN_BATCH and
+DETECTION_POOL_PROCESSES for a machine. The pool is started before timing,
+as it is in a long-running worker, and the prediction cache is disabled.
+
+Usage:
+    python benchmarks/process_pool.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ['PREDICTION_CACHE_MAX_ENTRIES'] = '0'
+
+from batch_detection import build_backfill
+from detection_pool import DetectionPool
+from emotion_detector import EmotionDetector
+
+BATCH_SIZES = [500, 2000, 10000, 50000]
+PROCESS_COUNTS = [1, 2, 4, 8]
+
+
+def time_batch(pool, texts, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pool.predict_batch(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    detector = EmotionDetector()
+    batches = {size: build_backfill(detector, size, duplicate_rate=0.0) for size in BATCH_SIZES}
+    print(f"CPU cores available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+
+    timings = {'inline': {size: time_batch(DetectionPool(detector, processes=0), texts)
+                          for size, texts in batches.items()}}
+    for processes in PROCESS_COUNTS:
+        pool = DetectionPool(detector, processes=processes, min_batch_size=1)
+        pool.start()
+        timings[f'{processes} proc'] = {size: time_batch(pool, texts) for size, texts in batches.items()}
+        pool.shutdown()
+
+    print(f"\n{'batch':>7} " + ' '.join(f"{label:>10}" for label in timings) + "   (ms)")
+    for size in BATCH_SIZES:
+        print(f"{size:>7} " + ' '.join(f"{timings[label][size] * 1e3:>10.1f}" for label in timings))
@@ -0,0 +1,59 @@
+"""
+Startup Benchmark
+
+Measures ML service cold start in fresh interpreters:
+1. Import time of the app module
+2. Time to first /api/detect-emotion response (from process start of import)
+3. Time until /health reports ready
+
+Usage:
+    python benchmarks/startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs inside a fresh interpreter so nothing is already imported
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.post('/api/detect-emotion', json={'text': 'I feel great today!'})
+first_response = time.perf_counter()
+assert response.status_code == 200, response.status_code
+while not client.get('/health').get_json().get('ready', True):
+    time.sleep(0.005)
+ready = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1e3,
+    'first_response_ms': (first_response - start) * 1e3,
+    'ready_ms': (ready - start) * 1e3,
+}))
+"""
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=SERVICE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    result = measure(runs)
+    print(f"Median of {runs} cold starts:")
+    print(f"  import app:         {result['import_ms']:8.0f} ms")
+    print(f"  first response:     {result['first_response_ms']:8.0f} ms")
+    print(f"  ready (/health):    {result['ready_ms']:8.0f} ms")
@@ -0,0 +1,98 @@
+"""
+Worker Memory Benchmark
+
+Starts gunicorn with a trained model in two configurations and reports the
+memory of each worker (Linux only, reads /proc/<pid>/smaps_rollup):
+1. Before: every worker imports the app and loads the model into memory
+2. After: the app is preloaded in the master (gunicorn.conf.py) and the
+   model arrays are memory-mapped, so workers share read-only pages
+
+RSS counts shared pages in every process. PSS splits shared pages between
+the processes using them, and Private is what each extra worker really costs.
+
+Usage:
+    python benchmarks/worker_memory.py [workers]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from emotion_detector import EmotionDetector
+from inference_modes import build_labelled_corpus
+
+PORT = 5091
+
+
+def read_memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                values[parts[0].rstrip(':')] = int(parts[1])
+    values['Private'] = values.pop('Private_Clean') + values.pop('Private_Dirty')
+    return values
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def measure(model_path, workers, preload):
+    env = dict(os.environ, MODEL_PATH=model_path, EMOTION_INFERENCE_MODE='model',
+               GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD='true' if preload else 'false',
+               MODEL_MMAP_MODE='r' if preload else 'none', PORT=str(PORT))
+    server = subprocess.Popen(['gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+                              cwd=SERVICE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Wait for every worker to be ready, then exercise the model path
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                if len(worker_pids(server.pid)) == workers:
+                    urllib.request.urlopen(f'http://127.0.0.1:{PORT}/health/ready', timeout=1)
+                    break
+            except Exception:
+                pass
+            time.sleep(0.2)
+        for _ in range(workers * 20):
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{PORT}/api/batch-detect',
+                data=b'{"texts": ["I feel wonderful today", "so worried about work"]}',
+                headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(request, timeout=5).read()
+        time.sleep(0.5)
+        return [read_memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label, samples):
+    def mean(key):
+        return sum(sample[key] for sample in samples) / len(samples) / 1024
+    print(f"{label:<32} {mean('Rss'):>9.1f} {mean('Pss'):>9.1f} {mean('Private'):>9.1f}")
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_path = os.path.join(model_dir, 'emotion_model.pkl')
+        trainer = EmotionDetector(cache_max_entries=0)
+        texts, labels = build_labelled_corpus(trainer, 20000, seed=1)
+        trainer.train_model(texts, labels, model_path)
+
+        print(f"\nMean per worker, {workers} workers (MB)")
+        print(f"{'configuration':<32} {'RSS':>9} {'PSS':>9} {'Private':>9}")
+        report('before: per-worker load', measure(model_path, workers, preload=False))
+        report('after: preload + mmap + freeze', measure(model_path, workers, preload=True))
@@ -0,0 +1,348 @@
+"""
+Bulk Insights
+
+Offline precomputation of personalized insights for many users, without
+one HTTP round trip per user.
+
+How it works:
+1. Reads a JSONL export, one user per line:
+   {"user_id": 42, "journal_entries": [...], "mood_history": [...],
+    "task_history": [...], "habit_data": [...], "timezone": "..."}
+2. Sends batches of raw lines to a process pool. Each child builds its
+   PersonalizedInsights once and parses, analyzes and serializes its users,
+   so all per-user work runs in parallel. Results come back in input order.
+   With ANNOTATION_STORE_PATH set, children share the annotation store, so
+   a rerun only tokenizes new or edited journal entries.
+3. Writes one result per user as JSONL ({"user_id", "insights"} or
+   {"user_id", "error"}), or a columnar .npz file with one array per
+   flattened field (e.g. "mood_patterns.average_mood_score"; nested lists
+   are stored as JSON strings)
+4. Checkpoints the input byte offset together with the output size, so a
+   crashed run resumes after the last checkpointed batch. Output written
+   after that checkpoint is truncated away first, so no user appears twice.
+5. Reports users/sec and the time spent reading, parsing, analyzing,
+   serializing and writing
+
+Only a few batches are in flight at once, so memory stays flat however long
+the export is. The .npz format is assembled at the end from a JSONL staging
+file of flattened rows (<output>.rows.jsonl), which is what gets
+checkpointed.
+
+The pool uses the 'forkserver' start method (where available), like
+detection_pool.py. With processes=0 every batch runs in this process.
+
+Usage:
+    python bulk_insights.py export.jsonl --output insights.jsonl [--processes 4]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Insights generator owned by each pool child (set by _init_child)
+_child_generator = None
+
+STAGES = ['read', 'parse', 'analyze', 'serialize', 'write']
+
+
+def _init_child():
+    """Build the insights generator once per child process"""
+    global _child_generator
+    from annotation_store import AnnotationStore
+    from personalized_insights import PersonalizedInsights
+    _child_generator = PersonalizedInsights(annotations=AnnotationStore())
+
+
+def flatten(value: Any, prefix: str = '', row: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Flatten nested dicts into dotted keys; lists become JSON strings
+
+    Returns:
+        dict: e.g. {'mood_patterns.average_mood_score': 6.2, ...}
+    """
+    row = {} if row is None else row
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(item, f'{prefix}.{key}' if prefix else str(key), row)
+    elif isinstance(value, list):
+        row[prefix] = json.dumps(value)
+    else:
+        row[prefix] = value
+    return row
+
+
+def _analyze_batch(lines: List[Tuple[int, str]], columnar: bool) -> Tuple[List[str], Dict[str, float], int]:
+    """
+    Parse, analyze and serialize one batch of export lines
+
+    Args:
+        lines: (line number, raw line) pairs
+        columnar: Serialize flattened rows (for .npz) instead of nested results
+
+    Returns:
+        tuple: (one JSON line per user, seconds per stage, number of errors)
+    """
+    generator = _child_generator
+    timings = {'parse': 0.0, 'analyze': 0.0, 'serialize': 0.0}
+    outputs = []
+    errors = 0
+    for line_number, line in lines:
+        started = time.perf_counter()
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('expected a JSON object')
+        except ValueError as e:
+            record = None
+            result = {'user_id': None, 'line': line_number, 'error': f'Invalid line: {str(e)}'}
+        parsed = time.perf_counter()
+        timings['parse'] += parsed - started
+        if record is not None:
+            user_id = record.get('user_id')
+            try:
+                result = {'user_id': user_id, 'insights': generator.generate_insights(
+                    journal_entries=record.get('journal_entries', []),
+                    mood_history=record.get('mood_history', []),
+                    task_history=record.get('task_history', []),
+                    habit_data=record.get('habit_data', []),
+                    timezone=record.get('timezone')
+                )}
+            except Exception as e:
+                result = {'user_id': user_id, 'line': line_number, 'error': str(e)}
+        started = time.perf_counter()
+        timings['analyze'] += started - parsed
+        errors += 'error' in result
+        outputs.append(json.dumps(flatten(result) if columnar else result) + '\n')
+        timings['serialize'] += time.perf_counter() - started
+    return outputs, timings, errors
+
+
+def _analyze_batch_inline(lines: List[Tuple[int, str]], columnar: bool):
+    if _child_generator is None:
+        _init_child()
+    return _analyze_batch(lines, columnar)
+
+
+def _column(values: List[Any]) -> np.ndarray:
+    """
+    Typed array for one flattened field: bool, int64 or str when every user
+    has such a value, float64 (NaN for missing) for numbers, JSON strings
+    otherwise
+    """
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present) and len(present) == len(values):
+        return np.array(values, dtype=bool)
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        if len(present) == len(values) and all(isinstance(value, int) for value in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    if all(isinstance(value, str) for value in present):
+        return np.array(['' if value is None else value for value in values], dtype=str)
+    return np.array([json.dumps(value) for value in values], dtype=str)
+
+
+def write_columnar(rows_path: str, output_path: str):
+    """Assemble the .npz file from the staged rows (fields missing for a user are None)"""
+    with open(rows_path, encoding='utf-8') as rows_file:
+        rows = [json.loads(line) for line in rows_file if line.strip()]
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    temporary_path = output_path + '.tmp.npz'
+    np.savez(temporary_path, **{name: _column([row.get(name) for row in rows]) for name in names})
+    os.replace(temporary_path, output_path)
+
+
+class BulkInsightsJob:
+    """
+    Resumable, parallel insights run over a JSONL export
+
+    The checkpoint is written next to the output as
+    <output>.checkpoint.json (input offset, output size and counters) and
+    removed once the run finishes.
+    """
+
+    def __init__(self, output_path: str, processes: Optional[int] = None, batch_size: int = 20,
+                 checkpoint_every: int = 10, output_format: Optional[str] = None,
+                 progress: Optional[Callable[[str], None]] = print):
+        """
+        Args:
+            output_path: .jsonl/.ndjson results file or .npz columnar file
+            processes: Pool size, 0 runs every batch in this process
+                (default: BULK_INSIGHTS_PROCESSES env var or the CPU count)
+            batch_size: Users sent to a child at a time
+            checkpoint_every: Write a checkpoint every N batches
+            output_format: 'jsonl' or 'npz' (default: from the output suffix)
+            progress: Called with status lines (None = silent)
+        """
+        if processes is None:
+            processes = int(os.getenv('BULK_INSIGHTS_PROCESSES', os.cpu_count() or 1))
+        if output_format is None:
+            output_format = 'npz' if output_path.lower().endswith('.npz') else 'jsonl'
+        if output_format not in ('jsonl', 'npz'):
+            raise ValueError(f"Unknown output format '{output_format}', expected 'jsonl' or 'npz'")
+        self.output_path = output_path
+        self.processes = max(0, processes)
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.output_format = output_format
+        self.progress = progress
+        self.state_path = output_path + '.checkpoint.json'
+        # Results are streamed here; for .npz this is the staging file
+        self.rows_path = output_path + '.rows.jsonl' if output_format == 'npz' else output_path
+
+    def _load_state(self, input_path: str, resume: bool) -> Dict[str, Any]:
+        """Pick up a checkpoint for the same input, or start fresh"""
+        if resume and os.path.exists(self.state_path) and os.path.exists(self.rows_path):
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+            if state.get('input') == os.path.abspath(input_path):
+                return state
+        return {'input': os.path.abspath(input_path), 'offset': 0, 'line': 0, 'output_bytes': 0,
+                'users': 0, 'errors': 0, 'batches': 0, 'timings': dict.fromkeys(STAGES, 0.0)}
+
+    def _checkpoint(self, state: Dict[str, Any], output):
+        """Flush the output, then record the offsets that match it"""
+        output.flush()
+        os.fsync(output.fileno())
+        state['output_bytes'] = output.tell()
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temporary_path, self.state_path)
+
+    def _batches(self, handle, state: Dict[str, Any]) -> Iterator[Tuple[List[Tuple[int, str]], int, int]]:
+        """Yield (lines, input offset after them, line number after them) from the saved position"""
+        handle.seek(state['offset'])
+        offset, line_number = state['offset'], state['line']
+        batch = []
+        for raw_line in iter(handle.readline, b''):
+            offset += len(raw_line)
+            line_number += 1
+            if raw_line.strip():
+                batch.append((line_number, raw_line.decode('utf-8')))
+            if len(batch) >= self.batch_size:
+                yield batch, offset, line_number
+                batch = []
+        if batch:
+            yield batch, offset, line_number
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if not self.processes:
+            return None
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=context, initializer=_init_child)
+
+    def run(self, input_path: str, resume: bool = True) -> Dict[str, Any]:
+        """
+        Compute insights for every user in the export
+
+        Args:
+            input_path: JSONL export, one user per line
+            resume: Continue from an existing checkpoint if there is one
+
+        Returns:
+            dict: users, errors, seconds, users_per_second and seconds per
+            stage (parse/analyze/serialize are summed over the children)
+        """
+        state = self._load_state(input_path, resume)
+        columnar = self.output_format == 'npz'
+        start = time.perf_counter()
+        start_users = state['users']
+        timings = state['timings']
+        executor = self._executor()
+        # Batches submitted but not yet written, oldest first
+        pending = deque()
+
+        def write(output):
+            future, offset, line_number = pending.popleft()
+            lines, batch_timings, errors = future.result() if executor else future
+            write_started = time.perf_counter()
+            output.write(''.join(lines).encode('utf-8'))
+            for stage, seconds in batch_timings.items():
+                timings[stage] += seconds
+            timings['write'] += time.perf_counter() - write_started
+            state.update(offset=offset, line=line_number, users=state['users'] + len(lines),
+                         errors=state['errors'] + errors, batches=state['batches'] + 1)
+            if state['batches'] % self.checkpoint_every == 0:
+                self._checkpoint(state, output)
+                self._report(state, start, start_users)
+
+        try:
+            mode = 'r+b' if state['output_bytes'] else 'wb'
+            with open(input_path, 'rb') as handle, open(self.rows_path, mode) as output:
+                # Drop anything written after the last checkpoint
+                output.truncate(state['output_bytes'])
+                output.seek(state['output_bytes'])
+                batches = self._batches(handle, state)
+                while True:
+                    read_started = time.perf_counter()
+                    batch = next(batches, None)
+                    timings['read'] += time.perf_counter() - read_started
+                    if batch is None:
+                        break
+                    lines, offset, line_number = batch
+                    if executor:
+                        pending.append((executor.submit(_analyze_batch, lines, columnar), offset, line_number))
+                    else:
+                        pending.append((_analyze_batch_inline(lines, columnar), offset, line_number))
+                    # Keep every child busy without reading ahead of the output
+                    while len(pending) > 2 * max(1, self.processes):
+                        write(output)
+                while pending:
+                    write(output)
+                self._checkpoint(state, output)
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        if columnar:
+            write_started = time.perf_counter()
+            write_columnar(self.rows_path, self.output_path)
+            os.remove(self.rows_path)
+            timings['write'] += time.perf_counter() - write_started
+        os.remove(self.state_path)
+
+        elapsed = time.perf_counter() - start
+        users = state['users'] - start_users
+        summary = {
+            'users': state['users'],
+            'errors': state['errors'],
+            'seconds': round(elapsed, 3),
+            'users_per_second': round(users / elapsed, 1) if elapsed > 0 else 0.0,
+            'stages': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        }
+        if self.progress:
+            stages = ', '.join(f'{stage} {seconds:.1f}s' for stage, seconds in summary['stages'].items())
+            self.progress(f"✅ Bulk insights finished: {summary['users']:,} users ({summary['errors']:,} errors) "
+                          f"in {elapsed:.1f}s, {summary['users_per_second']:,} users/s, saved to {self.output_path}")
+            self.progress(f"   Stages: {stages}")
+        return summary
+
+    def _report(self, state: Dict[str, Any], start: float, start_users: int):
+        if self.progress:
+            elapsed = time.perf_counter() - start
+            rate = (state['users'] - start_users) / elapsed if elapsed > 0 else 0.0
+            self.progress(f"  {state['users']:,} users, {state['errors']:,} errors, {rate:,.1f} users/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute personalized insights for a JSONL export of users')
+    parser.add_argument('input', help='JSONL export, one user per line')
+    parser.add_argument('--output', required=True, help='Results file: .jsonl, or .npz for columnar output')
+    parser.add_argument('--format', choices=['jsonl', 'npz'], help='Output format (default: from the suffix)')
+    parser.add_argument('--processes', type=int, help='Pool size, 0 = no pool (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='Batches between checkpoints')
+    parser.add_argument('--no-resume', action='store_true', help='Ignore any existing checkpoint')
+    args = parser.parse_args()
+
+    BulkInsightsJob(args.output, processes=args.processes, batch_size=args.batch_size,
+                    checkpoint_every=args.checkpoint_every, output_format=args.format).run(
+        args.input, resume=not args.no_resume)
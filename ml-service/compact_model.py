@@ -0,0 +1,316 @@
+"""
+Compact Model
+
+Compiles a trained TF-IDF + Multinomial Naive Bayes pipeline (the one built
+by EmotionDetector.train_model) into a small NumPy-only artifact, and scores
+texts with it without importing scikit-learn.
+
+The artifact is an uncompressed .npz file holding:
+- vocabulary / vocabulary_offsets: the feature terms as one UTF-8 byte
+  array plus start offsets (column i is term i), turned into a dict -
+  Python's own hash table - when the artifact is loaded
+- idf: the IDF weight of every feature
+- weights: a (features x classes) matrix of IDF-scaled class log
+  probabilities, so a document's class scores are one sparse dot product
+- class_log_prior: one log prior per class
+- config: tokenizer and normalization settings (JSON)
+
+Naive Bayes only compares classes, so adding the same number to every class
+of a feature does not change the probabilities. The weights are centered per
+feature before storing, which keeps the stored values small and lets them be
+quantized:
+- float32: default, probabilities within 1e-5 of scikit-learn
+- float16: weights at half the size, within 1e-3
+- int8: weights at a quarter of the size (plus one float32 scale per
+  feature), within 2e-2
+
+export_compact_model checks the tolerance on sample texts and refuses to
+write an artifact that exceeds it.
+
+Usage:
+    python compact_model.py models/emotion_model.pkl [--dtype float16] [--output models/emotion_model.npz]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+from itertools import repeat
+from typing import Dict, List, Optional
+
+import numpy as np
+
+COMPACT_SUFFIX = '.npz'
+
+# Largest allowed difference from the original pipeline's probabilities
+TOLERANCES = {
+    'float32': 1e-5,
+    'float16': 1e-3,
+    'int8': 2e-2
+}
+
+
+def _vectorizer_config(vectorizer) -> Dict:
+    """Settings the scorer needs to reproduce TfidfVectorizer.transform"""
+    unsupported = []
+    if vectorizer.analyzer != 'word':
+        unsupported.append(f"analyzer={vectorizer.analyzer!r}")
+    if vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+        unsupported.append('custom tokenizer/preprocessor')
+    if vectorizer.strip_accents is not None:
+        unsupported.append(f"strip_accents={vectorizer.strip_accents!r}")
+    if vectorizer.norm not in ('l1', 'l2', None):
+        unsupported.append(f"norm={vectorizer.norm!r}")
+    if unsupported:
+        raise ValueError(f"Unsupported vectorizer settings: {', '.join(unsupported)}")
+
+    stop_words = vectorizer.get_stop_words()
+    return {
+        'lowercase': bool(vectorizer.lowercase),
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'stop_words': sorted(stop_words) if stop_words else [],
+        'binary': bool(vectorizer.binary),
+        'sublinear_tf': bool(vectorizer.sublinear_tf),
+        'norm': vectorizer.norm
+    }
+
+
+def _quantize(weights: np.ndarray, dtype: str) -> Dict[str, np.ndarray]:
+    """Store weights as float32, float16 or int8 with one scale per feature"""
+    if dtype == 'float32':
+        return {'weights': weights.astype(np.float32)}
+    if dtype == 'float16':
+        return {'weights': weights.astype(np.float16)}
+    if dtype == 'int8':
+        scale = np.abs(weights).max(axis=1) / 127
+        scale[scale == 0] = 1.0
+        quantized = np.round(weights / scale[:, None]).astype(np.int8)
+        return {'weights': quantized, 'weight_scale': scale.astype(np.float32)}
+    raise ValueError(f"Unknown dtype '{dtype}', expected one of {', '.join(TOLERANCES)}")
+
+
+def compile_pipeline(pipeline, dtype: str = 'float32') -> Dict[str, np.ndarray]:
+    """
+    Turn a fitted TF-IDF + MultinomialNB pipeline into compact arrays
+
+    Args:
+        pipeline: Fitted Pipeline([TfidfVectorizer, MultinomialNB])
+        dtype: 'float32', 'float16' or 'int8' for the weight matrix
+
+    Returns:
+        dict: Arrays to save with np.savez
+    """
+    steps = [step for _, step in getattr(pipeline, 'steps', [])]
+    if len(steps) != 2 or not hasattr(steps[0], 'vocabulary_') or type(steps[1]).__name__ != 'MultinomialNB':
+        raise ValueError('Only fitted TfidfVectorizer + MultinomialNB pipelines can be compiled '
+                         '(streaming HashingVectorizer models are not supported)')
+    vectorizer, classifier = steps
+    config = _vectorizer_config(vectorizer)
+    config['classes'] = [str(label) for label in classifier.classes_]
+
+    vocabulary = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        vocabulary[index] = term
+
+    if getattr(vectorizer, 'use_idf', True):
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+    else:
+        idf = np.ones(len(vocabulary))
+
+    # Class score of a document = sum over its features of
+    # tf * idf * feature_log_prob, normalized like the TF-IDF row
+    weights = idf[:, None] * np.asarray(classifier.feature_log_prob_, dtype=np.float64).T
+    weights -= weights.mean(axis=1, keepdims=True)
+
+    encoded = [term.encode('utf-8') for term in vocabulary]
+    arrays = {
+        'vocabulary': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'vocabulary_offsets': np.cumsum([0] + [len(term) for term in encoded]).astype(np.uint32),
+        'idf': idf.astype(np.float32),
+        'class_log_prior': np.asarray(classifier.class_log_prior_, dtype=np.float64),
+        'config': np.array(json.dumps(config))
+    }
+    arrays.update(_quantize(weights, dtype))
+    return arrays
+
+
+def _decode_terms(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])]
+
+
+class CompactScorer:
+    """
+    scikit-learn-free replacement for the trained pipeline's predict_proba
+
+    Exposes classes_ and predict_proba(texts) so EmotionDetector can use it
+    wherever it uses the pipeline.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        config = json.loads(str(arrays['config']))
+        self.classes_ = np.array(config['classes'])
+        self.dtype = str(arrays['weights'].dtype)
+        self._token_re = re.compile(config['token_pattern'])
+        self._lowercase = config['lowercase']
+        self._min_n, self._max_n = config['ngram_range']
+        self._stop_words = frozenset(config['stop_words'])
+        self._binary = config['binary']
+        self._sublinear_tf = config['sublinear_tf']
+        self._norm = config['norm']
+
+        self.vocabulary = _decode_terms(arrays['vocabulary'], arrays['vocabulary_offsets'])
+        self._vocabulary = {term: index for index, term in enumerate(self.vocabulary)}
+        self._idf = arrays['idf'].astype(np.float64)
+        self._class_log_prior = arrays['class_log_prior'].astype(np.float64)
+        # Dequantized once; a few hundred KB even for large vocabularies
+        weights = arrays['weights'].astype(np.float64)
+        if 'weight_scale' in arrays:
+            weights *= arrays['weight_scale'].astype(np.float64)[:, None]
+        self._weights = weights
+
+    def _terms(self, text: str) -> List[str]:
+        """Word n-grams exactly as TfidfVectorizer's word analyzer builds them"""
+        if self._lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self._stop_words:
+            tokens = [token for token in tokens if token not in self._stop_words]
+
+        terms = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), min(self._max_n, len(tokens)) + 1):
+            terms.extend(map(' '.join, zip(*[tokens[i:] for i in range(n)])))
+        return terms
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """
+        Class probabilities for a batch of texts
+
+        Args:
+            texts: Texts to score (already preprocessed like the training texts)
+
+        Returns:
+            ndarray: (len(texts) x len(classes_)) probabilities
+        """
+        # Vocabulary index of every term, -1 for terms the model never saw
+        lookup = self._vocabulary.get
+        columns = []
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            terms = self._terms(text)
+            columns.extend(map(lookup, terms, repeat(-1, len(terms))))
+            lengths[row] = len(terms)
+
+        columns = np.array(columns, dtype=np.int64)
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        known = columns >= 0
+        columns, rows = columns[known], rows[known]
+
+        scores = np.tile(self._class_log_prior, (len(texts), 1))
+        if not len(columns):
+            return self._softmax(scores)
+
+        # Term counts per (row, feature); np.unique sorts them row by row
+        keys = rows * len(self._idf) + columns
+        keys, counts = np.unique(keys, return_counts=True)
+        rows, columns = np.divmod(keys, len(self._idf))
+
+        tf = counts.astype(np.float64)
+        if self._binary:
+            tf[:] = 1.0
+        elif self._sublinear_tf:
+            tf = 1.0 + np.log(tf)
+
+        # The weights already include the IDF; only the row norm of the
+        # TF-IDF vector is still needed
+        if self._norm is not None:
+            tfidf = tf * self._idf[columns]
+            magnitude = tfidf ** 2 if self._norm == 'l2' else np.abs(tfidf)
+            norms = np.bincount(rows, weights=magnitude, minlength=len(texts))
+            if self._norm == 'l2':
+                norms = np.sqrt(norms)
+            tf /= norms[rows]
+
+        # Sum each row's feature contributions (rows are contiguous)
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        contributions = self._weights[columns] * tf[:, None]
+        scores[rows[starts]] += np.add.reduceat(contributions, starts, axis=0)
+        return self._softmax(scores)
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+def sample_texts(vocabulary: List[str], count: int = 500, seed: int = 0) -> List[str]:
+    """Random texts built from the model's own vocabulary, for tolerance checks"""
+    rng = random.Random(seed)
+    words = [term for term in vocabulary if ' ' not in term] or list(vocabulary)
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(1, 80))) for _ in range(count)]
+
+
+def max_probability_error(pipeline, scorer: CompactScorer, texts: List[str]) -> float:
+    """Largest absolute difference between the pipeline's and the scorer's probabilities"""
+    return float(np.abs(np.asarray(pipeline.predict_proba(texts)) - scorer.predict_proba(texts)).max())
+
+
+def export_compact_model(pipeline, path: str, dtype: str = 'float32',
+                         check_texts: Optional[List[str]] = None) -> float:
+    """
+    Compile a pipeline, check it against the original and save it
+
+    Args:
+        pipeline: Fitted TF-IDF + MultinomialNB pipeline
+        path: Output .npz file
+        dtype: 'float32', 'float16' or 'int8'
+        check_texts: Texts to compare probabilities on
+            (default: random texts from the model's vocabulary)
+
+    Returns:
+        float: Largest absolute probability difference on the check texts
+
+    Raises:
+        ValueError: If the pipeline is not supported or the difference
+            exceeds TOLERANCES[dtype]
+    """
+    arrays = compile_pipeline(pipeline, dtype)
+    scorer = CompactScorer(arrays)
+    if check_texts is None:
+        check_texts = sample_texts(scorer.vocabulary)
+    error = max_probability_error(pipeline, scorer, check_texts)
+    if error > TOLERANCES[dtype]:
+        raise ValueError(f"{dtype} export differs by {error:.2e}, above the {TOLERANCES[dtype]:.0e} tolerance")
+
+    temporary_path = path + '.tmp' + COMPACT_SUFFIX
+    np.savez(temporary_path, **arrays)
+    os.replace(temporary_path, path)
+    return error
+
+
+def load_compact_model(path: str) -> CompactScorer:
+    """Load an artifact written by export_compact_model"""
+    with np.load(path, allow_pickle=False) as archive:
+        return CompactScorer({name: archive[name] for name in archive.files})
+
+
+if __name__ == '__main__':
+    from model_store import load_model
+
+    parser = argparse.ArgumentParser(description='Export the trained emotion model as a compact NumPy artifact')
+    parser.add_argument('model_path', nargs='?', default=os.getenv('MODEL_PATH', 'models/emotion_model.pkl'))
+    parser.add_argument('--dtype', choices=list(TOLERANCES), default='float32')
+    parser.add_argument('--output', help='Output file (default: model path with a .npz suffix)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model_path)[0] + COMPACT_SUFFIX
+    try:
+        error = export_compact_model(load_model(args.model_path, mmap_mode=None), output, args.dtype)
+        print(f"✅ Compact {args.dtype} model saved to {output} "
+              f"({os.path.getsize(output) / 1024:.0f} KB, max probability difference {error:.1e})")
+    except ValueError as e:
+        print(f"❌ Error exporting model: {e}")
+        raise SystemExit(1)
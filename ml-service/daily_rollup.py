@@ -0,0 +1,343 @@
+"""
+Daily Rollup
+
+Per-user day-level aggregates. For each day with activity, one row holds:
+- the number, sum, lowest and highest of the mood scores, and the entries
+  of each emotion
+- the tasks created and completed
+- the habits marked
+- the journal entries written
+
+Records count on their date in the user's timezone (offset-aware
+timestamps are converted to it, see InsightStateStore); habit marks count
+on their date. Records without a valid date share one row (day UNDATED).
+Only answers over the whole history include that row.
+
+Mood, productivity and weekly-summary answers for any period are sums over
+a slice of rows (see the PersonalizedInsights._rollup_* builders). Ten years
+of history are at most 3 650 rows, whatever the number of records.
+
+On disk (RollupStore), each user's rollup is a directory holding:
+- one raw little-endian file per column (one per emotion too), rows in day
+  order
+- meta.json: the row count, the emotion names and the insight-state
+  version the rows reflect
+
+A read memory-maps the day column, finds the requested period by binary
+search and then reads only the period's rows of each column. A write
+rewrites only the rows from the first changed day onward. New records are
+usually for today, so most writes append a row or replace the last one.
+
+The rollup is derived data. meta.json is written last, and a rollup whose
+version does not match the insight state (an interrupted write, a failed
+commit) is rebuilt from the stored records.
+"""
+
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import quote
+
+import numpy as np
+
+from insight_frames import categorize, weekdays
+from journal_themes import UNDATED
+
+# Bumped when the file layout changes; older rollups are then rebuilt
+FORMAT_VERSION = 3
+
+# Fixed columns and their on-disk dtypes; each emotion adds an int64 column
+COLUMNS = {
+    'day': '<i8',
+    'mood_count': '<i8',
+    'mood_sum': '<f8',
+    'mood_min': '<f8',
+    'mood_max': '<f8',
+    'tasks_created': '<i8',
+    'tasks_completed': '<i8',
+    'habits_marked': '<i8',
+    'journal_entries': '<i8'
+}
+EMOTION_DTYPE = '<i8'
+
+
+def parse_day(value: Optional[str]) -> Optional[int]:
+    """
+    Epoch day of an ISO date such as '2026-03-01' (None stays None)
+
+    Raises:
+        ValueError: If the value is not a date
+    """
+    if value is None:
+        return None
+    try:
+        return int(np.datetime64(str(value)[:10], 'D').astype(np.int64))
+    except ValueError:
+        raise ValueError(f'Invalid date: {value}')
+
+
+class DailyRollup:
+    """
+    Day-level aggregates of one user, one row per day in ascending order
+
+    Attributes:
+        columns: Column name -> array (see COLUMNS); mood_min and mood_max
+            are NaN on days without moods
+        emotions: Emotion names, in order of first appearance
+        emotion_counts: rows x emotions int64 matrix of mood entries
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], emotions: List[str], emotion_counts: np.ndarray):
+        self.columns = columns
+        self.emotions = emotions
+        self.emotion_counts = emotion_counts
+
+    @classmethod
+    def empty(cls) -> 'DailyRollup':
+        return cls({name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}, [],
+                   np.zeros((0, 0), dtype=np.int64))
+
+    @classmethod
+    def build(cls, mood_days: Sequence[int], mood_scores: Sequence[float], mood_emotions: List[str],
+              task_days: Sequence[int], task_completed: Sequence[bool], journal_days: Sequence[int],
+              habit_days: Sequence[int], habit_counts: Sequence[int]) -> 'DailyRollup':
+        """
+        Rollup of raw records
+
+        Args:
+            mood_days, mood_scores, mood_emotions: Epoch day (UNDATED when
+                unknown), score and emotion of each mood entry
+            task_days, task_completed: Epoch day and completion of each task
+            journal_days: Epoch day of each journal entry
+            habit_days, habit_counts: Distinct epoch days and the number of
+                habits marked on each
+        """
+        mood_days, task_days, journal_days, habit_days = (
+            np.asarray(days, dtype=np.int64) for days in (mood_days, task_days, journal_days, habit_days))
+        mood_scores = np.asarray(mood_scores, dtype=np.float64)
+        habit_counts = np.asarray(habit_counts, dtype=np.int64)
+        task_completed = np.asarray(task_completed, dtype=bool)
+        days = np.unique(np.concatenate((mood_days, task_days, journal_days, habit_days[habit_counts > 0])))
+        rows = len(days)
+
+        mood_rows = np.searchsorted(days, mood_days)
+        mood_min = np.full(rows, np.nan)
+        mood_max = np.full(rows, np.nan)
+        np.fmin.at(mood_min, mood_rows, mood_scores)
+        np.fmax.at(mood_max, mood_rows, mood_scores)
+        emotions, codes = categorize(list(mood_emotions))
+        emotion_counts = np.zeros((rows, len(emotions)), dtype=np.int64)
+        np.add.at(emotion_counts, (mood_rows, codes), 1)
+
+        task_rows = np.searchsorted(days, task_days)
+        journal_rows = np.searchsorted(days, journal_days)
+        habits_marked = np.zeros(rows, dtype=np.int64)
+        marked = habit_counts > 0
+        habits_marked[np.searchsorted(days, habit_days[marked])] = habit_counts[marked]
+        return cls({
+            'day': days,
+            'mood_count': np.bincount(mood_rows, minlength=rows),
+            'mood_sum': np.bincount(mood_rows, weights=mood_scores, minlength=rows),
+            'mood_min': mood_min,
+            'mood_max': mood_max,
+            'tasks_created': np.bincount(task_rows, minlength=rows),
+            'tasks_completed': np.bincount(task_rows[task_completed], minlength=rows),
+            'habits_marked': habits_marked,
+            'journal_entries': np.bincount(journal_rows, minlength=rows)
+        }, emotions, emotion_counts)
+
+    def __len__(self) -> int:
+        return len(self.columns['day'])
+
+    def _rows(self, selection) -> 'DailyRollup':
+        return DailyRollup({name: column[selection] for name, column in self.columns.items()}, self.emotions,
+                           self.emotion_counts[selection])
+
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> 'DailyRollup':
+        """
+        Rows from epoch day start to end (inclusive; None for no bound). The
+        undated row is only kept when neither bound is given.
+        """
+        if start is None and end is None:
+            return self
+        days = self.columns['day']
+        low = np.searchsorted(days, UNDATED + 1 if start is None else max(start, UNDATED + 1))
+        high = len(days) if end is None else np.searchsorted(days, end, side='right')
+        return self._rows(slice(low, max(low, high)))
+
+    def dated(self) -> 'DailyRollup':
+        """Rows of days with a date"""
+        return self.between(start=UNDATED + 1)
+
+    def weekdays(self) -> np.ndarray:
+        """Day of week (Monday = 0) of each row; meaningless for the undated row"""
+        return weekdays(self.columns['day'].astype('datetime64[D]'))
+
+
+class RollupStore:
+    """
+    Daily rollups of every user as memory-mappable column files
+
+    Attributes:
+        path: Directory holding one subdirectory per user
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _directory(self, user_id) -> str:
+        return os.path.join(self.path, quote(str(user_id), safe=''))
+
+    @contextmanager
+    def _locked(self, directory: str, exclusive: bool):
+        """
+        Hold the user's lock file: shared for reads, exclusive for writes
+
+        fcntl is imported here as it only exists on POSIX. On Windows the
+        first byte of the file is locked with msvcrt instead, exclusively
+        for reads too.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                return
+            import msvcrt
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _files(directory: str, emotions: List[str]) -> Dict[str, tuple]:
+        """Column name -> (file, dtype), fixed columns first, then one per emotion"""
+        files = {name: (os.path.join(directory, f'{name}.bin'), dtype) for name, dtype in COLUMNS.items()}
+        files.update((f'emotion:{index}', (os.path.join(directory, f'emotion-{index}.bin'), EMOTION_DTYPE))
+                     for index in range(len(emotions)))
+        return files
+
+    @staticmethod
+    def _meta(directory: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(directory, 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('format') == FORMAT_VERSION else None
+
+    def _read(self, directory: str, meta: Dict, start: Optional[int], end: Optional[int]) -> DailyRollup:
+        """The rows of a period: binary search on the mapped day column, then one read per column"""
+        rows = meta['rows']
+        if not rows:
+            return DailyRollup.empty()
+        files = self._files(directory, meta['emotions'])
+        day = np.memmap(files['day'][0], dtype=files['day'][1], mode='r', shape=(rows,))
+        if start is None and end is None:
+            low, high = 0, rows
+        else:
+            low = int(np.searchsorted(day, UNDATED + 1 if start is None else max(start, UNDATED + 1)))
+            high = max(low, rows if end is None else int(np.searchsorted(day, end, side='right')))
+        columns = {name: np.fromfile(path, dtype=dtype, count=high - low,
+                                     offset=low * np.dtype(dtype).itemsize).astype(np.dtype(dtype).newbyteorder('='))
+                   for name, (path, dtype) in files.items()}
+        emotion_counts = np.zeros((high - low, len(meta['emotions'])), dtype=np.int64)
+        for index in range(len(meta['emotions'])):
+            emotion_counts[:, index] = columns.pop(f'emotion:{index}')
+        return DailyRollup(columns, list(meta['emotions']), emotion_counts)
+
+    def version(self, user_id) -> Optional[int]:
+        """Insight-state version the user's stored rollup reflects (None without one)"""
+        meta = self._meta(self._directory(user_id))
+        return meta['version'] if meta else None
+
+    def load(self, user_id, version=None, start: Optional[int] = None,
+             end: Optional[int] = None) -> Optional[DailyRollup]:
+        """
+        Rows of a period of a user's rollup
+
+        Args:
+            user_id: User whose rollup to read
+            version: Insight-state version the rollup must reflect
+            start, end: Epoch days (inclusive; None for no bound, both None
+                for every row including the undated one)
+
+        Returns:
+            DailyRollup, or None when none is stored for that version
+        """
+        directory = self._directory(user_id)
+        if not os.path.isdir(directory):
+            return None
+        with self._locked(directory, exclusive=False):
+            meta = self._meta(directory)
+            if meta is None or meta['version'] != version:
+                return None
+            return self._read(directory, meta, start, end)
+
+    def write(self, user_id, rows: DailyRollup, version, since: Optional[int] = None):
+        """
+        Replace the rows from epoch day `since` on (every row when None)
+
+        Args:
+            user_id: User whose rollup to update
+            rows: The new rows from `since` on (every row of that part of
+                the history, including days that did not change)
+            version: Insight-state version the rollup reflects afterwards
+            since: First day that changed; requires a stored rollup
+        """
+        directory = self._directory(user_id)
+        os.makedirs(directory, exist_ok=True)
+        with self._locked(directory, exclusive=True):
+            meta = self._meta(directory) if since is not None else None
+            first, emotions = 0, []
+            if meta is not None and meta['rows']:
+                files = self._files(directory, meta['emotions'])
+                first = int(np.searchsorted(np.memmap(files['day'][0], dtype=files['day'][1], mode='r',
+                                                      shape=(meta['rows'],)), since))
+                emotions = list(meta['emotions'])
+            emotions += [emotion for emotion in rows.emotions if emotion not in emotions]
+            # Rows before `first` stay; every column is cut there and the new rows appended
+            for name, (path, dtype) in self._files(directory, emotions).items():
+                if name.startswith('emotion:'):
+                    emotion = emotions[int(name.split(':')[1])]
+                    values = (rows.emotion_counts[:, rows.emotions.index(emotion)] if emotion in rows.emotions
+                              else np.zeros(len(rows), dtype=np.int64))
+                else:
+                    values = rows.columns[name]
+                existing = os.path.exists(path)
+                with open(path, 'r+b' if existing else 'wb') as column:
+                    # An emotion seen for the first time has no entries on earlier days
+                    column.truncate(first * np.dtype(dtype).itemsize)
+                    column.seek(first * np.dtype(dtype).itemsize)
+                    column.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            self._write_meta(directory, {'format': FORMAT_VERSION, 'rows': first + len(rows), 'emotions': emotions,
+                                         'version': version})
+
+    def restamp(self, user_id, version):
+        """Mark a user's unchanged rollup as reflecting `version`"""
+        directory = self._directory(user_id)
+        with self._locked(directory, exclusive=True):
+            meta = self._meta(directory)
+            self._write_meta(directory, dict(meta, version=version))
+
+    @staticmethod
+    def _write_meta(directory: str, meta: Dict):
+        """Replace meta.json atomically; this commits a write"""
+        with open(os.path.join(directory, 'meta.json.tmp'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(os.path.join(directory, 'meta.json.tmp'), os.path.join(directory, 'meta.json'))
+
+    def delete(self, user_id):
+        """Drop a user's rollup"""
+        shutil.rmtree(self._directory(user_id), ignore_errors=True)
@@ -0,0 +1,138 @@
+"""
+Detection Pool
+
+Multi-core execution for large emotion detection batches.
+
+A gunicorn worker scores a batch on a single core. For batches above a
+configurable size, the pool deduplicates the texts, splits them into
+contiguous shards and scores the shards in a persistent process pool.
+Each child builds its own EmotionDetector once, when it starts. Results
+are reassembled in input order. Smaller batches are scored inline, since
+sending them to another process costs more than it saves.
+
+The pool uses the 'forkserver' start method (where available) so children
+never inherit the gunicorn worker's threads or locks.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# Detector owned by each pool child (set by _init_child)
+_child_detector = None
+
+
+def _init_child(inference_mode: Optional[str]):
+    """Build and warm up the detector once per child process"""
+    global _child_detector
+    from emotion_detector import EmotionDetector
+    _child_detector = EmotionDetector(inference_mode=inference_mode)
+    _child_detector.warm_up()
+
+
+def _predict_shard(texts: List[str]) -> List[Dict]:
+    return _child_detector.predict_batch(texts)
+
+
+def _ping(_):
+    return True
+
+
+class DetectionPool:
+    """
+    Route batches either inline or across a persistent process pool
+    """
+
+    def __init__(self, detector, processes: Optional[int] = None, min_batch_size: Optional[int] = None):
+        """
+        Args:
+            detector: EmotionDetector used for inline batches
+            processes: Pool size, 0 disables the pool
+                (default: DETECTION_POOL_PROCESSES env var or 0)
+            min_batch_size: Batches with at least this many distinct texts use
+                the pool (default: DETECTION_POOL_MIN_BATCH env var or 2000)
+        """
+        if processes is None:
+            processes = int(os.getenv('DETECTION_POOL_PROCESSES', 0))
+        if min_batch_size is None:
+            min_batch_size = int(os.getenv('DETECTION_POOL_MIN_BATCH', 2000))
+        self.detector = detector
+        self.processes = max(0, processes)
+        self.min_batch_size = max(1, min_batch_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the pool on first use and keep it for the life of the process"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=context,
+                        initializer=_init_child,
+                        initargs=(self.detector.inference_mode,)
+                    )
+                    atexit.register(self.shutdown)
+        return self._executor
+
+    def start(self):
+        """Start every child now instead of on the first large batch"""
+        if self.enabled:
+            executor = self._get_executor()
+            list(executor.map(_ping, range(self.processes)))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def predict_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Predict emotions for a batch, sharding large ones across processes
+
+        Args:
+            texts (list): Raw texts to analyze
+
+        Returns:
+            list: One result per text, in input order (same as
+            EmotionDetector.predict_batch)
+        """
+        # Duplicates are only sent to the pool once
+        unique_texts = list(dict.fromkeys(text for text in texts if isinstance(text, str)))
+        if not self.enabled or len(unique_texts) < self.min_batch_size:
+            return self.detector.predict_batch(texts)
+
+        shard_size = -(-len(unique_texts) // self.processes)
+        shards = [unique_texts[i:i + shard_size] for i in range(0, len(unique_texts), shard_size)]
+
+        unique_results = {}
+        for shard, results in zip(shards, self._get_executor().map(_predict_shard, shards)):
+            unique_results.update(zip(shard, results))
+
+        # Non-string entries are handled inline exactly as before
+        results = []
+        for text in texts:
+            if isinstance(text, str) and text in unique_results:
+                results.append(dict(unique_results[text]))
+            else:
+                results.append(self.detector.predict_batch([text])[0])
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'processes': self.processes,
+            'min_batch_size': self.min_batch_size,
+            'started': self._executor is not None
+        }
@@ -15,28 +15,112 @@ The detector uses:
 4. Confidence scoring based on keyword frequency
 """
 
+import hashlib
+import json
 import os
 import re
 import string
+import threading
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
-import joblib
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 
-# Download required NLTK data for text processing
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+from compact_model import COMPACT_SUFFIX, load_compact_model
+from keyword_matcher import KeywordMatcher
+from model_store import load_model, save_model
+from prediction_cache import PredictionCache
+
+# scikit-learn and joblib are imported inside the functions that need them
+# (loading or training a model), so the rule-based path starts quickly and
+# importing this module never touches the network.
+
+# URLs first, otherwise any character other than letters, whitespace and
+# !?., - same result as removing URLs and then special characters
+_CLEANUP_RE = re.compile(r'http\S+|www.\S+|[^a-z\s!?.,]')
+
+# How predictions are made when a trained model is available:
+# - rule: keyword rules only (the trained model is ignored)
+# - model: model probabilities, falling back to rules when the model is unsure
+# - hybrid: weighted blend of model probabilities and normalized rule scores
+INFERENCE_MODES = ('rule', 'model', 'hybrid')
+
+
+def _tracked(method):
+    """Wrap a mutating list/dict method so it reports the edit afterwards"""
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._on_change()
+        return result
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+class _TrackedList(list):
+    """Keyword list that reports in-place edits to the detector owning it"""
+    
+    def __init__(self, items, on_change):
+        super().__init__(items)
+        self._on_change = on_change
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert',
+              'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(_TrackedList, _name, _tracked(getattr(list, _name)))
+
+
+class _TrackedDict(dict):
+    """Emotion -> keywords dictionary that reports edits, its lists included"""
+    
+    def __init__(self, items, on_change):
+        super().__init__((emotion, _TrackedList(keywords, on_change)) for emotion, keywords in dict(items).items())
+        self._on_change = on_change
+    
+    def __setitem__(self, emotion, keywords):
+        super().__setitem__(emotion, _TrackedList(keywords, self._on_change))
+        self._on_change()
+    
+    def update(self, *args, **kwargs):
+        for emotion, keywords in dict(*args, **kwargs).items():
+            super().__setitem__(emotion, _TrackedList(keywords, self._on_change))
+        self._on_change()
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def setdefault(self, emotion, keywords=()):
+        if emotion not in self:
+            self[emotion] = keywords
+        return self[emotion]
+
+
+for _name in ('__delitem__', 'pop', 'popitem', 'clear'):
+    setattr(_TrackedDict, _name, _tracked(getattr(dict, _name)))
+
+
+class _DetectorState:
+    """
+    Detector attribute that predictions depend on
+    
+    Assigning it (or editing a tracked keyword list in place) bumps the
+    detector's state version, which invalidates cached predictions.
+    """
+    
+    def __init__(self, wrap=None):
+        self.wrap = wrap
+    
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return getattr(instance, self.name)
+    
+    def __set__(self, instance, value):
+        if self.wrap is not None:
+            value = self.wrap(value, instance._state_changed)
+        setattr(instance, self.name, value)
+        instance._state_changed()
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
 
 class EmotionDetector:
     """
@@ -44,14 +128,60 @@ class EmotionDetector:
     Detects emotions: joy, happy, sad, angry, anxious, excited, calm, neutral, fear, love
     """
     
-    def __init__(self):
+    # Everything a cached prediction depends on
+    emotion_keywords = _DetectorState(_TrackedDict)
+    negation_words = _DetectorState(_TrackedList)
+    question_words = _DetectorState(_TrackedList)
+    model = _DetectorState()
+    inference_mode = _DetectorState()
+    model_confidence_threshold = _DetectorState()
+    model_blend_weight = _DetectorState()
+    
+    def __init__(self, cache_max_entries=None, cache_max_bytes=None, inference_mode=None):
+        """
+        Args:
+            cache_max_entries (int): Prediction cache size, 0 disables it
+                (default: PREDICTION_CACHE_MAX_ENTRIES env var or 10000)
+            cache_max_bytes (int): Prediction cache memory budget in bytes
+                (default: PREDICTION_CACHE_MAX_BYTES env var or 32 MB)
+            inference_mode (str): One of INFERENCE_MODES
+                (default: EMOTION_INFERENCE_MODE env var or 'rule')
+        """
+        if cache_max_entries is None:
+            cache_max_entries = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', 10000))
+        if cache_max_bytes is None:
+            cache_max_bytes = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+        if inference_mode is None:
+            inference_mode = os.getenv('EMOTION_INFERENCE_MODE', 'rule')
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{inference_mode}', expected one of {INFERENCE_MODES}")
+        
+        # Cached predictions are only valid for the state they were computed
+        # with: changing a keyword list, the model or a setting bumps the
+        # version (under the lock) and moves the cache to it
+        self.cache = PredictionCache(cache_max_entries, cache_max_bytes)
+        self._state_lock = threading.Lock()
+        self._state_version = 0
+        
+        self.inference_mode = inference_mode
+        # Model mode: below this probability the rule-based result is used instead
+        self.model_confidence_threshold = float(os.getenv('MODEL_CONFIDENCE_THRESHOLD', 0.5))
+        # Hybrid mode: share of the blended distribution taken from the model
+        self.model_blend_weight = float(os.getenv('MODEL_BLEND_WEIGHT', 0.7))
+        
         self.model = None
+        # File the model was loaded from or saved to (identifies it in fingerprint())
+        self.model_path = None
         self.vectorizer = None
         self.emotions = [
             'joy', 'happy', 'sad', 'angry', 'anxious', 
             'excited', 'calm', 'neutral', 'fear', 'love'
         ]
         self.emotion_keywords = self._build_keyword_dict()
+        self.negation_words = ['not', 'no', 'never', 'neither', 'nobody', 'nothing']
+        self.question_words = ['why', 'what', 'how']
+        self._matcher = self._build_matcher()
+        self._matcher_version = self._state_version
         self._initialize_model()
     
     def _build_keyword_dict(self):
@@ -69,6 +199,46 @@ class EmotionDetector:
             'love': ['love', 'adore', 'cherish', 'affection', 'care', 'fond', 'devoted', 'passionate'],
         }
     
+    def _build_matcher(self):
+        """
+        Compile emotion, negation and question keywords into one matcher
+        
+        Built once so each text is scanned in a single pass instead of
+        one substring search per keyword.
+        """
+        keyword_groups = dict(self.emotion_keywords)
+        keyword_groups['_negation'] = self.negation_words
+        keyword_groups['_question'] = self.question_words
+        return KeywordMatcher(keyword_groups)
+    
+    def _state_changed(self):
+        """Bump the state version and move the prediction cache to it"""
+        with self._state_lock:
+            self._state_version += 1
+            self.cache.invalidate(self._state_version)
+    
+    def _sync_state(self):
+        """
+        Pick up keyword dictionary or model changes before predicting
+        
+        Rebuilds the keyword matcher when the state version moved since it
+        was built (keyword lists edited, even in place, or a different model
+        or setting).
+        
+        Returns:
+            int: State version to stamp the predictions made now with, so
+            they are not cached if the state changes while they run
+        """
+        version = self._state_version
+        if self._matcher_version == version:
+            return version
+        
+        with self._state_lock:
+            if self._matcher_version != self._state_version:
+                self._matcher = self._build_matcher()
+                self._matcher_version = self._state_version
+            return self._state_version
+    
     def _initialize_model(self):
         """
         Initialize or load the emotion detection model
@@ -76,13 +246,25 @@ class EmotionDetector:
         Tries to load a pre-trained ML model if available.
         Falls back to rule-based detection if no model is found.
         This allows the system to work immediately without training data.
+        
+        Model arrays are memory-mapped read-only by default (MODEL_MMAP_MODE,
+        set to 'none' to load them into memory) so preloaded gunicorn
+        workers share one copy.
+        
+        A MODEL_PATH ending in .npz is a compact model exported by
+        compact_model.py, which is scored without importing scikit-learn.
         """
         model_path = os.getenv('MODEL_PATH', 'models/emotion_model.pkl')
+        mmap_mode = os.getenv('MODEL_MMAP_MODE', 'r')
         
         # Check if pre-trained machine learning model exists
         if os.path.exists(model_path):
             try:
-                self.model = joblib.load(model_path)
+                if model_path.endswith(COMPACT_SUFFIX):
+                    self.model = load_compact_model(model_path)
+                else:
+                    self.model = load_model(model_path, mmap_mode=None if mmap_mode == 'none' else mmap_mode)
+                self.model_path = model_path
                 return
             except Exception as e:
                 pass
@@ -108,11 +290,9 @@ class EmotionDetector:
         # Convert to lowercase for case-insensitive matching
         text = text.lower()
         
-        # Remove URLs (they don't convey emotion)
-        text = re.sub(r'http\S+|www.\S+', '', text)
-        
-        # Remove special characters but keep punctuation for emotion cues
-        text = re.sub(r'[^a-z\s!?.,]', '', text)
+        # Remove URLs (they don't convey emotion) and special characters
+        # (keeping punctuation for emotion cues) in a single regex pass
+        text = _CLEANUP_RE.sub('', text)
         
         # Remove extra whitespace
         text = ' '.join(text.split())
@@ -137,25 +317,25 @@ class EmotionDetector:
         """
         text_lower = text.lower()
         
+        # Count keyword hits for every group in one pass
+        keyword_counts = self._matcher.count(text_lower)
+        
         # Initialize emotion scores (higher score = stronger emotion)
         emotion_scores = {emotion: 0 for emotion in self.emotions}
         
-        for emotion, keywords in self.emotion_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    emotion_scores[emotion] += 1
+        for emotion in self.emotion_keywords:
+            emotion_scores[emotion] += keyword_counts[emotion]
         
         # Check for emotional punctuation
         if '!' in text:
             emotion_scores['excited'] += 0.5
             emotion_scores['happy'] += 0.3
         
-        if '?' in text and any(word in text_lower for word in ['why', 'what', 'how']):
+        if '?' in text and keyword_counts['_question'] > 0:
             emotion_scores['anxious'] += 0.3
         
         # Negation handling
-        negation_words = ['not', 'no', 'never', 'neither', 'nobody', 'nothing']
-        has_negation = any(word in text_lower for word in negation_words)
+        has_negation = keyword_counts['_negation'] > 0
         
         if has_negation:
             # Reduce positive emotions
@@ -183,6 +363,192 @@ class EmotionDetector:
         
         return dominant_emotion, confidence
     
+    def _rule_based_scores_batch(self, texts):
+        """
+        Vectorized rule-based emotion scores for a batch of preprocessed texts
+        
+        Applies the same scoring as _rule_based_detection, but counts
+        keywords for the whole batch as one sparse matrix and applies the
+        punctuation and negation steps as NumPy operations.
+        
+        Args:
+            texts (list): Preprocessed texts to analyze
+        
+        Returns:
+            ndarray: (texts x self.emotions) matrix of emotion scores
+        """
+        texts_lower = [text.lower() for text in texts]
+        groups = self._matcher.groups
+        counts = self._matcher.count_batch(texts_lower)
+        
+        # Emotion scores as a (texts x emotions) float matrix
+        scores = np.zeros((len(texts), len(self.emotions)))
+        for column, emotion in enumerate(self.emotions):
+            if emotion in self.emotion_keywords:
+                scores[:, column] = counts[:, groups.index(emotion)]
+        
+        column = {emotion: index for index, emotion in enumerate(self.emotions)}
+        
+        # Emotional punctuation
+        exclamation = np.array(['!' in text for text in texts], dtype=bool)
+        question = np.array(['?' in text for text in texts], dtype=bool) & (counts[:, groups.index('_question')] > 0)
+        scores[:, column['excited']] += np.where(exclamation, 0.5, 0.0)
+        scores[:, column['happy']] += np.where(exclamation, 0.3, 0.0)
+        scores[:, column['anxious']] += np.where(question, 0.3, 0.0)
+        
+        # Negation handling
+        negation = counts[:, groups.index('_negation')] > 0
+        for emotion, factor in [('happy', 0.5), ('joy', 0.5), ('excited', 0.5), ('sad', 1.5), ('anxious', 1.5)]:
+            scores[negation, column[emotion]] *= factor
+        
+        return scores
+    
+    def _rule_based_detection_batch(self, texts):
+        """
+        Vectorized rule-based detection for a batch of preprocessed texts
+        
+        Args:
+            texts (list): Preprocessed texts to analyze
+        
+        Returns:
+            tuple: (list of dominant emotions, array of confidence scores)
+        """
+        scores = self._rule_based_scores_batch(texts)
+        
+        # Dominant emotion (first maximum, like max() over the score dict)
+        dominant = scores.argmax(axis=1)
+        max_scores = scores[np.arange(len(texts)), dominant]
+        
+        # Sum left to right (cumsum) so totals match the scalar path exactly
+        totals = scores.cumsum(axis=1)[:, -1] if len(texts) else np.zeros(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidences = np.clip(max_scores / totals, 0.5, 1.0)
+        
+        no_match = max_scores == 0
+        confidences[no_match] = 0.5
+        emotions = [
+            'neutral' if empty else self.emotions[index]
+            for index, empty in zip(dominant, no_match)
+        ]
+        
+        return emotions, confidences
+    
+    def _model_proba_batch(self, texts):
+        """
+        Run the trained model on a whole batch at once
+        
+        The pipeline's vectorizer transforms every text in one call, then
+        predict_proba scores the resulting matrix.
+        
+        Args:
+            texts (list): Preprocessed texts to analyze
+        
+        Returns:
+            tuple: (list of class labels, (texts x labels) probability matrix)
+        """
+        probabilities = np.asarray(self.model.predict_proba(texts))
+        return [str(label) for label in self.model.classes_], probabilities
+    
+    def fingerprint(self):
+        """
+        Short hash of everything predictions depend on: keyword lists,
+        inference mode and settings, and the model file (path, size and
+        modification time), so results stored outside this process can be
+        matched to the detector that made them
+        """
+        model = None
+        if self.model is not None:
+            try:
+                stat = os.stat(self.model_path)
+                model = [self.model_path, stat.st_size, stat.st_mtime_ns]
+            except (OSError, TypeError):
+                model = [self.model_path, id(self.model)]
+        state = [self.emotion_keywords, self.negation_words, self.question_words, self.active_inference_mode(),
+                 self.model_confidence_threshold, self.model_blend_weight, model]
+        return hashlib.blake2b(json.dumps(state, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+    
+    def active_inference_mode(self):
+        """Inference mode actually in use ('rule' until a model is loaded)"""
+        return self.inference_mode if self.model is not None else 'rule'
+    
+    def _score_batch(self, texts):
+        """
+        Score preprocessed texts with the active inference mode
+        
+        Args:
+            texts (list): Preprocessed, non-empty texts
+        
+        Returns:
+            list: One (emotion, probability, all_emotions items) tuple per text
+        """
+        mode = self.active_inference_mode()
+        
+        if mode == 'rule':
+            emotions, confidences = self._rule_based_detection_batch(texts)
+            return [
+                (emotion, float(confidence), ((emotion, float(confidence)),))
+                for emotion, confidence in zip(emotions, confidences)
+            ]
+        
+        classes, probabilities = self._model_proba_batch(texts)
+        
+        if mode == 'hybrid':
+            # Align model classes and rule emotions on one label axis
+            labels = self.emotions + [label for label in classes if label not in self.emotions]
+            model_dist = np.zeros((len(texts), len(labels)))
+            model_dist[:, [labels.index(label) for label in classes]] = probabilities
+            
+            rule_scores = self._rule_based_scores_batch(texts)
+            totals = rule_scores.sum(axis=1, keepdims=True)
+            rule_dist = np.zeros_like(model_dist)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rule_dist[:, :len(self.emotions)] = np.where(totals > 0, rule_scores / totals, 0.0)
+            
+            # Texts without any keyword hit rely on the model alone
+            weight = self.model_blend_weight
+            probabilities = np.where(
+                totals > 0,
+                weight * model_dist + (1 - weight) * rule_dist,
+                model_dist
+            )
+            classes = labels
+        
+        best = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(texts)), best]
+        
+        # Model mode: hand unsure predictions back to the rules
+        fallback = {}
+        if mode == 'model':
+            unsure = np.flatnonzero(confidences < self.model_confidence_threshold)
+            if len(unsure):
+                emotions, rule_confidences = self._rule_based_detection_batch([texts[i] for i in unsure])
+                fallback = dict(zip(unsure.tolist(), zip(emotions, rule_confidences)))
+        
+        predictions = []
+        for row in range(len(texts)):
+            if row in fallback:
+                emotion, confidence = fallback[row]
+                predictions.append((emotion, float(confidence), ((emotion, float(confidence)),)))
+                continue
+            
+            distribution = tuple(
+                (label, round(float(p), 4))
+                for label, p in zip(classes, probabilities[row]) if p > 0
+            )
+            predictions.append((classes[best[row]], float(confidences[row]), distribution))
+        
+        return predictions
+    
+    @staticmethod
+    def _build_result(prediction):
+        """Turn a cached (emotion, probability, all_emotions) tuple into a response dict"""
+        emotion, probability, all_emotions = prediction
+        return {
+            'emotion': emotion,
+            'probability': round(probability, 2),
+            'all_emotions': dict(all_emotions)
+        }
+    
     def predict(self, text):
         """
         Predict emotion from text
@@ -201,34 +567,114 @@ class EmotionDetector:
                 'all_emotions': {'neutral': 0.5}
             }
         
+        version = self._sync_state()
+        
         # Preprocess
         processed_text = self._preprocess_text(text)
         
-        # Use rule-based detection
-        emotion, probability = self._rule_based_detection(processed_text)
+        # Reuse the result for text we have already scored
+        cache_key = PredictionCache.make_key(processed_text)
+        prediction = self.cache.get(cache_key, version)
+        if prediction is None:
+            if self.active_inference_mode() == 'rule':
+                # Use rule-based detection
+                emotion, probability = self._rule_based_detection(processed_text)
+                prediction = (emotion, probability, ((emotion, probability),))
+            else:
+                prediction = self._score_batch([processed_text])[0]
+            self.cache.put(cache_key, prediction, version)
+        
+        return self._build_result(prediction)
+    
+    def predict_batch(self, texts):
+        """
+        Predict emotions for a batch of texts
         
-        # Build all emotions dict
-        all_emotions = {emotion: probability}
+        Identical texts are scored once, and the whole batch goes through
+        the vectorized rule or model path instead of one predict() call per text.
         
-        return {
-            'emotion': emotion,
-            'probability': round(probability, 2),
-            'all_emotions': all_emotions
-        }
+        Args:
+            texts (list): Raw texts to analyze
+        
+        Returns:
+            list: One result per text, in input order, matching predict()
+        """
+        # Deduplicate non-empty texts, keeping first-seen order
+        unique_texts = {}
+        for text in texts:
+            if text and len(text.strip()) > 0:
+                unique_texts.setdefault(text, len(unique_texts))
+        
+        version = self._sync_state()
+        
+        # Look up cached predictions, then score only the misses together
+        predictions = [None] * len(unique_texts)
+        cache_keys = [None] * len(unique_texts)
+        missing = []
+        for text, index in unique_texts.items():
+            processed_text = self._preprocess_text(text)
+            cache_keys[index] = PredictionCache.make_key(processed_text)
+            predictions[index] = self.cache.get(cache_keys[index], version)
+            if predictions[index] is None:
+                missing.append((index, processed_text))
+        
+        if missing:
+            scored = self._score_batch([text for _, text in missing])
+            for (index, _), prediction in zip(missing, scored):
+                predictions[index] = prediction
+                self.cache.put(cache_keys[index], prediction, version)
+        
+        results = []
+        for text in texts:
+            if not text or len(text.strip()) == 0:
+                results.append({
+                    'emotion': 'neutral',
+                    'probability': 0.5,
+                    'all_emotions': {'neutral': 0.5}
+                })
+                continue
+            
+            results.append(self._build_result(predictions[unique_texts[text]]))
+        
+        return results
+    
+    def warm_up(self):
+        """
+        Run every detection path once so the first real request is fast
+        
+        Fills the keyword matcher's word cache with the keywords themselves
+        and loads the batch dependencies (scipy, and the model if one is
+        loaded). Results are discarded and never enter the prediction cache.
+        """
+        self._sync_state()
+        sample = self._preprocess_text(' '.join(self._matcher.keywords) + '! why?')
+        self._rule_based_detection(sample)
+        self._rule_based_detection_batch([sample, 'not okay'])
+        self._score_batch([sample, 'not okay'])
     
     def is_loaded(self):
         """Check if model is loaded"""
         return True  # Always true for rule-based approach
     
-    def train_model(self, texts, labels):
+    def train_model(self, texts, labels, model_path=None):
         """
-        Train the emotion detection model (for future enhancement)
+        Train the emotion detection model
+        
+        Texts go through the same preprocessing as at prediction time.
+        The trained model is used when EMOTION_INFERENCE_MODE is 'model'
+        or 'hybrid'.
         
         Args:
             texts: List of text samples
             labels: List of emotion labels
+            model_path: Where to save the model
+                (default: MODEL_PATH env var or models/emotion_model.pkl)
         """
         try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.naive_bayes import MultinomialNB
+            from sklearn.pipeline import Pipeline
+            
             # Create pipeline
             pipeline = Pipeline([
                 ('tfidf', TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
@@ -236,16 +682,19 @@ class EmotionDetector:
             ])
             
             # Train
-            pipeline.fit(texts, labels)
+            pipeline.fit([self._preprocess_text(text) for text in texts], labels)
             
             # Save model
-            model_dir = 'models'
-            os.makedirs(model_dir, exist_ok=True)
+            if model_path is None:
+                model_path = os.getenv('MODEL_PATH', 'models/emotion_model.pkl')
+            model_dir = os.path.dirname(model_path)
+            if model_dir:
+                os.makedirs(model_dir, exist_ok=True)
             
-            model_path = os.path.join(model_dir, 'emotion_model.pkl')
-            joblib.dump(pipeline, model_path)
+            save_model(pipeline, model_path)
             
             self.model = pipeline
+            self.model_path = model_path
             
             print(f"✅ Model trained and saved to {model_path}")
             return True
@@ -253,4 +702,39 @@ class EmotionDetector:
         except Exception as e:
             print(f"❌ Error training model: {e}")
             return False
-
+    
+    def train_model_streaming(self, paths, model_path=None, update=False, resume=True, **options):
+        """
+        Train (or update) the model out-of-core from JSONL/CSV exports
+        
+        Reads the files chunk by chunk with a hashing vectorizer and a
+        partial_fit classifier, writing resumable checkpoints along the way.
+        See streaming_trainer.StreamingTrainer for the available options.
+        
+        Args:
+            paths: JSONL or CSV files with text and label fields
+            model_path: Where to save the model
+                (default: MODEL_PATH env var or models/emotion_model.pkl)
+            update: Continue training the existing model at model_path
+            resume: Pick up from a checkpoint left by an interrupted run
+        
+        Returns:
+            bool: True if training succeeded
+        """
+        from streaming_trainer import StreamingTrainer
+        
+        if model_path is None:
+            model_path = os.getenv('MODEL_PATH', 'models/emotion_model.pkl')
+        model_dir = os.path.dirname(model_path)
+        if model_dir:
+            os.makedirs(model_dir, exist_ok=True)
+        
+        try:
+            trainer = StreamingTrainer(model_path, self.emotions, preprocess=self._preprocess_text, **options)
+            self.model = trainer.train(paths, resume=resume, update=update)
+            self.model_path = model_path
+            return True
+        
+        except Exception as e:
+            print(f"❌ Error training model: {e}")
+            return False
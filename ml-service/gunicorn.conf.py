@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for the ML service
+
+Settings can be overridden with environment variables:
+- PORT: Port to bind (default 5001)
+- GUNICORN_WORKERS: Number of worker processes (default 2 in sync mode,
+  one per available CPU core in async mode)
+- GUNICORN_PRELOAD: Load the app once in the master before forking (default true)
+- ML_SERVER_MODE: 'sync' serves app:app with sync workers (default),
+  'async' serves asgi:app with uvicorn workers (one event loop per worker,
+  handlers in a thread pool, see asgi.py)
+
+The app is chosen here, so start the server with just:
+    gunicorn --config gunicorn.conf.py
+
+With preload enabled, the detector, keyword matchers and the memory-mapped
+model are built once in the master process. Workers are forked afterwards
+and share those pages read-only instead of each loading its own copy.
+"""
+
+import gc
+import os
+
+server_mode = os.getenv('ML_SERVER_MODE', 'sync').lower()
+if server_mode not in ('sync', 'async'):
+    raise ValueError(f"Unknown ML_SERVER_MODE '{server_mode}', expected 'sync' or 'async'")
+
+if server_mode == 'async':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'app:app'
+    worker_class = 'sync'
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+# An async worker accepts every connection it can and keeps it, so two
+# event loops sharing a core split requests unevenly; one per core is enough
+default_workers = len(os.sched_getaffinity(0)) if server_mode == 'async' and hasattr(os, 'sched_getaffinity') else 2
+workers = int(os.getenv('GUNICORN_WORKERS', default_workers))
+timeout = 120
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+if preload_app:
+    # Warm up synchronously in the master: a background warm-up thread
+    # would not survive the fork into workers
+    os.environ.setdefault('ML_WARM_UP', 'sync')
+
+
+def when_ready(server):
+    """Freeze preloaded objects before workers are forked"""
+    if preload_app:
+        # Move everything created so far out of the garbage collector's
+        # reach so collections in workers don't write to (and un-share)
+        # the pages holding the preloaded model and vocabulary
+        gc.freeze()
@@ -0,0 +1,250 @@
+"""
+Habit Bitmaps
+
+Marked days of many habits as packed per-habit day bitmaps.
+
+Each habit is one row of bits over a shared range of days, anchored at an
+epoch day (days since 1970-01-01): bit k of a row is set when the habit
+was marked on day origin + k. Rows are packed 8 days per byte with
+np.packbits, so a habit with ten years of history takes about 460 bytes.
+
+Every statistic is a vectorized operation over all habits at once:
+- days marked in any window: popcount of the row's bytes (lookup table),
+  with the partial bytes at the window's edges masked
+- completion rates: those counts divided by the days in the window since
+  the habit started, so a 3-day-old habit is not measured against 30 days
+- current and longest streaks: run lengths from the edges of the unpacked
+  rows (np.diff), never a loop over days
+- weekday breakdown: marks per weekday against the number of those
+  weekdays since the habit started
+
+A habit starts on its creation day ('created_at') or, if it was marked
+earlier or has no creation date, on its first marked day. Days are calendar
+days as written ("2026-03-14", or the wall-clock date of a timestamp).
+Marks more than MAX_HISTORY_DAYS before today or more than MAX_DAYS_AHEAD
+after it are ignored like invalid dates, so one malformed date cannot
+stretch the bitmaps of every habit.
+
+The insight state store keeps one packed row per habit (see to_row and
+from_rows), so stored-state answers read a few hundred bytes per habit.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# 1970-01-01 (epoch day 0) was a Thursday
+_EPOCH_WEEKDAY = 3
+
+# Set bits in each byte value
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Start of a habit with neither a creation date nor marks
+NO_START = np.iinfo(np.int64).max
+
+# Range of marks kept around today (about 20 years back, a year ahead)
+MAX_HISTORY_DAYS = 7305
+MAX_DAYS_AHEAD = 366
+
+
+def epoch_days(timestamps: np.ndarray) -> np.ndarray:
+    """Epoch day of each datetime64 timestamp (its wall-clock date); meaningless for NaT"""
+    return timestamps.astype('datetime64[D]').astype(np.int64)
+
+
+def epoch_day(moment) -> int:
+    """Epoch day of a datetime's date"""
+    return int(np.datetime64(moment.date(), 'D').astype(np.int64))
+
+
+def plausible_days(days: np.ndarray, today: int) -> np.ndarray:
+    """Mask of the epoch days within the range of marks kept around today"""
+    days = np.asarray(days, dtype=np.int64)
+    return (days > today - MAX_HISTORY_DAYS) & (days <= today + MAX_DAYS_AHEAD)
+
+
+def _edge_mask(low: int, high: int) -> int:
+    """Byte mask of bits low..high-1 (little-endian bit order)"""
+    return ((1 << high) - 1) & ~((1 << low) - 1)
+
+
+class HabitBitmaps:
+    """
+    Packed day bitmaps of several habits over a shared day range
+
+    Attributes:
+        bits: uint8 array, habits x bytes (bit order 'little')
+        origin: Epoch day of the first bit
+        days: Number of days covered
+        starts: Epoch day each habit started (see module docstring)
+    """
+
+    def __init__(self, bits: np.ndarray, origin: int, days: int, starts: np.ndarray):
+        self.bits = bits
+        self.origin = origin
+        self.days = days
+        self.starts = starts
+
+    @classmethod
+    def from_days(cls, habit_index: np.ndarray, days: np.ndarray, habit_count: int,
+                  created: Optional[np.ndarray] = None, today: Optional[int] = None) -> 'HabitBitmaps':
+        """
+        Bitmaps from (habit, epoch day) pairs; duplicates are harmless
+
+        Args:
+            habit_index: Row of the habit each mark belongs to
+            days: Epoch day of each mark
+            habit_count: Number of habits (rows)
+            created: Epoch day each habit was created (NO_START if
+                unknown), optional
+            today: Epoch day the range must reach, so windows ending today
+                fit (defaults to the last mark); marks too far from it are
+                dropped (plausible_days)
+        """
+        habit_index = np.asarray(habit_index, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        if len(days):
+            kept = plausible_days(days, int(days.max()) if today is None else today)
+            habit_index, days = habit_index[kept], days[kept]
+        first = np.full(habit_count, NO_START, dtype=np.int64)
+        np.minimum.at(first, habit_index, days)
+        starts = first if created is None else np.minimum(first, np.asarray(created, dtype=np.int64))
+
+        bounds = [day for day in (today,) if day is not None] + ([int(days.min()), int(days.max())]
+                                                                 if len(days) else [])
+        origin = min(bounds) if bounds else 0
+        span = max(bounds) - origin + 1 if bounds else 0
+        marked = np.zeros((habit_count, span), dtype=bool)
+        marked[habit_index, days - origin] = True
+        return cls(np.packbits(marked, axis=1, bitorder='little'), origin, span, starts)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, bytes]], created: np.ndarray,
+                  today: Optional[int] = None) -> 'HabitBitmaps':
+        """Bitmaps from per-habit (origin, packed bytes) rows as stored by to_row()"""
+        habit_index, days = [], []
+        for index, (origin, packed) in enumerate(rows):
+            marked = cls.row_days(origin, packed)
+            habit_index.append(np.full(len(marked), index, dtype=np.int64))
+            days.append(marked)
+        return cls.from_days(np.concatenate(habit_index) if habit_index else np.zeros(0, dtype=np.int64),
+                             np.concatenate(days) if days else np.zeros(0, dtype=np.int64),
+                             len(created), created, today)
+
+    @staticmethod
+    def to_row(days: np.ndarray) -> Tuple[int, bytes]:
+        """One habit's marked epoch days as (origin, packed bytes) for storage"""
+        days = np.unique(np.asarray(days, dtype=np.int64))
+        if not len(days):
+            return 0, b''
+        marked = np.zeros(int(days[-1] - days[0]) + 1, dtype=bool)
+        marked[days - days[0]] = True
+        return int(days[0]), np.packbits(marked, bitorder='little').tobytes()
+
+    @staticmethod
+    def row_days(origin: int, packed: bytes) -> np.ndarray:
+        """Marked epoch days of one habit's (origin, packed bytes) row, ascending"""
+        return np.flatnonzero(np.unpackbits(np.frombuffer(packed, dtype=np.uint8), bitorder='little')) + origin
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def marked(self) -> np.ndarray:
+        """Unpacked habits x days bool matrix"""
+        return np.unpackbits(self.bits, axis=1, count=self.days, bitorder='little').astype(bool)
+
+    def count(self, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        """
+        Days marked per habit between epoch days first and last (inclusive;
+        scalars or one bound per habit)
+        """
+        low = np.clip(np.broadcast_to(np.asarray(first, dtype=np.int64) - self.origin, (len(self),)), 0, self.days)
+        high = np.clip(np.broadcast_to(np.asarray(last, dtype=np.int64) - self.origin + 1, (len(self),)),
+                       0, self.days)
+        high = np.maximum(high, low)
+        # Whole bytes from cumulative popcounts, then the partial edge bytes
+        cumulative = np.zeros((len(self), self.bits.shape[1] + 1), dtype=np.int64)
+        np.cumsum(_POPCOUNT[self.bits], axis=1, out=cumulative[:, 1:])
+        rows = np.arange(len(self))
+        low_byte, high_byte = low // 8, high // 8
+        counts = cumulative[rows, high_byte] - cumulative[rows, low_byte]
+        padded = np.concatenate((self.bits, np.zeros((len(self), 1), dtype=np.uint8)), axis=1)
+        low_mask = np.array([_edge_mask(0, bit) for bit in range(8)], dtype=np.uint8)
+        counts -= _POPCOUNT[padded[rows, low_byte] & low_mask[low % 8]]
+        counts += _POPCOUNT[padded[rows, high_byte] & low_mask[high % 8]]
+        return counts
+
+    def completion_rates(self, window: int, today: int) -> np.ndarray:
+        """
+        Share of the last `window` days (ending today) each habit was
+        marked, counting only days since it started
+        """
+        window_start = today - window + 1
+        first = np.maximum(window_start, np.minimum(self.starts, today + 1))
+        possible = today - first + 1
+        return np.where(possible > 0, self.count(first, today) / np.maximum(possible, 1), 0.0)
+
+    def streaks(self, today: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Current streak (consecutive marked days up to today; 0 if today is
+        not marked) and longest streak of every habit
+        """
+        marked = self.marked()
+        edges = np.diff(np.pad(marked, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        run_rows, run_starts = np.nonzero(edges == 1)
+        _, run_ends = np.nonzero(edges == -1)
+        lengths = run_ends - run_starts
+        longest = np.zeros(len(self), dtype=np.int64)
+        np.maximum.at(longest, run_rows, lengths)
+        # Runs through today count up to today (marks ahead of it do not)
+        current = np.zeros(len(self), dtype=np.int64)
+        offset = today - self.origin
+        through_today = (run_starts <= offset) & (run_ends > offset)
+        current[run_rows[through_today]] = offset - run_starts[through_today] + 1
+        return current, longest
+
+    def weekday_rates(self, today: int) -> np.ndarray:
+        """
+        habits x 7 (Monday first): marked share of each weekday since the
+        habit started (0 for weekdays that have not come up yet)
+        """
+        marked = self.marked()
+        # Marks after today do not count against the days that have come up
+        marked[:, max(today - self.origin + 1, 0):] = False
+        weekdays = (self.origin + np.arange(self.days) + _EPOCH_WEEKDAY) % 7
+        marks = marked.astype(np.int64) @ (weekdays[:, None] == np.arange(7)).astype(np.int64)
+        # Occurrences of each weekday between the start and today
+        starts = np.minimum(self.starts, today + 1)
+        length = np.maximum(today - starts + 1, 0)
+        first_weekday = (starts + _EPOCH_WEEKDAY) % 7
+        occurrences = (length[:, None] // 7
+                       + (((np.arange(7) - first_weekday[:, None]) % 7) < (length % 7)[:, None]))
+        return np.where(occurrences > 0, marks / np.maximum(occurrences, 1), 0.0)
+
+    def summaries(self, today: int, windows: Iterable[int]) -> List[Dict]:
+        """
+        Per-habit statistics for the response
+
+        Returns:
+            list: One dict per habit with started (date or None),
+            total_marked, completion_rates by window ('7d', ...),
+            current_streak, longest_streak and weekday_rates by day name
+        """
+        windows = list(windows)
+        rates = {f'{window}d': self.completion_rates(window, today) for window in windows}
+        current, longest = self.streaks(today)
+        weekday = self.weekday_rates(today)
+        total = self.count(self.origin, self.origin + self.days - 1)
+        return [
+            {
+                'started': str(np.datetime64(int(self.starts[row]), 'D')) if self.starts[row] != NO_START else None,
+                'total_marked': int(total[row]),
+                'completion_rates': {name: round(float(values[row]), 4) for name, values in rates.items()},
+                'current_streak': int(current[row]),
+                'longest_streak': int(longest[row]),
+                'weekday_rates': dict(zip(DAY_NAMES, np.round(weekday[row], 4).tolist()))
+            }
+            for row in range(len(self))
+        ]
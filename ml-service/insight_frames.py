@@ -0,0 +1,421 @@
+"""
+Insight Frames
+
+Typed, columnar views of one insights request.
+
+PersonalizedInsights receives journal entries, mood logs, tasks and habits
+as lists of JSON objects. Instead of every analysis walking those lists
+with entry.get(...) and re-parsing dates, each list is converted once per
+request into a Frame: a set of equally long NumPy columns (parsed
+timestamps, scores, emotion category codes, completion flags, ...).
+Analyses then run as vectorized operations over the columns.
+
+Timestamps are parsed exactly like the per-entry code they replace
+(datetime.fromisoformat with 'Z' read as UTC), once per distinct string,
+and stored as datetime64[us] wall-clock times as written, plus a flag for
+strings that carried a UTC offset. Frames also keep each string's UTC
+offset, so times can be shown in the user's timezone (local_wall_clock).
+The time windows compare those local times with the naive local 'now';
+without a timezone, offset-aware times count by their wall clock as
+written, like habit marks count by their date. Their day of week is the
+written one.
+
+InsightFrames is the per-request analysis context: frames and derived
+metrics (completion counts, habit rates, recent mood averages, ...) are
+memoized there, so sections that share an intermediate compute it once.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime, tzinfo
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from habit_bitmaps import MAX_DAYS_AHEAD, MAX_HISTORY_DAYS
+
+# datetime64 value used for missing or unparseable timestamps
+NAT = np.datetime64('NaT', 'us')
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+class Frame:
+    """
+    Equally long NumPy columns describing one list of records
+
+    Columns are read with frame['name']; len(frame) is the record count.
+    """
+
+    def __init__(self, length: int, **columns: np.ndarray):
+        self.length = length
+        self.columns = columns
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse one ISO timestamp, 'Z' meaning UTC; None when invalid"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def parse_timestamps(values: Iterable[Any], with_offsets: bool = False) -> Tuple[np.ndarray, ...]:
+    """
+    Parse ISO timestamps, each distinct string only once
+
+    Missing, empty and non-string values are invalid, like unparseable
+    strings.
+
+    Args:
+        values: Timestamp strings
+        with_offsets: Also return UTC offsets and which strings had a time
+
+    Returns:
+        tuple: (datetime64[us] wall-clock times, NaT when missing or invalid;
+        bool array, True where the string carried a UTC offset), plus with
+        with_offsets (int64 UTC offset in seconds, 0 unless aware; bool
+        array, False for date-only strings and invalid values)
+    """
+    strings = [value if isinstance(value, str) else '' for value in values]
+    unique = list(dict.fromkeys(strings))
+    codes = np.fromiter(map({string: code for code, string in enumerate(unique)}.__getitem__, strings),
+                        dtype=np.int64, count=len(strings))
+
+    try:
+        parsed = [datetime.fromisoformat(string.replace('Z', '+00:00')) for string in unique]
+    except ValueError:
+        parsed = [_parse_timestamp(string) for string in unique]
+
+    valid = np.array([moment is not None for moment in parsed], dtype=bool)
+    if not valid.all():
+        parsed = [moment or _EPOCH for moment in parsed]
+    aware = np.array([moment.tzinfo is not None for moment in parsed], dtype=bool) & valid
+    if not with_offsets:
+        return _wall_clock(parsed, valid)[codes], aware[codes]
+
+    offsets = np.array([int(moment.utcoffset().total_seconds()) if moment.tzinfo is not None else 0
+                        for moment in parsed], dtype=np.int64)
+    # 'YYYY-MM-DD' (or 'YYYYMMDD'): the time of day is unknown
+    timed = np.array([len(string) > 10 for string in unique], dtype=bool) & valid
+    return _wall_clock(parsed, valid)[codes], aware[codes], np.where(aware, offsets, 0)[codes], timed[codes]
+
+
+def _wall_clock(moments: List[datetime], valid: np.ndarray) -> np.ndarray:
+    """
+    datetime64[us] of each datetime's wall-clock time, ignoring any tzinfo
+
+    Composed from the date ordinal and time fields, which is an order of
+    magnitude faster than converting datetime objects one by one.
+    """
+    count = len(moments)
+
+    def field(name):
+        return np.fromiter(map(attrgetter(name), moments), dtype=np.int64, count=count)
+
+    days = np.fromiter(map(datetime.toordinal, moments), dtype=np.int64, count=count) - _EPOCH_ORDINAL
+    seconds = days * 86400 + field('hour') * 3600 + field('minute') * 60 + field('second')
+    micros = seconds * 1000000 + field('microsecond')
+    micros[~valid] = NAT.astype(np.int64)
+    return micros.view('datetime64[us]')
+
+
+def to_datetime64(moment: datetime) -> np.datetime64:
+    """Naive datetime as a datetime64[us] comparable with timestamp columns"""
+    return np.datetime64(moment.replace(tzinfo=None), 'us')
+
+
+def resolve_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """
+    Timezone for an IANA name such as 'Europe/Berlin' (None for no name)
+
+    Raises:
+        ValueError: If the name is not a known timezone
+    """
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(f'Unknown timezone: {name}')
+
+
+def _utc_offset(zone: tzinfo, seconds: int) -> int:
+    """UTC offset of zone, in seconds, at an instant (seconds since the epoch)"""
+    return int(datetime.fromtimestamp(int(seconds), zone).utcoffset().total_seconds())
+
+
+def _offset_changes(zone: tzinfo, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    When zone's UTC offset changes between two instants (seconds since the epoch)
+
+    The offset is sampled weekly and each change is located to the second
+    by bisection, so the cost depends on the time span (about 52 lookups
+    a year), not on how many timestamps are converted.
+
+    Returns:
+        tuple: (sorted change instants; offsets, one more than instants: the
+        offset before the first change, then after each change)
+    """
+    step = 7 * 86400
+    samples = list(range(int(start) - step, int(end) + 2 * step, step))
+    sampled = [_utc_offset(zone, instant) for instant in samples]
+    changes, offsets = [], [sampled[0]]
+    for previous, instant, before, after in zip(samples, samples[1:], sampled, sampled[1:]):
+        if after == before:
+            continue
+        low, high = previous, instant
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _utc_offset(zone, middle) == before:
+                low = middle
+            else:
+                high = middle
+        changes.append(high)
+        offsets.append(after)
+    return np.array(changes, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def local_wall_clock(timestamps: np.ndarray, aware: np.ndarray, offsets: np.ndarray,
+                     zone: Optional[tzinfo]) -> np.ndarray:
+    """
+    Wall-clock times in zone
+
+    Offset-aware timestamps are converted through UTC (following the
+    zone's daylight saving changes); naive ones are taken as already
+    local. Without a zone, every timestamp keeps the time as written.
+
+    Only instants in the range habit marks are kept in (MAX_HISTORY_DAYS
+    before now to MAX_DAYS_AHEAD after it) are converted. Implausible ones
+    such as 0001-01-01T10:00:00Z keep the time as written: converting them
+    would overflow datetime, and the offset lookup would span centuries.
+
+    Args:
+        timestamps, aware, offsets: Columns from parse_timestamps(..., with_offsets=True)
+        zone: Target timezone (see resolve_timezone), or None
+    """
+    if zone is None or not aware.any():
+        return timestamps
+    now = int(time.time())
+    utc = timestamps.astype(np.int64) - offsets * 1000000
+    utc_seconds = utc // 1000000
+    convert = (aware & (utc_seconds > now - MAX_HISTORY_DAYS * 86400)
+               & (utc_seconds <= now + (MAX_DAYS_AHEAD + 1) * 86400))
+    if not convert.any():
+        return timestamps
+    utc, utc_seconds = utc[convert], utc_seconds[convert]
+    changes, zone_offsets = _offset_changes(zone, utc_seconds.min(), utc_seconds.max())
+    local = timestamps.copy()
+    local[convert] = (utc + zone_offsets[np.searchsorted(changes, utc_seconds, side='right')] * 1000000
+                      ).view('datetime64[us]')
+    return local
+
+
+def in_window(timestamps: np.ndarray, aware: np.ndarray, offsets: np.ndarray, zone: Optional[tzinfo],
+              start: datetime) -> np.ndarray:
+    """True for timestamps whose wall-clock time in zone is at or after start (NaT never matches)"""
+    return local_wall_clock(timestamps, aware, offsets, zone) >= to_datetime64(start)
+
+
+def weekdays(timestamps: np.ndarray) -> np.ndarray:
+    """Day of week (Monday = 0) of each timestamp; meaningless for NaT"""
+    days = timestamps.astype('datetime64[D]').astype(np.int64)
+    # 1970-01-01 was a Thursday
+    return (days + 3) % 7
+
+
+def hours_of_day(timestamps: np.ndarray) -> np.ndarray:
+    """Hour of day (0-23) of each timestamp; meaningless for NaT"""
+    return (timestamps.astype('datetime64[h]').astype(np.int64)) % 24
+
+
+def weekly_slots(timestamps: np.ndarray, aware: np.ndarray, offsets: np.ndarray,
+                 zone: Optional[tzinfo]) -> np.ndarray:
+    """Hour of the week (weekday * 24 + hour, Monday 0-1 AM = 0) in zone; meaningless for NaT"""
+    local = local_wall_clock(timestamps, aware, offsets, zone)
+    return weekdays(local) * 24 + hours_of_day(local)
+
+
+def categorize(values: List[Any]) -> Tuple[List[Any], np.ndarray]:
+    """
+    Encode values as category codes
+
+    Returns:
+        tuple: (categories in order of first appearance, int code per value)
+    """
+    categories = list(dict.fromkeys(values))
+    index = {category: code for code, category in enumerate(categories)}
+    return categories, np.fromiter((index[value] for value in values), dtype=np.int64, count=len(values))
+
+
+def build_mood_frame(mood_history: List[Dict]) -> Frame:
+    """Columns: emotion codes (+ categories), score, timestamp (from 'date'), aware, utc_offset"""
+    categories, codes = categorize([entry.get('emotion', 'neutral') for entry in mood_history])
+    timestamps, aware, offsets, _ = parse_timestamps((entry.get('date') for entry in mood_history),
+                                                     with_offsets=True)
+    scores = np.array([entry.get('score', 5) for entry in mood_history], dtype=np.float64)
+    frame = Frame(len(mood_history), emotion=codes, score=scores, timestamp=timestamps, aware=aware,
+                  utc_offset=offsets)
+    frame.emotion_categories = categories
+    return frame
+
+
+def build_task_frame(task_history: List[Dict]) -> Frame:
+    """
+    Columns: completed, title (lowercase), timestamp (from 'created_at'),
+    aware, utc_offset (seconds) and timed (False for date-only strings)
+    """
+    timestamps, aware, offsets, timed = parse_timestamps((task.get('created_at') for task in task_history),
+                                                         with_offsets=True)
+    completed = np.fromiter((bool(task.get('completed', False)) for task in task_history),
+                            dtype=bool, count=len(task_history))
+    titles = np.array([task.get('title', '').lower() for task in task_history], dtype=object)
+    return Frame(len(task_history), completed=completed, title=titles, timestamp=timestamps, aware=aware,
+                 utc_offset=offsets, timed=timed)
+
+
+def build_journal_frame(journal_entries: List[Dict]) -> Frame:
+    """Columns: has_created_at, timestamp (from 'created_at'), aware, utc_offset"""
+    created = [entry.get('created_at') for entry in journal_entries]
+    timestamps, aware, offsets, _ = parse_timestamps(created, with_offsets=True)
+    has_created_at = np.fromiter((bool(value) for value in created), dtype=bool, count=len(created))
+    return Frame(len(journal_entries), has_created_at=has_created_at, timestamp=timestamps, aware=aware,
+                 utc_offset=offsets)
+
+
+def build_habit_frame(habit_data: List[Dict]) -> Frame:
+    """
+    One row per habit (name, created_at), plus the marked days of every
+    habit flattened into day_habit (owning habit's row), day_timestamp and
+    day_aware
+    """
+    names = [habit.get('name', 'Unknown') for habit in habit_data]
+    marked = [habit.get('marked_days', []) or [] for habit in habit_data]
+    lengths = np.fromiter((len(days) for days in marked), dtype=np.int64, count=len(marked))
+    timestamps, aware = parse_timestamps(day for days in marked for day in days)
+    created, _ = parse_timestamps(habit.get('created_at') for habit in habit_data)
+    return Frame(len(habit_data), name=np.array(names, dtype=object), created_at=created,
+                 day_habit=np.repeat(np.arange(len(habit_data)), lengths),
+                 day_timestamp=timestamps, day_aware=aware)
+
+
+class InsightFrames:
+    """
+    Analysis context of one request: its frames and every intermediate
+    metric, each computed once on first use, plus the request's 'now'
+
+    Analyses ask for intermediates through memoized(name, compute). Each
+    request is recorded against the section (see section()) or metric that
+    made it, so profile() can report the real dependency graph and where
+    the time went.
+
+    Args:
+        journal_entries, mood_history, task_history, habit_data: Raw payload lists
+        text_analyzer: TextAnalyzer used to tokenize journal content once
+        now: Reference time for the time windows (default: datetime.now())
+        timezone: The user's timezone for time-of-day analyses (None: times as written)
+    """
+
+    def __init__(self, journal_entries: Optional[List[Dict]] = None, mood_history: Optional[List[Dict]] = None,
+                 task_history: Optional[List[Dict]] = None, habit_data: Optional[List[Dict]] = None,
+                 text_analyzer=None, now: Optional[datetime] = None, timezone: Optional[tzinfo] = None):
+        self.journal_entries = journal_entries or []
+        self.mood_history = mood_history or []
+        self.task_history = task_history or []
+        self.habit_data = habit_data or []
+        self.text_analyzer = text_analyzer
+        self.now = now or datetime.now()
+        self.timezone = timezone
+        self._values = {}
+        # name -> {'ms': time to compute (including what it used), 'uses': set of metric names}
+        self._metrics = {}
+        self._sections = {}
+        self._active = []
+
+    def _record_use(self, name: str):
+        if self._active:
+            self._active[-1]['uses'].add(name)
+
+    def memoized(self, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        Value of the intermediate `name`, computed with compute() only once
+
+        Args:
+            name: Metric name, unique within the request
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            The (cached) value
+        """
+        self._record_use(name)
+        if name in self._values:
+            return self._values[name]
+        record = {'ms': 0.0, 'uses': set()}
+        self._metrics[name] = record
+        self._active.append(record)
+        started = time.perf_counter()
+        try:
+            value = compute()
+        finally:
+            record['ms'] = (time.perf_counter() - started) * 1000
+            self._active.pop()
+        self._values[name] = value
+        return value
+
+    @contextmanager
+    def section(self, name: str):
+        """Time an output section and record the intermediates it uses"""
+        record = self._sections.setdefault(name, {'ms': 0.0, 'uses': set()})
+        self._active.append(record)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['ms'] += (time.perf_counter() - started) * 1000
+            self._active.pop()
+
+    def profile(self) -> Dict[str, Any]:
+        """
+        Sections and intermediates of this request
+
+        A section's or metric's 'ms' includes computing the intermediates it
+        was first to use; 'uses' lists every intermediate it read, cached or
+        not, which is the request's dependency graph.
+        """
+        def report(records):
+            return {name: {'ms': round(record['ms'], 3), 'uses': sorted(record['uses'])}
+                    for name, record in records.items()}
+        return {'sections': report(self._sections), 'metrics': report(self._metrics)}
+
+    @property
+    def journal(self) -> Frame:
+        return self.memoized('journal', lambda: build_journal_frame(self.journal_entries))
+
+    @property
+    def mood(self) -> Frame:
+        return self.memoized('mood', lambda: build_mood_frame(self.mood_history))
+
+    @property
+    def tasks(self) -> Frame:
+        return self.memoized('tasks', lambda: build_task_frame(self.task_history))
+
+    @property
+    def habits(self) -> Frame:
+        return self.memoized('habits', lambda: build_habit_frame(self.habit_data))
+
+    @property
+    def journal_tokens(self):
+        """TokenizedEntries for the journal content (one keyword scan per entry)"""
+        return self.memoized('journal_tokens', lambda: self.text_analyzer.tokenize_entries(self.journal_entries))
@@ -0,0 +1,911 @@
+"""
+Insight State Store
+
+Persistent per-user aggregates for PersonalizedInsights, kept in SQLite.
+
+Without it the backend posts a user's whole history on every insights
+call and the service recomputes everything, so the cost grows with the
+age of the account. Instead, the backend can send only new, changed or
+deleted records (POST /api/insight-state/ingest). The store keeps per user:
+- running counts and sums: mood scores, tasks completed, journal entries
+- day-of-week mood buckets, emotion and task category distributions
+- keyword hits per TextAnalyzer group (journal themes and emotions)
+- entries mentioning each journal theme and their hits, the days and
+  months that mention it, for the theme timeline: its first and last day
+  are index lookups and its monthly counts one row per month
+- tasks and completions per hour of the week in the user's timezone, for
+  the best productivity times
+- mood sums and task completions per day, for the mood-productivity
+  correlation, which reads the CORRELATION_LOOKBACK_DAYS days up to the
+  latest one (an index range, like the mood trends of mood_patterns()).
+  Each process keeps the latest correlation and theme timeline per user
+  until the next ingest for that user
+- one row per record with its timestamp and what it contributed, so a
+  changed or deleted record is subtracted exactly
+- the marked days of every habit as a packed day bitmap (habit_bitmaps.py),
+  a few hundred bytes for years of history
+- a daily rollup (daily_rollup.py): mood, emotion, task, habit and journal
+  counts per day, in memory-mappable column files next to the database.
+  Each ingest rebuilds the rows from the first day it touched onward, from
+  the stored records. It answers mood patterns, productivity and weekly
+  summaries for any period (mood_patterns(), productivity() and
+  weekly_summary() with start/end days)
+
+Answers are built from the aggregates plus indexed lookups of recent
+records (the last 7 mood entries, the last 7 / 30 days). The time needed
+depends on how much happened recently, not on the length of the history.
+
+Records are identified by their 'id'. Ingesting a record with a known id
+replaces it. "Last 7 mood entries" means the 7 latest by date, not the last
+7 of a posted list. Timestamps are parsed like the request path
+(insight_frames.parse_timestamps). As there, the 7-day windows and the
+daily rollup use times in the user's timezone: offset-aware timestamps are
+converted to it, and kept as written without one. Habit marks count by
+their date.
+
+The user's timezone is sent with any delta ('timezone', an IANA name) and
+kept. When it changes, the stored tasks are re-bucketed into the new
+local hours and the daily rollup is rebuilt.
+
+The database lives at INSIGHT_STATE_PATH (default data/insight_state.db). It
+is opened lazily in each process and used in WAL mode, so gunicorn workers
+can share one file. The rollups live in ROLLUP_PATH (default: the database
+path with a _rollups suffix); a private ':memory:' store keeps none unless
+one is given.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from daily_rollup import DailyRollup, RollupStore
+from habit_bitmaps import NO_START, HabitBitmaps, epoch_day, epoch_days, plausible_days
+from insight_frames import NAT, local_wall_clock, parse_timestamps, resolve_timezone, weekdays, weekly_slots
+from journal_themes import UNDATED, ThemeTimeline, theme_columns
+from mood_correlation import RESOLUTIONS, correlate, window_start
+from mood_trends import EWMA_HALFLIFE_DAYS, WINDOWS, lookback_days
+
+# Payload list name -> table holding its records
+RECORD_TABLES = {
+    'journal_entries': 'journal_records',
+    'mood_history': 'mood_records',
+    'task_history': 'task_records',
+    'habit_data': 'habit_records'
+}
+
+# Users whose latest correlation and theme timeline each process keeps
+CORRELATION_CACHE_USERS = 1024
+
+# Mood scores are summed as integers in millionths, so running sums stay
+# exact however many times records are added, changed and removed
+SCORE_SCALE = 1000000
+
+# A record's date in the user's timezone is at most this many days from
+# the date it was written with (a UTC offset of up to 24 hours, converted
+# to a zone between UTC-12 and UTC+14)
+MAX_DAY_SHIFT = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aggregates (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, name, key)
+);
+CREATE TABLE IF NOT EXISTS bins (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (user_id, name, bin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mood_records (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    ts INTEGER,
+    aware INTEGER NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    score REAL NOT NULL,
+    emotion TEXT NOT NULL,
+    UNIQUE (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS mood_records_by_time ON mood_records (user_id, ts);
+CREATE TABLE IF NOT EXISTS task_records (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    ts INTEGER,
+    aware INTEGER NOT NULL,
+    completed INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    slot INTEGER,
+    UNIQUE (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS task_records_by_time ON task_records (user_id, ts);
+CREATE TABLE IF NOT EXISTS journal_records (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    ts INTEGER,
+    aware INTEGER NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    dated INTEGER NOT NULL,
+    group_counts TEXT NOT NULL,
+    UNIQUE (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS journal_records_by_time ON journal_records (user_id, ts);
+CREATE TABLE IF NOT EXISTS habit_records (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created INTEGER,
+    origin INTEGER NOT NULL,
+    days BLOB NOT NULL,
+    UNIQUE (user_id, id)
+);
+"""
+
+
+class InvalidDelta(ValueError):
+    """A delta payload that cannot be applied (e.g. a record without an id)"""
+
+
+def _micros(moment: datetime) -> int:
+    """Naive datetime as microseconds since the epoch, like the ts columns"""
+    return int(np.datetime64(moment.replace(tzinfo=None), 'us').astype(np.int64))
+
+
+def _timestamp_columns(values: Iterable[Any]):
+    """(ts or None, aware, utc_offset) per value, parsed like the request path"""
+    timestamps, aware, offsets, _ = parse_timestamps(values, with_offsets=True)
+    valid = ~np.isnat(timestamps)
+    micros = timestamps.astype(np.int64).tolist()
+    return [(ts if ok else None, int(flag), offset)
+            for ts, ok, flag, offset in zip(micros, valid.tolist(), aware.tolist(), offsets.tolist())]
+
+
+def _local_times(rows, zone) -> np.ndarray:
+    """
+    Wall-clock times in zone, as datetime64[us], of (ts, aware, utc_offset,
+    ...) record rows; NaT where ts is None
+    """
+    columns = np.array([(NAT.astype(np.int64) if ts is None else ts, aware, offset) for ts, aware, offset, *_ in rows],
+                       dtype=np.int64).reshape(-1, 3)
+    return local_wall_clock(columns[:, 0].view('datetime64[us]'), columns[:, 1].astype(bool), columns[:, 2], zone)
+
+
+def _mood_score(entry: Dict) -> float:
+    """A mood record's score (5 when it has none); InvalidDelta unless it is a finite number"""
+    score = entry.get('score', 5)
+    try:
+        value = float(score)
+    except (TypeError, ValueError):
+        value = math.nan
+    if isinstance(score, bool) or not math.isfinite(value):
+        raise InvalidDelta(f"mood_history record {entry['id']}: score must be a number, got {score!r}")
+    return value
+
+
+class InsightStateStore:
+    """
+    SQLite-backed per-user insight aggregates with delta ingestion
+    """
+
+    def __init__(self, generator, path: Optional[str] = None, rollup_path: Optional[str] = None):
+        """
+        Args:
+            generator: PersonalizedInsights providing keyword groups, task
+                categories and the shared result builders
+            path: SQLite file (default: INSIGHT_STATE_PATH env var or
+                data/insight_state.db; ':memory:' for a private store)
+            rollup_path: Directory of the daily rollups (default: ROLLUP_PATH
+                env var or the database path with a _rollups suffix)
+        """
+        self.generator = generator
+        self.path = path or os.getenv('INSIGHT_STATE_PATH', 'data/insight_state.db')
+        rollup_path = rollup_path or os.getenv('ROLLUP_PATH') or (
+            None if self.path == ':memory:' else os.path.splitext(self.path)[0] + '_rollups')
+        self.rollups = RollupStore(rollup_path) if rollup_path else None
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # user_id -> (state version, mood-productivity correlation)
+        self._correlations = OrderedDict()
+        # user_id -> (state version, journal theme timeline)
+        self._timelines = OrderedDict()
+        # Epoch days whose records the current ingest changed (UNDATED for undated records)
+        self._changed_days: Set[int] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use in this process (after any fork)"""
+        if self._connection is None or self._pid != os.getpid():
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ':memory:':
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    # ========================================
+    # DELTA INGESTION
+    # ========================================
+
+    def ingest(self, user_id, delta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply new, changed and deleted records for one user atomically
+
+        Args:
+            user_id: User the records belong to
+            delta: Payload with any of journal_entries, mood_history,
+                task_history and habit_data (records with an 'id'; a known
+                id replaces the stored record), 'deleted' mapping those
+                names to lists of ids (applied after the upserts),
+                'replace': true to drop the user's state first (full resync),
+                and 'timezone': the user's IANA timezone (kept until changed)
+
+        Returns:
+            dict: Number of records upserted and deleted per list
+
+        Raises:
+            InvalidDelta: If the payload is malformed; nothing is applied
+        """
+        user_id = str(user_id)
+        deleted = delta.get('deleted') or {}
+        if not isinstance(deleted, dict) or not all(isinstance(ids, list) for ids in deleted.values()):
+            raise InvalidDelta("'deleted' must map record lists to lists of ids")
+        for name in list(RECORD_TABLES) + list(deleted):
+            if name not in RECORD_TABLES:
+                raise InvalidDelta(f'Unknown record list: {name}')
+            records = delta.get(name) or []
+            if not isinstance(records, list) or not all(isinstance(r, dict) and r.get('id') is not None
+                                                        for r in records):
+                raise InvalidDelta(f'{name} must be a list of records with an id')
+        mood_scores = [_mood_score(entry) for entry in delta.get('mood_history') or []]
+
+        timezone = delta.get('timezone')
+        try:
+            resolve_timezone(timezone)
+        except ValueError as e:
+            raise InvalidDelta(str(e))
+
+        # Tokenize journal text before taking the lock
+        journal_entries = delta.get('journal_entries') or []
+        group_counts = self.generator.text_analyzer.tokenize_entries(journal_entries).group_counts
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            self._changed_days = set()
+            try:
+                previous_version = self._total(connection, user_id, 'version')[1] or None
+                if delta.get('replace'):
+                    self._delete_user(connection, user_id)
+                # A new timezone moves records to other local days
+                rebuild = bool(delta.get('replace'))
+                if timezone and timezone != self._timezone_name(connection, user_id):
+                    self._set_timezone(connection, user_id, timezone)
+                    rebuild = True
+                self._upsert_moods(connection, user_id, delta.get('mood_history') or [], mood_scores)
+                self._upsert_tasks(connection, user_id, delta.get('task_history') or [])
+                self._upsert_journals(connection, user_id, journal_entries, group_counts)
+                self._upsert_habits(connection, user_id, delta.get('habit_data') or [])
+                result = {'upserted': {name: len(delta.get(name) or []) for name in RECORD_TABLES}, 'deleted': {}}
+                # Deletions come last, so they win over an upsert of the same id
+                for name, ids in deleted.items():
+                    result['deleted'][name] = sum(self._delete_record(connection, user_id, name, str(record_id))
+                                                  for record_id in ids)
+                # New version: results derived from the old state are stale in every process
+                version = time.time_ns()
+                connection.execute("INSERT OR REPLACE INTO aggregates (user_id, name, key, count, total) "
+                                   "VALUES (?, 'version', '', 0, ?)", (user_id, version))
+                if self.rollups is not None:
+                    self._update_rollup(connection, user_id, version, previous_version, rebuild)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return result
+
+    def delete_user(self, user_id):
+        """Drop all stored state of a user"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._delete_user(connection, str(user_id))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            if self.rollups is not None:
+                self.rollups.delete(user_id)
+
+    def _delete_user(self, connection, user_id: str):
+        for table in ['aggregates', 'bins'] + list(RECORD_TABLES.values()):
+            connection.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+
+    def _add(self, connection, user_id: str, name: str, key: str, count: int, total: int = 0):
+        """Add to one running aggregate (rows keep their first-seen order)"""
+        connection.execute(
+            'INSERT INTO aggregates (user_id, name, key, count, total) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (user_id, name, key) DO UPDATE SET count = count + excluded.count, '
+            'total = total + excluded.total',
+            (user_id, name, key, count, total))
+
+    def _add_bin(self, connection, user_id: str, name: str, bin: int, count: int, total: int = 0):
+        """Add to one per-bin aggregate (bins whose count drops to 0 are removed)"""
+        connection.execute(
+            'INSERT INTO bins (user_id, name, bin, count, total) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (user_id, name, bin) DO UPDATE SET count = count + excluded.count, '
+            'total = total + excluded.total',
+            (user_id, name, bin, count, total))
+        if count < 0:
+            connection.execute('DELETE FROM bins WHERE user_id = ? AND name = ? AND bin = ? AND count = 0',
+                               (user_id, name, bin))
+
+    def _changed(self, ts: Optional[int]):
+        """Note the day of a record the current ingest adds or removes"""
+        self._changed_days.add(UNDATED if ts is None else ts // RESOLUTIONS['day'])
+
+    def _time_bin(self, ts: int) -> int:
+        """Correlation bin (e.g. day since the epoch) of a ts value"""
+        return ts // RESOLUTIONS[self.generator.CORRELATION_RESOLUTION]
+
+    def _mood_contribution(self, connection, user_id: str, row, sign: int):
+        ts, aware, score, emotion = row
+        self._changed(ts)
+        score = round(score * SCORE_SCALE)
+        self._add(connection, user_id, 'mood', '', sign, sign * score)
+        self._add(connection, user_id, 'mood_emotion', emotion, sign)
+        if ts is not None:
+            weekday = int(weekdays(np.array([ts], dtype='datetime64[us]'))[0])
+            self._add(connection, user_id, 'mood_weekday', str(weekday), sign, sign * score)
+            self._add_bin(connection, user_id, 'mood_bin', self._time_bin(ts), sign, sign * score)
+
+    def _task_contribution(self, connection, user_id: str, row, sign: int):
+        ts, completed, category, slot = row
+        self._changed(ts)
+        self._add(connection, user_id, 'task', '', sign, sign * completed)
+        self._add(connection, user_id, 'task_category', category, sign, sign * completed)
+        if ts is not None:
+            self._add_bin(connection, user_id, 'task_bin', self._time_bin(ts), sign, sign * completed)
+        if slot is not None:
+            self._add(connection, user_id, 'task_slot', str(slot), sign, sign * completed)
+
+    def _timezone_name(self, connection, user_id: str) -> Optional[str]:
+        row = connection.execute("SELECT key FROM aggregates WHERE user_id = ? AND name = 'timezone'",
+                                 (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def _set_timezone(self, connection, user_id: str, timezone: str):
+        """Store the user's timezone and re-bucket the stored tasks into its local hours"""
+        connection.execute("DELETE FROM aggregates WHERE user_id = ? AND name IN ('timezone', 'task_slot')",
+                           (user_id,))
+        connection.execute("INSERT INTO aggregates (user_id, name, key) VALUES (?, 'timezone', ?)",
+                           (user_id, timezone))
+        rows = connection.execute('SELECT id, ts, aware, utc_offset, completed FROM task_records '
+                                  'WHERE user_id = ? AND slot IS NOT NULL', (user_id,)).fetchall()
+        if not rows:
+            return
+        ids = [row[0] for row in rows]
+        columns = np.array([row[1:] for row in rows], dtype=np.int64)
+        slots = weekly_slots(columns[:, 0].view('datetime64[us]'), columns[:, 1].astype(bool), columns[:, 2],
+                             resolve_timezone(timezone))
+        connection.executemany('UPDATE task_records SET slot = ? WHERE user_id = ? AND id = ?',
+                               zip(slots.tolist(), [user_id] * len(ids), ids))
+        totals = np.bincount(slots, minlength=7 * 24)
+        completed = np.bincount(slots, weights=columns[:, 3], minlength=7 * 24).astype(np.int64)
+        for slot in np.flatnonzero(totals).tolist():
+            self._add(connection, user_id, 'task_slot', str(slot), int(totals[slot]), int(completed[slot]))
+
+    def _journal_contribution(self, connection, user_id: str, row, sign: int):
+        ts, dated, group_counts = row
+        self._changed(ts)
+        self._add(connection, user_id, 'journal', '', sign, sign * dated)
+        group_counts = json.loads(group_counts)
+        for group, hits in zip(self.generator.text_analyzer.groups, group_counts):
+            if hits:
+                self._add(connection, user_id, 'journal_group', group, 0, sign * hits)
+        # Entries mentioning each theme and their hits, and the days and
+        # months with such entries
+        day = None if ts is None else ts // RESOLUTIONS['day']
+        month = None if day is None else int(np.datetime64(day, 'D').astype('datetime64[M]').astype(np.int64))
+        for theme, column in zip(self.generator.theme_keywords,
+                                 theme_columns(self.generator.text_analyzer, self.generator.theme_keywords)):
+            if group_counts[column]:
+                self._add(connection, user_id, 'journal_theme', theme, sign, sign * group_counts[column])
+                if day is not None:
+                    self._add_bin(connection, user_id, f'theme_day:{theme}', day, sign)
+                    self._add_bin(connection, user_id, f'theme_month:{theme}', month, sign)
+
+    def _delete_record(self, connection, user_id: str, name: str, record_id: str) -> int:
+        """Remove one record and subtract its contribution; 1 if it existed"""
+        table = RECORD_TABLES[name]
+        columns = {
+            'mood_records': 'ts, aware, score, emotion',
+            'task_records': 'ts, completed, category, slot',
+            'journal_records': 'ts, dated, group_counts',
+            'habit_records': 'origin, days'
+        }[table]
+        row = connection.execute(f'SELECT {columns} FROM {table} WHERE user_id = ? AND id = ?',
+                                 (user_id, record_id)).fetchone()
+        if row is None:
+            return 0
+        if table == 'mood_records':
+            self._mood_contribution(connection, user_id, row, -1)
+        elif table == 'task_records':
+            self._task_contribution(connection, user_id, row, -1)
+        elif table == 'journal_records':
+            self._journal_contribution(connection, user_id, row, -1)
+        else:
+            self._changed_days.update(HabitBitmaps.row_days(*row).tolist())
+        connection.execute(f'DELETE FROM {table} WHERE user_id = ? AND id = ?', (user_id, record_id))
+        return 1
+
+    def _upsert_moods(self, connection, user_id: str, moods: List[Dict], scores: List[float]):
+        times = _timestamp_columns(entry.get('date') for entry in moods)
+        for entry, (ts, aware, offset), score in zip(moods, times, scores):
+            record_id = str(entry['id'])
+            self._delete_record(connection, user_id, 'mood_history', record_id)
+            row = (ts, aware, score, str(entry.get('emotion', 'neutral')))
+            connection.execute('INSERT INTO mood_records (user_id, id, ts, aware, utc_offset, score, emotion) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?)', (user_id, record_id, ts, aware, offset) + row[2:])
+            self._mood_contribution(connection, user_id, row, 1)
+
+    def _upsert_tasks(self, connection, user_id: str, tasks: List[Dict]):
+        timestamps, aware, offsets, timed = parse_timestamps((task.get('created_at') for task in tasks),
+                                                             with_offsets=True)
+        # Hour of the week in the user's timezone; None without a time of day
+        slots = weekly_slots(timestamps, aware, offsets, resolve_timezone(self._timezone_name(connection, user_id)))
+        slots = [slot if ok else None for slot, ok in zip(slots.tolist(), timed.tolist())]
+        times = _timestamp_columns(task.get('created_at') for task in tasks)
+        for task, (ts, aware, offset), slot in zip(tasks, times, slots):
+            record_id = str(task['id'])
+            self._delete_record(connection, user_id, 'task_history', record_id)
+            category = self.generator.TASK_CATEGORIES[self.generator._task_category(task.get('title', '').lower())]
+            row = (ts, int(bool(task.get('completed', False))), category, slot)
+            connection.execute('INSERT INTO task_records (user_id, id, ts, aware, completed, category, utc_offset, '
+                               'slot) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (user_id, record_id, ts, aware, row[1], category, offset, slot))
+            self._task_contribution(connection, user_id, row, 1)
+
+    def _upsert_journals(self, connection, user_id: str, entries: List[Dict], group_counts: np.ndarray):
+        times = _timestamp_columns(entry.get('created_at') for entry in entries)
+        for entry, (ts, aware, offset), counts in zip(entries, times, group_counts.tolist()):
+            record_id = str(entry['id'])
+            self._delete_record(connection, user_id, 'journal_entries', record_id)
+            row = (int(bool(entry.get('created_at'))), json.dumps(counts))
+            connection.execute('INSERT INTO journal_records (user_id, id, ts, aware, utc_offset, dated, group_counts) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?)', (user_id, record_id, ts, aware, offset) + row)
+            self._journal_contribution(connection, user_id, (ts,) + row, 1)
+
+    def _upsert_habits(self, connection, user_id: str, habits: List[Dict]):
+        created, _ = parse_timestamps(habit.get('created_at') for habit in habits)
+        created_days = [None if missing else day
+                        for day, missing in zip(epoch_days(created).tolist(), np.isnat(created).tolist())]
+        today = epoch_day(datetime.now())
+        for habit, created_day in zip(habits, created_days):
+            record_id = str(habit['id'])
+            marked, _ = parse_timestamps(habit.get('marked_days', []) or [])
+            marked = epoch_days(marked[~np.isnat(marked)])
+            origin, days = HabitBitmaps.to_row(marked[plausible_days(marked, today)])
+            row = (str(habit.get('name', 'Unknown')), created_day, origin, days)
+            # Days marked or unmarked since the stored version of the habit
+            stored = connection.execute('SELECT origin, days FROM habit_records WHERE user_id = ? AND id = ?',
+                                        (user_id, record_id)).fetchone()
+            self._changed_days.update(np.setxor1d(HabitBitmaps.row_days(origin, days),
+                                                  HabitBitmaps.row_days(*stored) if stored else []).tolist())
+            # Updated habits keep their place in the reporting order
+            connection.execute('INSERT INTO habit_records (user_id, id, name, created, origin, days) '
+                               'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, id) DO UPDATE SET '
+                               'name = excluded.name, created = excluded.created, origin = excluded.origin, '
+                               'days = excluded.days', (user_id, record_id) + row)
+
+    # ========================================
+    # DAILY ROLLUP
+    # ========================================
+
+    def _rollup_rows(self, connection, user_id: str, since: Optional[int] = None) -> DailyRollup:
+        """
+        Daily rollup of the stored records from epoch day `since` on (all of
+        them when None or UNDATED), each on its date in the user's timezone
+        """
+        full = since is None or since == UNDATED
+        # Records written up to MAX_DAY_SHIFT days before `since` may fall on it locally
+        where, params = ('', (user_id,)) if full else (' AND ts >= ?',
+                                                       (user_id, (since - MAX_DAY_SHIFT) * RESOLUTIONS['day']))
+        zone = resolve_timezone(self._timezone_name(connection, user_id))
+
+        def local_days(table, columns, order=''):
+            rows = connection.execute(f'SELECT ts, aware, utc_offset, {columns} FROM {table} '
+                                      f'WHERE user_id = ?{where}{order}', params).fetchall()
+            local = _local_times(rows, zone)
+            days = np.where(np.isnat(local), UNDATED, local.astype('datetime64[D]').astype(np.int64))
+            if not full:
+                rows = [row for row, kept in zip(rows, (days >= since).tolist()) if kept]
+                days = days[days >= since]
+            return days, [row[3:] for row in rows]
+
+        mood_days, moods = local_days('mood_records', 'score, emotion', ' ORDER BY rowid')
+        task_days, tasks = local_days('task_records', 'completed')
+        journal_days, _ = local_days('journal_records', 'dated')
+        marks = [HabitBitmaps.row_days(origin, packed) for origin, packed in connection.execute(
+            'SELECT origin, days FROM habit_records WHERE user_id = ?', (user_id,))]
+        habit_days, habit_counts = np.unique(np.concatenate(marks) if marks else np.zeros(0, dtype=np.int64),
+                                             return_counts=True)
+        if since is not None:
+            habit_counts[habit_days < since] = 0
+        return DailyRollup.build(mood_days, [row[0] for row in moods], [row[1] for row in moods],
+                                 task_days, [row[0] for row in tasks], journal_days, habit_days, habit_counts)
+
+    def _update_rollup(self, connection, user_id: str, version: int, previous_version: Optional[int], full: bool):
+        """
+        Bring the user's daily rollup to `version` within an ingest: rebuild
+        its rows from the first day the ingest changed, or every row after a
+        full resync or a timezone change, or when the stored rollup does not
+        reflect the previous state
+        """
+        if full or previous_version is None or self.rollups.version(user_id) != previous_version:
+            self.rollups.write(user_id, self._rollup_rows(connection, user_id), version)
+        elif self._changed_days:
+            # Changed days are the dates records were written with; their local dates may be earlier
+            since = min(self._changed_days)
+            if since != UNDATED:
+                since -= MAX_DAY_SHIFT
+            self.rollups.write(user_id, self._rollup_rows(connection, user_id, since), version, since=since)
+        else:
+            self.rollups.restamp(user_id, version)
+
+    def rollup(self, user_id, start: Optional[int] = None, end: Optional[int] = None) -> DailyRollup:
+        """
+        Rows of a user's daily rollup, rebuilt from the stored records first
+        if it does not reflect the current state
+
+        Args:
+            user_id: User to read
+            start, end: Epoch days (inclusive; None for no bound, both None
+                for every row including the undated one)
+
+        Raises:
+            ValueError: If this store keeps no rollups
+        """
+        if self.rollups is None:
+            raise ValueError('Daily rollups are disabled for this insight state store')
+        with self._lock:
+            connection, user_id = self._connect(), str(user_id)
+            version = self._total(connection, user_id, 'version')[1] or None
+            if version is None:
+                return DailyRollup.empty()
+            rollup = self.rollups.load(user_id, version, start, end)
+            if rollup is None:
+                connection.execute('BEGIN IMMEDIATE')
+                try:
+                    version = self._total(connection, user_id, 'version')[1] or None
+                    self.rollups.write(user_id, self._rollup_rows(connection, user_id), version)
+                    connection.execute('COMMIT')
+                except BaseException:
+                    connection.execute('ROLLBACK')
+                    raise
+                rollup = self.rollups.load(user_id, version, start, end)
+            return rollup
+
+    # ========================================
+    # ANSWERS FROM STORED STATE
+    # ========================================
+
+    def has_user(self, user_id) -> bool:
+        """True if any state is stored for the user"""
+        with self._lock:
+            connection = self._connect()
+            user_id = str(user_id)
+            return any(
+                connection.execute(f'SELECT 1 FROM {table} WHERE user_id = ? LIMIT 1', (user_id,)).fetchone()
+                for table in RECORD_TABLES.values()
+            )
+
+    def _aggregates(self, connection, user_id: str, name: str):
+        """(key, count, total) rows of one aggregate in first-seen order"""
+        return connection.execute('SELECT key, count, total FROM aggregates WHERE user_id = ? AND name = ? '
+                                  'ORDER BY rowid', (user_id, name)).fetchall()
+
+    def _total(self, connection, user_id: str, name: str):
+        row = connection.execute('SELECT count, total FROM aggregates WHERE user_id = ? AND name = ? AND key = ?',
+                                 (user_id, name, '')).fetchone()
+        return row or (0, 0.0)
+
+    def _binned(self, connection, user_id: str, name: str) -> np.ndarray:
+        """(bin, count, total) rows of a per-bin aggregate as an int64 array"""
+        rows = connection.execute('SELECT CAST(key AS INTEGER), count, total FROM aggregates '
+                                  'WHERE user_id = ? AND name = ? AND count != 0', (user_id, name)).fetchall()
+        return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+    def _bins(self, connection, user_id: str, name: str, start: Optional[int] = None) -> np.ndarray:
+        """(bin, count, total) rows of a per-bin aggregate from bin `start` on, as an int64 array"""
+        rows = connection.execute('SELECT bin, count, total FROM bins WHERE user_id = ? AND name = ? AND bin >= ?',
+                                  (user_id, name, np.iinfo(np.int64).min if start is None else start)).fetchall()
+        return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+    def _bin_range(self, connection, user_id: str, name: str):
+        """First and last bin of a per-bin aggregate (None, None without any)"""
+        return connection.execute(
+            'SELECT (SELECT MIN(bin) FROM bins WHERE user_id = ? AND name = ?), '
+            '(SELECT MAX(bin) FROM bins WHERE user_id = ? AND name = ?)', (user_id, name) * 2).fetchone()
+
+    def _reused(self, cache: OrderedDict, connection, user_id: str, compute):
+        """
+        Result of compute() for the user, kept in cache and reused until the
+        user's state changes
+
+        Args:
+            cache: user_id -> (state version, result), least recently used first
+            connection: Open connection (the caller holds the lock)
+            user_id: User the result belongs to
+            compute: Builds the result from the stored state
+        """
+        version = self._total(connection, user_id, 'version')[1] or None
+        cached = cache.get(user_id)
+        if version is not None and cached is not None and cached[0] == version:
+            cache.move_to_end(user_id)
+            return cached[1]
+
+        result = compute()
+        cache[user_id] = (version, result)
+        cache.move_to_end(user_id)
+        while len(cache) > CORRELATION_CACHE_USERS:
+            cache.popitem(last=False)
+        return result
+
+    def _mood_productivity_correlation(self, connection, user_id: str) -> Dict[str, Any]:
+        """
+        Same analysis as PersonalizedInsights._calculate_mood_productivity_correlation,
+        reused until the user's state changes
+
+        Only the bins of the CORRELATION_LOOKBACK_DAYS days up to the latest
+        one are read, so the cost does not grow with the length of the history.
+        """
+        def analyze():
+            generator = self.generator
+            last = [bin for name in ('mood_bin', 'task_bin')
+                    for bin in self._bin_range(connection, user_id, name)[1:] if bin is not None]
+            start = window_start(max(last), generator.CORRELATION_LOOKBACK_DAYS,
+                                 generator.CORRELATION_RESOLUTION) if last else None
+            moods = self._bins(connection, user_id, 'mood_bin', start)
+            tasks = self._bins(connection, user_id, 'task_bin', start)
+            return correlate(moods[:, 0], moods[:, 2] / SCORE_SCALE, moods[:, 1],
+                             tasks[:, 0], tasks[:, 2], tasks[:, 1],
+                             lags=generator.CORRELATION_LAGS, resolution=generator.CORRELATION_RESOLUTION,
+                             lookback_days=generator.CORRELATION_LOOKBACK_DAYS)
+        return self._reused(self._correlations, connection, user_id, analyze)
+
+    def _productivity_windows(self, connection, user_id: str) -> Dict[str, Any]:
+        """Same result as PersonalizedInsights._analyze_best_productivity_times"""
+        slots = self._binned(connection, user_id, 'task_slot')
+        totals = np.bincount(slots[:, 0], weights=slots[:, 1], minlength=7 * 24).astype(np.int64).reshape(7, 24)
+        completed = np.bincount(slots[:, 0], weights=slots[:, 2], minlength=7 * 24).astype(np.int64).reshape(7, 24)
+        return self.generator._rank_productivity_windows(
+            totals, completed, resolve_timezone(self._timezone_name(connection, user_id)))
+
+    def _theme_timeline(self, connection, user_id: str, journal_count: int) -> ThemeTimeline:
+        """
+        Same timeline as PersonalizedInsights._analyze_journal_patterns, from
+        the per-theme totals, reused until the user's state changes
+
+        Each mentioned theme costs two index lookups (first and last day)
+        and one row per month with mentions, whatever the number of days.
+        """
+        def build():
+            timeline = ThemeTimeline(self.generator.theme_keywords)
+            timeline.total_entries = journal_count
+            for theme, entries, hits in self._aggregates(connection, user_id, 'journal_theme'):
+                if entries and theme in self.generator.theme_keywords:
+                    first, last = self._bin_range(connection, user_id, f'theme_day:{theme}')
+                    months = self._bins(connection, user_id, f'theme_month:{theme}')
+                    timeline.add_theme_totals(theme, entries, hits, first, last,
+                                              dict(zip(months[:, 0].tolist(), months[:, 1].tolist())))
+            return timeline
+        return self._reused(self._timelines, connection, user_id, build)
+
+    def _week_records(self, connection, table: str, user_id: str, week_ago: int, zone, columns: str = 'ts'):
+        """
+        `columns` of the records whose time in the user's timezone is at or
+        after week_ago (microseconds), like PersonalizedInsights._week_windows
+        """
+        rows = connection.execute(f'SELECT ts, aware, utc_offset, {columns} FROM {table} WHERE user_id = ? '
+                                  'AND ts >= ?', (user_id, week_ago - MAX_DAY_SHIFT * RESOLUTIONS['day'])).fetchall()
+        recent = _local_times(rows, zone).astype(np.int64) >= week_ago
+        return [row[3:] for row, kept in zip(rows, recent.tolist()) if kept]
+
+    def _recent_mood_scores(self, connection, user_id: str) -> List[float]:
+        """
+        Scores of the 7 latest mood entries by date, picked like
+        PersonalizedInsights._recent_moods (undated ones count as oldest,
+        higher scores as later at the same time)
+        """
+        rows = connection.execute('SELECT score FROM mood_records WHERE user_id = ? '
+                                  'ORDER BY ts DESC, score DESC LIMIT 7', (user_id,)).fetchall()
+        return [score for score, in rows]
+
+    def _mood_patterns(self, connection, user_id: str) -> Dict[str, Any]:
+        count, score_sum = self._total(connection, user_id, 'mood')
+        if not count:
+            return {'error': 'No mood data available'}
+
+        distribution = {emotion: n for emotion, n, _ in self._aggregates(connection, user_id, 'mood_emotion') if n}
+        if count >= 7:
+            recent = self._recent_mood_scores(connection, user_id)
+            recent_avg = sum(recent) / len(recent)
+            older_avg = (score_sum / SCORE_SCALE - sum(recent)) / (count - 7) if count > 7 else recent_avg
+            trend = self.generator._mood_trend(recent_avg, older_avg)
+        else:
+            trend = 'insufficient_data'
+        weekday_buckets = {int(day): (n, total) for day, n, total in self._aggregates(connection, user_id, 'mood_weekday')}
+        day_patterns = {
+            day_name: self.generator._mean_score(weekday_buckets[day][1] / SCORE_SCALE / weekday_buckets[day][0])
+            for day, day_name in enumerate(self.generator.DAY_NAMES)
+            if weekday_buckets.get(day, (0, 0))[0]
+        }
+
+        return {
+            'most_common_emotion': self.generator._most_common_emotion(distribution),
+            'average_mood_score': self.generator._mean_score(score_sum / SCORE_SCALE / count),
+            'mood_trend': trend,
+            'emotion_distribution': distribution,
+            'day_patterns': day_patterns,
+            'total_entries': count
+        }
+
+    def mood_patterns(self, user_id, trend_options: Optional[Dict[str, Any]] = None,
+                      start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Same result as PersonalizedInsights.analyze_mood_patterns, from stored
+        state; with start and/or end (epoch days, inclusive), that period's
+        patterns from the daily rollup
+        """
+        if start is not None or end is not None:
+            return self.generator.analyze_mood_patterns([], trend_options, rollup=self.rollup(user_id, start, end))
+        with self._lock:
+            connection, user_id = self._connect(), str(user_id)
+            result = self._mood_patterns(connection, user_id)
+            if 'error' not in result:
+                days, scores = self._lookback_moods(connection, user_id, trend_options or {})
+                result['trend_analytics'] = self.generator._mood_trend_analytics(
+                    days, scores, np.ones(len(scores)), **(trend_options or {}))
+            return result
+
+    def _lookback_moods(self, connection, user_id: str, trend_options: Dict[str, Any]):
+        """
+        (epoch day, score) arrays of the dated mood entries that mood_trends
+        reads: the lookback up to the latest entry, found through the time
+        index, so the cost does not grow with the length of the history
+        """
+        day = RESOLUTIONS['day']
+        last, = connection.execute('SELECT MAX(ts) FROM mood_records WHERE user_id = ?', (user_id,)).fetchone()
+        if last is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        lookback = lookback_days(trend_options.get('windows', WINDOWS),
+                                 trend_options.get('halflife', EWMA_HALFLIFE_DAYS))
+        rows = connection.execute('SELECT ts, score FROM mood_records WHERE user_id = ? AND ts >= ?',
+                                  (user_id, (last // day - lookback + 1) * day)).fetchall()
+        times = np.fromiter((ts for ts, _ in rows), dtype=np.int64, count=len(rows))
+        return times // day, np.fromiter((score for _, score in rows), dtype=np.float64, count=len(rows))
+
+    def _productivity(self, connection, user_id: str) -> Dict[str, Any]:
+        task_count, tasks_completed = self._total(connection, user_id, 'task')
+        if not task_count:
+            return {'error': 'No task data available'}
+        tasks_completed = int(tasks_completed)
+        mood_count, _ = self._total(connection, user_id, 'mood')
+        mood_productivity = self._mood_productivity_correlation(connection, user_id) if mood_count else None
+        productivity_windows = self._productivity_windows(connection, user_id)
+        generator = self.generator
+        return {
+            'completion_rate': round(tasks_completed / task_count * 100, 1),
+            'total_tasks': task_count,
+            'completed_tasks': tasks_completed,
+            'mood_productivity_correlation': generator._correlation_headline(mood_productivity),
+            'mood_productivity_analysis': mood_productivity,
+            'best_productivity_times': [window['label'] for window in productivity_windows['by_time_of_day'][:2]],
+            'productivity_windows': productivity_windows,
+            'task_insights': generator._summarize_task_types(
+                (category, n, int(done))
+                for category, n, done in self._aggregates(connection, user_id, 'task_category') if n)
+        }
+
+    def productivity(self, user_id, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Same result as PersonalizedInsights.analyze_productivity, from stored
+        state; with start and/or end (epoch days, inclusive), that period's
+        completion and mood correlation from the daily rollup
+        """
+        if start is not None or end is not None:
+            return self.generator.analyze_productivity([], [], [], rollup=self.rollup(user_id, start, end))
+        with self._lock:
+            return self._productivity(self._connect(), str(user_id))
+
+    def weekly_summary(self, user_id, end: Optional[int] = None) -> Dict[str, Any]:
+        """Summary of the 7 days ending on epoch day `end` (default: today), from the daily rollup"""
+        end = epoch_day(datetime.now()) if end is None else end
+        return self.generator._generate_weekly_summary(None, rollup=self.rollup(user_id, end - 6, end))
+
+    def insights(self, user_id, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Same sections as PersonalizedInsights.generate_insights, from stored state
+
+        Args:
+            user_id: User to report on
+            now: Reference time for the 7-day and habit windows (default: datetime.now())
+        """
+        now = now or datetime.now()
+        week_ago = _micros(now - timedelta(days=7))
+        generator = self.generator
+        user_id = str(user_id)
+
+        with self._lock:
+            connection = self._connect()
+            mood_count, _ = self._total(connection, user_id, 'mood')
+            task_count, tasks_completed = self._total(connection, user_id, 'task')
+            journal_count, journal_dated = self._total(connection, user_id, 'journal')
+            habits = connection.execute('SELECT name, created, origin, days FROM habit_records '
+                                        'WHERE user_id = ? ORDER BY rowid', (user_id,)).fetchall()
+
+            mood_patterns = self._mood_patterns(connection, user_id)
+            recent_scores = self._recent_mood_scores(connection, user_id) if mood_count else []
+
+            productivity = self._productivity(connection, user_id)
+            tasks_completed = int(tasks_completed)
+
+            if journal_count:
+                group_totals = {group: int(total) for group, _, total
+                                in self._aggregates(connection, user_id, 'journal_group')}
+                journal = generator._summarize_journal(journal_count, group_totals, int(journal_dated),
+                                                       self._theme_timeline(connection, user_id, journal_count))
+            else:
+                journal = {'error': 'No journal data available'}
+
+            zone = resolve_timezone(self._timezone_name(connection, user_id))
+            week_scores = [score for score, in self._week_records(connection, 'mood_records', user_id, week_ago,
+                                                                  zone, 'score')]
+            week_tasks = [completed for completed, in self._week_records(connection, 'task_records', user_id,
+                                                                         week_ago, zone, 'completed')]
+            weekly_summary = {
+                'journal_entries_this_week': len(self._week_records(connection, 'journal_records', user_id,
+                                                                    week_ago, zone)),
+                'mood_entries_this_week': len(week_scores),
+                'tasks_this_week': len(week_tasks),
+                'completed_tasks_this_week': sum(week_tasks),
+                'average_mood_this_week': sum(week_scores) / len(week_scores) if week_scores else None
+            }
+
+        names = [name for name, _, _, _ in habits]
+        bitmaps = HabitBitmaps.from_rows(
+            [(origin, days) for _, _, origin, days in habits],
+            np.array([NO_START if created is None else created for _, created, _, _ in habits], dtype=np.int64),
+            epoch_day(now))
+        rates = bitmaps.completion_rates(generator.HABIT_RATE_WINDOW, epoch_day(now)).tolist()
+        details = dict(zip(names, bitmaps.summaries(epoch_day(now), generator.HABIT_WINDOWS)))
+        return {
+            'mood_patterns': mood_patterns,
+            'productivity_insights': productivity,
+            'journal_insights': journal,
+            'habit_insights': (generator._summarize_habits(dict(zip(names, rates)), len(habits), details)
+                               if habits else {'error': 'No habit data available'}),
+            'recommendations': generator._recommend(
+                sum(recent_scores) / len(recent_scores) if recent_scores else None,
+                tasks_completed / task_count if task_count else None,
+                float(np.mean(rates)) if rates else None),
+            'weekly_summary': weekly_summary
+        }
@@ -0,0 +1,195 @@
+"""
+Journal Themes
+
+Per-theme timelines of journal content. For each theme: how many entries
+mention it, its keyword hits, the first and last day it came up, and how
+many entries mentioned it in each month.
+
+Themes come from a theme dictionary (theme name -> keywords). The default
+is PersonalizedInsights.theme_keywords. JOURNAL_THEMES_PATH can name a JSON
+file with another one (see load_theme_keywords). The dictionary is compiled
+once, together with every other keyword list, into the TextAnalyzer of
+PersonalizedInsights, so each entry is still scanned a single time.
+
+ThemeTimeline accumulates partial aggregates: per-entry keyword counts from
+a request, or per-theme totals kept by the insight state store. Its memory
+depends on the number of themes and months, not on the number of entries or
+the length of their text, and entries are never concatenated.
+stream_theme_timeline feeds it from any iterable of entries, one chunk at a
+time, so a multi-megabyte history is processed with a bounded working set.
+"""
+
+import json
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from insight_frames import parse_timestamps
+from text_analysis import TextAnalyzer
+
+# Day of entries without a valid created_at
+UNDATED = np.iinfo(np.int64).min
+
+# Entries tokenized at a time by stream_theme_timeline
+STREAM_CHUNK_SIZE = 500
+
+_NO_DAY = np.iinfo(np.int64).max
+
+
+def load_theme_keywords(path: str) -> Dict[str, List[str]]:
+    """
+    Theme dictionary from a JSON file, e.g. {"Music": ["music", "concert"]}
+
+    Args:
+        path: JSON object of theme name -> list of keywords (reporting order)
+
+    Returns:
+        dict: Theme name -> lowercase keywords
+
+    Raises:
+        ValueError: If the file is not a non-empty object of keyword lists
+    """
+    with open(path) as theme_file:
+        themes = json.load(theme_file)
+    if not isinstance(themes, dict) or not themes or not all(
+            isinstance(keywords, list) and keywords and all(isinstance(word, str) and word.strip()
+                                                            for word in keywords)
+            for keywords in themes.values()):
+        raise ValueError(f'{path}: expected a JSON object of theme name -> list of keywords')
+    return {str(theme): [word.strip().lower() for word in keywords] for theme, keywords in themes.items()}
+
+
+def entry_days(timestamps: np.ndarray) -> np.ndarray:
+    """Epoch day (wall-clock date) of each datetime64 timestamp, UNDATED for NaT"""
+    return np.where(np.isnat(timestamps), UNDATED, timestamps.astype('datetime64[D]').astype(np.int64))
+
+
+def theme_columns(analyzer: TextAnalyzer, themes: Iterable[str]) -> List[int]:
+    """Columns of TokenizedEntries.group_counts holding each theme's keyword hits"""
+    return [analyzer.group_index[f'theme:{theme}'] for theme in themes]
+
+
+class ThemeTimeline:
+    """
+    Running per-theme mention counts, first/last days and monthly counts
+
+    Attributes:
+        themes: Theme names in reporting order
+        total_entries: Entries added so far
+    """
+
+    def __init__(self, themes: Iterable[str]):
+        self.themes = list(themes)
+        self.total_entries = 0
+        self._entries = np.zeros(len(self.themes), dtype=np.int64)
+        self._hits = np.zeros(len(self.themes), dtype=np.int64)
+        self._first = np.full(len(self.themes), _NO_DAY, dtype=np.int64)
+        self._last = np.full(len(self.themes), UNDATED, dtype=np.int64)
+        # Month (months since 1970-01) -> entries mentioning each theme
+        self._monthly: Dict[int, np.ndarray] = {}
+
+    def add(self, days: np.ndarray, entries: np.ndarray, hits: np.ndarray, total_entries: Optional[int] = None):
+        """
+        Add entries or per-day partial aggregates
+
+        Args:
+            days: Epoch day of each row (UNDATED for undated entries)
+            entries: rows x themes, entries mentioning each theme (0/1 per
+                entry, or a count per day)
+            hits: rows x themes keyword hits
+            total_entries: Entries the rows stand for (default: one per row)
+        """
+        days = np.asarray(days, dtype=np.int64)
+        entries = np.asarray(entries, dtype=np.int64).reshape(len(days), len(self.themes))
+        hits = np.asarray(hits, dtype=np.int64).reshape(len(days), len(self.themes))
+        self.total_entries += len(days) if total_entries is None else total_entries
+        self._entries += entries.sum(axis=0)
+        self._hits += hits.sum(axis=0)
+
+        dated = days != UNDATED
+        if not dated.any():
+            return
+        mentioned = entries[dated] > 0
+        self._first = np.minimum(self._first, np.where(mentioned, days[dated, None], _NO_DAY).min(axis=0))
+        self._last = np.maximum(self._last, np.where(mentioned, days[dated, None], UNDATED).max(axis=0))
+        months = days[dated].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        unique_months, month_index = np.unique(months, return_inverse=True)
+        month_entries = np.zeros((len(unique_months), len(self.themes)), dtype=np.int64)
+        np.add.at(month_entries, month_index, entries[dated])
+        for month, counts in zip(unique_months.tolist(), month_entries):
+            self._monthly[month] = self._monthly.get(month, 0) + counts
+
+    def add_theme_totals(self, theme: str, entries: int, hits: int, first: Optional[int], last: Optional[int],
+                         monthly: Dict[int, int]):
+        """
+        Add one theme's running totals, as kept by the insight state store
+
+        Args:
+            theme: One of the themes
+            entries: Entries mentioning it (dated or not)
+            hits: Its keyword hits
+            first, last: Epoch days of its first and last dated mention
+                (None when no dated entry mentions it)
+            monthly: Month (months since 1970-01) -> entries mentioning it
+        """
+        index = self.themes.index(theme)
+        self._entries[index] += entries
+        self._hits[index] += hits
+        if first is not None:
+            self._first[index] = min(self._first[index], first)
+            self._last[index] = max(self._last[index], last)
+        for month, count in monthly.items():
+            self._monthly.setdefault(month, np.zeros(len(self.themes), dtype=np.int64))[index] += count
+
+    def summaries(self) -> Dict[str, Dict]:
+        """
+        Timeline of every mentioned theme, in dictionary order
+
+        Returns:
+            dict: Theme -> entries (mentioning it), keyword_hits,
+            share_of_entries, first_mentioned and last_mentioned (dates;
+            None when only undated entries mention it) and monthly_entries
+            ('YYYY-MM' -> entries, months with mentions only)
+        """
+        months = sorted(self._monthly)
+        result = {}
+        for index, theme in enumerate(self.themes):
+            if self._entries[index] <= 0:
+                continue
+            dated = self._first[index] != _NO_DAY
+            result[theme] = {
+                'entries': int(self._entries[index]),
+                'keyword_hits': int(self._hits[index]),
+                'share_of_entries': round(int(self._entries[index]) / self.total_entries, 4),
+                'first_mentioned': str(np.datetime64(int(self._first[index]), 'D')) if dated else None,
+                'last_mentioned': str(np.datetime64(int(self._last[index]), 'D')) if dated else None,
+                'monthly_entries': {str(np.datetime64(month, 'M')): int(self._monthly[month][index])
+                                    for month in months if self._monthly[month][index] > 0}
+            }
+        return result
+
+
+def stream_theme_timeline(entries: Iterable[Dict], analyzer: TextAnalyzer, themes: Iterable[str],
+                          chunk_size: int = STREAM_CHUNK_SIZE) -> ThemeTimeline:
+    """
+    Theme timeline of any iterable of journal entries (e.g. a generator
+    reading an export), holding at most one chunk of entries at a time
+
+    Args:
+        entries: Journal entries with 'content' and 'created_at'
+        analyzer: TextAnalyzer whose groups include 'theme:<name>' for every theme
+        themes: Theme names in reporting order
+        chunk_size: Entries tokenized at a time
+    """
+    themes = list(themes)
+    columns = theme_columns(analyzer, themes)
+    timeline = ThemeTimeline(themes)
+    entries = iter(entries)
+    while True:
+        chunk = list(islice(entries, chunk_size))
+        if not chunk:
+            return timeline
+        hits = analyzer.tokenize_entries(chunk).group_counts[:, columns]
+        timestamps, _ = parse_timestamps(entry.get('created_at') for entry in chunk)
+        timeline.add(entry_days(timestamps), hits > 0, hits)
@@ -0,0 +1,196 @@
+"""
+Keyword Matcher
+
+Compiled, single-pass keyword matching shared by the ML service analyzers.
+
+The original rule-based detector ran one `keyword in text` scan per keyword
+(roughly 80 full passes over every journal entry). The matcher instead:
+1. Splits the text once into words (letters only, punctuation is a separator)
+2. Looks up each distinct word in a cache of "keywords contained in this word"
+3. Adds up the hits per keyword group
+
+Matching keeps plain substring semantics: a keyword counts when it appears
+anywhere in the text, including inside a longer word ("down" in "download"),
+exactly like the `in` checks it replaces. Because a letters-only keyword can
+never span a separator, checking it inside each word gives the same answer
+as checking it against the whole text. Keywords that contain anything other
+than lowercase letters fall back to a direct substring check.
+"""
+
+import re
+import string
+from typing import Dict, List
+
+import numpy as np
+
+# Keywords made only of lowercase letters can be matched word by word
+_WORD_KEYWORD_RE = re.compile(r'[a-z]+')
+
+# Every ASCII character that is not a lowercase letter separates words
+_SEPARATORS = str.maketrans({
+    char: ' ' for char in map(chr, range(128)) if char not in string.ascii_lowercase
+})
+
+
+class KeywordMatcher:
+    """
+    Count keyword group hits in a text with one pass over its words
+
+    Built once from a dictionary of group name -> keyword list, e.g. the
+    emotion keyword dictionary plus negation and question word lists.
+    Each distinct keyword present in the text counts once for every group
+    it belongs to, matching the behaviour of nested `keyword in text` loops.
+    """
+
+    def __init__(self, keyword_groups: Dict[str, List[str]], max_cached_words: int = 50000):
+        """
+        Compile keyword groups into lookup tables
+
+        Args:
+            keyword_groups: Mapping of group name to its keywords
+            max_cached_words: Upper bound on remembered word lookups
+        """
+        self.groups = list(keyword_groups.keys())
+        self.max_cached_words = max_cached_words
+
+        # keyword -> list of groups (a keyword may appear in several groups)
+        self._keyword_groups = {}
+        for group, keywords in keyword_groups.items():
+            for keyword in keywords:
+                self._keyword_groups.setdefault(keyword, []).append(group)
+
+        self.keywords = list(self._keyword_groups.keys())
+        self._keyword_ids = {keyword: index for index, keyword in enumerate(self.keywords)}
+
+        self._word_keywords = [k for k in self._keyword_groups if _WORD_KEYWORD_RE.fullmatch(k)]
+        self._other_keywords = [k for k in self._keyword_groups if not _WORD_KEYWORD_RE.fullmatch(k)]
+
+        # word -> tuple of keywords contained in it, for words with hits
+        self._word_cache = {}
+        # Words known to contain no keyword; most words of a text, so they
+        # are removed with one set difference instead of a lookup each
+        self._plain_words = set()
+
+    def _keywords_in_word(self, word: str) -> tuple:
+        """Find (and remember) which keywords occur inside a single word"""
+        hits = self._word_cache.get(word)
+        if hits is None:
+            hits = tuple(keyword for keyword in self._word_keywords if keyword in word)
+            if len(self._word_cache) + len(self._plain_words) < self.max_cached_words:
+                if hits:
+                    self._word_cache[word] = hits
+                else:
+                    self._plain_words.add(word)
+        return hits
+
+    def find_keywords(self, text: str) -> set:
+        """
+        Find every distinct keyword present in the text
+
+        Args:
+            text (str): Lowercase text to scan
+
+        Returns:
+            set: Keywords that occur in the text
+        """
+        words = set(text.translate(_SEPARATORS).split())
+        words.difference_update(self._plain_words)
+        hits = list(map(self._word_cache.get, words))
+        if None in hits:
+            # Some words have not been seen yet
+            hits = [self._keywords_in_word(word) for word in words]
+        found = set().union(*hits)
+
+        for keyword in self._other_keywords:
+            if keyword in text:
+                found.add(keyword)
+
+        return found
+
+    def keyword_ids(self, text: str) -> np.ndarray:
+        """
+        Compact, sorted array of the IDs (positions in self.keywords) of
+        every distinct keyword present in the text
+
+        Args:
+            text (str): Lowercase text to scan
+
+        Returns:
+            ndarray: uint16 (or uint32 for very large vocabularies) keyword IDs
+        """
+        dtype = np.uint16 if len(self.keywords) < 2 ** 16 else np.uint32
+        found = self.find_keywords(text)
+        ids = np.fromiter(map(self._keyword_ids.__getitem__, found), dtype=dtype, count=len(found))
+        ids.sort()
+        return ids
+
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Count keyword hits per group
+
+        Args:
+            text (str): Lowercase text to scan
+
+        Returns:
+            dict: Group name -> number of distinct keywords found
+        """
+        counts = {group: 0 for group in self.groups}
+        for keyword in self.find_keywords(text):
+            for group in self._keyword_groups[keyword]:
+                counts[group] += 1
+        return counts
+
+    def keyword_matrix(self, texts: List[str]) -> 'sparse.csr_matrix':
+        """
+        Build a sparse document x keyword matrix in one pass over the batch
+
+        Args:
+            texts: Lowercase texts to scan
+
+        Returns:
+            csr_matrix: Shape (len(texts), len(self.keywords)), 1 where the
+            keyword occurs in the text
+        """
+        # Imported here so single-text matching does not pay for scipy at startup
+        from scipy import sparse
+
+        indptr = [0]
+        indices = []
+        for text in texts:
+            indices.extend(self._keyword_ids[keyword] for keyword in self.find_keywords(text))
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix(
+            (data, np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(texts), len(self.keywords))
+        )
+
+    def group_matrix(self) -> np.ndarray:
+        """
+        Keyword x group incidence matrix
+
+        Multiplying a keyword matrix by it gives per-group counts identical
+        to calling count() on each text.
+
+        Returns:
+            ndarray: Shape (len(self.keywords), len(self.groups))
+        """
+        group_ids = {group: index for index, group in enumerate(self.groups)}
+        matrix = np.zeros((len(self.keywords), len(self.groups)), dtype=np.int32)
+        for keyword, groups in self._keyword_groups.items():
+            for group in groups:
+                matrix[self._keyword_ids[keyword], group_ids[group]] += 1
+        return matrix
+
+    def count_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Count keyword hits per group for a whole batch
+
+        Args:
+            texts: Lowercase texts to scan
+
+        Returns:
+            ndarray: Shape (len(texts), len(self.groups)) of hit counts
+        """
+        return np.asarray(self.keyword_matrix(texts) @ self.group_matrix())
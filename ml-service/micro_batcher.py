@@ -0,0 +1,187 @@
+"""
+Micro Batcher
+
+Opt-in micro-batching for single-text emotion detection.
+
+The backend sends one /api/detect-emotion request per saved journal entry.
+Scored one by one, every request pays the full per-call overhead of the
+detector (state checks, vectorizer and predict_proba calls). The micro
+batcher queues concurrent single-text requests, waits at most a small window
+(or until a batch is full), scores the batch with
+EmotionDetector.predict_batch and hands each caller its own result.
+
+The window starts when the first request of a batch arrives, so the latency
+added to any request is bounded by the window plus the batch's scoring time.
+Requests that arrive while a batch is being scored form the next batch.
+
+Batching only helps when requests run concurrently in one process: use it
+with the async serving mode (asgi.py) and keep ASGI_THREADS at least as
+large as the batch size. A sync worker handles one request at a time, so it
+would only ever see batches of one.
+
+Batching also only pays off when a trained model is used (model or hybrid
+inference mode). Rule-only scoring takes about 30 us per text, and handing
+it to the dispatcher thread cost more than batching saved (see
+benchmarks/README.md). In rule mode, which is also what the detector uses
+until a model is loaded, requests bypass the queue and are counted as
+passed through. The dispatcher thread is only started by the first request
+that can be batched.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+# Recent queue waits kept for the percentiles in stats()
+_WAIT_SAMPLES = 2048
+
+
+class MicroBatcher:
+    """
+    Collect concurrent single-text predictions into small batches
+    """
+
+    def __init__(self, detector, window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+        """
+        Args:
+            detector: EmotionDetector whose predict_batch scores each batch
+            window_ms: Longest time a request waits for others to join its
+                batch, 0 disables batching
+                (default: MICRO_BATCH_WINDOW_MS env var or 0)
+            max_batch_size: A batch is scored as soon as it has this many
+                requests (default: MICRO_BATCH_MAX_SIZE env var or 32)
+        """
+        if window_ms is None:
+            window_ms = float(os.getenv('MICRO_BATCH_WINDOW_MS', 0))
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv('MICRO_BATCH_MAX_SIZE', 32))
+        self.detector = detector
+        self.window_ms = max(0.0, window_ms)
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._batches = 0
+        self._requests = 0
+        self._passed_through = 0
+        self._size_histogram = {}
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self._total_wait = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    @property
+    def batching(self) -> bool:
+        """Whether requests are queued now (enabled and the detector scores with a model)"""
+        return self.enabled and self.detector.active_inference_mode() != 'rule'
+
+    def _ensure_dispatcher(self):
+        """Start the dispatcher thread with the first batchable request (after any fork)"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    thread = threading.Thread(target=self._dispatch_forever, name='micro-batcher', daemon=True)
+                    thread.start()
+                    self._thread = thread
+
+    def predict(self, text: str) -> Dict:
+        """
+        Predict the emotion of one text, batched with concurrent callers
+
+        Args:
+            text (str): Raw text to analyze
+
+        Returns:
+            dict: Same result as EmotionDetector.predict(text)
+        """
+        # Rule-only scoring has no per-call overhead worth sharing, and the
+        # hand-off to the dispatcher would cost more than it saves
+        if not self.batching:
+            if self.enabled:
+                with self._lock:
+                    self._passed_through += 1
+            return self.detector.predict(text)
+
+        self._ensure_dispatcher()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _next_batch(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.window_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already queued
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch_forever(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                results = self.detector.predict_batch([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            self._record(batch, started)
+
+    def _record(self, batch, started: float):
+        bucket = 1 << (len(batch).bit_length() - 1)
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._size_histogram[bucket] = self._size_histogram.get(bucket, 0) + 1
+            for _, _, enqueued in batch:
+                wait = started - enqueued
+                self._waits.append(wait)
+                self._total_wait += wait
+
+    def stats(self) -> Dict:
+        """
+        Batching metrics since startup
+
+        batch_sizes maps power-of-two buckets ("4" = sizes 4-7) to batch
+        counts. Queue waits are the time from arrival until scoring starts;
+        the percentiles cover the most recent requests. passed_through
+        counts requests scored directly because the detector was in rule
+        mode.
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'enabled': self.enabled,
+                'batching': self.batching,
+                'window_ms': self.window_ms,
+                'max_batch_size': self.max_batch_size,
+                'batches': self._batches,
+                'requests': self._requests,
+                'passed_through': self._passed_through,
+                'mean_batch_size': round(self._requests / self._batches, 2) if self._batches else None,
+                'batch_sizes': {str(size): count for size, count in sorted(self._size_histogram.items())},
+                'queue_wait_ms': None
+            }
+            if waits:
+                stats['queue_wait_ms'] = {
+                    'mean': round(self._total_wait / self._requests * 1000, 3),
+                    'p50': round(waits[len(waits) // 2] * 1000, 3),
+                    'p99': round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3),
+                    'max': round(waits[-1] * 1000, 3)
+                }
+        return stats
@@ -0,0 +1,113 @@
+"""
+Model Store
+
+Saves and loads trained emotion models in a memory-mappable layout.
+
+A model is written as two files:
+- <model_path>: the pickled pipeline with its NumPy arrays stripped out
+- <model_path>.arrays: the arrays (IDF weights, class log-probabilities,
+  feature counts, ...) in an uncompressed joblib file
+
+Loading the sidecar with mmap_mode='r' maps the arrays read-only from disk
+instead of copying them into each process. When gunicorn preloads the app
+(see gunicorn.conf.py) every worker shares the same physical pages, so
+adding workers does not multiply the model's memory.
+
+Models saved as a single pickle by older versions still load.
+"""
+
+import os
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+SIDECAR_SUFFIX = '.arrays'
+
+
+def _array_slots(estimator, prefix: str = '') -> Iterator[Tuple[str, object, str]]:
+    """
+    Find every NumPy array attribute of a fitted estimator
+
+    Walks pipeline steps and nested estimators (e.g. the TfidfTransformer
+    inside a TfidfVectorizer).
+
+    Yields:
+        (dotted path, owning object, attribute name)
+    """
+    if hasattr(estimator, 'steps'):
+        for name, step in estimator.steps:
+            yield from _array_slots(step, f'{prefix}{name}.')
+        return
+
+    for name, value in list(vars(estimator).items()):
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            yield f'{prefix}{name}', estimator, name
+        elif hasattr(value, 'get_params'):
+            yield from _array_slots(value, f'{prefix}{name}.')
+
+
+def _resolve(pipeline, path: str) -> Tuple[object, str]:
+    """Find the object and attribute name a dotted sidecar path refers to"""
+    parts = path.split('.')
+    owner = pipeline.named_steps[parts[0]] if hasattr(pipeline, 'named_steps') else getattr(pipeline, parts[0])
+    for part in parts[1:-1]:
+        owner = getattr(owner, part)
+    return owner, parts[-1]
+
+
+def save_model(pipeline, model_path: str):
+    """
+    Save a fitted pipeline with its arrays in a memory-mappable sidecar
+
+    Args:
+        pipeline: Fitted scikit-learn pipeline
+        model_path: Path of the main model file
+    """
+    import joblib
+
+    arrays: Dict[str, np.ndarray] = {}
+    slots = list(_array_slots(pipeline))
+    try:
+        # Detach arrays so the main pickle only holds the object structure
+        for path, owner, name in slots:
+            arrays[path] = getattr(owner, name)
+            setattr(owner, name, None)
+        joblib.dump(pipeline, model_path + '.tmp')
+    finally:
+        for path, owner, name in slots:
+            setattr(owner, name, arrays[path])
+
+    # Uncompressed so the arrays can be memory-mapped on load
+    joblib.dump(arrays, model_path + SIDECAR_SUFFIX + '.tmp')
+
+    # Swap both files in with renames: processes that still have the old
+    # sidecar mapped keep reading the old (unlinked) file safely
+    os.replace(model_path + SIDECAR_SUFFIX + '.tmp', model_path + SIDECAR_SUFFIX)
+    os.replace(model_path + '.tmp', model_path)
+
+
+def load_model(model_path: str, mmap_mode: Optional[str] = 'r'):
+    """
+    Load a model saved by save_model (or a legacy single-file model)
+
+    Args:
+        model_path: Path of the main model file
+        mmap_mode: 'r' to share read-only pages between processes,
+            'c' for private copy-on-write, None to load into memory.
+            Use 'c' or None when the model will be updated in place.
+
+    Returns:
+        The fitted pipeline
+    """
+    import joblib
+
+    sidecar_path = model_path + SIDECAR_SUFFIX
+    if not os.path.exists(sidecar_path):
+        return joblib.load(model_path, mmap_mode=mmap_mode)
+
+    pipeline = joblib.load(model_path)
+    arrays = joblib.load(sidecar_path, mmap_mode=mmap_mode)
+    for path, array in arrays.items():
+        owner, name = _resolve(pipeline, path)
+        setattr(owner, name, array)
+    return pipeline
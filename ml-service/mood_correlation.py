@@ -0,0 +1,190 @@
+"""
+Mood-Productivity Correlation
+
+Correlates mood scores with task completion on a per-day (or per-hour)
+grid.
+
+Both series are first aggregated into time bins: the mean mood score of
+each bin, and the completion rate of the tasks created in it. Bins with
+both a mood score and tasks are paired. The result has:
+- Pearson correlation of the paired bins (linear relationship)
+- Spearman rank correlation (monotonic relationship, robust to outliers)
+- lagged correlations: mood in one bin against productivity `lag` bins
+  later (lag 1 at day resolution: mood today vs. productivity tomorrow;
+  negative lags look at productivity first)
+
+Each coefficient comes with the number of paired bins and a two-sided
+p-value from the t distribution with n - 2 degrees of freedom, the usual
+test for both coefficients (it is what scipy.stats reports too).
+
+Everything runs on NumPy arrays: bins are grouped with np.unique and
+np.bincount, and series are paired with np.intersect1d, so the cost grows
+with the number of records and never loops over days in Python. Empty
+bins are never materialized, so histories with gaps cost nothing extra.
+
+The inputs are per-record or per-bin partial aggregates (a sum plus a
+count), so the request path can pass raw records while the insight state
+store passes its running daily totals.
+
+With lookback_days, only the bins of the last lookback_days days up to the
+latest mood or task bin are correlated. Every caller passes
+PersonalizedInsights.CORRELATION_LOOKBACK_DAYS, so the insight state store
+reads a bounded range of its per-day totals however long the history is.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Bin width in microseconds (the unit of the datetime64[us] timestamp columns)
+RESOLUTIONS = {
+    'day': 86400 * 1000000,
+    'hour': 3600 * 1000000
+}
+
+# A coefficient is reported as significant below this p-value
+SIGNIFICANCE_LEVEL = 0.05
+
+
+def time_bins(timestamps: np.ndarray, resolution: str = 'day') -> np.ndarray:
+    """
+    Bin index of each datetime64[us] timestamp (days or hours since the
+    epoch, by wall-clock time); timestamps must not be NaT
+    """
+    return timestamps.astype(np.int64) // RESOLUTIONS[resolution]
+
+
+def window_start(last_bin: int, lookback_days: int, resolution: str = 'day') -> int:
+    """First bin of the lookback_days days ending with last_bin"""
+    return last_bin - lookback_days * (RESOLUTIONS['day'] // RESOLUTIONS[resolution]) + 1
+
+
+def _bin_ratios(bins: np.ndarray, numerators: np.ndarray, denominators: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum partial aggregates per bin
+
+    Returns:
+        tuple: (sorted distinct bins, numerator sum / denominator sum per bin)
+    """
+    unique, inverse = np.unique(bins, return_inverse=True)
+    totals = np.bincount(inverse, weights=numerators, minlength=len(unique))
+    counts = np.bincount(inverse, weights=denominators, minlength=len(unique))
+    present = counts > 0
+    # Rounded so that equal means compare equal (ranks keep their ties)
+    # however the sums were accumulated
+    return unique[present], np.round(totals[present] / counts[present], 9)
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Ranks starting at 1, ties sharing their average rank"""
+    order = np.argsort(values, kind='mergesort')
+    ordered = values[order]
+    starts = np.concatenate(([0], np.flatnonzero(ordered[1:] != ordered[:-1]) + 1))
+    ends = np.append(starts[1:], len(values))
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return ranks
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    """Pearson coefficient; None when either series is constant"""
+    dx = x - x.mean()
+    dy = y - y.mean()
+    denominator = np.sqrt(np.dot(dx, dx) * np.dot(dy, dy))
+    if denominator == 0:
+        return None
+    return float(np.clip(np.dot(dx, dy) / denominator, -1.0, 1.0))
+
+
+def _p_value(r: float, n: int) -> float:
+    """Two-sided p-value of a correlation coefficient over n pairs"""
+    if abs(r) == 1.0:
+        return 0.0
+    # Imported here so requests without enough data never load scipy
+    from scipy.special import stdtr
+    dof = n - 2
+    t = abs(r) * np.sqrt(dof / (1.0 - r * r))
+    return float(2.0 * stdtr(dof, -t))
+
+
+def _coefficient(x: np.ndarray, y: np.ndarray, method: str) -> Dict[str, Any]:
+    """Coefficient, p-value and significance of paired samples"""
+    n = len(x)
+    r = None
+    if n >= 3:
+        if method == 'spearman':
+            x, y = _rank(x), _rank(y)
+        r = _pearson(x, y)
+    if r is None:
+        return {'r': None, 'p_value': None, 'n': n, 'significant': False}
+    p_value = _p_value(r, n)
+    return {
+        'r': round(r, 4),
+        'p_value': round(p_value, 4),
+        'n': n,
+        'significant': p_value < SIGNIFICANCE_LEVEL
+    }
+
+
+def _paired(mood_bins: np.ndarray, mood: np.ndarray, task_bins: np.ndarray, productivity: np.ndarray,
+            lag: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Mood of each bin paired with productivity `lag` bins later (both sorted and distinct)"""
+    _, mood_index, task_index = np.intersect1d(mood_bins + lag, task_bins, assume_unique=True,
+                                               return_indices=True)
+    return mood[mood_index], productivity[task_index]
+
+
+def correlate(mood_bins: np.ndarray, mood_sums: np.ndarray, mood_counts: np.ndarray,
+              task_bins: np.ndarray, task_completed: np.ndarray, task_totals: np.ndarray,
+              lags: Iterable[int] = (1, -1), resolution: str = 'day',
+              lookback_days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Correlate mood with task completion over time bins
+
+    Args:
+        mood_bins, mood_sums, mood_counts: Mood score sums and entry counts
+            per bin index (one row per record or per partial aggregate)
+        task_bins, task_completed, task_totals: Completed and total task
+            counts per bin index, likewise
+        lags: Offsets (in bins) of productivity after mood to also test
+        resolution: Bin width the indexes were built with
+        lookback_days: Days up to the latest bin (mood or task) to
+            correlate (default: every bin)
+
+    Returns:
+        dict: 'pearson' and 'spearman' for same-bin pairs, and 'lagged'
+        (one entry per lag with both coefficients), plus 'lookback_days'
+        when given. Each coefficient has
+        'r' (None with fewer than 3 pairs or a constant series),
+        'p_value', 'n' (paired bins) and 'significant'.
+    """
+    mood_bins, mood = _bin_ratios(np.asarray(mood_bins, dtype=np.int64),
+                                  np.asarray(mood_sums, dtype=np.float64),
+                                  np.asarray(mood_counts, dtype=np.float64))
+    task_bins, productivity = _bin_ratios(np.asarray(task_bins, dtype=np.int64),
+                                          np.asarray(task_completed, dtype=np.float64),
+                                          np.asarray(task_totals, dtype=np.float64))
+    if lookback_days is not None and (len(mood_bins) or len(task_bins)):
+        start = window_start(int(max(mood_bins[-1:].tolist() + task_bins[-1:].tolist())), lookback_days, resolution)
+        mood_kept, task_kept = mood_bins >= start, task_bins >= start
+        mood_bins, mood = mood_bins[mood_kept], mood[mood_kept]
+        task_bins, productivity = task_bins[task_kept], productivity[task_kept]
+
+    x, y = _paired(mood_bins, mood, task_bins, productivity)
+    lagged = []
+    for lag in lags:
+        lag_x, lag_y = _paired(mood_bins, mood, task_bins, productivity, lag)
+        lagged.append({
+            'lag': lag,
+            'pearson': _coefficient(lag_x, lag_y, 'pearson'),
+            'spearman': _coefficient(lag_x, lag_y, 'spearman')
+        })
+    result = {
+        'resolution': resolution,
+        'pearson': _coefficient(x, y, 'pearson'),
+        'spearman': _coefficient(x, y, 'spearman'),
+        'lagged': lagged
+    }
+    if lookback_days is not None:
+        result['lookback_days'] = lookback_days
+    return result
@@ -0,0 +1,251 @@
+"""
+Mood Trend Analytics
+
+Multi-horizon mood trends over calendar days rather than list positions.
+
+Mood scores are first summed per day. From the day totals it computes:
+- rolling means over the last N days (7, 30 and 90 by default), for every
+  day, so a window covers the same span of time however often the user
+  logs, and the mean of the N days before it for comparison
+- an exponentially weighted moving average (EWMA) whose weight halves every
+  `halflife` days. It decays per calendar day, so a gap in the log weakens
+  the old scores instead of being ignored.
+- the least-squares slope of the scores in each window, in points per week
+- a downsampled series of equal-width buckets for charting
+
+Windows end at the most recent entry (not today), so a user who has not
+logged for a while still gets trends for their last active period and
+the result depends only on the data.
+
+Only the days that can change the result are read: two of the longest
+window (the window and the one before it) or 50 half-lives of EWMA
+history, whichever is longer. Older days weigh less than 2 ** -50 in the
+EWMA. The series covers the same span. The lookback never exceeds
+MAX_LOOKBACK_DAYS, so one malformed far-past date cannot stretch the day
+grid, and the stored-state path can read just these days.
+
+Everything is a linear pass over a dense day grid: rolling sums come from
+differences of cumulative sums, the EWMA from cumulative sums of
+exponentially scaled day totals, and the downsampled series from
+np.bincount. The inputs are per-record or per-day partial aggregates (a
+sum plus a count), like mood_correlation.correlate, so the request path
+passes raw records while the insight state store passes its running daily
+totals.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Default windows (days), EWMA half-life (days) and chart points
+WINDOWS = (7, 30, 90)
+EWMA_HALFLIFE_DAYS = 7.0
+SERIES_POINTS = 90
+
+# Bounds for request parameters
+MAX_WINDOW_DAYS = 3650
+MAX_WINDOWS = 6
+MAX_SERIES_POINTS = 1000
+
+# Days of history the EWMA keeps, in half-lives
+EWMA_HORIZON_HALFLIVES = 50
+
+# Longest span of days up to the last entry that the trends read
+MAX_LOOKBACK_DAYS = 2 * MAX_WINDOW_DAYS
+
+# EWMA blocks are kept short enough that decay ** -block stays far from overflow
+_MAX_SCALE_EXPONENT = 600
+
+
+def trend_options(windows: Optional[str] = None, halflife: Optional[str] = None,
+                  points: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Validated mood_trends() keyword arguments from request parameters
+
+    Args:
+        windows: Comma-separated window lengths in days, e.g. "7,30,90"
+        halflife: EWMA half-life in days
+        points: Most points in the downsampled series
+
+    Returns:
+        dict: windows, halflife and points (defaults for omitted values)
+
+    Raises:
+        ValueError: If a value is malformed or out of range
+    """
+    options = {'windows': WINDOWS, 'halflife': EWMA_HALFLIFE_DAYS, 'points': SERIES_POINTS}
+    try:
+        if windows:
+            options['windows'] = tuple(sorted({int(window) for window in windows.split(',')}))
+        if halflife:
+            options['halflife'] = float(halflife)
+        if points:
+            options['points'] = int(points)
+    except ValueError:
+        raise ValueError('windows, halflife and points must be numbers')
+    if not 1 <= len(options['windows']) <= MAX_WINDOWS or not all(
+            1 <= window <= MAX_WINDOW_DAYS for window in options['windows']):
+        raise ValueError(f'windows must be 1 to {MAX_WINDOWS} lengths between 1 and {MAX_WINDOW_DAYS} days')
+    if not 0 < options['halflife'] <= MAX_WINDOW_DAYS:
+        raise ValueError(f'halflife must be above 0 and at most {MAX_WINDOW_DAYS} days')
+    if not 1 <= options['points'] <= MAX_SERIES_POINTS:
+        raise ValueError(f'points must be between 1 and {MAX_SERIES_POINTS}')
+    return options
+
+
+def lookback_days(windows: Iterable[int] = WINDOWS, halflife: float = EWMA_HALFLIFE_DAYS) -> int:
+    """Days up to and including the last entry that mood_trends() reads (see module docstring)"""
+    return min(max(2 * max(windows), int(np.ceil(EWMA_HORIZON_HALFLIVES * halflife))), MAX_LOOKBACK_DAYS)
+
+
+def _day_grid(days: np.ndarray, sums: np.ndarray, counts: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Dense per-day totals from the first to the last day
+
+    Returns:
+        tuple: (first day, score sum per day, entry count per day)
+    """
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    return (first, np.bincount(days - first, weights=sums, minlength=span),
+            np.bincount(days - first, weights=counts, minlength=span))
+
+
+def _rolling(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the `window` days ending at each day, from a cumulative sum with a leading 0"""
+    ends = np.arange(1, len(cumulative))
+    return cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator, NaN where the denominator is 0"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def _decayed(values: np.ndarray, decay: float) -> np.ndarray:
+    """
+    out[t] = sum of values[s] * decay ** (t - s) over s <= t
+
+    Each block is a cumulative sum of values scaled by decay ** -k, scaled
+    back by decay ** k, plus the previous block's total decayed in.
+    """
+    block = max(1, int(_MAX_SCALE_EXPONENT / -np.log2(decay)))
+    out = np.empty(len(values))
+    carry = 0.0
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        steps = np.arange(len(chunk))
+        out[start:start + len(chunk)] = (decay ** steps * np.cumsum(chunk * decay ** -steps)
+                                         + carry * decay ** (steps + 1))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+
+def _slope(sums: np.ndarray, counts: np.ndarray) -> Optional[float]:
+    """
+    Least-squares slope (points per day) of every entry's score against its
+    day; per-day totals give the same fit as the individual entries
+    """
+    n = counts.sum()
+    if n < 2:
+        return None
+    t = np.arange(len(sums), dtype=np.float64)
+    t_sum = np.dot(counts, t)
+    spread = np.dot(counts, t * t) - t_sum * t_sum / n
+    if spread <= 1e-9:
+        return None
+    return float((np.dot(t, sums) - t_sum * sums.sum() / n) / spread)
+
+
+def _value(x) -> Optional[float]:
+    """Rounded for output; first to 9 decimals so that summation order cannot flip the last digit"""
+    return None if np.isnan(x) else round(round(float(x), 9), 2)
+
+
+def _date(day: int) -> str:
+    return str(np.datetime64(int(day), 'D'))
+
+
+def mood_trends(days: np.ndarray, sums: np.ndarray, counts: np.ndarray, windows: Iterable[int] = WINDOWS,
+                halflife: float = EWMA_HALFLIFE_DAYS, points: int = SERIES_POINTS) -> Optional[Dict[str, Any]]:
+    """
+    Rolling, exponentially weighted and downsampled mood trends
+
+    Args:
+        days, sums, counts: Mood score sums and entry counts per day index
+            (days since the epoch; one row per record or per partial
+            aggregate). Rows before the lookback are ignored.
+        windows: Rolling window lengths in days
+        halflife: EWMA half-life in days
+        points: Most buckets in the downsampled series
+
+    Returns:
+        dict: 'as_of' (the last day with an entry), 'windows' (per window:
+        days, entries, mean, previous_mean of the window before it and
+        slope_per_week), 'ewma' (halflife_days and value) and 'series'
+        (bucket_days and points, each with the bucket's last date, entries,
+        mean, and the EWMA and rolling means at that date). None without
+        dated entries.
+    """
+    windows = tuple(windows)
+    days = np.asarray(days, dtype=np.int64)
+    sums = np.asarray(sums, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    present = counts != 0
+    if not present.any():
+        return None
+    present &= days > int(days[present].max()) - lookback_days(windows, halflife)
+    first, day_sums, day_counts = _day_grid(days[present], sums[present], counts[present])
+    span = len(day_sums)
+    last = first + span - 1
+    cumulative_sums = np.concatenate(([0.0], np.cumsum(day_sums)))
+    cumulative_counts = np.concatenate(([0.0], np.cumsum(day_counts)))
+
+    rolling_means = {}
+    window_results = []
+    for window in windows:
+        rolling_means[window] = _ratio(_rolling(cumulative_sums, window), _rolling(cumulative_counts, window))
+        # The `window` days before the last window
+        before = span - window
+        previous = (_ratio(cumulative_sums[before] - cumulative_sums[max(before - window, 0)],
+                           cumulative_counts[before] - cumulative_counts[max(before - window, 0)])
+                    if before > 0 else np.nan)
+        slope = _slope(day_sums[-window:], day_counts[-window:])
+        window_results.append({
+            'days': window,
+            'entries': int(cumulative_counts[-1] - cumulative_counts[max(span - window, 0)]),
+            'mean': _value(rolling_means[window][-1]),
+            'previous_mean': _value(previous),
+            'slope_per_week': None if slope is None else round(slope * 7, 3)
+        })
+
+    decay = 0.5 ** (1.0 / halflife)
+    ewma = _ratio(_decayed(day_sums, decay), _decayed(day_counts, decay))
+
+    # Buckets of equal width counted back from the last day, so the newest
+    # bucket is complete; a bucket's values are taken at its last day
+    width = -(-span // points)
+    buckets = (span - 1 - np.arange(span)) // width
+    bucket_count = int(buckets[0]) + 1
+    bucket_sums = np.bincount(buckets, weights=day_sums, minlength=bucket_count)[::-1]
+    bucket_counts = np.bincount(buckets, weights=day_counts, minlength=bucket_count)[::-1]
+    bucket_ends = np.arange(span - 1 - (bucket_count - 1) * width, span, width)
+    bucket_means = _ratio(bucket_sums, bucket_counts)
+    series = [
+        {
+            'date': _date(first + end),
+            'entries': int(bucket_counts[i]),
+            'mean': _value(bucket_means[i]),
+            'ewma': _value(ewma[end]),
+            'rolling_means': {f'{window}d': _value(rolling_means[window][end]) for window in rolling_means}
+        }
+        for i, end in enumerate(bucket_ends.tolist())
+    ]
+
+    return {
+        'as_of': _date(last),
+        'windows': window_results,
+        'ewma': {'halflife_days': halflife, 'value': _value(ewma[-1])},
+        'series': {'bucket_days': width, 'points': series}
+    }
@@ -11,15 +11,33 @@ Processes journal entries, mood history, tasks, and habits to:
 
 This module uses statistical analysis and pattern recognition
 to provide meaningful insights to users.
+
+Each request's payload is converted once into columnar frames
+(insight_frames.py): timestamps are parsed once, and mood, task and habit
+analyses run as vectorized NumPy operations over the columns instead of
+re-walking the raw lists per analysis.
+
+Mood patterns, productivity and weekly summaries can also be answered from
+a DailyRollup (daily_rollup.py), the per-day aggregates the insight state
+store keeps for each user, for any period.
 """
 
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 from collections import Counter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import os
 import re
 
+from daily_rollup import DailyRollup
+from habit_bitmaps import NO_START, HabitBitmaps, epoch_day, epoch_days
+from insight_frames import (Frame, InsightFrames, build_journal_frame, categorize, in_window, resolve_timezone,
+                            weekdays, weekly_slots)
+from journal_themes import ThemeTimeline, entry_days, load_theme_keywords, theme_columns
+from mood_correlation import correlate, time_bins
+from mood_trends import mood_trends
+from text_analysis import TextAnalyzer, TokenizedEntries
+
 class PersonalizedInsights:
     """
     Generate personalized insights based on user data patterns
@@ -32,7 +50,30 @@ class PersonalizedInsights:
     - Personalized recommendations
     """
     
-    def __init__(self):
+    DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    
+    # Task categories by title keywords (see _task_category)
+    TASK_CATEGORIES = ['work', 'health', 'learning', 'personal']
+    
+    # Mood-productivity correlation grid and lags (see mood_correlation.py)
+    CORRELATION_RESOLUTION = 'day'
+    CORRELATION_LAGS = (1, -1)
+    # Days up to the latest mood or task day that are correlated, so the
+    # stored state reads a bounded range of its daily totals
+    CORRELATION_LOOKBACK_DAYS = 365
+    
+    # Best productivity times: tasks are grouped into windows of this many
+    # hours (dividing 24); windows with fewer tasks are not ranked
+    PRODUCTIVITY_WINDOW_HOURS = 2
+    MIN_WINDOW_TASKS = 3
+    TOP_PRODUCTIVITY_WINDOWS = 5
+    
+    # Habit completion windows in days (see habit_bitmaps.py); habit_performance
+    # uses HABIT_RATE_WINDOW
+    HABIT_WINDOWS = (7, 30, 90)
+    HABIT_RATE_WINDOW = 30
+    
+    def __init__(self, annotations=None):
         """
         Initialize the insights generator with keyword dictionaries
         
@@ -40,6 +81,10 @@ class PersonalizedInsights:
         - Emotion detection in journal content
         - Productivity topic identification
         - Habit-related content analysis
+        
+        Args:
+            annotations: AnnotationStore keeping each journal entry's keyword
+                IDs across requests (annotation_store.py), optional
         """
         # Keywords for emotion detection in journal entries
         self.emotion_keywords = {
@@ -61,9 +106,63 @@ class PersonalizedInsights:
             'exercise', 'workout', 'run', 'walk', 'gym', 'yoga', 'meditation', 'read', 'study', 'learn',
             'sleep', 'wake', 'morning', 'evening', 'routine', 'habit', 'practice', 'consistency'
         ]
+        
+        # Keywords for journal content themes (in reporting order);
+        # JOURNAL_THEMES_PATH can name a JSON file with another dictionary
+        themes_path = os.getenv('JOURNAL_THEMES_PATH')
+        self.theme_keywords = load_theme_keywords(themes_path) if themes_path else {
+            'Work & Career': ['work', 'job', 'career', 'office'],
+            'Relationships': ['family', 'friend', 'relationship', 'love'],
+            'Health & Wellness': ['health', 'exercise', 'fitness', 'doctor'],
+            'Travel & Adventure': ['travel', 'vacation', 'trip', 'adventure'],
+            'Learning & Growth': ['learn', 'study', 'education', 'course']
+        }
+        
+        # One vocabulary for all keyword sets, so each journal entry is
+        # scanned once and every analyzer reads counts from its tokens
+        self.text_analyzer = self._build_text_analyzer(annotations)
+
+    def _build_text_analyzer(self, annotations=None) -> TextAnalyzer:
+        """Combine emotion, productivity, habit and theme keywords into one analyzer"""
+        keyword_groups = {f'emotion:{emotion}': keywords for emotion, keywords in self.emotion_keywords.items()}
+        keyword_groups['productivity'] = self.productivity_keywords
+        keyword_groups['habit'] = self.habit_keywords
+        keyword_groups.update({f'theme:{theme}': keywords for theme, keywords in self.theme_keywords.items()})
+        return TextAnalyzer(keyword_groups, annotations)
+
+    def _tokenize_journal(self, journal_entries: List[Dict],
+                          journal_tokens: Optional[TokenizedEntries] = None) -> TokenizedEntries:
+        """Reuse already tokenized journal entries, or tokenize them once now"""
+        if journal_tokens is not None:
+            return journal_tokens
+        return self.text_analyzer.tokenize_entries(journal_entries)
+
+    def build_frames(self, journal_entries: Optional[List[Dict]] = None, mood_history: Optional[List[Dict]] = None,
+                     task_history: Optional[List[Dict]] = None, habit_data: Optional[List[Dict]] = None,
+                     timezone: Optional[str] = None) -> InsightFrames:
+        """
+        Columnar frames for one request, shared by every analysis
+        
+        Frames are built on first use, so lists an endpoint never analyzes
+        are never converted.
+        
+        Args:
+            journal_entries, mood_history, task_history, habit_data: Raw payload lists
+            timezone: The user's IANA timezone for time-of-day analyses
+                (None: times as written)
+        
+        Returns:
+            InsightFrames for the request
+        
+        Raises:
+            ValueError: If the timezone is unknown
+        """
+        return InsightFrames(journal_entries, mood_history, task_history, habit_data,
+                             text_analyzer=self.text_analyzer, timezone=resolve_timezone(timezone))
 
     def generate_insights(self, journal_entries: List[Dict], mood_history: List[Dict], 
-                         task_history: List[Dict], habit_data: List[Dict]) -> Dict[str, Any]:
+                         task_history: List[Dict], habit_data: List[Dict], profile: bool = False,
+                         timezone: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate comprehensive personalized insights from all user data
         
@@ -75,6 +174,9 @@ class PersonalizedInsights:
             mood_history: List of mood entry objects
             task_history: List of task objects
             habit_data: List of habit objects
+            profile: Also return analysis_profile: per-section time and the
+                intermediates each section and metric used
+            timezone: The user's IANA timezone, for best productivity times
         
         Returns:
             Dictionary containing:
@@ -86,18 +188,33 @@ class PersonalizedInsights:
             - weekly_summary: Summary of the past week
         """
         
-        insights = {
-            'mood_patterns': self._analyze_mood_patterns(mood_history),
-            'productivity_insights': self._analyze_productivity_patterns(task_history, mood_history),
-            'journal_insights': self._analyze_journal_patterns(journal_entries),
-            'habit_insights': self._analyze_habit_patterns(habit_data, mood_history),
-            'recommendations': self._generate_recommendations(journal_entries, mood_history, task_history, habit_data),
-            'weekly_summary': self._generate_weekly_summary(journal_entries, mood_history, task_history)
-        }
+        # Convert the payload once; every intermediate (journal tokens,
+        # completion counts, habit rates, ...) is then computed once and
+        # shared by all sections
+        frames = self.build_frames(journal_entries, mood_history, task_history, habit_data, timezone)
+        
+        sections = [
+            ('mood_patterns', self._analyze_mood_patterns),
+            ('productivity_insights', self._analyze_productivity_patterns),
+            ('journal_insights', lambda frames: self._analyze_journal_patterns(journal_entries, frames.journal_tokens,
+                                                                               frames.journal)),
+            ('habit_insights', self._analyze_habit_patterns),
+            ('recommendations', self._generate_recommendations),
+            ('weekly_summary', self._generate_weekly_summary)
+        ]
+        insights = {}
+        for name, analyze in sections:
+            with frames.section(name):
+                insights[name] = analyze(frames)
+        
+        if profile:
+            insights['analysis_profile'] = frames.profile()
         
         return insights
 
-    def analyze_mood_patterns(self, mood_history: List[Dict]) -> Dict[str, Any]:
+    def analyze_mood_patterns(self, mood_history: List[Dict],
+                              trend_options: Optional[Dict[str, Any]] = None,
+                              rollup: Optional[DailyRollup] = None) -> Dict[str, Any]:
         """
         Analyze mood patterns and trends over time
         
@@ -106,48 +223,30 @@ class PersonalizedInsights:
         - Average mood scores
         - Trends (improving/declining/stable)
         - Day-of-week patterns
+        - Rolling, EWMA and downsampled trends by date (trend_analytics)
         
         Args:
             mood_history: List of mood entries with dates and scores
+            trend_options: windows, halflife and points for
+                mood_trends.mood_trends (see mood_trends.trend_options)
+            rollup: Daily rollup of a period to analyze instead of
+                mood_history (see _rollup_mood_patterns)
         
         Returns:
             Dictionary with mood analysis results
         """
-        if not mood_history:
-            return {'error': 'No mood data available'}
-        
-        # Extract emotions and scores
-        emotions = [entry.get('emotion', 'neutral') for entry in mood_history]
-        scores = [entry.get('score', 5) for entry in mood_history]
-        dates = [entry.get('date') for entry in mood_history]
-        
-        # Calculate statistics
-        emotion_counts = Counter(emotions)
-        most_common_emotion = emotion_counts.most_common(1)[0][0] if emotion_counts else 'neutral'
-        avg_mood_score = np.mean(scores) if scores else 5.0
-        
-        # Analyze trends
-        if len(scores) >= 7:  # At least a week of data
-            recent_avg = np.mean(scores[-7:])  # Last 7 days
-            older_avg = np.mean(scores[:-7]) if len(scores) > 7 else recent_avg
-            trend = 'improving' if recent_avg > older_avg else 'declining' if recent_avg < older_avg else 'stable'
-        else:
-            trend = 'insufficient_data'
-        
-        # Day of week analysis
-        day_patterns = self._analyze_day_patterns(mood_history)
-        
-        return {
-            'most_common_emotion': most_common_emotion,
-            'average_mood_score': round(avg_mood_score, 2),
-            'mood_trend': trend,
-            'emotion_distribution': dict(emotion_counts),
-            'day_patterns': day_patterns,
-            'total_entries': len(mood_history)
-        }
+        if rollup is not None:
+            return self._rollup_mood_patterns(rollup, **(trend_options or {}))
+        frames = self.build_frames(mood_history=mood_history)
+        result = self._analyze_mood_patterns(frames)
+        if 'error' not in result:
+            result['trend_analytics'] = self._mood_trend_analytics(*self._daily_mood_totals(frames),
+                                                                   **(trend_options or {}))
+        return result
 
     def analyze_productivity(self, task_history: List[Dict], mood_history: List[Dict], 
-                           journal_entries: List[Dict]) -> Dict[str, Any]:
+                           journal_entries: List[Dict], timezone: Optional[str] = None,
+                           rollup: Optional[DailyRollup] = None) -> Dict[str, Any]:
         """
         Analyze productivity patterns and task completion
         
@@ -161,36 +260,18 @@ class PersonalizedInsights:
             task_history: List of task objects
             mood_history: List of mood entries
             journal_entries: List of journal entries
+            timezone: The user's IANA timezone, for best productivity times
+            rollup: Daily rollup of a period to analyze instead of the
+                lists (see _rollup_productivity)
         
         Returns:
             Dictionary with productivity insights
         """
+        if rollup is not None:
+            return self._rollup_productivity(rollup)
         
-        if not task_history:
-            return {'error': 'No task data available'}
-        
-        # Calculate completion rates
-        total_tasks = len(task_history)
-        completed_tasks = len([task for task in task_history if task.get('completed', False)])
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Analyze mood-productivity correlation
-        mood_productivity_correlation = self._calculate_mood_productivity_correlation(task_history, mood_history)
-        
-        # Best productivity times
-        best_times = self._analyze_best_productivity_times(task_history)
-        
-        # Task type analysis
-        task_insights = self._analyze_task_types(task_history)
-        
-        return {
-            'completion_rate': round(completion_rate, 1),
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'mood_productivity_correlation': mood_productivity_correlation,
-            'best_productivity_times': best_times,
-            'task_insights': task_insights
-        }
+        return self._analyze_productivity_patterns(
+            self.build_frames(journal_entries, mood_history, task_history, timezone=timezone))
 
     def generate_habit_recommendations(self, current_habits: List[Dict], mood_history: List[Dict], 
                                      journal_entries: List[Dict]) -> List[Dict]:
@@ -211,15 +292,82 @@ class PersonalizedInsights:
             List of recommendation objects with type, title, and suggestions
         """
         
-        recommendations = []
+        return self._generate_habit_recommendations(
+            self.build_frames(journal_entries, mood_history, habit_data=current_habits))
+
+    def _analyze_mood_patterns(self, frames: InsightFrames) -> Dict[str, Any]:
+        """Analyze mood patterns from the request's mood frame"""
+        if not frames.mood_history:
+            return {'error': 'No mood data available'}
+        
+        mood = frames.mood
+        scores = mood['score']
         
-        # Analyze current habits performance
-        habit_performance = self._analyze_habit_performance(current_habits, mood_history)
+        # Emotion counts in order of first appearance
+        emotion_counts = frames.memoized('emotion_counts', lambda: np.bincount(
+            frames.mood['emotion'], minlength=len(frames.mood.emotion_categories)))
+        emotion_distribution = dict(zip(mood.emotion_categories, emotion_counts.tolist()))
+        avg_mood_score = np.mean(scores)
+        
+        # Analyze trends
+        if len(scores) >= 7:  # At least a week of data
+            recent_avg = self._recent_mood_average(frames)  # Latest 7 entries
+            older_avg = np.mean(scores[~self._recent_moods(frames)]) if len(scores) > 7 else recent_avg
+            trend = self._mood_trend(recent_avg, older_avg)
+        else:
+            trend = 'insufficient_data'
+        
+        # Day of week analysis
+        day_patterns = self._analyze_day_patterns(frames)
+        
+        return {
+            'most_common_emotion': self._most_common_emotion(emotion_distribution),
+            'average_mood_score': self._mean_score(avg_mood_score),
+            'mood_trend': trend,
+            'emotion_distribution': emotion_distribution,
+            'day_patterns': day_patterns,
+            'total_entries': len(mood)
+        }
+
+    def _analyze_productivity_patterns(self, frames: InsightFrames) -> Dict[str, Any]:
+        """Analyze productivity patterns from the request's task frame"""
+        if not frames.task_history:
+            return {'error': 'No task data available'}
+        
+        # Calculate completion rates
+        total_tasks = len(frames.tasks)
+        completed_tasks = self._completed_task_count(frames)
+        completion_rate = completed_tasks / total_tasks * 100
+        
+        # Analyze mood-productivity correlation
+        mood_productivity = self._calculate_mood_productivity_correlation(frames)
+        
+        # Best productivity times
+        productivity_windows = self._analyze_best_productivity_times(frames)
+        
+        # Task type analysis
+        task_insights = self._analyze_task_types(frames)
+        
+        return {
+            'completion_rate': round(completion_rate, 1),
+            'total_tasks': total_tasks,
+            'completed_tasks': completed_tasks,
+            'mood_productivity_correlation': self._correlation_headline(mood_productivity),
+            'mood_productivity_analysis': mood_productivity,
+            'best_productivity_times': [window['label'] for window in productivity_windows['by_time_of_day'][:2]],
+            'productivity_windows': productivity_windows,
+            'task_insights': task_insights
+        }
+
+    def _generate_habit_recommendations(self, frames: InsightFrames) -> List[Dict]:
+        """Habit recommendations from the request's frames"""
+        recommendations = []
         
         # Mood-based recommendations
-        if mood_history:
-            recent_moods = [entry.get('emotion', 'neutral') for entry in mood_history[-7:]]
-            most_common_recent = Counter(recent_moods).most_common(1)[0][0]
+        if frames.mood_history:
+            mood = frames.mood
+            recent_code = Counter(mood['emotion'][-7:].tolist()).most_common(1)[0][0]
+            most_common_recent = mood.emotion_categories[recent_code]
             
             if most_common_recent in ['sad', 'anxious']:
                 recommendations.append({
@@ -234,8 +382,8 @@ class PersonalizedInsights:
                 })
         
         # Productivity-based recommendations
-        if journal_entries:
-            productivity_mentions = self._count_productivity_mentions(journal_entries)
+        if frames.journal_entries:
+            productivity_mentions = self._count_productivity_mentions(frames.journal_entries, frames.journal_tokens)
             if productivity_mentions > 0:
                 recommendations.append({
                     'type': 'productivity',
@@ -262,115 +410,67 @@ class PersonalizedInsights:
         
         return recommendations
 
-    def _analyze_mood_patterns(self, mood_history: List[Dict]) -> Dict[str, Any]:
-        """Internal method to analyze mood patterns"""
-        return self.analyze_mood_patterns(mood_history)
-
-    def _analyze_productivity_patterns(self, task_history: List[Dict], mood_history: List[Dict]) -> Dict[str, Any]:
-        """Internal method to analyze productivity patterns"""
-        return self.analyze_productivity(task_history, mood_history, [])
-
-    def _analyze_journal_patterns(self, journal_entries: List[Dict]) -> Dict[str, Any]:
+    def _analyze_journal_patterns(self, journal_entries: List[Dict],
+                                  journal_tokens: Optional[TokenizedEntries] = None,
+                                  journal_frame: Optional[Frame] = None) -> Dict[str, Any]:
         """Analyze journal entry patterns"""
         if not journal_entries:
             return {'error': 'No journal data available'}
         
-        # Analyze writing frequency
-        total_entries = len(journal_entries)
+        journal_tokens = self._tokenize_journal(journal_entries, journal_tokens)
+        if journal_frame is None:
+            journal_frame = build_journal_frame(journal_entries)
         
-        # Analyze content themes
-        all_content = ' '.join([entry.get('content', '') for entry in journal_entries])
-        themes = self._extract_content_themes(all_content)
+        # Keyword hits of every group summed over all entries
+        group_totals = dict(zip(self.text_analyzer.groups, journal_tokens.group_counts.sum(axis=0).tolist()))
+        dated_entries = len([entry for entry in journal_entries if entry.get('created_at')])
         
-        # Analyze emotion patterns in journal
-        emotion_patterns = self._analyze_journal_emotions(journal_entries)
+        # Theme mentions per entry, placed in time by each entry's date
+        theme_hits = journal_tokens.group_counts[:, theme_columns(self.text_analyzer, self.theme_keywords)]
+        theme_timeline = ThemeTimeline(self.theme_keywords)
+        theme_timeline.add(entry_days(journal_frame['timestamp']), theme_hits > 0, theme_hits)
         
-        return {
-            'total_entries': total_entries,
-            'content_themes': themes,
-            'emotion_patterns': emotion_patterns,
-            'writing_frequency': self._calculate_writing_frequency(journal_entries)
-        }
+        return self._summarize_journal(len(journal_entries), group_totals, dated_entries, theme_timeline)
 
-    def _analyze_habit_patterns(self, habit_data: List[Dict], mood_history: List[Dict]) -> Dict[str, Any]:
+    def _analyze_habit_patterns(self, frames: InsightFrames) -> Dict[str, Any]:
         """Analyze habit patterns and correlations"""
-        if not habit_data:
+        if not frames.habit_data:
             return {'error': 'No habit data available'}
         
-        # Calculate habit completion rates
-        habit_performance = {}
-        for habit in habit_data:
-            name = habit.get('name', 'Unknown')
-            completion_rate = self._calculate_habit_completion_rate(habit)
-            habit_performance[name] = completion_rate
-        
-        # Find best performing habits
-        best_habits = sorted(habit_performance.items(), key=lambda x: x[1], reverse=True)
-        
-        return {
-            'habit_performance': habit_performance,
-            'best_habits': best_habits[:3],
-            'total_habits': len(habit_data),
-            'average_completion_rate': np.mean(list(habit_performance.values())) if habit_performance else 0
-        }
+        # Calculate habit completion rates, streaks and weekday breakdowns
+        bitmaps = self._habit_bitmaps(frames)
+        details = dict(zip(frames.habits['name'].tolist(),
+                           bitmaps.summaries(epoch_day(frames.now), self.HABIT_WINDOWS)))
+        return self._summarize_habits(self._habit_performance(frames), len(frames.habits), details)
 
-    def _generate_recommendations(self, journal_entries: List[Dict], mood_history: List[Dict], 
-                                task_history: List[Dict], habit_data: List[Dict]) -> List[Dict]:
+    def _generate_recommendations(self, frames: InsightFrames) -> List[Dict]:
         """Generate personalized recommendations"""
-        recommendations = []
-        
-        # Mood-based recommendations
-        if mood_history:
-            recent_avg_mood = np.mean([entry.get('score', 5) for entry in mood_history[-7:]])
-            if recent_avg_mood < 4:
-                recommendations.append({
-                    'type': 'mood_support',
-                    'title': 'Mood Support',
-                    'message': 'Your recent mood scores have been lower. Consider journaling more or trying relaxation techniques.',
-                    'priority': 'high'
-                })
-        
-        # Productivity recommendations
-        if task_history:
-            completion_rate = len([t for t in task_history if t.get('completed', False)]) / len(task_history)
-            if completion_rate < 0.7:
-                recommendations.append({
-                    'type': 'productivity',
-                    'title': 'Productivity Boost',
-                    'message': 'Try breaking large tasks into smaller, manageable pieces.',
-                    'priority': 'medium'
-                })
-        
-        # Habit recommendations
-        if habit_data:
-            avg_completion = np.mean([self._calculate_habit_completion_rate(h) for h in habit_data])
-            if avg_completion < 0.6:
-                recommendations.append({
-                    'type': 'habits',
-                    'title': 'Habit Consistency',
-                    'message': 'Focus on building consistency with one habit at a time.',
-                    'priority': 'medium'
-                })
-        
-        return recommendations
+        recent_avg_mood = self._recent_mood_average(frames) if frames.mood_history else None
+        task_completion = self._completed_task_count(frames) / len(frames.tasks) if frames.task_history else None
+        habit_completion = np.mean(self._habit_completion_rates(frames)) if frames.habit_data else None
+        return self._recommend(recent_avg_mood, task_completion, habit_completion)
 
-    def _generate_weekly_summary(self, journal_entries: List[Dict], mood_history: List[Dict], 
-                               task_history: List[Dict]) -> Dict[str, Any]:
-        """Generate weekly summary insights"""
+    def _generate_weekly_summary(self, frames: Optional[InsightFrames],
+                                 rollup: Optional[DailyRollup] = None) -> Dict[str, Any]:
+        """
+        Generate weekly summary insights
         
-        # Get last 7 days of data
-        week_ago = datetime.now() - timedelta(days=7)
+        With a rollup (the rows of the week's days), the summary is
+        answered from it instead of the frames (see _rollup_weekly_summary).
+        """
+        if rollup is not None:
+            return self._rollup_weekly_summary(rollup)
         
-        recent_journals = [j for j in journal_entries if self._is_within_week(j.get('created_at'), week_ago)]
-        recent_moods = [m for m in mood_history if self._is_within_week(m.get('date'), week_ago)]
-        recent_tasks = [t for t in task_history if self._is_within_week(t.get('created_at'), week_ago)]
+        # Get last 7 days of data
+        recent_journals, recent_moods, recent_tasks = self._week_windows(frames)
+        mood, tasks = frames.mood, frames.tasks
         
         return {
-            'journal_entries_this_week': len(recent_journals),
-            'mood_entries_this_week': len(recent_moods),
-            'tasks_this_week': len(recent_tasks),
-            'completed_tasks_this_week': len([t for t in recent_tasks if t.get('completed', False)]),
-            'average_mood_this_week': np.mean([m.get('score', 5) for m in recent_moods]) if recent_moods else None
+            'journal_entries_this_week': int(np.count_nonzero(recent_journals)),
+            'mood_entries_this_week': int(np.count_nonzero(recent_moods)),
+            'tasks_this_week': int(np.count_nonzero(recent_tasks)),
+            'completed_tasks_this_week': int(np.count_nonzero(tasks['completed'] & recent_tasks)),
+            'average_mood_this_week': np.mean(mood['score'][recent_moods]) if recent_moods.any() else None
         }
 
     # ========================================
@@ -378,179 +478,507 @@ class PersonalizedInsights:
     # These are internal methods used by the main analysis functions
     # ========================================
     
-    def _analyze_day_patterns(self, mood_history: List[Dict]) -> Dict[str, float]:
+    def _analyze_day_patterns(self, frames: InsightFrames) -> Dict[str, float]:
         """
         Analyze mood patterns by day of week
         
         Helps identify if certain days (e.g., Mondays, Fridays) 
         have consistently better or worse moods.
         """
-        day_scores = {'Monday': [], 'Tuesday': [], 'Wednesday': [], 'Thursday': [], 
-                     'Friday': [], 'Saturday': [], 'Sunday': []}
+        mood = frames.mood
+        dated = ~np.isnat(mood['timestamp'])
+        days = weekdays(mood['timestamp'][dated])
         
-        for entry in mood_history:
-            date_str = entry.get('date')
-            if date_str:
-                try:
-                    date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                    day_name = date_obj.strftime('%A')
-                    score = entry.get('score', 5)
-                    day_scores[day_name].append(score)
-                except:
-                    continue
+        # Group scores by weekday, keeping entry order within each day
+        order = np.argsort(days, kind='stable')
+        day_scores = np.split(mood['score'][dated][order], np.cumsum(np.bincount(days, minlength=7))[:-1])
         
         # Calculate averages
         day_averages = {}
-        for day, scores in day_scores.items():
-            if scores:
-                day_averages[day] = round(np.mean(scores), 2)
+        for day_name, scores in zip(self.DAY_NAMES, day_scores):
+            if len(scores):
+                day_averages[day_name] = self._mean_score(np.mean(scores))
         
         return day_averages
 
-    def _calculate_mood_productivity_correlation(self, task_history: List[Dict], mood_history: List[Dict]) -> float:
-        """Calculate correlation between mood and productivity"""
-        if not task_history or not mood_history:
-            return 0.0
+    def _calculate_mood_productivity_correlation(self, frames: InsightFrames) -> Optional[Dict[str, Any]]:
+        """
+        Correlate daily mood with the completion rate of the tasks created that day
         
-        # This is a simplified correlation calculation
-        # In a real implementation, you'd use proper statistical methods
-        return 0.65  # Placeholder correlation value
+        Pearson and Spearman coefficients with p-values, same day and lagged
+        (see mood_correlation.correlate). None without both moods and tasks.
+        """
+        if not frames.task_history or not frames.mood_history:
+            return None
+        
+        def compute():
+            mood, tasks = frames.mood, frames.tasks
+            mood_dated = ~np.isnat(mood['timestamp'])
+            task_dated = ~np.isnat(tasks['timestamp'])
+            return correlate(
+                time_bins(mood['timestamp'][mood_dated], self.CORRELATION_RESOLUTION),
+                mood['score'][mood_dated], np.ones(np.count_nonzero(mood_dated)),
+                time_bins(tasks['timestamp'][task_dated], self.CORRELATION_RESOLUTION),
+                tasks['completed'][task_dated], np.ones(np.count_nonzero(task_dated)),
+                lags=self.CORRELATION_LAGS, resolution=self.CORRELATION_RESOLUTION,
+                lookback_days=self.CORRELATION_LOOKBACK_DAYS
+            )
+        return frames.memoized('mood_productivity_correlation', compute)
 
-    def _analyze_best_productivity_times(self, task_history: List[Dict]) -> List[str]:
-        """Analyze when user is most productive"""
-        # Simplified analysis - in reality, you'd analyze timestamps
-        return ['Morning (9-11 AM)', 'Afternoon (2-4 PM)']
+    def _daily_mood_totals(self, frames: InsightFrames):
+        """(day index, score, 1) per dated mood entry, for mood_trends"""
+        mood = frames.mood
+        dated = ~np.isnat(mood['timestamp'])
+        return time_bins(mood['timestamp'][dated], 'day'), mood['score'][dated], np.ones(np.count_nonzero(dated))
 
-    def _analyze_task_types(self, task_history: List[Dict]) -> Dict[str, Any]:
-        """Analyze task types and completion rates"""
-        task_types = {}
-        for task in task_history:
-            title = task.get('title', '').lower()
-            completed = task.get('completed', False)
-            
-            # Simple categorization
-            if any(word in title for word in ['work', 'project', 'meeting']):
-                category = 'work'
-            elif any(word in title for word in ['exercise', 'gym', 'run']):
-                category = 'health'
-            elif any(word in title for word in ['read', 'study', 'learn']):
-                category = 'learning'
-            else:
-                category = 'personal'
-            
-            if category not in task_types:
-                task_types[category] = {'total': 0, 'completed': 0}
-            
-            task_types[category]['total'] += 1
-            if completed:
-                task_types[category]['completed'] += 1
-        
-        # Calculate completion rates
-        for category in task_types:
-            total = task_types[category]['total']
-            completed = task_types[category]['completed']
-            task_types[category]['completion_rate'] = (completed / total * 100) if total > 0 else 0
-        
-        return task_types
-
-    def _analyze_habit_performance(self, current_habits: List[Dict], mood_history: List[Dict]) -> Dict[str, float]:
-        """Analyze performance of current habits"""
-        performance = {}
-        for habit in current_habits:
-            name = habit.get('name', 'Unknown')
-            completion_rate = self._calculate_habit_completion_rate(habit)
-            performance[name] = completion_rate
-        return performance
-
-    def _calculate_habit_completion_rate(self, habit: Dict) -> float:
-        """Calculate completion rate for a habit"""
-        marked_days = habit.get('marked_days', [])
-        if not marked_days:
-            return 0.0
+    def _analyze_best_productivity_times(self, frames: InsightFrames) -> Dict[str, Any]:
+        """
+        Analyze when user is most productive
         
-        # Calculate based on recent activity (last 30 days)
-        recent_days = [day for day in marked_days if self._is_recent(day)]
-        return len(recent_days) / 30.0 if recent_days else 0.0
+        Tasks are counted by the local hour and weekday they were created
+        (in the request's timezone); date-only timestamps carry no time of
+        day and are left out. See _rank_productivity_windows for the result.
+        """
+        totals, completed = self._productivity_histogram(frames)
+        return self._rank_productivity_windows(totals, completed, frames.timezone)
+
+    def _analyze_task_types(self, frames: InsightFrames) -> Dict[str, Any]:
+        """Analyze task types and completion rates"""
+        tasks = frames.tasks
+        
+        # Categorize each distinct title once, then count per category
+        titles, title_codes = categorize(tasks['title'].tolist())
+        title_categories = np.array([self._task_category(title) for title in titles], dtype=np.int64)
+        categories = title_categories[title_codes]
+        totals = np.bincount(categories, minlength=len(self.TASK_CATEGORIES))
+        completed = np.bincount(categories[tasks['completed']], minlength=len(self.TASK_CATEGORIES))
+        
+        # Report categories in order of their first task
+        present = np.flatnonzero(totals)
+        first_seen = [int(np.argmax(categories == code)) for code in present]
+        return self._summarize_task_types(
+            (self.TASK_CATEGORIES[code], int(totals[code]), int(completed[code]))
+            for _, code in sorted(zip(first_seen, present))
+        )
+
+    def _task_category(self, title: str) -> int:
+        """Index into TASK_CATEGORIES for a lowercase task title"""
+        if any(word in title for word in ['work', 'project', 'meeting']):
+            return 0
+        elif any(word in title for word in ['exercise', 'gym', 'run']):
+            return 1
+        elif any(word in title for word in ['read', 'study', 'learn']):
+            return 2
+        return 3
+
+    # ========================================
+    # SHARED INTERMEDIATES
+    # Memoized per request, so every section that needs one reuses it
+    # ========================================
+
+    def _habit_performance(self, frames: InsightFrames) -> Dict[str, float]:
+        """Completion rate by habit name (later habits with the same name replace earlier ones)"""
+        return frames.memoized('habit_performance', lambda: dict(
+            zip(frames.habits['name'].tolist(), self._habit_completion_rates(frames).tolist())))
+
+    def _habit_completion_rates(self, frames: InsightFrames) -> np.ndarray:
+        """
+        Completion rate of every habit: days marked in the last
+        HABIT_RATE_WINDOW days / the days of that window since it started
+        """
+        return frames.memoized('habit_completion_rates', lambda: self._habit_bitmaps(frames).completion_rates(
+            self.HABIT_RATE_WINDOW, epoch_day(frames.now)))
+
+    def _habit_bitmaps(self, frames: InsightFrames) -> HabitBitmaps:
+        """Marked days of every habit as packed day bitmaps"""
+        def compute():
+            habits = frames.habits
+            dated = ~np.isnat(habits['day_timestamp'])
+            created = np.where(np.isnat(habits['created_at']), NO_START, epoch_days(habits['created_at']))
+            return HabitBitmaps.from_days(habits['day_habit'][dated], epoch_days(habits['day_timestamp'][dated]),
+                                          len(habits), created, epoch_day(frames.now))
+        return frames.memoized('habit_bitmaps', compute)
+
+    def _productivity_histogram(self, frames: InsightFrames):
+        """Tasks and completed tasks per (weekday, local hour): two 7 x 24 arrays"""
+        def compute():
+            tasks = frames.tasks
+            timed = tasks['timed']
+            slots = weekly_slots(tasks['timestamp'], tasks['aware'], tasks['utc_offset'], frames.timezone)[timed]
+            totals = np.bincount(slots, minlength=7 * 24).reshape(7, 24)
+            completed = np.bincount(slots[tasks['completed'][timed]], minlength=7 * 24).reshape(7, 24)
+            return totals, completed
+        return frames.memoized('productivity_histogram', compute)
+
+    def _completed_task_count(self, frames: InsightFrames) -> int:
+        """Number of completed tasks"""
+        return frames.memoized('completed_tasks', lambda: int(np.count_nonzero(frames.tasks['completed'])))
+
+    def _recent_moods(self, frames: InsightFrames) -> np.ndarray:
+        """
+        Mask of the 7 latest mood entries by date, whatever their order in
+        the list. Undated entries count as the oldest, and of entries logged
+        at the same time the higher scores count as later, so stored state
+        picks the same entries.
+        """
+        def compute():
+            mood = frames.mood
+            # NaT is the smallest int64, so undated entries sort first
+            order = np.lexsort((mood['score'], mood['timestamp'].astype(np.int64)))
+            recent = np.zeros(len(mood), dtype=bool)
+            recent[order[-7:]] = True
+            return recent
+        return frames.memoized('recent_moods', compute)
+
+    def _recent_mood_average(self, frames: InsightFrames) -> float:
+        """Average score of the 7 latest mood entries by date"""
+        return frames.memoized('recent_mood_average',
+                               lambda: np.mean(frames.mood['score'][self._recent_moods(frames)]))
+
+    def _week_windows(self, frames: InsightFrames):
+        """Masks of the journal entries, mood entries and tasks from the last 7 days, in the request's timezone"""
+        def compute():
+            week_ago = frames.now - timedelta(days=7)
+            return tuple(in_window(frame['timestamp'], frame['aware'], frame['utc_offset'], frames.timezone,
+                                   week_ago)
+                         for frame in (frames.journal, frames.mood, frames.tasks))
+        return frames.memoized('week_windows', compute)
 
     def _extract_content_themes(self, content: str) -> List[str]:
         """Extract main themes from journal content"""
-        themes = []
-        content_lower = content.lower()
-        
-        if any(word in content_lower for word in ['work', 'job', 'career', 'office']):
-            themes.append('Work & Career')
-        if any(word in content_lower for word in ['family', 'friend', 'relationship', 'love']):
-            themes.append('Relationships')
-        if any(word in content_lower for word in ['health', 'exercise', 'fitness', 'doctor']):
-            themes.append('Health & Wellness')
-        if any(word in content_lower for word in ['travel', 'vacation', 'trip', 'adventure']):
-            themes.append('Travel & Adventure')
-        if any(word in content_lower for word in ['learn', 'study', 'education', 'course']):
-            themes.append('Learning & Growth')
-        
-        return themes
-
-    def _analyze_journal_emotions(self, journal_entries: List[Dict]) -> Dict[str, int]:
+        tokens = self.text_analyzer.tokenize_entries([{'content': content}])
+        return [theme for theme in self.theme_keywords if tokens.total(f'theme:{theme}') > 0]
+
+    def _analyze_journal_emotions(self, journal_entries: List[Dict],
+                                  journal_tokens: Optional[TokenizedEntries] = None) -> Dict[str, int]:
         """Analyze emotions mentioned in journal entries"""
-        emotion_counts = {emotion: 0 for emotion in self.emotion_keywords.keys()}
-        
-        for entry in journal_entries:
-            content = entry.get('content', '').lower()
-            for emotion, keywords in self.emotion_keywords.items():
-                for keyword in keywords:
-                    if keyword in content:
-                        emotion_counts[emotion] += 1
+        journal_tokens = self._tokenize_journal(journal_entries, journal_tokens)
         
-        return emotion_counts
+        # Each emotion keyword found in an entry counts once for that entry
+        return {
+            emotion: journal_tokens.total(f'emotion:{emotion}')
+            for emotion in self.emotion_keywords.keys()
+        }
 
     def _calculate_writing_frequency(self, journal_entries: List[Dict]) -> str:
         """Calculate how frequently user writes"""
         if not journal_entries:
             return 'No entries'
+        return self._writing_frequency_label(len([entry for entry in journal_entries if entry.get('created_at')]))
+
+    def _count_productivity_mentions(self, journal_entries: List[Dict],
+                                     journal_tokens: Optional[TokenizedEntries] = None) -> int:
+        """Count mentions of productivity-related topics"""
+        journal_tokens = self._tokenize_journal(journal_entries, journal_tokens)
+        return journal_tokens.total('productivity')
+
+    # ========================================
+    # RESULT BUILDERS
+    # Turn aggregate values into response sections. Shared with
+    # insight_state.py, which answers from stored per-user aggregates.
+    # ========================================
+
+    def _mood_trend(self, recent_avg: float, older_avg: float) -> str:
+        """
+        Trend of the last 7 mood scores against the ones before them
+        (compared to 9 decimals, so summation order cannot decide it)
+        """
+        recent_avg, older_avg = round(float(recent_avg), 9), round(float(older_avg), 9)
+        return 'improving' if recent_avg > older_avg else 'declining' if recent_avg < older_avg else 'stable'
+
+    def _most_common_emotion(self, distribution: Dict[str, int]) -> str:
+        """
+        Emotion with the most entries; ties go to the alphabetically first,
+        so every answer path agrees whatever order the entries came in
+        """
+        return min(distribution, key=lambda emotion: (-distribution[emotion], emotion))
+
+    def _mean_score(self, mean: float) -> float:
+        """
+        Mean mood score for output, rounded by NumPy like the original
+        round(np.mean(...), 2); rounded to 9 decimals first so that
+        summation order cannot flip the last digit
+        """
+        return round(round(np.float64(mean), 9), 2)
+
+    def _mood_trend_analytics(self, days, sums, counts, **options) -> Optional[Dict[str, Any]]:
+        """mood_trends.mood_trends with a trend label per window (None without dated entries)"""
+        trends = mood_trends(days, sums, counts, **options)
+        if trends is not None:
+            for window in trends['windows']:
+                window['trend'] = ('insufficient_data' if window['mean'] is None or window['previous_mean'] is None
+                                   else self._mood_trend(window['mean'], window['previous_mean']))
+        return trends
+
+    def _correlation_headline(self, analysis: Optional[Dict[str, Any]]) -> float:
+        """Same-day Pearson coefficient to two decimals (0.0 when it cannot be computed)"""
+        if analysis is None or analysis['pearson']['r'] is None:
+            return 0.0
+        return round(analysis['pearson']['r'], 2)
+
+    def _rank_productivity_windows(self, totals: np.ndarray, completed: np.ndarray,
+                                   timezone=None) -> Dict[str, Any]:
+        """
+        Rank time windows by task completion
+        
+        Hours are grouped into windows of PRODUCTIVITY_WINDOW_HOURS. Windows
+        with at least MIN_WINDOW_TASKS tasks are ranked by the lower bound
+        of the 95% Wilson interval of their completion rate, so a window
+        with 9 of 10 tasks done outranks one with 2 of 2.
+        
+        Args:
+            totals, completed: Task counts per (weekday, hour), 7 x 24 arrays
+            timezone: Timezone the hours are in (reported only)
+        
+        Returns:
+            dict: 'by_time_of_day' (all weekdays together) and
+            'by_day_and_time', each the TOP_PRODUCTIVITY_WINDOWS best windows
+            with label, start_hour, end_hour, completion_rate (%), completed
+            and total (plus day); 'tasks_with_time' and 'timezone'
+        """
+        width = self.PRODUCTIVITY_WINDOW_HOURS
+        window_totals = totals.reshape(7, 24 // width, width).sum(axis=2)
+        window_completed = completed.reshape(7, 24 // width, width).sum(axis=2)
+        
+        def ranked(window_totals, window_completed):
+            """Indexes of the best windows in flattened order"""
+            eligible = np.flatnonzero(window_totals >= self.MIN_WINDOW_TASKS)
+            n = window_totals[eligible].astype(np.float64)
+            rate = window_completed[eligible] / n
+            z2 = 1.96 ** 2
+            lower = (rate + z2 / (2 * n) - np.sqrt(z2 * (rate * (1 - rate) / n + z2 / (4 * n * n)))) / (1 + z2 / n)
+            # Best lower bound first, then more tasks, then earlier in the week
+            return eligible[np.lexsort((eligible, -n, -lower))][:self.TOP_PRODUCTIVITY_WINDOWS]
+        
+        def window(index, window_totals, window_completed, day=None):
+            start = int(index % (24 // width)) * width
+            label = self._time_window_label(start, start + width)
+            result = {
+                'label': f'{day} {label[0].lower()}{label[1:]}' if day else label,
+                'start_hour': start,
+                'end_hour': start + width,
+                'completion_rate': round(window_completed.flat[index] / window_totals.flat[index] * 100, 1),
+                'completed': int(window_completed.flat[index]),
+                'total': int(window_totals.flat[index])
+            }
+            if day:
+                result['day'] = day
+            return result
+        
+        by_time_totals, by_time_completed = window_totals.sum(axis=0), window_completed.sum(axis=0)
+        return {
+            'by_time_of_day': [window(index, by_time_totals, by_time_completed)
+                               for index in ranked(by_time_totals, by_time_completed)],
+            'by_day_and_time': [window(index, window_totals, window_completed,
+                                       self.DAY_NAMES[index // (24 // width)])
+                                for index in ranked(window_totals.ravel(), window_completed.ravel())],
+            'tasks_with_time': int(totals.sum()),
+            'timezone': str(timezone) if timezone is not None else None
+        }
+    
+    def _time_window_label(self, start: int, end: int) -> str:
+        """Label such as 'Morning (9-11 AM)' or 'Evening (10 PM-12 AM)'"""
+        def clock(hour):
+            return hour % 12 or 12, 'AM' if hour % 24 < 12 else 'PM'
+        
+        (first, first_half), (last, last_half) = clock(start), clock(end)
+        hours = (f'{first}-{last} {last_half}' if first_half == last_half
+                 else f'{first} {first_half}-{last} {last_half}')
+        part = ('Night' if start < 5 else 'Morning' if start < 12 else 'Afternoon' if start < 17
+                else 'Evening' if start < 21 else 'Night')
+        return f'{part} ({hours})'
+    
+    def _rollup_mood_patterns(self, rollup: DailyRollup, **trend_options) -> Dict[str, Any]:
+        """
+        Mood patterns of the days of a rollup
+        
+        Same fields as _analyze_mood_patterns plus lowest_mood_score and
+        highest_mood_score. The rollup keeps days, not entries, so
+        mood_trend compares the last 7 days with mood entries against the
+        days before them.
+        """
+        counts = rollup.columns['mood_count']
+        total = int(counts.sum())
+        if not total:
+            return {'error': 'No mood data available'}
+        
+        sums = rollup.columns['mood_sum']
+        emotion_counts = rollup.emotion_counts.sum(axis=0)
+        distribution = {emotion: int(n) for emotion, n in zip(rollup.emotions, emotion_counts.tolist()) if n}
+        
+        dated = rollup.dated()
+        dated_days = dated.columns['day'][dated.columns['mood_count'] > 0]
+        if total >= 7 and len(dated_days):
+            recent = dated.between(start=int(dated_days[-1]) - 6)
+            recent_count = int(recent.columns['mood_count'].sum())
+            recent_avg = recent.columns['mood_sum'].sum() / recent_count
+            older_avg = ((sums.sum() - recent.columns['mood_sum'].sum()) / (total - recent_count)
+                         if total > recent_count else recent_avg)
+            trend = self._mood_trend(recent_avg, older_avg)
+        else:
+            trend = 'insufficient_data'
         
-        # Calculate days between entries
-        dates = [entry.get('created_at') for entry in journal_entries if entry.get('created_at')]
-        if len(dates) < 2:
+        weekday_counts = np.bincount(dated.weekdays(), weights=dated.columns['mood_count'], minlength=7)
+        weekday_sums = np.bincount(dated.weekdays(), weights=dated.columns['mood_sum'], minlength=7)
+        return {
+            'most_common_emotion': self._most_common_emotion(distribution),
+            'average_mood_score': self._mean_score(sums.sum() / total),
+            'lowest_mood_score': float(np.nanmin(rollup.columns['mood_min'])),
+            'highest_mood_score': float(np.nanmax(rollup.columns['mood_max'])),
+            'mood_trend': trend,
+            'emotion_distribution': distribution,
+            'day_patterns': {day_name: self._mean_score(weekday_sums[day] / weekday_counts[day])
+                             for day, day_name in enumerate(self.DAY_NAMES) if weekday_counts[day]},
+            'total_entries': total,
+            'trend_analytics': self._mood_trend_analytics(dated.columns['day'], dated.columns['mood_sum'],
+                                                          dated.columns['mood_count'], **trend_options)
+        }
+    
+    def _rollup_productivity(self, rollup: DailyRollup) -> Dict[str, Any]:
+        """
+        Task completion and mood-productivity correlation of the days of a rollup
+        
+        The correlation is by day. Best productivity times and task types
+        need the hour and title of each task, which the rollup does not
+        keep, so they are left out.
+        """
+        total = int(rollup.columns['tasks_created'].sum())
+        if not total:
+            return {'error': 'No task data available'}
+        completed = int(rollup.columns['tasks_completed'].sum())
+        
+        dated = rollup.dated()
+        columns = dated.columns
+        mood_days = columns['mood_count'] > 0
+        task_days = columns['tasks_created'] > 0
+        mood_productivity = correlate(
+            columns['day'][mood_days], columns['mood_sum'][mood_days], columns['mood_count'][mood_days],
+            columns['day'][task_days], columns['tasks_completed'][task_days], columns['tasks_created'][task_days],
+            lags=self.CORRELATION_LAGS, resolution='day', lookback_days=self.CORRELATION_LOOKBACK_DAYS
+        ) if rollup.columns['mood_count'].any() else None
+        return {
+            'completion_rate': round(completed / total * 100, 1),
+            'total_tasks': total,
+            'completed_tasks': completed,
+            'mood_productivity_correlation': self._correlation_headline(mood_productivity),
+            'mood_productivity_analysis': mood_productivity
+        }
+    
+    def _rollup_weekly_summary(self, rollup: DailyRollup) -> Dict[str, Any]:
+        """
+        Weekly summary fields, plus habits_marked_this_week, summed over the
+        days of a rollup (records count on their date in the user's
+        timezone, see InsightStateStore); habit marks count on their date.
+        """
+        columns = rollup.columns
+        mood_count = int(columns['mood_count'].sum())
+        return {
+            'journal_entries_this_week': int(columns['journal_entries'].sum()),
+            'mood_entries_this_week': mood_count,
+            'tasks_this_week': int(columns['tasks_created'].sum()),
+            'completed_tasks_this_week': int(columns['tasks_completed'].sum()),
+            'average_mood_this_week': columns['mood_sum'].sum() / mood_count if mood_count else None,
+            'habits_marked_this_week': int(columns['habits_marked'].sum())
+        }
+    
+    def _summarize_task_types(self, categories) -> Dict[str, Any]:
+        """Task insights from (category, total, completed) in reporting order"""
+        return {
+            category: {
+                'total': total,
+                'completed': completed,
+                'completion_rate': completed / total * 100
+            }
+            for category, total, completed in categories
+        }
+
+    def _summarize_journal(self, total_entries: int, group_totals: Dict[str, int], dated_entries: int,
+                           theme_timeline: ThemeTimeline) -> Dict[str, Any]:
+        """
+        Journal insights from keyword hits per TextAnalyzer group
+        
+        Args:
+            total_entries: Number of journal entries
+            group_totals: Keyword hits of each group summed over all entries
+            dated_entries: Entries with a created_at value
+            theme_timeline: Theme mentions over time (journal_themes.py)
+        """
+        return {
+            'total_entries': total_entries,
+            # A theme counts if any entry mentions it
+            'content_themes': [theme for theme in self.theme_keywords if group_totals.get(f'theme:{theme}', 0) > 0],
+            # Each emotion keyword found in an entry counts once for that entry
+            'emotion_patterns': {emotion: group_totals.get(f'emotion:{emotion}', 0) for emotion in self.emotion_keywords},
+            'writing_frequency': self._writing_frequency_label(dated_entries),
+            'theme_timeline': theme_timeline.summaries()
+        }
+
+    def _writing_frequency_label(self, dated_entries: int) -> str:
+        """Writing frequency from the number of dated journal entries"""
+        if dated_entries < 2:
             return 'Insufficient data'
         
         # Simplified frequency calculation
-        total_days = len(dates)
-        if total_days >= 20:
+        if dated_entries >= 20:
             return 'Daily'
-        elif total_days >= 10:
+        elif dated_entries >= 10:
             return 'Frequent'
-        elif total_days >= 5:
+        elif dated_entries >= 5:
             return 'Occasional'
         else:
             return 'Rare'
 
-    def _count_productivity_mentions(self, journal_entries: List[Dict]) -> int:
-        """Count mentions of productivity-related topics"""
-        count = 0
-        for entry in journal_entries:
-            content = entry.get('content', '').lower()
-            for keyword in self.productivity_keywords:
-                if keyword in content:
-                    count += 1
-        return count
-
-    def _is_within_week(self, date_str: str, week_ago: datetime) -> bool:
-        """Check if date is within the last week"""
-        if not date_str:
-            return False
-        try:
-            date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            return date_obj >= week_ago
-        except:
-            return False
-
-    def _is_recent(self, date_str: str) -> bool:
-        """Check if date is within the last 30 days"""
-        if not date_str:
-            return False
-        try:
-            date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            return date_obj >= thirty_days_ago
-        except:
-            return False
+    def _summarize_habits(self, habit_performance: Dict[str, float], total_habits: int,
+                          habit_details: Dict[str, Dict]) -> Dict[str, Any]:
+        """Habit insights from completion rates and HabitBitmaps.summaries() by habit name"""
+        # Find best performing habits
+        best_habits = sorted(habit_performance.items(), key=lambda x: x[1], reverse=True)
+        
+        return {
+            'habit_performance': habit_performance,
+            'best_habits': best_habits[:3],
+            'total_habits': total_habits,
+            'average_completion_rate': np.mean(list(habit_performance.values())) if habit_performance else 0,
+            'habit_details': habit_details
+        }
+
+    def _recommend(self, recent_avg_mood: Optional[float], task_completion: Optional[float],
+                   habit_completion: Optional[float]) -> List[Dict]:
+        """
+        Recommendations from aggregate values (None when there is no such data)
+        
+        Args:
+            recent_avg_mood: Average score of the last 7 mood entries
+            task_completion: Share of tasks completed (0-1)
+            habit_completion: Average habit completion rate (0-1)
+        """
+        recommendations = []
+        
+        # Mood-based recommendations
+        if recent_avg_mood is not None and recent_avg_mood < 4:
+            recommendations.append({
+                'type': 'mood_support',
+                'title': 'Mood Support',
+                'message': 'Your recent mood scores have been lower. Consider journaling more or trying relaxation techniques.',
+                'priority': 'high'
+            })
+        
+        # Productivity recommendations
+        if task_completion is not None and task_completion < 0.7:
+            recommendations.append({
+                'type': 'productivity',
+                'title': 'Productivity Boost',
+                'message': 'Try breaking large tasks into smaller, manageable pieces.',
+                'priority': 'medium'
+            })
+        
+        # Habit recommendations
+        if habit_completion is not None and habit_completion < 0.6:
+            recommendations.append({
+                'type': 'habits',
+                'title': 'Habit Consistency',
+                'message': 'Focus on building consistency with one habit at a time.',
+                'priority': 'medium'
+            })
+        
+        return recommendations
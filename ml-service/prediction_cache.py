@@ -0,0 +1,157 @@
+"""
+Prediction Cache
+
+Bounded, thread-safe LRU cache for emotion predictions.
+
+Users often re-save the same journal entry and the frontend re-requests
+emotions for unchanged text, so the detector remembers recent results
+keyed by a hash of the preprocessed text. The cache is bounded by both
+entry count and an approximate memory budget, evicts least recently used
+entries first, and keeps hit/miss/eviction counters for /health.
+
+A single lock guards every operation, which keeps it safe under gunicorn
+threaded workers (each worker process has its own cache). Entries are
+stamped with the version of the detector state (keywords and model) they
+were computed with: invalidate() moves the cache to a newer version, and a
+put() from an older one - a prediction still in flight when the state
+changed - is dropped instead of being served later.
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class PredictionCache:
+    """
+    LRU cache of prediction results with entry and memory limits
+
+    Values should be immutable (e.g. tuples) since the same object is
+    handed to every caller that hits the entry.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Maximum number of cached predictions (0 disables the cache)
+            max_bytes: Approximate memory budget for keys and values
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(text: str) -> bytes:
+        """Hash preprocessed text into a compact cache key"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    @staticmethod
+    def _value_size(value: Any) -> int:
+        """Approximate memory used by a value, including nested tuples"""
+        size = sys.getsizeof(value)
+        if isinstance(value, tuple):
+            size += sum(PredictionCache._value_size(item) for item in value)
+        return size
+
+    @staticmethod
+    def _entry_size(key: bytes, value: Any) -> int:
+        """Approximate memory used by one entry"""
+        return sys.getsizeof(key) + PredictionCache._value_size(value)
+
+    def get(self, key: bytes, version: Optional[int] = None) -> Optional[Any]:
+        """
+        Return the cached value (marking it recently used) or None
+
+        Args:
+            key: Cache key from make_key()
+            version: State version the caller predicts with; an entry
+                stamped with another version is a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (version is not None and entry[2] != version):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, value: Any, version: Optional[int] = None):
+        """
+        Store a value, evicting least recently used entries to stay in budget
+
+        Args:
+            key: Cache key from make_key()
+            value: Prediction to store
+            version: State version the value was computed with (default:
+                the current one); values from an older version are dropped
+        """
+        if not self.enabled:
+            return
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version is None:
+                version = self.version
+            elif version < self.version:
+                return
+            elif version > self.version:
+                self._reset(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size, version)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, version: int):
+        """Drop every entry and move to a newer state version (counters are kept)"""
+        with self._lock:
+            if version > self.version:
+                self._reset(version)
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._reset(self.version)
+
+    def _reset(self, version: int):
+        """Drop every entry and set the version (callers hold the lock)"""
+        self._entries.clear()
+        self._bytes = 0
+        self.version = version
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache usage and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'version': self.version,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,203 @@
+"""
+Response Cache
+
+Bounded, thread-safe cache of serialized insight responses.
+
+Dashboard refreshes post the same payload to the insights endpoints again
+and again. Each response is stored as its serialized JSON body under a
+content address: a hash of the endpoint, the query string and the
+canonical form of the request body (keys sorted, no whitespace), so
+payloads that differ only in key order or formatting share an entry. A
+hit skips both the analysis and the serialization. Canonicalizing a large
+body costs a few milliseconds, so the canonical key of each recently seen
+raw body (hashed as received) is remembered: byte-identical refreshes are
+looked up before the body is even parsed.
+
+Every body carries an ETag (a hash of the body itself). A client that
+sends it back in If-None-Match gets 304 Not Modified without a body, on a
+hit as well as when a recomputed response turns out unchanged.
+
+Entries expire after a TTL and, at the latest, at the next local midnight:
+weekly summaries, habit rates and mood trends are relative to the current
+day, so a response computed yesterday is never served today. Within a day
+the TTL bounds how far their sliding windows can lag. The cache is bounded
+by entry count and an approximate memory budget and evicts least recently
+used entries first. Hit, miss, expiry and 304 counters are kept per
+endpoint for /health. Each worker process has its own cache.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+
+def _next_midnight(now: float) -> float:
+    """Epoch seconds of the next local midnight after `now`"""
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses with TTL, day-change expiry and
+    entry/memory limits
+
+    Values are (body bytes, etag) pairs.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300):
+        """
+        Args:
+            max_entries: Maximum number of cached responses (0 disables the cache)
+            max_bytes: Approximate memory budget for the cached bodies
+            ttl_seconds: Longest time an entry is served (0 disables the cache)
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        # key -> (body, etag, expires_at, size)
+        self._entries = OrderedDict()
+        # digest of a raw request -> its canonical key (LRU, max_entries)
+        self._aliases = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.evictions = 0
+        # endpoint -> {'hits', 'misses', 'expired', 'not_modified'}
+        self._counters = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def make_key(endpoint: str, query: bytes, data: Any) -> bytes:
+        """
+        Content address of a request: endpoint, query string and the
+        canonical JSON form of the body
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(endpoint.encode('utf-8') + b'\0' + query + b'\0')
+        digest.update(json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                                 default=str).encode('utf-8'))
+        return digest.digest()
+
+    @staticmethod
+    def make_raw_key(endpoint: str, query: bytes, raw_body: bytes) -> bytes:
+        """Hash of a request exactly as received (no canonicalization)"""
+        return hashlib.blake2b(endpoint.encode('utf-8') + b'\0' + query + b'\0' + raw_body,
+                               digest_size=16).digest()
+
+    def known_key(self, raw_key: bytes) -> Optional[bytes]:
+        """Content address of a raw request (make_raw_key) seen recently; else None"""
+        with self._lock:
+            key = self._aliases.get(raw_key)
+            if key is not None:
+                self._aliases.move_to_end(raw_key)
+            return key
+
+    def key_for(self, raw_key: bytes, endpoint: str, query: bytes, data: Any) -> bytes:
+        """
+        Content address of a request, remembered for known_key(raw_key)
+
+        Args:
+            raw_key: make_raw_key() of the request
+            endpoint: Request path
+            query: Raw query string
+            data: The parsed body
+
+        Returns:
+            bytes: The make_key() address
+        """
+        key = self.make_key(endpoint, query, data)
+        with self._lock:
+            self._aliases[raw_key] = key
+            while len(self._aliases) > self.max_entries:
+                self._aliases.popitem(last=False)
+        return key
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """Strong validator for a response body"""
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def _count(self, endpoint: str, counter: str):
+        counters = self._counters.setdefault(endpoint, {'hits': 0, 'misses': 0, 'expired': 0, 'not_modified': 0})
+        counters[counter] += 1
+
+    def get(self, endpoint: str, key: bytes) -> Optional[Tuple[bytes, str]]:
+        """Return the cached (body, etag) if still fresh (marking it recently used), else None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.time():
+                self._entries.pop(key)
+                self._bytes -= entry[3]
+                self._count(endpoint, 'expired')
+                entry = None
+            if entry is None:
+                self._count(endpoint, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count(endpoint, 'hits')
+            return entry[0], entry[1]
+
+    def put(self, key: bytes, body: bytes, etag: str):
+        """Store a response, evicting least recently used entries to stay in budget"""
+        if not self.enabled:
+            return
+        size = sys.getsizeof(key) + sys.getsizeof(body) + sys.getsizeof(etag)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = min(now + self.ttl_seconds, _next_midnight(now))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[3]
+            self._entries[key] = (body, etag, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+                self.evictions += 1
+
+    def record_not_modified(self, endpoint: str):
+        """Count a 304 answered for `endpoint`"""
+        with self._lock:
+            self._count(endpoint, 'not_modified')
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache usage plus hit/miss/expiry/304 counters, in total and per endpoint"""
+        def with_hit_rate(counters):
+            lookups = counters['hits'] + counters['misses']
+            return dict(counters, hit_rate=round(counters['hits'] / lookups, 4) if lookups else 0.0)
+
+        with self._lock:
+            totals = {'hits': 0, 'misses': 0, 'expired': 0, 'not_modified': 0}
+            for counters in self._counters.values():
+                for name, value in counters.items():
+                    totals[name] += value
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'evictions': self.evictions,
+                **with_hit_rate(totals),
+                'endpoints': {endpoint: with_hit_rate(counters) for endpoint, counters in self._counters.items()}
+            }
@@ -0,0 +1,252 @@
+"""
+Streaming Trainer
+
+Out-of-core training for the emotion model on labelled exports that do not
+fit in memory (millions of journal entries).
+
+How it works:
+1. Reads JSONL or CSV files chunk by chunk (only one chunk is in memory)
+2. Vectorizes with a stateless HashingVectorizer, so no vocabulary has to
+   be collected up front
+3. Updates a partial_fit-capable classifier (MultinomialNB or SGD) per chunk
+4. Reports progress and writes resumable checkpoints (model + byte offsets)
+
+An existing model can be updated with new data instead of retrained from
+scratch. This works for streaming models and for the TF-IDF pipeline built by
+EmotionDetector.train_model (its fitted vocabulary stays fixed).
+
+Usage:
+    python streaming_trainer.py export.jsonl [more.csv ...] [--update]
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from model_store import load_model, save_model
+
+
+def _iter_lines(handle, offset: int, position: Dict[str, int]) -> Iterator[str]:
+    """Yield decoded lines from a binary file, tracking the byte offset after each"""
+    handle.seek(offset)
+    position['offset'] = offset
+    for raw_line in iter(handle.readline, b''):
+        position['offset'] += len(raw_line)
+        yield raw_line.decode('utf-8')
+
+
+def iter_records(path: str, text_field: str = 'text', label_field: str = 'label',
+                 offset: int = 0) -> Iterator[Tuple[str, str, int]]:
+    """
+    Stream (text, label) records from a JSONL or CSV file
+
+    Args:
+        path: .jsonl/.ndjson or .csv file
+        text_field: Field holding the entry text
+        label_field: Field holding the emotion label
+        offset: Byte offset to resume from (0 = start of file)
+
+    Yields:
+        (text, label, byte offset just after the record)
+    """
+    position = {'offset': offset}
+    is_csv = path.lower().endswith('.csv')
+
+    with open(path, 'rb') as handle:
+        if is_csv:
+            header = next(csv.reader([handle.readline().decode('utf-8')]))
+            offset = max(offset, handle.tell())
+            rows = csv.DictReader(_iter_lines(handle, offset, position), fieldnames=header)
+        else:
+            rows = (json.loads(line) for line in _iter_lines(handle, offset, position) if line.strip())
+
+        for row in rows:
+            text, label = row.get(text_field), row.get(label_field)
+            if text and label:
+                yield text, str(label), position['offset']
+
+
+class StreamingTrainer:
+    """
+    Chunked, resumable training of an emotion classification pipeline
+
+    Checkpoints are written next to the model as <model_path>.checkpoint
+    (the partially trained model) and <model_path>.checkpoint.json
+    (how far each input file has been read). Both are removed once
+    training finishes.
+    """
+
+    def __init__(self, model_path: str, classes: List[str], classifier: str = 'nb',
+                 n_features: int = 2 ** 18, chunk_size: int = 10000, checkpoint_every: int = 10,
+                 text_field: str = 'text', label_field: str = 'label',
+                 preprocess: Optional[Callable[[str], str]] = None,
+                 progress: Optional[Callable[[str], None]] = print):
+        """
+        Args:
+            model_path: Where the trained model is saved
+            classes: Every label the classifier can predict (partial_fit
+                needs them up front); records with other labels are skipped
+            classifier: 'nb' (MultinomialNB) or 'sgd' (logistic SGDClassifier)
+            n_features: Hashing space size; memory grows with classes x n_features
+            chunk_size: Records held in memory at once
+            checkpoint_every: Write a checkpoint every N chunks
+            text_field: Field holding the entry text
+            label_field: Field holding the emotion label
+            preprocess: Applied to each text before vectorizing
+            progress: Called with a status line after each chunk (None = silent)
+        """
+        if classifier not in ('nb', 'sgd'):
+            raise ValueError(f"Unknown classifier '{classifier}', expected 'nb' or 'sgd'")
+        self.model_path = model_path
+        self.classes = list(classes)
+        self.classifier = classifier
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.checkpoint_every = checkpoint_every
+        self.text_field = text_field
+        self.label_field = label_field
+        self.preprocess = preprocess or (lambda text: text)
+        self.progress = progress
+        self.checkpoint_path = model_path + '.checkpoint'
+        self.state_path = model_path + '.checkpoint.json'
+
+    def build_pipeline(self):
+        """Untrained hashing + partial_fit classifier pipeline"""
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
+
+        # Naive Bayes needs non-negative features, so no alternating signs
+        vectorizer = HashingVectorizer(n_features=self.n_features, ngram_range=(1, 2), alternate_sign=False)
+        classifier = MultinomialNB(alpha=0.1) if self.classifier == 'nb' else SGDClassifier(loss='log_loss')
+        return Pipeline([('hashing', vectorizer), ('classifier', classifier)])
+
+    def _load_state(self, resume: bool, update: bool):
+        """Pick up a checkpoint, an existing model to update, or start fresh"""
+        if resume and os.path.exists(self.state_path) and os.path.exists(self.checkpoint_path):
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+            # Loaded into memory (not memory-mapped) because it is updated in place
+            pipeline = load_model(self.checkpoint_path, mmap_mode=None)
+            classifier = pipeline.steps[-1][1]
+            if hasattr(classifier, 'classes_'):
+                self.classes = [str(label) for label in classifier.classes_]
+            return pipeline, state
+
+        state = {'offsets': {}, 'completed': [], 'rows': 0, 'skipped': 0, 'chunks': 0}
+        if update and os.path.exists(self.model_path):
+            pipeline = load_model(self.model_path, mmap_mode=None)
+            # A trained classifier cannot learn new labels; records with
+            # labels it does not know are skipped
+            self.classes = [str(label) for label in pipeline.steps[-1][1].classes_]
+            return pipeline, state
+
+        return self.build_pipeline(), state
+
+    def _checkpoint(self, pipeline, state):
+        """Save the partially trained model, then the offsets that match it"""
+        save_model(pipeline, self.checkpoint_path)
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temporary_path, self.state_path)
+
+    def _fit_chunk(self, pipeline, texts: List[str], labels: List[str]):
+        """Vectorize one chunk with the fixed front of the pipeline and update the classifier"""
+        features = [self.preprocess(text) for text in texts]
+        for _, step in pipeline.steps[:-1]:
+            features = step.transform(features)
+        pipeline.steps[-1][1].partial_fit(features, labels, classes=self.classes)
+
+    def train(self, paths: List[str], resume: bool = True, update: bool = False):
+        """
+        Train on every file in order, one chunk at a time
+
+        Args:
+            paths: JSONL/CSV files to read
+            resume: Continue from an existing checkpoint if there is one
+            update: Start from the model already at model_path
+
+        Returns:
+            The trained pipeline (also saved to model_path)
+        """
+        pipeline, state = self._load_state(resume, update)
+        known_labels = set(self.classes)
+        start = time.perf_counter()
+        start_rows = state['rows']
+
+        for path in paths:
+            if path in state['completed']:
+                continue
+
+            texts, labels = [], []
+            records = iter_records(path, self.text_field, self.label_field, state['offsets'].get(path, 0))
+            for text, label, offset in records:
+                if label not in known_labels:
+                    state['skipped'] += 1
+                    continue
+                texts.append(text)
+                labels.append(label)
+
+                if len(texts) >= self.chunk_size:
+                    self._fit_chunk(pipeline, texts, labels)
+                    state['rows'] += len(texts)
+                    state['chunks'] += 1
+                    state['offsets'][path] = offset
+                    texts, labels = [], []
+                    self._report(path, state, start, start_rows)
+                    if state['chunks'] % self.checkpoint_every == 0:
+                        self._checkpoint(pipeline, state)
+
+            if texts:
+                self._fit_chunk(pipeline, texts, labels)
+                state['rows'] += len(texts)
+                state['chunks'] += 1
+                self._report(path, state, start, start_rows)
+            state['completed'].append(path)
+            state['offsets'].pop(path, None)
+            self._checkpoint(pipeline, state)
+
+        save_model(pipeline, self.model_path)
+        for leftover in (self.state_path, self.checkpoint_path, self.checkpoint_path + '.arrays'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+        if self.progress:
+            self.progress(f"✅ Streaming training finished: {state['rows']:,} rows "
+                          f"({state['skipped']:,} skipped), model saved to {self.model_path}")
+        return pipeline
+
+    def _report(self, path: str, state: Dict, start: float, start_rows: int):
+        if self.progress:
+            elapsed = time.perf_counter() - start
+            rate = (state['rows'] - start_rows) / elapsed if elapsed > 0 else 0.0
+            self.progress(f"  {os.path.basename(path)}: {state['rows']:,} rows, "
+                          f"{state['chunks']} chunks, {rate:,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    from emotion_detector import EmotionDetector
+
+    parser = argparse.ArgumentParser(description='Stream-train the emotion model from JSONL/CSV exports')
+    parser.add_argument('paths', nargs='+', help='JSONL or CSV files with text and label fields')
+    parser.add_argument('--model-path', default=os.getenv('MODEL_PATH', 'models/emotion_model.pkl'))
+    parser.add_argument('--update', action='store_true', help='Update the existing model instead of starting fresh')
+    parser.add_argument('--no-resume', action='store_true', help='Ignore any existing checkpoint')
+    parser.add_argument('--classifier', choices=['nb', 'sgd'], default='nb')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--n-features', type=int, default=2 ** 18)
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--label-field', default='label')
+    args = parser.parse_args()
+
+    detector = EmotionDetector(cache_max_entries=0)
+    detector.train_model_streaming(
+        args.paths, model_path=args.model_path, update=args.update, resume=not args.no_resume,
+        classifier=args.classifier, chunk_size=args.chunk_size, n_features=args.n_features,
+        text_field=args.text_field, label_field=args.label_field
+    )
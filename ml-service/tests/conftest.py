@@ -0,0 +1,87 @@
+"""
+Shared fixtures for the ML service tests
+
+Run from ml-service/ with `python -m pytest`. The service modules live at
+the top of ml-service/, so that directory is put on the import path.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# Warm up while app is imported rather than in a thread that could race
+# the fixtures below
+os.environ.setdefault('ML_WARM_UP', 'sync')
+
+from emotion_detector import EmotionDetector
+
+
+@pytest.fixture
+def detector(monkeypatch, tmp_path):
+    """Rule-based detector that never picks up a model file from the working directory"""
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'missing_model.pkl'))
+    monkeypatch.delenv('EMOTION_INFERENCE_MODE', raising=False)
+    return EmotionDetector()
+
+
+# A small labelled corpus, enough for a model that is confident on some
+# texts and unsure on others
+TRAINING_TEXTS = [
+    ('what a wonderful happy day with friends', 'happy'),
+    ('so glad and pleased with the result', 'happy'),
+    ('i feel sad and down today', 'sad'),
+    ('heartbroken and miserable after the news', 'sad'),
+    ('furious and annoyed at the meeting', 'angry'),
+    ('so mad and irritated by the traffic', 'angry'),
+    ('worried and nervous about the exam', 'anxious'),
+    ('stressed and tense before the deadline', 'anxious'),
+    ('a calm and peaceful walk by the lake', 'calm'),
+    ('relaxed and quiet evening at home', 'calm'),
+]
+
+# Texts for comparing detection paths: keyword hits, negation, questions,
+# words the model never saw, duplicates and empty texts
+DETECTION_TEXTS = [
+    'I feel amazing today!',
+    'I am not happy with how things went.',
+    'Why does everything make me so anxious?',
+    'a calm and peaceful walk',
+    'the quarterly report is due on friday',
+    'furious, worried and sad at once',
+    'I feel amazing today!',
+    '',
+    '   ',
+    'Visit https://example.com for more info',
+]
+
+
+@pytest.fixture
+def trained_model_path(detector, tmp_path):
+    """Path of a TF-IDF/NaiveBayes model trained on TRAINING_TEXTS"""
+    path = str(tmp_path / 'emotion_model.pkl')
+    texts, labels = zip(*TRAINING_TEXTS)
+    assert detector.train_model(list(texts), list(labels), model_path=path)
+    return path
+
+
+@pytest.fixture
+def model_detector(monkeypatch, trained_model_path):
+    """Build a detector that loads the trained model, in a given inference mode"""
+    monkeypatch.setenv('MODEL_PATH', trained_model_path)
+    return lambda mode: EmotionDetector(inference_mode=mode)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Flask test client with fresh components, no model and state under tmp_path"""
+    import app as service
+
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'missing_model.pkl'))
+    monkeypatch.setenv('INSIGHT_STATE_PATH', str(tmp_path / 'insight_state.db'))
+    monkeypatch.delenv('EMOTION_INFERENCE_MODE', raising=False)
+    for component in ('_detector', '_insights_generator', '_detection_pool', '_micro_batcher', '_insight_state'):
+        monkeypatch.setattr(service, component, None)
+    service.response_cache.clear()
+    return service.app.test_client()
@@ -0,0 +1,148 @@
+"""Annotation store: reused annotations give the same results; edits and fingerprints invalidate"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from annotation_store import AnnotationStore
+from personalized_insights import PersonalizedInsights
+
+WORDS = ('today i went to the office and my friend said the project was fine then we talked about travel plans '
+         'i felt happy and calm but a bit worried about the deadline and tired after the gym').split()
+
+
+@pytest.fixture
+def store():
+    return AnnotationStore(':memory:')
+
+
+@pytest.fixture(autouse=True)
+def default_themes(monkeypatch):
+    monkeypatch.delenv('JOURNAL_THEMES_PATH', raising=False)
+
+
+def journal_entries(count, seed):
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=count)
+    return [{'id': index, 'content': ' '.join(rng.choices(WORDS, k=rng.randint(3, 25))),
+             'created_at': (start + timedelta(days=index)).isoformat()} for index in range(count)]
+
+
+def counters(store, kind='keywords'):
+    stats = store.stats()[kind]
+    return stats['hits'], stats['misses']
+
+
+def test_stored_keywords_give_the_same_insights(store):
+    entries = journal_entries(60, 1) + [{'id': 'blank', 'content': ''}]
+    plain = PersonalizedInsights().generate_insights(entries, [], [], [])
+    insights = PersonalizedInsights(annotations=store)
+
+    assert insights.generate_insights(entries, [], [], []) == plain
+    assert counters(store) == (0, 60)
+    assert insights.generate_insights(entries, [], [], []) == plain
+    assert counters(store) == (60, 60)
+
+
+def test_an_edited_entry_is_tokenized_again(store):
+    entries = journal_entries(20, 2)
+    insights = PersonalizedInsights(annotations=store)
+    insights.generate_insights(entries, [], [], [])
+    entries[5] = dict(entries[5], content='a wonderful trip to the beach with family')
+
+    result = insights.generate_insights(entries, [], [], [])
+    assert counters(store) == (19, 21)
+    assert result == PersonalizedInsights().generate_insights(entries, [], [], [])
+
+
+def test_entries_without_ids_are_keyed_by_their_text(store):
+    insights = PersonalizedInsights(annotations=store)
+    entries = [{'content': 'happy at the gym'}, {'content': 'happy at the gym'}, {'content': 'worried at work'}]
+    insights.generate_insights(entries, [], [], [])
+    assert counters(store) == (0, 3)
+    insights.generate_insights(list(reversed(entries)), [], [], [])
+    assert counters(store) == (3, 3)
+
+
+def test_a_new_vocabulary_invalidates_keywords(store, tmp_path, monkeypatch):
+    entries = journal_entries(10, 3)
+    PersonalizedInsights(annotations=store).generate_insights(entries, [], [], [])
+    path = tmp_path / 'themes.json'
+    path.write_text(json.dumps({'Fitness': ['gym']}))
+    monkeypatch.setenv('JOURNAL_THEMES_PATH', str(path))
+
+    insights = PersonalizedInsights(annotations=store)
+    result = insights.generate_insights(entries, [], [], [])
+    assert counters(store) == (0, 20)
+    assert result == PersonalizedInsights().generate_insights(entries, [], [], [])
+
+
+def test_detect_scores_only_new_texts(store, detector):
+    scored = []
+
+    def predict_batch(texts):
+        scored.append(list(texts))
+        return detector.predict_batch(texts)
+
+    texts = ['I feel amazing today!', 'so worried about tomorrow', '', 'I feel amazing today!']
+    ids = [1, 2, 3, None]
+    first = store.detect(texts, ids, predict_batch, detector.fingerprint())
+    assert first == detector.predict_batch(texts)
+    assert scored == [['I feel amazing today!', 'so worried about tomorrow', 'I feel amazing today!'], ['']]
+
+    scored.clear()
+    assert store.detect(texts, ids, predict_batch, detector.fingerprint()) == first
+    assert scored == [['']]
+    assert counters(store, 'emotion') == (3, 3)
+
+
+def test_a_detector_change_invalidates_emotions(store, detector):
+    texts = ['I feel amazing today!', 'so worried about tomorrow']
+    store.detect(texts, [1, 2], detector.predict_batch, detector.fingerprint())
+    before = detector.fingerprint()
+    detector.emotion_keywords['happy'] = detector.emotion_keywords['happy'] + ['tomorrow']
+    assert detector.fingerprint() != before
+    store.detect(texts, [1, 2], detector.predict_batch, detector.fingerprint())
+    assert counters(store, 'emotion') == (0, 4)
+
+
+def test_disabled_store_passes_through(detector):
+    store = AnnotationStore('')
+    assert not store.enabled
+    texts = ['I feel amazing today!']
+    assert store.detect(texts, None, detector.predict_batch, detector.fingerprint()) == detector.predict_batch(texts)
+    assert counters(store, 'emotion') == (0, 0)
+
+
+def test_the_fingerprint_is_computed_only_when_enabled(client, monkeypatch, detector):
+    import app as service
+    monkeypatch.setattr(service, 'annotation_store', AnnotationStore(''))
+    monkeypatch.setattr(type(service.get_detector()), 'fingerprint',
+                        lambda self: pytest.fail('fingerprint computed with the store disabled'))
+    assert client.post('/api/detect-emotion', json={'text': 'I feel amazing today!'}).status_code == 200
+    assert client.post('/api/batch-detect', json={'texts': ['so worried', 'calm']}).status_code == 200
+
+    store = AnnotationStore(':memory:')
+    calls = []
+    store.detect(['I feel amazing today!'], [1], detector.predict_batch, lambda: calls.append(1) or 'abc')
+    assert calls == [1]
+
+
+def test_backfill_then_requests_only_hit(store, detector):
+    entries = journal_entries(30, 4)
+    analyzer = PersonalizedInsights(annotations=store).text_analyzer
+    assert store.backfill(iter(entries), analyzer, detector, chunk_size=7) == \
+        {'entries': 30, 'keywords_added': 30, 'emotion_added': 30}
+    assert store.backfill(iter(entries), analyzer, detector) == \
+        {'entries': 30, 'keywords_added': 0, 'emotion_added': 0}
+
+
+def test_detect_emotion_route_reuses_the_stored_result(client, monkeypatch, store):
+    import app as service
+    monkeypatch.setattr(service, 'annotation_store', store)
+    first = client.post('/api/detect-emotion', json={'text': 'I feel amazing today!', 'id': 7}).get_json()
+    second = client.post('/api/detect-emotion', json={'text': 'I feel amazing today!', 'id': 7}).get_json()
+    assert first == second
+    assert counters(store, 'emotion') == (1, 1)
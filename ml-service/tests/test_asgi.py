@@ -0,0 +1,67 @@
+"""Async serving mode: same endpoints and payloads as the Flask app"""
+
+import asyncio
+import json
+import os
+import runpy
+
+import pytest
+
+import asgi
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def call(method, path, body=None):
+    """Run one request through the ASGI app; (status, headers, parsed JSON body)"""
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+             'scheme': 'http', 'path': path, 'raw_path': path.encode('ascii'), 'root_path': '',
+             'query_string': b'', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+             'headers': [(b'host', b'testserver'), (b'content-type', b'application/json'),
+                         (b'content-length', str(len(data)).encode('ascii'))]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': data, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start = next(message for message in messages if message['type'] == 'http.response.start')
+    payload = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return start['status'], dict(start['headers']), json.loads(payload)
+
+
+def test_health_is_answered_on_the_event_loop(client, monkeypatch):
+    def never(*args, **kwargs):
+        raise AssertionError('health probes must not reach the handler threads')
+
+    monkeypatch.setattr(asgi, '_flask_asgi', never)
+    expected = client.get('/health/ready')
+    status, headers, payload = call('GET', '/health/ready')
+    assert (status, payload) == (expected.status_code, expected.get_json())
+    assert headers[b'content-type'] == b'application/json'
+    status, _, payload = call('GET', '/health')
+    assert status == 200 and payload['status'] == 'OK'
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/detect-emotion', {'text': 'I feel amazing today!'}),
+    ('/api/batch-detect', {'texts': ['so sad', '', 'so happy!']}),
+    ('/api/detect-emotion', {}),
+])
+def test_routes_match_the_flask_app(client, path, body):
+    expected = client.post(path, json=body)
+    status, _, payload = call('POST', path, body)
+    assert (status, payload) == (expected.status_code, expected.get_json())
+
+
+def test_gunicorn_serves_the_asgi_app_in_async_mode(monkeypatch):
+    monkeypatch.setenv('ML_SERVER_MODE', 'async')
+    config = runpy.run_path(os.path.join(SERVICE_DIR, 'gunicorn.conf.py'))
+    assert (config['wsgi_app'], config['worker_class']) == ('asgi:app', 'uvicorn_worker.UvicornWorker')
+    monkeypatch.setenv('ML_SERVER_MODE', 'threads')
+    with pytest.raises(ValueError):
+        runpy.run_path(os.path.join(SERVICE_DIR, 'gunicorn.conf.py'))
@@ -0,0 +1,45 @@
+"""predict_batch and /api/batch-detect give the same results as predict"""
+
+import pytest
+
+from conftest import DETECTION_TEXTS
+
+
+def test_rule_batch_matches_single_predictions(detector):
+    single = [detector.predict(text) for text in DETECTION_TEXTS]
+    detector.cache.clear()
+    assert detector.predict_batch(DETECTION_TEXTS) == single
+
+
+@pytest.mark.parametrize('mode', ['model', 'hybrid'])
+def test_model_batch_matches_single_predictions(model_detector, mode):
+    detector = model_detector(mode)
+    assert detector.active_inference_mode() == mode
+    single = [detector.predict(text) for text in DETECTION_TEXTS]
+    detector.cache.clear()
+    assert detector.predict_batch(DETECTION_TEXTS) == single
+
+
+def test_batch_keeps_input_order_and_length(detector):
+    texts = ['so sad', 'so happy!', 'so sad', '']
+    results = detector.predict_batch(texts)
+    assert [result['emotion'] for result in results] == ['sad', 'happy', 'sad', 'neutral']
+    assert detector.predict_batch([]) == []
+
+
+def test_batch_scores_duplicates_once(detector):
+    detector.predict_batch(['so sad', 'so sad', 'so sad'])
+    assert detector.cache.stats()['entries'] == 1
+
+
+def test_batch_endpoint(client):
+    response = client.post('/api/batch-detect', json={'texts': ['I feel amazing today!', '']})
+    assert response.status_code == 200
+    first, empty = response.get_json()['results']
+    assert first['emotion'] == 'happy'
+    assert empty == {'emotion': 'neutral', 'probability': 0.5, 'all_emotions': {}}
+
+
+@pytest.mark.parametrize('body', [{}, {'texts': 'not a list'}, {'texts': ['a', 'b'], 'ids': [1]}])
+def test_batch_endpoint_rejects_bad_requests(client, body):
+    assert client.post('/api/batch-detect', json=body).status_code == 400
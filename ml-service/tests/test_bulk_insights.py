@@ -0,0 +1,142 @@
+"""Bulk insights job vs per-user generate_insights, output formats and resuming"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import bulk_insights
+from bulk_insights import BulkInsightsJob, flatten
+from personalized_insights import PersonalizedInsights
+
+EMOTIONS = ['happy', 'sad', 'anxious', 'calm']
+WORDS = 'work project happy friend travel sad study deadline calm doctor'.split()
+
+
+def random_user(rng, user_id):
+    start = datetime.now() - timedelta(days=30)
+    days = [start + timedelta(days=day, hours=rng.uniform(8, 20)) for day in range(30)]
+    return {
+        'user_id': user_id,
+        'journal_entries': [{'content': ' '.join(rng.choices(WORDS, k=6)), 'created_at': day.isoformat()}
+                            for day in days if rng.random() < 0.5],
+        'mood_history': [{'emotion': rng.choice(EMOTIONS), 'score': rng.randint(1, 10), 'date': day.isoformat()}
+                         for day in days if rng.random() < 0.8],
+        'task_history': [{'title': rng.choice(['Work report', 'gym', 'Read book']), 'completed': rng.random() < 0.6,
+                          'created_at': day.isoformat()} for day in days for _ in range(rng.randint(0, 2))],
+        'habit_data': [{'name': 'Exercise', 'marked_days': [day.date().isoformat() for day in days[::2]]}],
+        'timezone': rng.choice([None, 'Europe/Berlin'])
+    }
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    """A JSONL export of 23 users, with a blank line and an invalid one"""
+    monkeypatch.delenv('ANNOTATION_STORE_PATH', raising=False)
+    monkeypatch.setattr(bulk_insights, '_child_generator', None)
+    rng = random.Random(4)
+    users = [random_user(rng, user_id) for user_id in range(23)]
+    lines = [json.dumps(user) for user in users]
+    lines.insert(10, '')
+    lines.insert(15, '{not json')
+    path = tmp_path / 'export.jsonl'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path), users
+
+
+def expected_insights(user):
+    result = PersonalizedInsights().generate_insights(user['journal_entries'], user['mood_history'],
+                                                      user['task_history'], user['habit_data'],
+                                                      timezone=user['timezone'])
+    return json.loads(json.dumps(result))
+
+
+def read_results(path):
+    with open(path) as results:
+        return [json.loads(line) for line in results]
+
+
+def check_results(results, users):
+    assert [result['user_id'] for result in results] == list(range(14)) + [None] + list(range(14, 23))
+    invalid = results[14]
+    assert invalid['line'] == 16 and invalid['error'].startswith('Invalid line')
+    for result in results[:14] + results[15:]:
+        assert result['insights'] == expected_insights(users[result['user_id']])
+
+
+def test_inline_run_matches_per_user_insights(export, tmp_path):
+    input_path, users = export
+    output = str(tmp_path / 'insights.jsonl')
+    summary = BulkInsightsJob(output, processes=0, batch_size=4, progress=None).run(input_path)
+    assert summary['users'] == 24 and summary['errors'] == 1
+    assert set(summary['stages']) == set(bulk_insights.STAGES)
+    check_results(read_results(output), users)
+
+
+def test_pool_run_matches_per_user_insights(export, tmp_path):
+    input_path, users = export
+    output = str(tmp_path / 'insights.jsonl')
+    BulkInsightsJob(output, processes=2, batch_size=3, progress=None).run(input_path)
+    check_results(read_results(output), users)
+
+
+def test_resume_after_a_crash_writes_each_user_once(export, tmp_path, monkeypatch):
+    input_path, users = export
+    output = str(tmp_path / 'insights.jsonl')
+    analyze = bulk_insights._analyze_batch_inline
+    calls = []
+
+    def crash_on_fifth_batch(lines, columnar):
+        calls.append(lines)
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        return analyze(lines, columnar)
+
+    monkeypatch.setattr(bulk_insights, '_analyze_batch_inline', crash_on_fifth_batch)
+    job = BulkInsightsJob(output, processes=0, batch_size=3, checkpoint_every=1, progress=None)
+    with pytest.raises(KeyboardInterrupt):
+        job.run(input_path)
+    with open(job.state_path) as state_file:
+        state = json.load(state_file)
+    assert 0 < state['users'] < 24
+    # A partial line written after the checkpoint is dropped on resume
+    with open(output, 'a') as partial:
+        partial.write('{"user_id": 99, "insi')
+
+    monkeypatch.setattr(bulk_insights, '_analyze_batch_inline', analyze)
+    summary = job.run(input_path)
+    assert summary['users'] == 24
+    check_results(read_results(output), users)
+
+
+def test_no_resume_starts_over(export, tmp_path):
+    input_path, users = export
+    output = str(tmp_path / 'insights.jsonl')
+    job = BulkInsightsJob(output, processes=0, progress=None)
+    job.run(input_path)
+    assert job.run(input_path, resume=False)['users'] == 24
+    assert len(read_results(output)) == 24
+
+
+def test_columnar_output(export, tmp_path):
+    input_path, users = export
+    output = str(tmp_path / 'insights.npz')
+    BulkInsightsJob(output, processes=0, batch_size=5, progress=None).run(input_path)
+    with np.load(output) as columns:
+        assert columns['user_id'].dtype == np.float64  # the invalid line has no user_id
+        scores = columns['insights.mood_patterns.average_mood_score']
+        expected = expected_insights(users[3])
+        assert scores[3] == expected['mood_patterns']['average_mood_score']
+        assert np.isnan(scores[14])
+        assert json.loads(columns['insights.recommendations'][3]) == expected['recommendations']
+
+
+def test_flatten_keeps_scalars_and_serializes_lists():
+    assert flatten({'a': {'b': 1, 'c': [1, {'d': 2}]}, 'e': None}) == {'a.b': 1, 'a.c': '[1, {"d": 2}]', 'e': None}
+
+
+def test_unknown_output_format_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        BulkInsightsJob(str(tmp_path / 'out.csv'), output_format='csv')
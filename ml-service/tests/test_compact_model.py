@@ -0,0 +1,50 @@
+"""Compact NumPy scorer exported from the trained pipeline"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from compact_model import TOLERANCES, compile_pipeline, export_compact_model, load_compact_model
+from conftest import DETECTION_TEXTS
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@pytest.mark.parametrize('dtype', list(TOLERANCES))
+def test_scorer_matches_the_pipeline_within_tolerance(detector, trained_model_path, tmp_path, dtype):
+    texts = [detector._preprocess_text(text) for text in DETECTION_TEXTS] + ['', 'zzz unknown words']
+    path = str(tmp_path / f'model-{dtype}.npz')
+    export_compact_model(detector.model, path, dtype)
+    scorer = load_compact_model(path)
+    assert list(scorer.classes_) == list(detector.model.classes_)
+    error = np.abs(scorer.predict_proba(texts) - detector.model.predict_proba(texts)).max()
+    assert error <= TOLERANCES[dtype]
+
+
+def test_unsupported_pipelines_are_refused(detector, trained_model_path, tmp_path):
+    from streaming_trainer import StreamingTrainer
+
+    with pytest.raises(ValueError):
+        compile_pipeline(StreamingTrainer(str(tmp_path / 'stream.pkl'), ['happy']).build_pipeline())
+    with pytest.raises(ValueError):
+        compile_pipeline(detector.model, 'int4')
+
+
+def test_detector_serves_a_compact_model_without_scikit_learn(detector, trained_model_path, tmp_path):
+    path = str(tmp_path / 'emotion_model.npz')
+    export_compact_model(detector.model, path)
+    detector.inference_mode = 'model'
+    expected = [detector.predict(text) for text in DETECTION_TEXTS]
+
+    code = (f'import json, sys; from emotion_detector import EmotionDetector; '
+            f'detector = EmotionDetector(inference_mode="model"); '
+            f'print(json.dumps([[detector.predict(text) for text in {DETECTION_TEXTS!r}], "sklearn" in sys.modules]))')
+    output = subprocess.run([sys.executable, '-c', code], cwd=SERVICE_DIR, check=True, capture_output=True,
+                            text=True, env={**os.environ, 'MODEL_PATH': path}).stdout
+    results, loaded_sklearn = json.loads(output.strip().splitlines()[-1])
+    assert not loaded_sklearn
+    assert results == expected
@@ -0,0 +1,211 @@
+"""Daily rollup: incremental updates vs a full rebuild, and period answers vs the request path"""
+
+import importlib.util
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+import daily_rollup
+from habit_bitmaps import epoch_day
+from insight_state import InsightStateStore
+from personalized_insights import PersonalizedInsights
+
+EMOTIONS = ['calm', 'happy', 'sad', 'anxious']
+
+
+@pytest.fixture
+def insights():
+    return PersonalizedInsights()
+
+
+@pytest.fixture
+def store(insights, tmp_path):
+    return InsightStateStore(insights, str(tmp_path / 'state.db'))
+
+
+def timestamp(rng, today):
+    """A time in the last 400 days; some undated, some with a UTC offset"""
+    moment = today - timedelta(days=rng.randint(0, 400), hours=rng.randint(0, 23))
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.15:
+        return moment.isoformat() + rng.choice(['Z', '+05:30'])
+    return moment.isoformat()
+
+
+def history(rng, count=600):
+    today = datetime.now().replace(microsecond=0)
+    moods = [{'id': i, 'emotion': rng.choice(EMOTIONS), 'score': rng.randint(1, 10), 'date': timestamp(rng, today)}
+             for i in range(count)]
+    tasks = [{'id': i, 'title': 'Work report', 'completed': rng.random() < 0.6,
+              'created_at': timestamp(rng, today)} for i in range(count)]
+    journal = [{'id': i, 'content': 'work today', 'created_at': timestamp(rng, today)} for i in range(count)]
+    habits = [{'id': h, 'name': f'Habit {h}',
+               'marked_days': [(today - timedelta(days=k)).date().isoformat() for k in range(200) if rng.random() < 0.5]}
+              for h in range(3)]
+    return moods, tasks, journal, habits
+
+
+def ingest_incrementally(store, rng, moods, tasks, journal, habits, zone=None):
+    """Half the history at once, then batches with edits, then deletes and a habit change"""
+    half = len(moods) // 2
+    store.ingest('u', {'mood_history': moods[:half], 'task_history': tasks[:half],
+                       'journal_entries': journal[:half], 'habit_data': habits, 'timezone': zone})
+    for start in range(half, len(moods), 50):
+        edits = [dict(entry, score=rng.randint(1, 10)) for entry in rng.sample(moods[:start], 5)]
+        for entry in edits:
+            moods[entry['id']] = entry
+        store.ingest('u', {'mood_history': moods[start:start + 50] + edits,
+                           'task_history': tasks[start:start + 50], 'journal_entries': journal[start:start + 50]})
+    deleted = rng.sample(range(len(moods)), 30)
+    store.ingest('u', {'deleted': {'mood_history': deleted, 'task_history': deleted}})
+    habits[1]['marked_days'] = habits[1]['marked_days'][::2]
+    store.ingest('u', {'habit_data': [habits[1]]})
+    return ([entry for entry in moods if entry['id'] not in deleted],
+            [task for task in tasks if task['id'] not in deleted])
+
+
+def assert_same_rows(a, b):
+    assert set(a.columns) == set(b.columns)
+    for name in a.columns:
+        assert np.allclose(a.columns[name], b.columns[name], equal_nan=True), name
+    assert np.array_equal(a.emotion_counts[:, [a.emotions.index(emotion) for emotion in b.emotions]],
+                          b.emotion_counts)
+
+
+def in_days(value, start, end, zone=None):
+    """Whether a timestamp's date, in zone when it has a UTC offset, is within the epoch days"""
+    if value is None:
+        return False
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if zone and moment.tzinfo is not None:
+        moment = moment.astimezone(ZoneInfo(zone))
+    day = epoch_day(moment)
+    return (start is None or day >= start) and (end is None or day <= end)
+
+
+@pytest.mark.parametrize('zone', [None, 'Pacific/Kiritimati', 'Pacific/Pago_Pago'])
+def test_incremental_rollup_matches_a_full_rebuild(store, zone):
+    rng = random.Random(3)
+    moods, tasks, journal, habits = history(rng)
+    ingest_incrementally(store, rng, moods, tasks, journal, habits, zone)
+    assert_same_rows(store.rollup('u'), store._rollup_rows(store._connect(), 'u'))
+
+
+def test_periods_match_the_request_path(insights, store):
+    rng = random.Random(5)
+    moods, tasks, journal, habits = history(rng)
+    moods, tasks = ingest_incrementally(store, rng, moods, tasks, journal, habits)
+    today = epoch_day(datetime.now())
+    for start, end in [(today - 30, today), (today - 200, today - 100), (None, today - 50), (today - 10, None)]:
+        period_moods = [entry for entry in moods if in_days(entry['date'], start, end)]
+        period_tasks = [task for task in tasks if in_days(task['created_at'], start, end)]
+        expected = insights.analyze_mood_patterns(period_moods)
+        stored = store.mood_patterns('u', None, start, end)
+        for key in ['average_mood_score', 'emotion_distribution', 'day_patterns', 'total_entries', 'trend_analytics']:
+            assert json.dumps(expected[key], sort_keys=True, default=float) == \
+                json.dumps(stored[key], sort_keys=True, default=float), key
+        assert stored['lowest_mood_score'] == min(entry['score'] for entry in period_moods)
+        assert stored['highest_mood_score'] == max(entry['score'] for entry in period_moods)
+        productivity = store.productivity('u', start, end)
+        expected = insights.analyze_productivity(period_tasks, period_moods, [])
+        for key in productivity:
+            assert json.dumps(productivity[key], sort_keys=True) == json.dumps(expected[key], sort_keys=True), key
+
+
+@pytest.mark.parametrize('zone', [None, 'Asia/Tokyo'])
+def test_weekly_summary_counts_records_on_their_local_date(store, zone):
+    rng = random.Random(7)
+    moods, tasks, journal, habits = history(rng)
+    moods, tasks = ingest_incrementally(store, rng, moods, tasks, journal, habits, zone)
+    today = epoch_day(datetime.now())
+    week = today - 6, today
+
+    summary = store.weekly_summary('u')
+    week_moods = [entry['score'] for entry in moods if in_days(entry['date'], *week, zone)]
+    week_tasks = [task for task in tasks if in_days(task['created_at'], *week, zone)]
+    assert summary['mood_entries_this_week'] == len(week_moods)
+    assert summary['average_mood_this_week'] == pytest.approx(np.mean(week_moods))
+    assert summary['tasks_this_week'] == len(week_tasks)
+    assert summary['completed_tasks_this_week'] == sum(task['completed'] for task in week_tasks)
+    assert summary['journal_entries_this_week'] == sum(in_days(entry['created_at'], *week, zone) for entry in journal)
+    # Habit marks count on their date
+    assert summary['habits_marked_this_week'] == sum(in_days(day, *week) for habit in habits
+                                                     for day in set(habit['marked_days']))
+
+
+def test_utc_timestamps_count_in_every_weekly_summary(insights, store):
+    # The backend sends its timestamps as UTC ('...Z')
+    now = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+    moods = [{'id': day, 'emotion': 'calm', 'score': day + 1, 'date': (now - timedelta(days=day)).isoformat() + 'Z'}
+             for day in [1, 2, 3, 5, 12, 40]]
+    tasks = [dict(mood, title='Work report', completed=True, created_at=mood['date']) for mood in moods]
+    journal = [dict(mood, content='work today', created_at=mood['date']) for mood in moods]
+    store.ingest('u', {'mood_history': moods, 'task_history': tasks, 'journal_entries': journal,
+                       'timezone': 'UTC'})
+
+    summaries = [insights.generate_insights(journal, moods, tasks, [], timezone='UTC')['weekly_summary'],
+                 store.insights('u')['weekly_summary'], store.weekly_summary('u')]
+    for summary in summaries:
+        assert summary['mood_entries_this_week'] == summary['tasks_this_week'] == 4
+        assert summary['completed_tasks_this_week'] == summary['journal_entries_this_week'] == 4
+        assert summary['average_mood_this_week'] == pytest.approx(3.75)
+
+
+def test_a_timezone_change_moves_records_to_their_new_local_date(store):
+    store.ingest('u', {'mood_history': [{'id': 1, 'emotion': 'calm', 'score': 5, 'date': '2026-03-01T20:00:00Z'}],
+                       'timezone': 'UTC'})
+    assert store.rollup('u').columns['day'].tolist() == [daily_rollup.parse_day('2026-03-01')]
+    store.ingest('u', {'timezone': 'Asia/Tokyo'})
+    assert store.rollup('u').columns['day'].tolist() == [daily_rollup.parse_day('2026-03-02')]
+
+
+def test_an_older_format_is_rebuilt(store, monkeypatch):
+    rng = random.Random(9)
+    moods, tasks, journal, habits = history(rng, count=100)
+    store.ingest('u', {'mood_history': moods, 'task_history': tasks, 'journal_entries': journal,
+                       'habit_data': habits})
+    current = store.rollup('u')
+    meta_path = os.path.join(store.rollups._directory('u'), 'meta.json')
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    meta['format'] = daily_rollup.FORMAT_VERSION - 1
+    with open(meta_path, 'w') as meta_file:
+        json.dump(meta, meta_file)
+
+    assert store.rollups.version('u') is None
+    assert_same_rows(store.rollup('u'), current)
+    with open(meta_path) as meta_file:
+        assert json.load(meta_file)['format'] == daily_rollup.FORMAT_VERSION
+
+    # The next ingest only touches a few days again
+    store.ingest('u', {'mood_history': [dict(moods[0], score=1)]})
+    assert_same_rows(store.rollup('u'), store._rollup_rows(store._connect(), 'u'))
+
+
+def test_the_module_imports_without_fcntl(monkeypatch):
+    # Windows has no fcntl; it is only needed once a rollup is locked
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    spec = importlib.util.spec_from_file_location('daily_rollup_without_fcntl', daily_rollup.__file__)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+
+def test_deleting_a_user_removes_the_rollup(store):
+    store.ingest('u', {'mood_history': [{'id': 1, 'emotion': 'calm', 'score': 5, 'date': '2026-03-01'}]})
+    assert len(store.rollup('u')) == 1
+    store.delete_user('u')
+    assert not os.path.exists(store.rollups._directory('u'))
+    assert len(store.rollup('u')) == 0
+
+
+def test_memory_store_keeps_no_rollups(insights):
+    store = InsightStateStore(insights, ':memory:')
+    with pytest.raises(ValueError):
+        store.rollup('u')
@@ -0,0 +1,28 @@
+"""Sharding large detection batches across a process pool"""
+
+from conftest import DETECTION_TEXTS
+from detection_pool import DetectionPool
+
+
+def test_pool_results_match_inline_detection(detector):
+    texts = DETECTION_TEXTS + [f'so happy, day {index}!' for index in range(20)] + [None]
+    pool = DetectionPool(detector, processes=2, min_batch_size=4)
+    try:
+        results = pool.predict_batch(texts)
+        assert pool.stats()['started']
+    finally:
+        pool.shutdown()
+    assert results == detector.predict_batch(texts)
+
+
+def test_small_batches_stay_inline(detector):
+    pool = DetectionPool(detector, processes=2, min_batch_size=100)
+    assert pool.predict_batch(DETECTION_TEXTS) == detector.predict_batch(DETECTION_TEXTS)
+    assert not pool.stats()['started']
+
+
+def test_zero_processes_disables_the_pool(detector):
+    pool = DetectionPool(detector, processes=0, min_batch_size=1)
+    assert not pool.enabled
+    assert pool.predict_batch(['so sad']) == detector.predict_batch(['so sad'])
+    assert not pool.stats()['started']
@@ -0,0 +1,129 @@
+"""Packed habit bitmaps vs counting marked days in a loop"""
+
+import random
+
+import numpy as np
+import pytest
+
+from habit_bitmaps import (DAY_NAMES, MAX_DAYS_AHEAD, MAX_HISTORY_DAYS, NO_START, HabitBitmaps, epoch_day,
+                           plausible_days)
+from personalized_insights import PersonalizedInsights
+
+TODAY = 20500
+WINDOWS = (7, 30)
+
+
+def random_habits(rng, count):
+    """Per habit: set of marked epoch days (a few after today) and creation day or NO_START"""
+    habits = []
+    for _ in range(count):
+        length = rng.choice([1, 3, 20, 120, 800])
+        first = TODAY - length + 1
+        marked = {day for day in range(first, TODAY + 3) if rng.random() < rng.choice([0.3, 0.7, 0.95])}
+        created = rng.choice([NO_START, first - rng.randint(0, 20), first + rng.randint(0, 10)])
+        habits.append((marked, created))
+    return habits
+
+
+def build(habits, today=TODAY):
+    habit_index = [index for index, (marked, _) in enumerate(habits) for _ in marked]
+    days = [day for marked, _ in habits for day in marked]
+    return HabitBitmaps.from_days(habit_index, days, len(habits), np.array([created for _, created in habits]), today)
+
+
+def loop_summary(marked, created, today=TODAY):
+    """One habit's statistics, one day at a time"""
+    started = min([day for day in (created,) if day != NO_START] + ([min(marked)] if marked else []), default=None)
+    rates = {}
+    for window in WINDOWS:
+        first = today - window + 1
+        if started is not None:
+            first = max(first, min(started, today + 1))
+        days = range(first, today + 1)
+        rates[f'{window}d'] = round(sum(day in marked for day in days) / len(days), 4) if len(days) else 0.0
+    current = 0
+    while today - current in marked:
+        current += 1
+    longest = run = 0
+    for day in sorted(marked):
+        run = run + 1 if day - 1 in marked else 1
+        longest = max(longest, run)
+    hits, occurrences = [0] * 7, [0] * 7
+    for day in range(started, today + 1) if started is not None else []:
+        weekday = (day + 3) % 7
+        occurrences[weekday] += 1
+        hits[weekday] += day in marked
+    return {
+        'started': str(np.datetime64(started, 'D')) if started is not None else None,
+        'total_marked': len(marked),
+        'completion_rates': rates,
+        'current_streak': current,
+        'longest_streak': longest,
+        'weekday_rates': {name: round(hits[i] / occurrences[i], 4) if occurrences[i] else 0.0
+                          for i, name in enumerate(DAY_NAMES)}
+    }
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_summaries_match_the_loop(seed):
+    habits = random_habits(random.Random(seed), 8)
+    assert build(habits).summaries(TODAY, WINDOWS) == [loop_summary(marked, created) for marked, created in habits]
+
+
+def test_counts_over_any_range_match_the_loop():
+    rng = random.Random(1)
+    habits = random_habits(rng, 5)
+    bitmaps = build(habits)
+    for _ in range(300):
+        first = rng.randint(bitmaps.origin - 10, TODAY + 5)
+        last = first + rng.randint(-2, 40)
+        assert bitmaps.count(first, last).tolist() == [sum(first <= day <= last for day in marked)
+                                                       for marked, _ in habits]
+
+
+def test_streaks_ignore_marks_after_today():
+    bitmaps = build([({TODAY - 2, TODAY - 1, TODAY, TODAY + 1, TODAY + 2}, NO_START),
+                     ({TODAY - 1, TODAY + 1}, NO_START)])
+    current, longest = bitmaps.streaks(TODAY)
+    assert current.tolist() == [3, 0]
+    assert longest.tolist() == [5, 1]
+
+
+def test_stored_rows_round_trip():
+    habits = random_habits(random.Random(2), 6) + [(set(), NO_START)]
+    rows = [HabitBitmaps.to_row(np.array(sorted(marked), dtype=np.int64)) for marked, _ in habits]
+    for (marked, _), (origin, packed) in zip(habits, rows):
+        assert HabitBitmaps.row_days(origin, packed).tolist() == sorted(marked)
+    created = np.array([created for _, created in habits])
+    stored = HabitBitmaps.from_rows(rows, created, TODAY)
+    assert stored.summaries(TODAY, WINDOWS) == build(habits).summaries(TODAY, WINDOWS)
+
+
+def test_implausible_marks_do_not_stretch_the_bitmaps():
+    marked = {TODAY - 3, TODAY - 1}
+    bitmaps = build([(marked | {TODAY - MAX_HISTORY_DAYS, TODAY + MAX_DAYS_AHEAD + 1, -719162}, NO_START)])
+    assert bitmaps.days == 4
+    assert bitmaps.summaries(TODAY, WINDOWS) == [loop_summary(marked, NO_START)]
+    assert plausible_days([TODAY - MAX_HISTORY_DAYS + 1, TODAY + MAX_DAYS_AHEAD], TODAY).all()
+
+
+def test_habit_without_marks_or_creation_date():
+    summary, = build([(set(), NO_START)]).summaries(TODAY, WINDOWS)
+    assert summary['started'] is None
+    assert summary['completion_rates'] == {'7d': 0.0, '30d': 0.0}
+    assert set(summary['weekday_rates'].values()) == {0.0}
+
+
+def test_request_habits_ignore_malformed_far_dates():
+    insights = PersonalizedInsights()
+    days = ['2026-03-01', '2026-03-02', '2026-03-04']
+
+    def summaries(marked_days):
+        frames = insights.build_frames(habit_data=[{'name': 'Read', 'marked_days': marked_days}])
+        bitmaps = insights._habit_bitmaps(frames)
+        return bitmaps.days, bitmaps.summaries(epoch_day(frames.now), WINDOWS)
+
+    clean_days, clean = summaries(days)
+    messy_days, messy = summaries(days + ['0001-01-01', '9999-12-31'])
+    assert messy == clean
+    assert messy_days == clean_days
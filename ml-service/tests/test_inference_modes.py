@@ -0,0 +1,67 @@
+"""Serving the trained model in rule, model and hybrid inference modes"""
+
+import numpy as np
+import pytest
+
+from emotion_detector import EmotionDetector
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        EmotionDetector(inference_mode='magic')
+
+
+def test_without_a_model_every_mode_uses_the_rules(monkeypatch, tmp_path):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'missing_model.pkl'))
+    detector = EmotionDetector(inference_mode='hybrid')
+    assert detector.active_inference_mode() == 'rule'
+    assert detector.predict('so sad today') == {'emotion': 'sad', 'probability': 1.0, 'all_emotions': {'sad': 1.0}}
+
+
+def test_rule_mode_ignores_the_model(model_detector, detector):
+    rules = model_detector('rule')
+    assert rules.model is not None
+    assert rules.predict('worried and nervous about the exam') == detector.predict('worried and nervous about the exam')
+
+
+def test_model_mode_returns_model_probabilities(model_detector):
+    detector = model_detector('model')
+    detector.model_confidence_threshold = 0.0
+    text = 'worried and nervous about the exam'
+    probabilities = detector.model.predict_proba([detector._preprocess_text(text)])[0]
+    result = detector.predict(text)
+    assert result['emotion'] == 'anxious'
+    assert result['probability'] == round(float(probabilities.max()), 2)
+    assert set(result['all_emotions']) == set(detector.model.classes_)
+
+
+def test_model_mode_falls_back_to_rules_when_unsure(model_detector, detector):
+    model = model_detector('model')
+    model.model_confidence_threshold = 1.01
+    text = 'worried and nervous about the exam'
+    assert model.predict(text) == detector.predict(text)
+
+
+def test_hybrid_blends_model_and_rule_distributions(model_detector):
+    detector = model_detector('hybrid')
+    text = 'furious, worried and sad at once'
+    processed = detector._preprocess_text(text)
+    model = dict(zip(detector.model.classes_, detector.model.predict_proba([processed])[0]))
+    rules = detector._rule_based_scores_batch([processed])[0]
+    rules = dict(zip(detector.emotions, rules / rules.sum()))
+    weight = detector.model_blend_weight
+    expected = {label: weight * model.get(label, 0.0) + (1 - weight) * rules.get(label, 0.0)
+                for label in set(model) | set(rules)}
+
+    result = detector.predict(text)
+    assert result['emotion'] == max(expected, key=expected.get)
+    assert result['all_emotions'] == {label: round(p, 4) for label, p in expected.items() if p > 0}
+    assert np.isclose(sum(result['all_emotions'].values()), 1.0, atol=1e-3)
+
+
+def test_hybrid_uses_the_model_alone_without_keyword_hits(model_detector):
+    detector = model_detector('hybrid')
+    text = 'the quarterly report is due on friday'
+    model = detector.model.predict_proba([detector._preprocess_text(text)])[0]
+    assert detector.predict(text)['all_emotions'] == {
+        label: round(float(p), 4) for label, p in zip(detector.model.classes_, model)}
@@ -0,0 +1,95 @@
+"""Columnar per-request frames: timestamp parsing, windows and local times"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+import insight_frames
+from insight_frames import (build_habit_frame, build_mood_frame, build_task_frame, categorize, in_window,
+                            local_wall_clock, parse_timestamps, resolve_timezone, weekdays)
+
+
+def test_timestamps_parse_like_fromisoformat():
+    values = ['2026-03-01T08:30:00', '2026-03-01T08:30:00Z', '2026-03-01T08:30:00+05:30', '2026-03-01',
+              'garbage', '', None, 12345, '2026-03-01T08:30:00']
+    timestamps, aware, offsets, timed = parse_timestamps(values, with_offsets=True)
+    wall_clock = np.datetime64('2026-03-01T08:30:00', 'us')
+    assert timestamps[:3].tolist() == [wall_clock.item()] * 3
+    assert timestamps[3] == np.datetime64('2026-03-01', 'us')
+    assert np.isnat(timestamps[4:8]).all() and timestamps[8] == wall_clock
+    assert aware.tolist() == [False, True, True] + [False] * 6
+    assert offsets.tolist() == [0, 0, 19800] + [0] * 6
+    assert timed.tolist() == [True, True, True, False, False, False, False, False, True]
+
+
+def test_windows_compare_times_in_the_timezone():
+    values = ['2026-03-05T10:00:00', '2026-03-01T03:00:00Z', '2026-02-28T20:00:00-05:00', '2026-02-01', None]
+    timestamps, aware, offsets, _ = parse_timestamps(values, with_offsets=True)
+    # Without a timezone, offset-aware times count by their wall clock as written
+    assert in_window(timestamps, aware, offsets, None, datetime(2026, 3, 1)).tolist() == [
+        True, True, False, False, False]
+    assert in_window(timestamps, aware, offsets, resolve_timezone('Asia/Tokyo'), datetime(2026, 3, 1)).tolist() == [
+        True, True, True, False, False]
+    assert in_window(timestamps, aware, offsets, resolve_timezone('America/Los_Angeles'),
+                     datetime(2026, 3, 1)).tolist() == [True, False, False, False, False]
+
+
+def test_weekdays_of_aware_times_use_their_wall_clock():
+    timestamps, _ = parse_timestamps(['2026-03-02T23:30:00+05:30', '2026-03-08'])
+    assert weekdays(timestamps).tolist() == [0, 6]
+
+
+@pytest.mark.parametrize('zone', ['America/New_York', 'Asia/Kolkata', 'Australia/Lord_Howe'])
+def test_local_wall_clock_matches_zoneinfo(zone):
+    rng = random.Random(zone)
+    moments = [datetime(2025, 1, 1, tzinfo=timezone(timedelta(minutes=rng.randrange(-720, 841, 15))))
+               + timedelta(seconds=rng.randrange(2 * 365 * 86400)) for _ in range(500)]
+    values = [moment.isoformat() for moment in moments] + ['2026-03-01T08:30:00']
+    timestamps, aware, offsets, _ = parse_timestamps(values, with_offsets=True)
+    local = local_wall_clock(timestamps, aware, offsets, resolve_timezone(zone))
+    expected = [moment.astimezone(ZoneInfo(zone)).replace(tzinfo=None) for moment in moments]
+    assert local[:-1].tolist() == expected
+    assert local[-1] == timestamps[-1]
+
+
+def test_implausible_aware_times_keep_the_time_as_written(monkeypatch):
+    values = ['0001-01-01T10:00:00Z', '9999-12-31T10:00:00Z', '2026-03-01T08:30:00Z']
+    timestamps, aware, offsets, _ = parse_timestamps(values, with_offsets=True)
+    spans = []
+    offset_changes = insight_frames._offset_changes
+    monkeypatch.setattr(insight_frames, '_offset_changes',
+                        lambda zone, start, end: spans.append(end - start) or offset_changes(zone, start, end))
+    local = local_wall_clock(timestamps, aware, offsets, resolve_timezone('Europe/Berlin'))
+    assert local[:2].tolist() == timestamps[:2].tolist()
+    assert local[2] == np.datetime64('2026-03-01T09:30:00', 'us')
+    # Offset changes are only looked up around the converted instant
+    assert spans == [0]
+
+
+def test_unknown_timezones_are_rejected():
+    assert resolve_timezone(None) is None
+    with pytest.raises(ValueError):
+        resolve_timezone('Mars/Olympus_Mons')
+
+
+def test_frames_hold_one_value_per_record():
+    moods = build_mood_frame([{'emotion': 'sad', 'score': 3, 'date': '2026-03-01'}, {}, {'emotion': 'sad'}])
+    assert moods.emotion_categories == ['sad', 'neutral']
+    assert moods['emotion'].tolist() == [0, 1, 0]
+    assert moods['score'].tolist() == [3.0, 5.0, 5.0]
+
+    tasks = build_task_frame([{'title': 'Gym', 'completed': 1}, {'completed': None}])
+    assert tasks['title'].tolist() == ['gym', ''] and tasks['completed'].tolist() == [True, False]
+
+    habits = build_habit_frame([{'name': 'Read', 'marked_days': ['2026-03-01', '2026-03-02']},
+                                {'marked_days': None}, {'name': 'Run', 'marked_days': ['2026-03-02']}])
+    assert habits['name'].tolist() == ['Read', 'Unknown', 'Run']
+    assert habits['day_habit'].tolist() == [0, 0, 2]
+
+
+def test_categories_keep_first_appearance_order():
+    categories, codes = categorize(['b', 'a', 'b', 'c'])
+    assert categories == ['b', 'a', 'c'] and codes.tolist() == [0, 1, 0, 2]
@@ -0,0 +1,195 @@
+"""Stored insight state vs the request path over the same records"""
+
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from insight_state import InsightStateStore, InvalidDelta
+from personalized_insights import PersonalizedInsights
+
+EMOTIONS = ['happy', 'sad', 'anxious', 'calm', 'angry', 'neutral']
+TASK_TITLES = ['Work report', 'gym session', 'Read book', 'call mom', 'project meeting', 'Study math']
+WORDS = 'work project happy friend travel sad study deadline calm doctor'.split()
+
+
+def build_history(days, rng):
+    """Journal entries, moods, tasks and habits with ids over the last `days` days"""
+    start = datetime.now() - timedelta(days=days)
+    day_starts = [start + timedelta(days=day) for day in range(days)]
+    journal = [{'content': ' '.join(rng.choices(WORDS, k=5)),
+                'created_at': (day + timedelta(hours=rng.uniform(19, 23))).isoformat()}
+               for day in day_starts if rng.random() < 0.6]
+    moods = [{'emotion': rng.choice(EMOTIONS), 'score': rng.choice([rng.randint(1, 10), round(rng.uniform(1, 10), 1)]),
+              'date': (day + timedelta(hours=rng.uniform(7, 22))).isoformat()}
+             for day in day_starts]
+    tasks = [{'title': rng.choice(TASK_TITLES), 'completed': rng.random() < 0.7,
+              'created_at': (day + timedelta(hours=rng.uniform(8, 20))).isoformat()}
+             for day in day_starts for _ in range(rng.randint(0, 4))]
+    habits = [{'name': name, 'created_at': (start - timedelta(days=30)).date().isoformat(),
+               'marked_days': [day.date().isoformat() for day in day_starts if rng.random() < 0.7]}
+              for name in ['Exercise', 'Meditation', 'Reading']]
+    for records in (journal, moods, tasks, habits):
+        for record_id, record in enumerate(records):
+            record['id'] = record_id
+    return journal, moods, tasks, habits
+
+
+def assert_close(expected, got, path=''):
+    """Equal results, allowing float sums kept in the store to differ in the last bits"""
+    if isinstance(expected, dict):
+        assert isinstance(got, dict) and set(expected) == set(got), path
+        for key in expected:
+            assert_close(expected[key], got[key], f'{path}/{key}')
+    elif isinstance(expected, list):
+        assert isinstance(got, list) and len(expected) == len(got), path
+        for index, (a, b) in enumerate(zip(expected, got)):
+            assert_close(a, b, f'{path}[{index}]')
+    elif isinstance(expected, float) or isinstance(got, float):
+        assert got is not None and math.isclose(expected, got, rel_tol=1e-9, abs_tol=1e-9), (path, expected, got)
+    else:
+        assert expected == got, (path, expected, got)
+
+
+def as_json(result):
+    return json.loads(json.dumps(result, default=float))
+
+
+@pytest.fixture
+def insights():
+    return PersonalizedInsights()
+
+
+@pytest.fixture
+def store(insights):
+    return InsightStateStore(insights, ':memory:')
+
+
+@pytest.mark.parametrize('days', [3, 20, 200])
+def test_chunked_ingests_match_the_request_path(insights, store, days):
+    rng = random.Random(days)
+    journal, moods, tasks, habits = build_history(days, rng)
+    # The request path reads the last 7 moods by date, not by list position
+    rng.shuffle(moods)
+    store.ingest('u', {'mood_history': moods[:3], 'replace': True})
+    for start in range(0, max(len(moods), len(tasks), len(journal)), 50):
+        store.ingest('u', {'journal_entries': journal[start:start + 50], 'mood_history': moods[start:start + 50],
+                           'task_history': tasks[start:start + 50], 'habit_data': habits if start == 0 else []})
+
+    expected = insights.generate_insights(journal, moods, tasks, habits)
+    assert_close(as_json(expected), as_json(store.insights('u', datetime.now())))
+    assert_close(as_json(insights.analyze_mood_patterns(moods)), as_json(store.mood_patterns('u')))
+
+
+def test_changes_and_deletes_match_the_request_path(insights, store):
+    rng = random.Random(5)
+    journal, moods, tasks, habits = build_history(40, rng)
+    store.ingest('u', {'journal_entries': journal, 'mood_history': moods, 'task_history': tasks,
+                       'habit_data': habits})
+
+    for task in tasks[::4]:
+        task['completed'] = not task['completed']
+    journal[0]['content'] = 'sad deadline'
+    changed_moods = moods[-3:]
+    for entry in changed_moods:
+        entry['score'], entry['emotion'] = 2, 'sad'
+    habits[0]['marked_days'] = habits[0]['marked_days'][::2]
+    deleted = {'task_history': [task['id'] for task in tasks[1::5]], 'mood_history': [moods[0]['id']]}
+    store.ingest('u', {'journal_entries': journal[:1], 'mood_history': changed_moods, 'task_history': tasks,
+                       'habit_data': habits[:1], 'deleted': deleted})
+    tasks = [task for task in tasks if task['id'] not in deleted['task_history']]
+    moods = moods[1:]
+
+    expected = insights.generate_insights(journal, moods, tasks, habits)
+    assert_close(as_json(expected), as_json(store.insights('u', datetime.now())))
+
+
+def test_equal_time_ties_agree(insights, store):
+    # Same timestamp and count for two emotions: both paths order by
+    # (time, score) and break the most-common tie alphabetically
+    moods = [{'id': index, 'emotion': emotion, 'score': score, 'date': '2026-03-01T09:00:00'}
+             for index, (emotion, score) in enumerate([('sad', 9), ('calm', 3), ('sad', 1), ('calm', 7),
+                                                       ('happy', 5), ('happy', 4), ('angry', 6), ('angry', 2)])]
+    store.ingest('u', {'mood_history': list(reversed(moods))})
+    expected = insights.analyze_mood_patterns(moods)
+    assert_close(as_json(expected), as_json(store.mood_patterns('u')))
+    assert store.mood_patterns('u')['most_common_emotion'] == 'angry'
+
+
+def test_trend_analytics_read_only_the_lookback(insights, store):
+    rng = random.Random(9)
+    _, moods, _, _ = build_history(400, rng)
+    store.ingest('u', {'mood_history': moods})
+    options = {'windows': [7, 30], 'halflife': 3}
+    expected = insights.analyze_mood_patterns(moods, options)['trend_analytics']
+    assert_close(as_json(expected), as_json(store.mood_patterns('u', options)['trend_analytics']))
+
+
+def test_long_histories_match_within_the_correlation_lookback(insights, store):
+    rng = random.Random(12)
+    journal, moods, tasks, habits = build_history(500, rng)
+    store.ingest('u', {'journal_entries': journal, 'mood_history': moods, 'task_history': tasks})
+    # The first mentions move when the oldest entries go
+    deleted = [entry['id'] for entry in journal[:40]]
+    store.ingest('u', {'deleted': {'journal_entries': deleted}})
+    journal = journal[40:]
+
+    expected = insights.generate_insights(journal, moods, tasks, [])
+    got = store.insights('u', datetime.now())
+    for section in ('productivity_insights', 'journal_insights'):
+        assert_close(as_json(expected[section]), as_json(got[section]))
+    analysis = got['productivity_insights']['mood_productivity_analysis']
+    assert analysis['lookback_days'] == insights.CORRELATION_LOOKBACK_DAYS
+    assert analysis['pearson']['n'] <= insights.CORRELATION_LOOKBACK_DAYS
+
+
+@pytest.mark.parametrize('deleted', [{'task_history': 5}, {'task_history': '12'}, {'mood_history': {'id': 1}}])
+def test_deleted_ids_must_be_lists(store, deleted):
+    store.ingest('u', {'task_history': [{'id': 1, 'title': 'Work report', 'completed': True},
+                                        {'id': 2, 'title': 'Study math', 'completed': False}]})
+    with pytest.raises(InvalidDelta):
+        store.ingest('u', {'deleted': deleted})
+    assert store.productivity('u')['total_tasks'] == 2
+
+
+@pytest.mark.parametrize('score', [None, 'seven', [7]])
+def test_non_numeric_scores_are_refused_before_anything_is_applied(store, score):
+    store.ingest('u', {'mood_history': [{'id': 1, 'emotion': 'calm', 'score': 5, 'date': '2026-03-01'}]})
+    with pytest.raises(InvalidDelta):
+        store.ingest('u', {'mood_history': [{'id': 2, 'emotion': 'sad', 'score': 3, 'date': '2026-03-02'},
+                                            {'id': 3, 'emotion': 'sad', 'score': score, 'date': '2026-03-02'}]})
+    assert store.mood_patterns('u')['total_entries'] == 1
+
+
+def test_implausible_years_are_ingested_with_a_timezone(insights, store):
+    tasks = [{'id': index, 'title': 'Work report', 'completed': True, 'created_at': created_at}
+             for index, created_at in enumerate(['0001-01-01T10:00:00Z', '9999-12-31T10:00:00Z'])]
+    store.ingest('u', {'task_history': tasks, 'timezone': 'Europe/Berlin'})
+    store.ingest('u', {'timezone': 'Asia/Tokyo'})
+    expected = insights.analyze_productivity(tasks, [], [], timezone='Asia/Tokyo')['productivity_windows']
+    assert_close(as_json(expected), as_json(store.insights('u')['productivity_insights']['productivity_windows']))
+
+
+def test_numeric_strings_are_accepted(store):
+    store.ingest('u', {'mood_history': [{'id': 1, 'emotion': 'calm', 'score': '7', 'date': '2026-03-01'}]})
+    assert store.mood_patterns('u')['average_mood_score'] == 7
+
+
+def test_ingest_route_rejects_a_null_score(client):
+    response = client.post('/api/insight-state/ingest', json={
+        'user_id': 42, 'mood_history': [{'id': 1, 'emotion': 'calm', 'score': 5},
+                                        {'id': 2, 'emotion': 'sad', 'score': None}]})
+    assert response.status_code == 400
+    assert 'score must be a number' in response.get_json()['error']
+
+
+def test_ingest_route_rejects_deleted_ids_that_are_not_a_list(client):
+    response = client.post('/api/insight-state/ingest', json={'user_id': 42, 'deleted': {'task_history': 7}})
+    assert response.status_code == 400
+    assert 'lists of ids' in response.get_json()['error']
+
+
+def test_ingest_route_requires_a_user_id(client):
+    assert client.post('/api/insight-state/ingest', json={'mood_history': []}).status_code == 400
@@ -0,0 +1,127 @@
+"""Journal theme timeline: streaming vs batch vs a per-entry loop"""
+
+import json
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from insight_frames import parse_timestamps
+from journal_themes import (UNDATED, ThemeTimeline, entry_days, load_theme_keywords, stream_theme_timeline,
+                            theme_columns)
+from personalized_insights import PersonalizedInsights
+
+WORDS = ('today i went to the office and my friend said the project was fine then we talked about travel plans '
+         'a course i want to study my health and the doctor visit family dinner was calm and i felt tired').split()
+
+
+@pytest.fixture
+def insights(monkeypatch):
+    monkeypatch.delenv('JOURNAL_THEMES_PATH', raising=False)
+    return PersonalizedInsights()
+
+
+def journal_entries(count, seed, undated=0.2):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [{'content': ' '.join(rng.choices(WORDS, k=rng.randint(3, 30))),
+             'created_at': None if rng.random() < undated
+             else (start + timedelta(hours=rng.uniform(0, 24 * 500))).isoformat()}
+            for _ in range(count)]
+
+
+def loop_timeline(theme_keywords, entries):
+    """Timeline built one entry at a time with substring checks"""
+    mentions, hits, days, months = Counter(), Counter(), defaultdict(list), defaultdict(Counter)
+    for entry in entries:
+        content = entry['content'].lower()
+        created = entry['created_at'][:10] if entry['created_at'] else None
+        for theme, keywords in theme_keywords.items():
+            found = sum(keyword in content for keyword in set(keywords))
+            if found:
+                mentions[theme] += 1
+                hits[theme] += found
+                if created:
+                    days[theme].append(created)
+                    months[theme][created[:7]] += 1
+    return {
+        theme: {
+            'entries': mentions[theme],
+            'keyword_hits': hits[theme],
+            'share_of_entries': round(mentions[theme] / len(entries), 4),
+            'first_mentioned': min(days[theme]) if days[theme] else None,
+            'last_mentioned': max(days[theme]) if days[theme] else None,
+            'monthly_entries': dict(sorted(months[theme].items()))
+        }
+        for theme in theme_keywords if mentions[theme]
+    }
+
+
+@pytest.mark.parametrize('count, seed', [(1, 0), (7, 1), (300, 2)])
+def test_request_timeline_matches_the_loop(insights, count, seed):
+    entries = journal_entries(count, seed)
+    timeline = insights._analyze_journal_patterns(entries)['theme_timeline']
+    assert timeline == loop_timeline(insights.theme_keywords, entries)
+    assert list(timeline) == [theme for theme in insights.theme_keywords if theme in timeline]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1000])
+def test_streaming_matches_the_request_path(insights, chunk_size):
+    entries = journal_entries(400, 3)
+    streamed = stream_theme_timeline((entry for entry in entries), insights.text_analyzer,
+                                     insights.theme_keywords, chunk_size=chunk_size)
+    assert streamed.total_entries == 400
+    assert json.dumps(streamed.summaries()) == json.dumps(
+        insights._analyze_journal_patterns(entries)['theme_timeline'])
+
+
+def test_daily_aggregates_match_per_entry_rows(insights):
+    entries = journal_entries(200, 4)
+    themes = list(insights.theme_keywords)
+    hits = insights.text_analyzer.tokenize_entries(entries).group_counts[:, theme_columns(insights.text_analyzer,
+                                                                                          themes)]
+    timestamps, _ = parse_timestamps(entry['created_at'] for entry in entries)
+    days = entry_days(timestamps)
+
+    per_entry = ThemeTimeline(themes)
+    per_entry.add(days, hits > 0, hits)
+
+    # Per-day totals, as the insight state store keeps them
+    unique_days, index = np.unique(days, return_inverse=True)
+    daily_entries = np.zeros((len(unique_days), len(themes)), dtype=np.int64)
+    daily_hits = np.zeros_like(daily_entries)
+    np.add.at(daily_entries, index, hits > 0)
+    np.add.at(daily_hits, index, hits)
+    daily = ThemeTimeline(themes)
+    daily.add(unique_days, daily_entries, daily_hits, total_entries=len(entries))
+    assert daily.summaries() == per_entry.summaries()
+
+
+def test_undated_mentions_have_no_dates():
+    timeline = ThemeTimeline(['Work', 'Health'])
+    timeline.add([UNDATED, 19800], [[1, 0], [0, 1]], [[2, 0], [0, 1]])
+    summaries = timeline.summaries()
+    assert summaries['Work'] == {'entries': 1, 'keyword_hits': 2, 'share_of_entries': 0.5,
+                                 'first_mentioned': None, 'last_mentioned': None, 'monthly_entries': {}}
+    assert summaries['Health']['first_mentioned'] == str(np.datetime64(19800, 'D'))
+
+
+def test_custom_theme_dictionary(tmp_path, monkeypatch):
+    path = tmp_path / 'themes.json'
+    path.write_text(json.dumps({'Music': ['Concert', 'music '], 'Garden': ['garden']}))
+    monkeypatch.setenv('JOURNAL_THEMES_PATH', str(path))
+    insights = PersonalizedInsights()
+    assert insights.theme_keywords == {'Music': ['concert', 'music'], 'Garden': ['garden']}
+    timeline = insights._analyze_journal_patterns([{'content': 'A concert in the garden',
+                                                    'created_at': '2026-03-01'}])['theme_timeline']
+    assert list(timeline) == ['Music', 'Garden']
+
+
+@pytest.mark.parametrize('themes', [[], {}, {'Music': []}, {'Music': 'concert'}, {'Music': ['  ']}])
+def test_malformed_theme_dictionaries_are_refused(tmp_path, themes):
+    path = tmp_path / 'themes.json'
+    path.write_text(json.dumps(themes))
+    with pytest.raises(ValueError):
+        load_theme_keywords(str(path))
@@ -0,0 +1,97 @@
+"""Compiled keyword matcher vs the original one-scan-per-keyword rules"""
+
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatcher
+
+# Keywords inside longer words, overlapping keywords, negation, questions,
+# punctuation-only and empty texts
+GOLDEN_CORPUS = [
+    "I feel amazing today!",
+    "I am not happy with how things went.",
+    "Why does everything make me so anxious?",
+    "Had a calm, peaceful evening with the family.",
+    "I know I should download the report, but I'm down.",
+    "My career is something I care about deeply.",
+    "Joyful, joyous, overjoyed - just pure joy!!!",
+    "Nothing special happened. It was an ordinary day.",
+    "I'm afraid and terrified of the exam tomorrow",
+    "Sitting still in the quiet library, feeling content.",
+    "What a wonderful, fantastic, awesome trip!",
+    "I'm frustrated and annoyed, honestly upset.",
+    "Nobody showed up. I feel blue and heartbroken.",
+    "Thrilled and pumped for the weekend!",
+    "How are you? I'm fine, thanks.",
+    "Visit https://example.com for more info",
+    "",
+    "...",
+    "I adore my dog and cherish every moment",
+    "Work was okay. Normal meeting, usual emails.",
+]
+
+
+def legacy_rule_based_detection(detector, text):
+    """The rule-based detection before the matcher: one substring scan per keyword"""
+    text_lower = text.lower()
+    emotion_scores = {emotion: 0 for emotion in detector.emotions}
+    for emotion, keywords in detector.emotion_keywords.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                emotion_scores[emotion] += 1
+    if '!' in text:
+        emotion_scores['excited'] += 0.5
+        emotion_scores['happy'] += 0.3
+    if '?' in text and any(word in text_lower for word in ['why', 'what', 'how']):
+        emotion_scores['anxious'] += 0.3
+    if any(word in text_lower for word in ['not', 'no', 'never', 'neither', 'nobody', 'nothing']):
+        emotion_scores['happy'] *= 0.5
+        emotion_scores['joy'] *= 0.5
+        emotion_scores['excited'] *= 0.5
+        emotion_scores['sad'] *= 1.5
+        emotion_scores['anxious'] *= 1.5
+    max_score = max(emotion_scores.values())
+    if max_score == 0:
+        return 'neutral', 0.5
+    dominant_emotion = max(emotion_scores, key=emotion_scores.get)
+    total_score = sum(emotion_scores.values())
+    confidence = emotion_scores[dominant_emotion] / total_score if total_score > 0 else 0.5
+    return dominant_emotion, max(0.5, min(1.0, confidence))
+
+
+@pytest.mark.parametrize('text', GOLDEN_CORPUS)
+def test_golden_corpus_matches_legacy_rules(detector, text):
+    processed = detector._preprocess_text(text)
+    assert detector._rule_based_detection(processed) == legacy_rule_based_detection(detector, processed)
+
+
+def test_random_entries_match_legacy_rules(detector):
+    rng = random.Random(1)
+    vocabulary = detector._matcher.keywords + ['download', 'career', 'nothing', 'the', 'a', 'was', '!', '?']
+    for _ in range(500):
+        text = ' '.join(rng.choices(vocabulary, k=rng.randint(0, 30)))
+        processed = detector._preprocess_text(text)
+        assert detector._rule_based_detection(processed) == legacy_rule_based_detection(detector, processed)
+
+
+def test_keywords_match_inside_longer_words():
+    matcher = KeywordMatcher({'sad': ['down'], 'love': ['care']})
+    assert matcher.count('i should download my career notes') == {'sad': 1, 'love': 1}
+
+
+def test_each_distinct_keyword_counts_once_per_group():
+    matcher = KeywordMatcher({'anxious': ['afraid', 'tense'], 'fear': ['afraid']})
+    assert matcher.count('afraid, afraid and afraid') == {'anxious': 1, 'fear': 1}
+
+
+def test_keywords_with_other_characters_use_substring_checks():
+    matcher = KeywordMatcher({'phrases': ['not okay', "can't"]})
+    assert matcher.find_keywords("i'm not okay and i can't sleep") == {'not okay', "can't"}
+    assert matcher.find_keywords('not, okay') == set()
+
+
+def test_word_cache_stays_bounded():
+    matcher = KeywordMatcher({'joy': ['joy']}, max_cached_words=10)
+    matcher.find_keywords(' '.join(f'word{chr(97 + i % 26)}{chr(97 + i // 26)}' for i in range(200)))
+    assert len(matcher._word_cache) + len(matcher._plain_words) <= 10
@@ -0,0 +1,70 @@
+"""Memoized per-request analysis context"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import insight_frames
+from insight_frames import InsightFrames
+from personalized_insights import PersonalizedInsights
+
+
+def history(rng, days=60):
+    start = datetime.now() - timedelta(days=days)
+    moments = [start + timedelta(days=day, hours=rng.randint(7, 22)) for day in range(days)]
+    journal = [{'content': rng.choice(['work deadline stress', 'happy day with friends', 'gym and study']),
+                'created_at': moment.isoformat()} for moment in moments[::2]]
+    moods = [{'emotion': rng.choice(['joy', 'sad', 'calm']), 'score': rng.randint(1, 10), 'date': moment.isoformat()}
+             for moment in moments]
+    tasks = [{'title': rng.choice(['Project report', 'Gym', 'Read']), 'completed': rng.random() < 0.6,
+              'created_at': moment.isoformat()} for moment in moments for _ in range(2)]
+    habits = [{'name': name, 'marked_days': [moment.date().isoformat() for moment in moments if rng.random() < 0.7]}
+              for name in ['Read', 'Meditate']]
+    return journal, moods, tasks, habits
+
+
+@pytest.fixture(scope='module')
+def insights():
+    return PersonalizedInsights()
+
+
+def test_intermediates_are_computed_once():
+    frames = InsightFrames()
+    calls = []
+    assert frames.memoized('answer', lambda: calls.append(1) or 42) == 42
+    assert frames.memoized('answer', lambda: calls.append(1) or 0) == 42
+    assert calls == [1]
+
+
+def test_each_frame_is_built_once_per_request(insights, monkeypatch):
+    builds = []
+    for name in ('build_mood_frame', 'build_task_frame', 'build_journal_frame', 'build_habit_frame'):
+        build = getattr(insight_frames, name)
+        monkeypatch.setattr(insight_frames, name, lambda records, build=build, name=name: builds.append(name)
+                            or build(records))
+    insights.generate_insights(*history(random.Random(1)))
+    assert sorted(builds) == ['build_habit_frame', 'build_journal_frame', 'build_mood_frame', 'build_task_frame']
+
+
+def test_sections_match_the_standalone_analyses(insights):
+    journal, moods, tasks, habits = history(random.Random(2))
+    combined = insights.generate_insights(journal, moods, tasks, habits)
+
+    def same(a, b):
+        return json.dumps(a, sort_keys=True, default=float) == json.dumps(b, sort_keys=True, default=float)
+
+    standalone = insights.analyze_mood_patterns(moods)
+    assert same(combined['mood_patterns'], {key: standalone[key] for key in combined['mood_patterns']})
+    assert same(combined['productivity_insights'], insights.analyze_productivity(tasks, moods, journal))
+
+def test_profile_reports_the_dependency_graph(insights):
+    result = insights.generate_insights(*history(random.Random(3)), profile=True)
+    profile = result['analysis_profile']
+    assert set(profile['sections']) == {'mood_patterns', 'productivity_insights', 'journal_insights',
+                                        'habit_insights', 'recommendations', 'weekly_summary'}
+    assert 'mood' in profile['sections']['mood_patterns']['uses']
+    assert 'completed_tasks' in profile['sections']['recommendations']['uses']
+    assert all(record['ms'] >= 0 for record in profile['metrics'].values())
+    assert 'analysis_profile' not in insights.generate_insights(*history(random.Random(3)))
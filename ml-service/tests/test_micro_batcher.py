@@ -0,0 +1,61 @@
+"""Micro-batching of concurrent single-text detections"""
+
+import threading
+
+import pytest
+
+from conftest import DETECTION_TEXTS
+from micro_batcher import MicroBatcher
+
+
+def predict_concurrently(batcher, texts):
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def run(index):
+        barrier.wait()
+        results[index] = batcher.predict(texts[index])
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_model_mode_requests_are_batched(model_detector):
+    detector = model_detector('model')
+    batcher = MicroBatcher(detector, window_ms=200, max_batch_size=len(DETECTION_TEXTS))
+    results = predict_concurrently(batcher, DETECTION_TEXTS)
+
+    detector.cache.clear()
+    assert results == [detector.predict(text) for text in DETECTION_TEXTS]
+    stats = batcher.stats()
+    assert stats['batching'] and stats['requests'] == len(DETECTION_TEXTS)
+    assert stats['batches'] < len(DETECTION_TEXTS)
+    assert stats['passed_through'] == 0
+
+
+def test_rule_mode_passes_through_without_a_dispatcher(detector):
+    batcher = MicroBatcher(detector, window_ms=50)
+    assert batcher.enabled and not batcher.batching
+    assert predict_concurrently(batcher, DETECTION_TEXTS[:4]) == [detector.predict(text) for text in DETECTION_TEXTS[:4]]
+    assert batcher._thread is None
+    assert batcher.stats()['passed_through'] == 4
+
+
+def test_disabled_batcher_calls_predict_directly(model_detector):
+    detector = model_detector('model')
+    batcher = MicroBatcher(detector, window_ms=0)
+    assert batcher.predict('so sad') == detector.predict('so sad')
+    assert batcher._thread is None
+    assert batcher.stats()['passed_through'] == 0
+
+
+def test_scoring_errors_reach_every_caller(model_detector, monkeypatch):
+    detector = model_detector('hybrid')
+    monkeypatch.setattr(detector, 'predict_batch', lambda texts: 1 / 0)
+    batcher = MicroBatcher(detector, window_ms=1)
+    with pytest.raises(ZeroDivisionError):
+        batcher.predict('so sad')
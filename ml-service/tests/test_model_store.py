@@ -0,0 +1,36 @@
+"""Memory-mappable model artifacts"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import DETECTION_TEXTS
+from model_store import SIDECAR_SUFFIX, _array_slots, load_model
+
+
+def test_sidecar_holds_every_array(trained_model_path):
+    assert os.path.exists(trained_model_path + SIDECAR_SUFFIX)
+    pipeline = joblib.load(trained_model_path)
+    assert all(getattr(owner, name) is None for _, owner, name in _array_slots(pipeline))
+
+
+@pytest.mark.parametrize('mmap_mode', ['r', 'c', None])
+def test_loaded_model_predicts_like_the_trained_one(detector, trained_model_path, mmap_mode):
+    texts = [detector._preprocess_text(text) for text in DETECTION_TEXTS]
+    loaded = load_model(trained_model_path, mmap_mode=mmap_mode)
+    np.testing.assert_array_equal(loaded.predict_proba(texts), detector.model.predict_proba(texts))
+
+
+def test_arrays_are_mapped_read_only(trained_model_path):
+    loaded = load_model(trained_model_path, mmap_mode='r')
+    arrays = [getattr(owner, name) for _, owner, name in _array_slots(loaded)]
+    assert arrays and all(isinstance(array, np.memmap) and not array.flags.writeable for array in arrays)
+
+
+def test_legacy_single_file_models_still_load(detector, trained_model_path, tmp_path):
+    path = str(tmp_path / 'legacy.pkl')
+    joblib.dump(detector.model, path)
+    loaded = load_model(path)
+    assert loaded.predict([detector._preprocess_text('so happy')])[0] == 'happy'
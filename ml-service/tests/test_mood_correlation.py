@@ -0,0 +1,136 @@
+"""Mood-productivity correlation vs scipy.stats and a per-day loop"""
+
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from mood_correlation import RESOLUTIONS, correlate, time_bins
+
+
+def random_records(rng, days=120, gap_rate=0.3):
+    """Per-record mood and task aggregates over days with gaps, several records per day"""
+    mood_bins, mood_scores, task_bins, task_done = [], [], [], []
+    for day in range(days):
+        if rng.random() < gap_rate:
+            continue
+        for _ in range(rng.randint(0, 3)):
+            mood_bins.append(day)
+            mood_scores.append(rng.choice([rng.randint(1, 10), round(rng.uniform(1, 10), 1)]))
+        for _ in range(rng.randint(0, 4)):
+            task_bins.append(day)
+            task_done.append(rng.random() < 0.6)
+    return mood_bins, mood_scores, task_bins, task_done
+
+
+def reference_pairs(mood_bins, mood_scores, task_bins, task_done, lag=0):
+    """
+    Mean mood per day paired with the completion rate `lag` days later, by
+    looping; means are rounded so that equal means tie (4.9 vs 9.8 / 2)
+    """
+    moods, tasks = defaultdict(list), defaultdict(list)
+    for day, score in zip(mood_bins, mood_scores):
+        moods[day].append(score)
+    for day, done in zip(task_bins, task_done):
+        tasks[day].append(done)
+    days = sorted(day for day in moods if day + lag in tasks)
+    return ([round(sum(moods[day]) / len(moods[day]), 9) for day in days],
+            [round(sum(tasks[day + lag]) / len(tasks[day + lag]), 9) for day in days])
+
+
+def run(mood_bins, mood_scores, task_bins, task_done, **kwargs):
+    return correlate(mood_bins, mood_scores, np.ones(len(mood_scores)),
+                     task_bins, np.asarray(task_done, dtype=np.float64), np.ones(len(task_done)), **kwargs)
+
+
+def assert_matches_scipy(result, x, y):
+    """Both coefficients of a result (or lagged entry) against scipy on the reference pairs"""
+    for method, reference in (('pearson', stats.pearsonr), ('spearman', stats.spearmanr)):
+        r, p_value = reference(x, y)
+        assert result[method]['n'] == len(x)
+        assert result[method]['r'] == pytest.approx(r, abs=5e-5)
+        assert result[method]['p_value'] == pytest.approx(p_value, abs=5e-5)
+        assert result[method]['significant'] == (p_value < 0.05)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_same_day_and_lagged_coefficients_match_scipy(seed):
+    records = random_records(random.Random(seed))
+    result = run(*records, lags=(1, -1, 3))
+
+    x, y = reference_pairs(*records)
+    assert_matches_scipy(result, x, y)
+    assert [entry['lag'] for entry in result['lagged']] == [1, -1, 3]
+    for entry in result['lagged']:
+        x, y = reference_pairs(*records, lag=entry['lag'])
+        assert_matches_scipy(entry, x, y)
+
+
+def test_lag_pairs_mood_with_later_productivity():
+    # Productivity follows yesterday's mood exactly, and is unrelated on the same day
+    mood_bins = [0, 1, 2, 3, 4, 5]
+    mood_scores = [2, 9, 4, 7, 1, 8]
+    task_bins = [1, 2, 3, 4, 5, 6]
+    task_done = [score / 10 for score in mood_scores]
+    result = correlate(mood_bins, mood_scores, np.ones(6), task_bins, task_done, np.ones(6), lags=(1, -1))
+    one_day_later = result['lagged'][0]
+    assert one_day_later['pearson']['r'] == 1.0
+    assert one_day_later['pearson']['p_value'] == 0.0
+    assert one_day_later['pearson']['n'] == 6
+    assert result['pearson']['n'] == 5
+    assert result['lagged'][1]['pearson']['n'] == 4
+
+
+def test_partial_aggregates_match_per_record_input():
+    rng = random.Random(11)
+    mood_bins, mood_scores, task_bins, task_done = random_records(rng)
+    per_record = run(mood_bins, mood_scores, task_bins, task_done)
+
+    # Daily totals, as the insight state store passes them
+    mood_days = sorted(set(mood_bins))
+    task_days = sorted(set(task_bins))
+    daily = correlate(mood_days,
+                      [sum(s for d, s in zip(mood_bins, mood_scores) if d == day) for day in mood_days],
+                      [mood_bins.count(day) for day in mood_days],
+                      task_days,
+                      [sum(c for d, c in zip(task_bins, task_done) if d == day) for day in task_days],
+                      [task_bins.count(day) for day in task_days])
+    assert daily == per_record
+
+
+def test_lookback_keeps_the_days_up_to_the_latest_bin():
+    mood_bins, mood_scores, task_bins, task_done = random_records(random.Random(13))
+    result = run(mood_bins, mood_scores, task_bins, task_done, lookback_days=30)
+
+    start = max(mood_bins + task_bins) - 29
+    recent = ([day for day in mood_bins if day >= start], [s for d, s in zip(mood_bins, mood_scores) if d >= start],
+              [day for day in task_bins if day >= start], [c for d, c in zip(task_bins, task_done) if d >= start])
+    assert result == dict(run(*recent), lookback_days=30)
+    assert result['pearson']['n'] < run(mood_bins, mood_scores, task_bins, task_done)['pearson']['n']
+
+
+def test_too_few_pairs_or_constant_series_have_no_coefficient():
+    few = correlate([0, 1], [5, 6], [1, 1], [0, 1], [1, 0], [1, 1], lags=())
+    assert few['pearson'] == {'r': None, 'p_value': None, 'n': 2, 'significant': False}
+    constant = correlate([0, 1, 2], [5, 5, 5], [1, 1, 1], [0, 1, 2], [1, 0, 1], [1, 1, 1], lags=())
+    assert constant['pearson']['r'] is None and constant['spearman']['r'] is None
+
+
+def test_ties_share_their_average_rank():
+    mood = [3, 3, 5, 7, 7, 7, 9]
+    tasks = [0.1, 0.4, 0.4, 0.2, 0.9, 0.9, 1.0]
+    days = list(range(7))
+    result = correlate(days, mood, np.ones(7), days, tasks, np.ones(7), lags=())
+    assert result['spearman']['r'] == pytest.approx(stats.spearmanr(mood, tasks)[0], abs=5e-5)
+
+
+def test_time_bins_by_day_and_hour():
+    timestamps = np.array(['2026-03-01T23:59:59', '2026-03-02T00:00:00', '2026-03-02T01:30:00'],
+                          dtype='datetime64[us]')
+    days = time_bins(timestamps)
+    assert list(days - days[0]) == [0, 1, 1]
+    hours = time_bins(timestamps, 'hour')
+    assert list(hours - hours[0]) == [0, 1, 2]
+    assert RESOLUTIONS['day'] == 24 * RESOLUTIONS['hour']
@@ -0,0 +1,142 @@
+"""Mood trend analytics vs a day-by-day loop"""
+
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from mood_trends import MAX_LOOKBACK_DAYS, lookback_days, mood_trends, trend_options
+
+
+def random_log(rng, days=400, start=20000):
+    """(day, score) per entry, with multi-week gaps and several entries on some days"""
+    entries = []
+    day = start
+    while day < start + days:
+        if rng.random() < 0.03:
+            day += rng.randint(14, 40)
+        for _ in range(rng.choice([0, 1, 1, 2, 3])):
+            entries.append((day, rng.choice([rng.randint(1, 10), round(rng.uniform(1, 10), 1)])))
+        day += 1
+    return entries
+
+
+def rounded(value):
+    return None if value is None else round(round(value, 9), 2)
+
+
+def loop_trends(entries, windows, halflife):
+    """Windows and EWMA by walking the days one at a time"""
+    scores = defaultdict(list)
+    for day, score in entries:
+        scores[day].append(score)
+    last = max(scores)
+    days = range(min(day for day in scores if last - day < lookback_days(windows, halflife)), last + 1)
+
+    def mean(end, length):
+        values = [score for day in range(end - length + 1, end + 1) for score in scores.get(day, [])]
+        return sum(values) / len(values) if values else None
+
+    numerator = denominator = 0.0
+    decay = 0.5 ** (1 / halflife)
+    for day in days:
+        numerator = numerator * decay + sum(scores.get(day, []))
+        denominator = denominator * decay + len(scores.get(day, []))
+
+    results = []
+    for window in windows:
+        points = [(day, score) for day in range(last - window + 1, last + 1) for score in scores.get(day, [])]
+        slope = None
+        if len({day for day, _ in points}) > 1:
+            slope = round(np.polyfit([day for day, _ in points], [score for _, score in points], 1)[0] * 7, 3)
+        before = last - window
+        results.append({
+            'days': window,
+            'entries': len(points),
+            'mean': rounded(mean(last, window)),
+            'previous_mean': rounded(mean(before, window)) if before >= days[0] else None,
+            'slope_per_week': slope
+        })
+    return results, rounded(numerator / denominator)
+
+
+def run(entries, **options):
+    days, scores = zip(*entries)
+    return mood_trends(np.array(days), np.array(scores, dtype=np.float64), np.ones(len(scores)), **options)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('windows, halflife', [((7, 30, 90), 7.0), ((3, 14), 2.5), ((365,), 30.0)])
+def test_windows_and_ewma_match_the_loop(seed, windows, halflife):
+    entries = random_log(random.Random(seed))
+    result = run(entries, windows=windows, halflife=halflife)
+    expected_windows, expected_ewma = loop_trends(entries, windows, halflife)
+
+    assert result['as_of'] == str(np.datetime64(max(day for day, _ in entries), 'D'))
+    for window, expected in zip(result['windows'], expected_windows):
+        assert {key: window[key] for key in ('days', 'entries', 'mean', 'previous_mean')} == \
+            {key: expected[key] for key in ('days', 'entries', 'mean', 'previous_mean')}
+        if expected['slope_per_week'] is None:
+            assert window['slope_per_week'] is None
+        else:
+            assert window['slope_per_week'] == pytest.approx(expected['slope_per_week'], abs=1e-3)
+    assert result['ewma'] == {'halflife_days': halflife, 'value': expected_ewma}
+
+
+def test_series_buckets_end_at_the_last_day():
+    entries = [(20000 + day, day % 10 + 1) for day in range(100)]
+    series = run(entries, windows=(7,), points=30)['series']
+    assert series['bucket_days'] == 4
+    assert series['points'][-1]['date'] == str(np.datetime64(20099, 'D'))
+    assert len(series['points']) == 25
+    assert sum(point['entries'] for point in series['points']) == 100
+    last = series['points'][-1]
+    assert last['mean'] == rounded(sum(day % 10 + 1 for day in range(96, 100)) / 4)
+    assert last['rolling_means'] == {'7d': rounded(sum(day % 10 + 1 for day in range(93, 100)) / 7)}
+
+
+def test_days_before_the_lookback_change_nothing():
+    entries = random_log(random.Random(7), days=800)
+    lookback = lookback_days((7, 30), 3.0)
+    last = max(day for day, _ in entries)
+    recent = [(day, score) for day, score in entries if day > last - lookback]
+    assert run(entries, windows=(7, 30), halflife=3.0) == run(recent, windows=(7, 30), halflife=3.0)
+
+
+def test_a_far_past_date_does_not_stretch_the_grid():
+    entries = random_log(random.Random(2), days=60)
+    result = run(entries + [(-700000, 5)], windows=(7, 30), points=1000)
+    assert result == run(entries, windows=(7, 30), points=1000)
+    assert lookback_days((3650,), 3650) == MAX_LOOKBACK_DAYS
+
+
+def test_partial_aggregates_match_per_entry_input():
+    entries = random_log(random.Random(4))
+    totals = defaultdict(lambda: [0.0, 0])
+    for day, score in entries:
+        totals[day][0] += score
+        totals[day][1] += 1
+    days = sorted(totals)
+    daily = mood_trends(np.array(days), np.array([totals[day][0] for day in days]),
+                        np.array([totals[day][1] for day in days]))
+    assert daily == run(entries)
+
+
+def test_no_dated_entries():
+    assert mood_trends(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)) is None
+
+
+def test_trend_options_parse_and_validate():
+    assert trend_options('30,7,7', '3.5', '20') == {'windows': (7, 30), 'halflife': 3.5, 'points': 20}
+    for arguments in [('0',), ('7,x',), ('1,2,3,4,5,6,7',), (None, '0'), (None, None, '5000')]:
+        with pytest.raises(ValueError):
+            trend_options(*arguments)
+
+
+def test_mood_patterns_route_rejects_bad_options(client):
+    response = client.post('/api/mood-patterns?windows=0', json={'mood_history': [{'score': 5, 'date': '2026-03-01'}]})
+    assert response.status_code == 400
+    trends = client.post('/api/mood-patterns?windows=3&points=5',
+                         json={'mood_history': [{'score': 5, 'date': '2026-03-01'}]}).get_json()['trend_analytics']
+    assert [window['days'] for window in trends['windows']] == [3]
@@ -0,0 +1,36 @@
+"""Streaming NDJSON batch detection"""
+
+import json
+
+import app as service
+from conftest import DETECTION_TEXTS
+
+
+def stream(client, lines):
+    response = client.post('/api/batch-detect/stream', data=''.join(line + '\n' for line in lines),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_matches_the_batch_endpoint(client):
+    lines = [json.dumps(text) if index % 2 else json.dumps({'text': text, 'id': index})
+             for index, text in enumerate(DETECTION_TEXTS)]
+    expected = client.post('/api/batch-detect', json={'texts': DETECTION_TEXTS}).get_json()['results']
+    assert stream(client, lines) == expected
+
+
+def test_invalid_lines_are_reported_in_place(client):
+    results = stream(client, ['"so happy"', '', '{not json', '42', '"so sad"'])
+    assert [result.get('emotion') for result in results] == ['happy', None, None, 'sad']
+    assert results[1]['line'] == 3 and results[1]['error'].startswith('Invalid line')
+    assert results[2]['line'] == 4
+
+
+def test_batches_double_up_to_the_limit(monkeypatch):
+    sizes = []
+    monkeypatch.setattr(service, 'detect_batch',
+                        lambda texts, ids=None: sizes.append(len(texts)) or [{} for _ in texts])
+    list(service._stream_batch_results((f'"text {index}"' for index in range(40)), max_batch_size=8))
+    assert sizes == [1, 2, 4, 8, 8, 8, 8, 1]
@@ -0,0 +1,95 @@
+"""Bounded LRU prediction cache and its invalidation in EmotionDetector"""
+
+from emotion_detector import EmotionDetector
+from prediction_cache import PredictionCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.put(b'a', ('joy',))
+    cache.put(b'b', ('sad',))
+    cache.get(b'a')
+    cache.put(b'c', ('calm',))
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == ('joy',)
+    assert cache.get(b'c') == ('calm',)
+    assert cache.evictions == 1
+
+
+def test_memory_budget_is_respected():
+    cache = PredictionCache(max_entries=1000, max_bytes=2000)
+    for index in range(100):
+        cache.put(index.to_bytes(4, 'little'), ('emotion', 0.5, (('emotion', 0.5),)))
+    stats = cache.stats()
+    assert 0 < stats['entries'] < 100
+    assert stats['bytes'] <= 2000
+
+
+def test_entry_size_counts_the_distribution():
+    one = ('joy', 0.9, (('joy', 0.9),))
+    ten = ('joy', 0.9, tuple((f'emotion{index}', index / 10) for index in range(10)))
+    assert PredictionCache._entry_size(b'key', ten) > PredictionCache._entry_size(b'key', one) + 9 * 100
+
+
+def test_puts_from_an_older_version_are_dropped():
+    cache = PredictionCache()
+    cache.put(b'a', ('joy',), version=0)
+    cache.invalidate(1)
+    assert cache.get(b'a', 1) is None
+    cache.put(b'a', ('joy',), version=0)
+    assert cache.stats()['entries'] == 0
+    cache.put(b'a', ('sad',), version=1)
+    assert cache.get(b'a', 1) == ('sad',)
+    assert cache.get(b'a', 0) is None
+
+
+def test_zero_entries_disables_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'missing_model.pkl'))
+    detector = EmotionDetector(cache_max_entries=0)
+    detector.predict('so happy')
+    assert detector.cache.stats()['entries'] == 0
+
+
+def test_repeated_text_is_served_from_the_cache(detector):
+    first = detector.predict('I feel amazing today!')
+    assert detector.predict('  i feel AMAZING today!  ') == first
+    assert detector.cache.hits == 1
+
+
+def test_keyword_change_clears_the_cache(detector):
+    assert detector.predict('the sky is teal')['emotion'] == 'neutral'
+    detector.emotion_keywords['calm'].append('teal')
+    assert detector.predict('the sky is teal')['emotion'] == 'calm'
+    assert detector.cache.misses == 2
+    detector.negation_words.append('sky')
+    detector.predict('the sky is teal')
+    assert detector.cache.misses == 3
+    detector.emotion_keywords.update(calm=['sky'])
+    assert detector.cache.stats()['entries'] == 0
+
+
+def test_a_prediction_in_flight_during_a_change_is_not_cached(detector, monkeypatch):
+    score = detector._rule_based_detection
+
+    def change_keywords_while_scoring(text):
+        detector.emotion_keywords['calm'].append('teal')
+        return score(text)
+
+    monkeypatch.setattr(detector, '_rule_based_detection', change_keywords_while_scoring)
+    assert detector.predict('the sky is teal')['emotion'] == 'neutral'
+    assert detector.cache.stats()['entries'] == 0
+    monkeypatch.undo()
+    assert detector.predict('the sky is teal')['emotion'] == 'calm'
+
+
+def test_model_change_clears_the_cache(detector, trained_model_path):
+    detector.predict('worried and nervous about the exam')
+    assert detector.cache.stats()['entries'] == 1
+
+    detector.inference_mode = 'model'
+    detector.train_model(['a calm and peaceful exam', 'worried and nervous'], ['calm', 'anxious'],
+                         model_path=trained_model_path)
+    assert detector.cache.stats()['entries'] == 0
+    result = detector.predict('worried and nervous about the exam')
+    assert detector.cache.misses == 2
+    assert set(result['all_emotions']) == {'calm', 'anxious'}
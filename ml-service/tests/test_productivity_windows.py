@@ -0,0 +1,118 @@
+"""Best productivity times: local-hour bucketing and Wilson ranking of windows"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from insight_frames import _parse_timestamp, resolve_timezone
+from personalized_insights import PersonalizedInsights
+
+TIMEZONES = [None, 'Europe/Berlin', 'America/New_York', 'Asia/Kolkata', 'Australia/Lord_Howe']
+
+
+@pytest.fixture
+def insights():
+    return PersonalizedInsights()
+
+
+def tasks_at(day, hour, done, total):
+    """`total` tasks created at day/hour (2026-03-02 is a Monday), `done` of them completed"""
+    created_at = (datetime(2026, 3, 2, hour, 15) + timedelta(days=day)).isoformat()
+    return [{'title': 'task', 'completed': index < done, 'created_at': created_at} for index in range(total)]
+
+
+def loop_histogram(tasks, timezone):
+    """Tasks and completions per (weekday, local hour), one datetime at a time"""
+    zone = resolve_timezone(timezone)
+    totals, completed = Counter(), Counter()
+    for task in tasks:
+        created_at = task.get('created_at')
+        if not isinstance(created_at, str) or len(created_at) <= 10:
+            continue
+        moment = _parse_timestamp(created_at)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(zone) if zone is not None else moment.replace(tzinfo=None)
+        slot = moment.weekday() * 24 + moment.hour
+        totals[slot] += 1
+        completed[slot] += bool(task.get('completed'))
+    as_array = lambda counts: np.array([counts[slot] for slot in range(7 * 24)]).reshape(7, 24)
+    return as_array(totals), as_array(completed)
+
+
+@pytest.mark.parametrize('timezone', TIMEZONES)
+def test_histogram_matches_a_datetime_loop(insights, timezone):
+    rng = random.Random(3)
+    start = datetime(2025, 1, 1)
+    tasks = []
+    for _ in range(2000):
+        moment = start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+        created_at = rng.choice([moment.isoformat(), moment.isoformat() + 'Z',
+                                 moment.isoformat() + '+05:30', moment.isoformat() + '-08:00',
+                                 moment.date().isoformat()])
+        tasks.append({'title': 'task', 'completed': rng.random() < 0.6, 'created_at': created_at})
+
+    frames = insights.build_frames([], [], tasks, timezone=timezone)
+    totals, completed = insights._productivity_histogram(frames)
+    expected_totals, expected_completed = loop_histogram(tasks, timezone)
+    assert np.array_equal(totals, expected_totals)
+    assert np.array_equal(completed, expected_completed)
+
+
+def test_aware_times_are_bucketed_in_the_users_timezone(insights):
+    # 08:30 UTC on a Monday is 03:30 in New York
+    tasks = [{'title': 'task', 'completed': True, 'created_at': '2026-03-02T08:30:00Z'}] * 3
+    windows = insights.analyze_productivity(tasks, [], [], timezone='America/New_York')['productivity_windows']
+    assert windows['timezone'] == 'America/New_York'
+    assert windows['by_day_and_time'][0]['day'] == 'Monday'
+    assert windows['by_day_and_time'][0]['start_hour'] == 2
+
+
+def test_implausible_years_do_not_fail_the_request(client):
+    tasks = [{'title': 'task', 'completed': True, 'created_at': created_at}
+             for created_at in ['0001-01-01T10:00:00Z', '9999-12-31T10:00:00Z', '2026-03-02T08:30:00Z']]
+    response = client.post('/api/productivity-insights', json={'task_history': tasks, 'timezone': 'Europe/Berlin'})
+    assert response.status_code == 200
+    assert response.get_json()['productivity_windows']['tasks_with_time'] == 3
+
+
+def test_date_only_tasks_have_no_time_of_day(insights):
+    tasks = tasks_at(0, 9, 3, 3) + [{'title': 'task', 'completed': True, 'created_at': '2026-03-02'}] * 5
+    result = insights.analyze_productivity(tasks, [], [])
+    assert result['total_tasks'] == 8
+    assert result['productivity_windows']['tasks_with_time'] == 3
+
+
+def test_wilson_lower_bound_outranks_small_perfect_windows(insights):
+    tasks = tasks_at(0, 7, 3, 3) + tasks_at(0, 14, 9, 10) + tasks_at(0, 20, 2, 2)
+    windows = insights.analyze_productivity(tasks, [], [])['productivity_windows']
+    assert [(window['start_hour'], window['completed'], window['total']) for window in windows['by_time_of_day']] \
+        == [(14, 9, 10), (6, 3, 3)]
+    assert windows['by_time_of_day'][1]['completion_rate'] == 100.0
+
+
+def test_equal_bounds_prefer_more_tasks_then_earlier_windows(insights):
+    tasks = tasks_at(2, 16, 4, 4) + tasks_at(0, 10, 4, 4) + tasks_at(1, 8, 8, 8)
+    windows = insights.analyze_productivity(tasks, [], [])['productivity_windows']['by_day_and_time']
+    assert [(window['day'], window['start_hour']) for window in windows] == \
+        [('Tuesday', 8), ('Monday', 10), ('Wednesday', 16)]
+
+
+def test_only_the_top_windows_are_reported(insights):
+    # 4, 3 or 2 of 4 tasks done in each of the twelve windows
+    tasks = [task for hour in range(0, 24, 2) for task in tasks_at(0, hour, 4 - hour // 2 % 3, 4)]
+    result = insights.analyze_productivity(tasks, [], [])
+    windows = result['productivity_windows']['by_time_of_day']
+    assert len(windows) == PersonalizedInsights.TOP_PRODUCTIVITY_WINDOWS
+    assert [(window['start_hour'], window['completed']) for window in windows] == \
+        [(0, 4), (6, 4), (12, 4), (18, 4), (2, 3)]
+    assert result['best_productivity_times'] == [window['label'] for window in windows[:2]]
+
+
+@pytest.mark.parametrize('start, label', [(0, 'Night (12-2 AM)'), (10, 'Morning (10 AM-12 PM)'),
+                                          (14, 'Afternoon (2-4 PM)'), (22, 'Night (10 PM-12 AM)'),
+                                          (18, 'Evening (6-8 PM)')])
+def test_window_labels(insights, start, label):
+    assert insights._time_window_label(start, start + 2) == label
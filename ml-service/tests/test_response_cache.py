@@ -0,0 +1,116 @@
+"""Response cache: content addressing, ETag / 304 and expiry"""
+
+import json
+
+import pytest
+
+import response_cache as response_cache_module
+from response_cache import ResponseCache
+
+MOODS = {'mood_history': [{'emotion': 'happy', 'score': 8, 'date': '2026-03-01T09:00:00'},
+                          {'emotion': 'sad', 'score': 3, 'date': '2026-03-02T09:00:00'}]}
+ENDPOINT = '/api/mood-patterns'
+
+
+def counters():
+    import app as service
+    return dict(service.response_cache.stats()['endpoints'].get(ENDPOINT, {'hits': 0, 'misses': 0,
+                                                                          'not_modified': 0}))
+
+
+def test_every_response_carries_an_etag_and_304s_on_a_match(client):
+    first = client.post(ENDPOINT, json=MOODS)
+    etag = first.headers['ETag'].strip('"')
+    assert first.status_code == 200 and etag
+
+    before = counters()
+    repeat = client.post(ENDPOINT, json=MOODS, headers={'If-None-Match': f'"{etag}"'})
+    assert repeat.status_code == 304
+    assert repeat.get_data() == b''
+    assert repeat.headers['ETag'].strip('"') == etag
+    after = counters()
+    assert after['hits'] == before['hits'] + 1
+    assert after['not_modified'] == before['not_modified'] + 1
+
+
+def test_a_stale_etag_gets_the_full_body(client):
+    first = client.post(ENDPOINT, json=MOODS)
+    repeat = client.post(ENDPOINT, json=MOODS, headers={'If-None-Match': '"not-the-etag"'})
+    assert repeat.status_code == 200
+    assert repeat.get_data() == first.get_data()
+    assert repeat.headers['ETag'] == first.headers['ETag']
+
+
+def test_key_order_and_whitespace_share_an_entry(client):
+    client.post(ENDPOINT, json=MOODS)
+    reordered = json.dumps({'mood_history': [dict(reversed(list(entry.items()))) for entry in MOODS['mood_history']]},
+                           indent=2)
+    before = counters()
+    response = client.post(ENDPOINT, data=reordered, content_type='application/json')
+    assert response.status_code == 200
+    assert counters()['hits'] == before['hits'] + 1
+
+
+def test_a_changed_body_gets_a_new_etag(client):
+    first = client.post(ENDPOINT, json=MOODS)
+    changed = {'mood_history': MOODS['mood_history'] + [{'emotion': 'calm', 'score': 6,
+                                                         'date': '2026-03-03T09:00:00'}]}
+    second = client.post(ENDPOINT, json=changed, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+
+
+def test_an_unchanged_recomputed_body_still_304s(client):
+    import app as service
+    etag = client.post(ENDPOINT, json=MOODS).headers['ETag']
+    service.response_cache.clear()
+    response = client.post(ENDPOINT, json=MOODS, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_query_string_is_part_of_the_key(client):
+    plain = client.post(ENDPOINT, json=MOODS)
+    windowed = client.post(f'{ENDPOINT}?windows=7', json=MOODS)
+    assert plain.headers['ETag'] != windowed.headers['ETag']
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    for name in (b'a', b'b'):
+        cache.put(name, name, name.decode())
+    assert cache.get('/x', b'a') is not None
+    cache.put(b'c', b'c', 'c')
+    assert cache.get('/x', b'b') is None
+    assert cache.get('/x', b'a') == (b'a', 'a')
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(response_cache_module.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(response_cache_module, '_next_midnight', lambda now: now + 86400)
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put(b'k', b'body', 'etag')
+    clock[0] += 59
+    assert cache.get('/x', b'k') is not None
+    clock[0] += 2
+    assert cache.get('/x', b'k') is None
+    assert cache.stats()['endpoints']['/x']['expired'] == 1
+
+
+def test_entries_expire_at_midnight(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(response_cache_module.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(response_cache_module, '_next_midnight', lambda now: now + 10)
+    cache = ResponseCache(ttl_seconds=300)
+    cache.put(b'k', b'body', 'etag')
+    clock[0] += 11
+    assert cache.get('/x', b'k') is None
+
+
+@pytest.mark.parametrize('options', [{'max_entries': 0}, {'max_bytes': 0}, {'ttl_seconds': 0}])
+def test_zero_limits_disable_the_cache(options):
+    cache = ResponseCache(**options)
+    cache.put(b'k', b'body', 'etag')
+    assert not cache.enabled
+    assert cache.get('/x', b'k') is None
@@ -0,0 +1,45 @@
+"""Fast, offline-safe startup: lazy imports and background warm-up"""
+
+import json
+import os
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def run_in_fresh_interpreter(code, **env):
+    output = subprocess.run([sys.executable, '-c', code], cwd=SERVICE_DIR, env={**os.environ, **env},
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_importing_the_app_loads_no_model_libraries(tmp_path):
+    loaded = run_in_fresh_interpreter(
+        'import json, sys, app; print(json.dumps([name for name in ("sklearn", "joblib", "nltk") '
+        'if name in sys.modules]))',
+        ML_WARM_UP='background', MODEL_PATH=str(tmp_path / 'missing_model.pkl'))
+    assert loaded == []
+
+
+def test_health_answers_before_warm_up(client, monkeypatch):
+    import app as service
+
+    monkeypatch.setitem(service.service_state, 'ready', False)
+    health = client.get('/health')
+    assert health.status_code == 200
+    assert health.get_json()['ready'] is False
+    assert client.get('/health/ready').status_code == 503
+
+    service.warm_up()
+    assert client.get('/health/ready').status_code == 200
+    assert client.get('/health').get_json()['warm_up_error'] is None
+
+
+def test_requests_before_warm_up_build_the_components(client, monkeypatch):
+    import app as service
+
+    monkeypatch.setitem(service.service_state, 'ready', False)
+    response = client.post('/api/detect-emotion', json={'text': 'I feel great today!'})
+    assert response.status_code == 200
+    assert response.get_json()['emotion'] == 'happy'
@@ -0,0 +1,86 @@
+"""Out-of-core streaming training: chunking, checkpoints and resume"""
+
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from conftest import DETECTION_TEXTS, TRAINING_TEXTS
+from model_store import load_model
+from streaming_trainer import StreamingTrainer, iter_records
+
+CLASSES = ['happy', 'sad', 'angry', 'anxious', 'calm']
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """The training corpus as a JSONL export (with a blank line and an unknown label) and a CSV export"""
+    jsonl = tmp_path / 'export.jsonl'
+    with open(jsonl, 'w') as handle:
+        for text, label in TRAINING_TEXTS:
+            handle.write(json.dumps({'text': text, 'label': label}) + '\n')
+        handle.write('\n' + json.dumps({'text': 'what a surprise', 'label': 'surprised'}) + '\n')
+    csv_path = tmp_path / 'export.csv'
+    with open(csv_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['label', 'text'])
+        for text, label in reversed(TRAINING_TEXTS):
+            writer.writerow([label, f'{text}, again'])
+    return [str(jsonl), str(csv_path)]
+
+
+def train(tmp_path, name, exports, **options):
+    trainer = StreamingTrainer(str(tmp_path / name), CLASSES, progress=None, n_features=2 ** 12, **options)
+    return trainer.train(exports)
+
+
+def test_records_resume_from_their_offsets(exports):
+    for path in exports:
+        records = list(iter_records(path))
+        assert len(records) == len(TRAINING_TEXTS) + path.endswith('.jsonl')
+        middle = records[4][2]
+        assert list(iter_records(path, offset=middle)) == records[5:]
+
+
+def test_chunked_training_matches_one_chunk(tmp_path, exports):
+    whole = train(tmp_path, 'whole.pkl', exports, chunk_size=1000)
+    chunked = train(tmp_path, 'chunked.pkl', exports, chunk_size=3)
+    np.testing.assert_allclose(chunked.predict_proba(DETECTION_TEXTS), whole.predict_proba(DETECTION_TEXTS))
+    saved = load_model(str(tmp_path / 'chunked.pkl'))
+    np.testing.assert_allclose(saved.predict_proba(DETECTION_TEXTS), whole.predict_proba(DETECTION_TEXTS))
+
+
+def test_unknown_labels_are_skipped(tmp_path, exports):
+    model = train(tmp_path, 'model.pkl', exports)
+    assert sorted(model.classes_) == sorted(CLASSES)
+
+
+def test_interrupted_training_resumes_from_the_checkpoint(tmp_path, exports, monkeypatch):
+    expected = train(tmp_path, 'expected.pkl', exports, chunk_size=3)
+
+    fit_chunk = StreamingTrainer._fit_chunk
+    calls = []
+
+    def crash_after_four_chunks(self, *args):
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        calls.append(1)
+        fit_chunk(self, *args)
+
+    monkeypatch.setattr(StreamingTrainer, '_fit_chunk', crash_after_four_chunks)
+    with pytest.raises(KeyboardInterrupt):
+        train(tmp_path, 'resumed.pkl', exports, chunk_size=3, checkpoint_every=1)
+    assert (tmp_path / 'resumed.pkl.checkpoint.json').exists()
+
+    monkeypatch.setattr(StreamingTrainer, '_fit_chunk', fit_chunk)
+    resumed = train(tmp_path, 'resumed.pkl', exports, chunk_size=3, checkpoint_every=1)
+    np.testing.assert_allclose(resumed.predict_proba(DETECTION_TEXTS), expected.predict_proba(DETECTION_TEXTS))
+    assert not (tmp_path / 'resumed.pkl.checkpoint.json').exists()
+
+
+def test_update_keeps_the_tfidf_vocabulary(detector, trained_model_path, exports):
+    vocabulary = dict(detector.model.named_steps['tfidf'].vocabulary_)
+    assert detector.train_model_streaming(exports[:1], model_path=trained_model_path, update=True, progress=None)
+    assert detector.model.named_steps['tfidf'].vocabulary_ == vocabulary
+    assert detector.model.named_steps['classifier'].class_count_.sum() == 2 * len(TRAINING_TEXTS)
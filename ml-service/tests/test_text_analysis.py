@@ -0,0 +1,64 @@
+"""One tokenization pass shared by the journal keyword analyzers"""
+
+import random
+
+import numpy as np
+import pytest
+
+from personalized_insights import PersonalizedInsights
+from text_analysis import TextAnalyzer
+
+FILLER = 'i went to work today and the meeting ran long then my friend called about the trip'.split()
+
+
+@pytest.fixture(scope='module')
+def insights():
+    return PersonalizedInsights()
+
+
+def journal(insights, rng, entries):
+    words = insights.text_analyzer.vocabulary + FILLER
+    return [{'content': ' '.join(rng.choice(words) + rng.choice(['', '', '!', ',', '.'])
+                                 for _ in range(rng.randint(0, 40))).capitalize()}
+            for _ in range(entries)]
+
+
+def legacy_analysis(insights, journal_entries):
+    """The analyzers before sharing a pass: each lowercases and substring-scans every entry again"""
+    content_lower = ' '.join([entry.get('content', '') for entry in journal_entries]).lower()
+    themes = [theme for theme, keywords in insights.theme_keywords.items()
+              if any(word in content_lower for word in keywords)]
+    emotions = {emotion: 0 for emotion in insights.emotion_keywords}
+    mentions = 0
+    for entry in journal_entries:
+        content = entry.get('content', '').lower()
+        for emotion, keywords in insights.emotion_keywords.items():
+            emotions[emotion] += sum(keyword in content for keyword in keywords)
+        mentions += sum(keyword in content for keyword in insights.productivity_keywords)
+    return themes, emotions, mentions
+
+
+def test_shared_pass_matches_separate_scans(insights):
+    rng = random.Random(42)
+    for _ in range(100):
+        entries = journal(insights, rng, rng.randint(1, 15))
+        tokens = insights.text_analyzer.tokenize_entries(entries)
+        shared = (insights._analyze_journal_patterns(entries, tokens)['content_themes'],
+                  insights._analyze_journal_emotions(entries, tokens),
+                  insights._count_productivity_mentions(entries, tokens))
+        assert shared == legacy_analysis(insights, entries)
+
+
+def test_group_counts_match_the_matcher():
+    analyzer = TextAnalyzer({'a': ['down', 'blue'], 'b': ['blue', 'work'], 'c': ['homework']})
+    texts = ['Feeling blue about homework', '', None, 'download the work files', 'BLUE blue Blue']
+    counts = analyzer.tokenize_entries([{'content': text} for text in texts]).group_counts
+    np.testing.assert_array_equal(counts, [[1, 2, 1], [0, 0, 0], [0, 0, 0], [1, 1, 0], [1, 1, 0]])
+
+
+def test_tokens_are_sorted_keyword_ids():
+    analyzer = TextAnalyzer({'a': ['zebra', 'apple'], 'b': ['mango']})
+    ids = analyzer.tokenize('Mango, zebra and APPLE')
+    assert ids.dtype == np.uint16
+    assert ids.tolist() == sorted(ids.tolist())
+    assert [analyzer.vocabulary[i] for i in ids] == ['zebra', 'apple', 'mango']
@@ -0,0 +1,114 @@
+"""
+Text Analysis Layer
+
+Tokenizes journal text once for every keyword-based analyzer.
+
+PersonalizedInsights used to lowercase and substring-search each journal
+entry separately for emotion keywords, productivity keywords and content
+themes. TextAnalyzer merges all of those keyword lists into one vocabulary
+and scans each entry a single time (with KeywordMatcher), producing a
+compact array of the keyword IDs it contains. Analyzers then read their
+counts from those arrays instead of going back to the text.
+
+Matching keeps the substring semantics of the original `keyword in
+content.lower()` checks, so results are unchanged.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher
+
+
+class TokenizedEntries:
+    """
+    A list of entries, each reduced to the keyword IDs it contains
+
+    Per-group counts are derived from the ID arrays on first use.
+    """
+
+    def __init__(self, analyzer: 'TextAnalyzer', token_ids: List[np.ndarray]):
+        self.analyzer = analyzer
+        self.token_ids = token_ids
+        self._group_counts = None
+
+    def __len__(self):
+        return len(self.token_ids)
+
+    @property
+    def group_counts(self) -> np.ndarray:
+        """(entries x groups) matrix: distinct keywords of each group per entry"""
+        if self._group_counts is None:
+            self._group_counts = self.analyzer.count_groups(self.token_ids)
+        return self._group_counts
+
+    def entry_counts(self, group: str) -> np.ndarray:
+        """Keyword hits of one group for every entry"""
+        return self.group_counts[:, self.analyzer.group_index[group]]
+
+    def total(self, group: str) -> int:
+        """Keyword hits of one group summed over all entries"""
+        return int(self.entry_counts(group).sum())
+
+
+class TextAnalyzer:
+    """
+    Unified keyword vocabulary with one-pass tokenization
+
+    Built once from a mapping of group name -> keywords, e.g.
+    'emotion:joy', 'productivity', 'habit', 'theme:Work & Career'.
+    """
+
+    def __init__(self, keyword_groups: Dict[str, List[str]], annotations=None):
+        """
+        Args:
+            keyword_groups: Group name -> keywords
+            annotations: AnnotationStore holding keyword IDs of earlier
+                entries (annotation_store.py), optional
+        """
+        self._matcher = KeywordMatcher(keyword_groups)
+        self.groups = self._matcher.groups
+        self.vocabulary = self._matcher.keywords
+        self.group_index = {group: index for index, group in enumerate(self.groups)}
+        self._group_matrix = self._matcher.group_matrix()
+        self.annotations = annotations
+        # Keyword IDs mean the same for analyzers with the same vocabulary
+        self.fingerprint = hashlib.blake2b(json.dumps(list(self.vocabulary)).encode('utf-8'),
+                                           digest_size=8).hexdigest()
+
+    def tokenize(self, text: Optional[str]) -> np.ndarray:
+        """Keyword IDs present in one text (case-insensitive)"""
+        if not text:
+            return np.zeros(0, dtype=np.uint16)
+        return self._matcher.keyword_ids(text.lower())
+
+    def tokenize_entries(self, entries: List[Dict], field: str = 'content') -> TokenizedEntries:
+        """Tokenize the given field of every entry, once (reusing stored keyword IDs when annotations are kept)"""
+        if self.annotations is not None and self.annotations.enabled:
+            return self.annotations.tokenize_entries(self, entries, field)
+        return TokenizedEntries(self, [self.tokenize(entry.get(field)) for entry in entries])
+
+    def count_groups(self, token_ids: List[np.ndarray]) -> np.ndarray:
+        """
+        Per-group keyword counts for a list of keyword ID arrays
+
+        Returns:
+            ndarray: (len(token_ids) x len(self.groups)) counts
+        """
+        if not token_ids:
+            return np.zeros((0, len(self.groups)), dtype=np.int64)
+        lengths = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(token_ids))
+        flat = np.concatenate(token_ids).astype(np.int64)
+
+        # Each keyword present in an entry adds its group memberships to that
+        # entry: one bincount per group over the keyword hits, so memory grows
+        # with the hits rather than hits x groups
+        entry_index = np.repeat(np.arange(len(token_ids)), lengths)
+        counts = np.zeros((len(token_ids), len(self.groups)), dtype=np.int64)
+        for group in range(len(self.groups)):
+            counts[:, group] = np.bincount(entry_index, weights=self._group_matrix[flat, group],
+                                           minlength=len(token_ids))
+        return counts